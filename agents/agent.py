@@ -7,6 +7,7 @@ It includes:
     - GraphAgent: A state-graph-based agent for message processing and prompt management.
     - ReActAgent: An agent with ReAct (Reasoning and Acting) capabilities using LangGraph's prebuilt tools.
 """
+import asyncio
 import logging
 from abc import ABC, abstractmethod
 from typing import Any
@@ -36,3 +37,19 @@ class AbstractAgent(ABC):
         Returns:
             dict[str, Any]: The updated state or response from the agent.
         """
+
+    async def aprocess_message(self, messages: list[HumanMessage], user_id: str) -> dict[str, Any]:
+        """
+        Process a message without blocking the event loop and return the updated state.
+
+        The default implementation runs process_message on a worker thread, agents with an asynchronous graph
+        override it.
+
+        Args:
+            messages (list[HumanMessage]): The list of messages to process.
+            user_id (str): The ID of the user sending the messages.
+
+        Returns:
+            dict[str, Any]: The updated state or response from the agent.
+        """
+        return await asyncio.to_thread(self.process_message, messages, user_id)
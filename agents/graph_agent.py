@@ -93,3 +93,17 @@ class GraphAgent(AbstractAgent):
         """
         config = RunnableConfig(configurable={"thread_id": user_id})
         return self.compiled_graph.invoke({"messages": messages}, config)
+
+    async def aprocess_message(self, messages: list[HumanMessage], user_id: str) -> dict[str, Any]:
+        """
+        Process a message with the asynchronous invocation of the compiled state graph.
+
+        Args:
+            messages (list[HumanMessage]): The list of messages to process.
+            user_id (str): The ID of the user sending the messages.
+
+        Returns:
+            dict[str, Any]: The response from the model.
+        """
+        config = RunnableConfig(configurable={"thread_id": user_id})
+        return await self.compiled_graph.ainvoke({"messages": messages}, config)
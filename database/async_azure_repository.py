@@ -0,0 +1,244 @@
+"""
+AsyncAzureRepository provides non-blocking operations on an Azure Cosmos DB container.
+
+The repository is built on the azure.cosmos.aio client. One CosmosClient is shared by all repositories of the
+application and owned by the FastAPI lifespan, so connections are pooled and closed once on shutdown. Queries are the
+same parameterized queries as the ones of AzureRepository.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from azure.cosmos.aio import ContainerProxy, CosmosClient
+from azure.cosmos.exceptions import CosmosHttpResponseError
+
+from database.async_repository import AsyncRepository
+from database.azure_repository import (MAX_BULK_WORKERS, READ_BATCH_SIZE, build_price_query, build_similarity_query,
+                                       decode_cosmos_token, encode_cosmos_token)
+from database.bulk_write_result_model import BulkItemResult, BulkWriteResult
+from database.repository_metrics import RequestCharge, observed, request_charge_hook
+from database.result_page_model import DEFAULT_PAGE_SIZE, ResultPage
+from database.search_filter_model import SearchFilter
+from embedding.vector import EmbeddingFormat, Vector
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAzureRepository(AsyncRepository):
+    """
+    Asynchronous repository for Azure Cosmos DB container operations.
+
+    Args:
+        container (ContainerProxy): The asynchronous container client to use.
+        embedding_format (EmbeddingFormat | None, optional): Format in which embeddings are stored and queried.
+            Defaults to full float32 vectors.
+        max_bulk_workers (int, optional): Maximum number of concurrent writes made by the bulk operations.
+            Defaults to MAX_BULK_WORKERS.
+    """
+
+    def __init__(self, container: ContainerProxy, embedding_format: Optional[EmbeddingFormat] = None,
+                 max_bulk_workers: int = MAX_BULK_WORKERS):
+        self.container = container
+        self.embedding_format = embedding_format or EmbeddingFormat()
+        self.max_bulk_workers = max_bulk_workers
+        self.metrics_label = f"cosmos_async:{getattr(container, 'id', 'container')}"
+
+    @classmethod
+    def from_client(cls, client: CosmosClient, database_name: str, container_name: str,
+                    embedding_format: Optional[EmbeddingFormat] = None,
+                    max_bulk_workers: int = MAX_BULK_WORKERS) -> "AsyncAzureRepository":
+        """
+        Create a repository for a container of a shared client.
+
+        Args:
+            client (CosmosClient): The shared asynchronous client, closed by its owner.
+            database_name (str): Name of the Cosmos DB database.
+            container_name (str): Name of the Cosmos DB container.
+            embedding_format (EmbeddingFormat | None, optional): Format in which embeddings are stored and queried.
+            max_bulk_workers (int, optional): Maximum number of concurrent writes made by the bulk operations.
+
+        Returns:
+            AsyncAzureRepository: Repository using the container.
+        """
+        container = client.get_database_client(database_name).get_container_client(container_name)
+        return cls(container, embedding_format, max_bulk_workers)
+
+    @observed("read_item")
+    async def read_item(self, item_id: str) -> dict:
+        """
+        Read an item from the Cosmos DB container by its ID.
+
+        Args:
+            item_id (str): The ID of the item to read.
+
+        Returns:
+            dict: The retrieved item.
+        """
+        return await self.container.read_item(item=item_id, partition_key=item_id,
+                                              response_hook=request_charge_hook())
+
+    @observed("read_items")
+    async def read_items(self, item_ids: list[str], fields: list[str]) -> dict[str, dict]:
+        """
+        Read many items from the Cosmos DB container with concurrent projected queries.
+
+        Args:
+            item_ids (list[str]): The IDs of the items to read.
+            fields (list[str]): Names of the fields to return for every item, "id" is always returned.
+
+        Returns:
+            dict[str, dict]: The projected items by ID, missing items are left out.
+        """
+        projection = ", ".join(f"c.{field}" for field in dict.fromkeys(["id", *fields]))
+        query = f"SELECT {projection} FROM c WHERE ARRAY_CONTAINS(@ids, c.id)"
+        batches = await asyncio.gather(*(
+            self._query(query, [{"name": "@ids", "value": item_ids[start:start + READ_BATCH_SIZE]}])
+            for start in range(0, len(item_ids), READ_BATCH_SIZE)
+        ))
+        return {item["id"]: item for batch in batches for item in batch}
+
+    @observed("upsert_items")
+    async def upsert_items(self, items: list[dict]) -> BulkWriteResult:
+        """
+        Create or replace many items in the Cosmos DB container with concurrent writes.
+
+        Args:
+            items (list[dict]): The items to be upserted.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+        return await self._bulk_write(self.container.upsert_item, items)
+
+    @observed("patch_items")
+    async def patch_items(self, patches: list[dict]) -> BulkWriteResult:
+        """
+        Set fields of existing items with concurrent partial updates.
+
+        Args:
+            patches (list[dict]): One dictionary per item with its "id" and the fields to set.
+
+        Returns:
+            BulkWriteResult: One result per patch, in input order.
+        """
+        async def patch(item: dict, response_hook: Optional[RequestCharge] = None) -> dict:
+            operations = [{"op": "set", "path": f"/{field}", "value": value}
+                          for field, value in item.items() if field != "id"]
+            return await self.container.patch_item(item=item["id"], partition_key=item["id"],
+                                                   patch_operations=operations, response_hook=response_hook)
+
+        return await self._bulk_write(patch, patches)
+
+    @observed("query_by_embedding")
+    async def query_by_embedding(self, embedding: Vector, max_results: int = 10,
+                                 search_filter: Optional[SearchFilter] = None) -> list[dict]:
+        """
+        Query items in the Cosmos DB container by vector similarity, see AzureRepository.query_by_embedding.
+
+        Args:
+            embedding (Vector): The embedding vector to query by.
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+                Defaults to no filter.
+
+        Returns:
+            list[dict]: The matching items with their similarity_score, most similar first.
+        """
+        query, parameters = build_similarity_query(max_results, search_filter)
+        parameters.append({"name": "@embedding", "value": self.embedding_format.encode(embedding)})
+        return await self._query(query, parameters)
+
+    @observed("query_pages_by_embedding")
+    async def query_pages_by_embedding(self, embedding: Vector, max_results: int = 10,
+                                       search_filter: Optional[SearchFilter] = None,
+                                       page_size: int = DEFAULT_PAGE_SIZE,
+                                       continuation_token: Optional[str] = None) -> AsyncIterator[ResultPage]:
+        """
+        Lazily yield the results of query_by_embedding page by page, fetching one Cosmos DB result page at a time.
+
+        Args:
+            embedding (Vector): The embedding vector to query by.
+            max_results (int, optional): Maximum number of results over all pages. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+                Defaults to no filter.
+            page_size (int, optional): Maximum number of results per page. Defaults to DEFAULT_PAGE_SIZE.
+            continuation_token (str | None, optional): Token of a previous page of the same query.
+                Defaults to the first page.
+
+        Returns:
+            AsyncIterator[ResultPage]: The pages, the last one without a continuation token.
+
+        Raises:
+            ValueError: If the continuation token was not created by a Cosmos DB repository.
+        """
+        cosmos_token = decode_cosmos_token(continuation_token)
+        query, parameters = build_similarity_query(max_results, search_filter)
+        parameters.append({"name": "@embedding", "value": self.embedding_format.encode(embedding)})
+        pager = self.container.query_items(query=query, parameters=parameters, max_item_count=page_size,
+                                           response_hook=request_charge_hook()).by_page(cosmos_token)
+        async for page in pager:
+            items = [item async for item in page]
+            yield ResultPage(items=items, continuation_token=encode_cosmos_token(pager.continuation_token))
+
+    @observed("query_by_price")
+    async def query_by_price(self, max_results: int = 10, search_filter: Optional[SearchFilter] = None,
+                             descending: bool = False) -> list[dict]:
+        """
+        Query items in the Cosmos DB container ordered by their numeric price, cheapest first by default.
+
+        Args:
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions of the search. Defaults to no filter.
+            descending (bool, optional): Return the most expensive items first. Defaults to False.
+
+        Returns:
+            list[dict]: Matching items without their embeddings.
+        """
+        query, parameters = build_price_query(max_results, search_filter, descending)
+        return await self._query(query, parameters)
+
+    async def _query(self, query: str, parameters: list[dict]) -> list[dict]:
+        """
+        Run a parameterized query and collect all result pages.
+        """
+        return [item async for item in self.container.query_items(query=query, parameters=parameters,
+                                                                  response_hook=request_charge_hook())]
+
+    def _encode_item(self, item: dict) -> dict:
+        """
+        Return a copy of the item with its embedding serialized in the repository embedding format.
+        """
+        if "embedding" not in item:
+            return item
+        return {**item, "embedding": self.embedding_format.encode(item["embedding"])}
+
+    async def _bulk_write(self, write: Callable[..., Awaitable[dict]], items: list[dict]) -> BulkWriteResult:
+        """
+        Run a single-item write operation for every item, with at most max_bulk_workers writes in flight.
+
+        Args:
+            write (Callable[..., Awaitable[dict]]): Container operation writing one item, accepting a response_hook.
+            items (list[dict]): The items to write.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+        semaphore = asyncio.Semaphore(self.max_bulk_workers)
+        response_hook = request_charge_hook()
+
+        async def write_one(item: dict) -> BulkItemResult:
+            async with semaphore:
+                try:
+                    await write(self._encode_item(item), response_hook=response_hook)
+                    return BulkItemResult(id=item.get("id"), success=True)
+                except CosmosHttpResponseError as e:
+                    logger.warning("Bulk write of item %s failed with status %s: %s",
+                                   item.get("id"), e.status_code, e)
+                    return BulkItemResult(id=item.get("id"), success=False, status_code=e.status_code, error=str(e))
+                except Exception as e:
+                    logger.warning("Bulk write of item %s failed: %s", item.get("id"), e)
+                    return BulkItemResult(id=item.get("id"), success=False, error=str(e))
+
+        result = BulkWriteResult(results=list(await asyncio.gather(*(write_one(item) for item in items))))
+        logger.info("Bulk write finished: %d of %d items written", result.succeeded, len(items))
+        return result
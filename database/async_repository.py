@@ -0,0 +1,167 @@
+"""
+Asynchronous repository interface for long-term memory backends.
+
+The API endpoints await the repository so a single worker can keep many requests in flight while they wait on the
+database. AsyncAzureRepository implements the interface natively, ThreadedAsyncRepository adapts any synchronous
+Repository, such as the local in-process vector store, by running its calls on worker threads.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from database.bulk_write_result_model import BulkWriteResult
+from database.repository import Repository
+from database.result_page_model import DEFAULT_PAGE_SIZE, ResultPage, paginate
+from database.search_filter_model import SearchFilter
+from embedding.vector import Vector
+
+
+class AsyncRepository(ABC):
+    """
+    Abstract base class for repositories awaited by the API, covering the reads and bulk writes it needs.
+    """
+
+    @abstractmethod
+    async def read_item(self, item_id: str) -> dict:
+        """
+        Read an item by its ID.
+
+        Args:
+            item_id (str): The ID of the item to read.
+
+        Returns:
+            dict: The retrieved item.
+        """
+
+    @abstractmethod
+    async def read_items(self, item_ids: list[str], fields: list[str]) -> dict[str, dict]:
+        """
+        Read many items, projected to the given fields.
+
+        Args:
+            item_ids (list[str]): The IDs of the items to read.
+            fields (list[str]): Names of the fields to return for every item, "id" is always returned.
+
+        Returns:
+            dict[str, dict]: The projected items by ID, missing items are left out.
+        """
+
+    @abstractmethod
+    async def upsert_items(self, items: list[dict]) -> BulkWriteResult:
+        """
+        Create or replace many items, reporting the outcome of every item without aborting the batch.
+
+        Args:
+            items (list[dict]): The items to be upserted.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+
+    @abstractmethod
+    async def patch_items(self, patches: list[dict]) -> BulkWriteResult:
+        """
+        Set fields of existing items, leaving their other fields untouched.
+
+        Args:
+            patches (list[dict]): One dictionary per item with its "id" and the fields to set.
+
+        Returns:
+            BulkWriteResult: One result per patch, in input order.
+        """
+
+    @abstractmethod
+    async def query_by_embedding(self, embedding: Vector, max_results: int = 10,
+                                 search_filter: Optional[SearchFilter] = None) -> list[dict]:
+        """
+        Query the items most similar to the embedding.
+
+        Args:
+            embedding (Vector): The embedding vector to query by.
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+                Defaults to no filter.
+
+        Returns:
+            list[dict]: The matching items without their embeddings, most similar first.
+        """
+
+    async def query_pages_by_embedding(self, embedding: Vector, max_results: int = 10,
+                                       search_filter: Optional[SearchFilter] = None,
+                                       page_size: int = DEFAULT_PAGE_SIZE,
+                                       continuation_token: Optional[str] = None) -> AsyncIterator[ResultPage]:
+        """
+        Lazily yield the results of query_by_embedding page by page, see Repository.query_pages_by_embedding.
+
+        The default implementation ranks the results once and resumes at the offset stored in the token.
+
+        Args:
+            embedding (Vector): The embedding vector to query by.
+            max_results (int, optional): Maximum number of results over all pages. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+                Defaults to no filter.
+            page_size (int, optional): Maximum number of results per page. Defaults to DEFAULT_PAGE_SIZE.
+            continuation_token (str | None, optional): Token of a previous page of the same query.
+                Defaults to the first page.
+
+        Returns:
+            AsyncIterator[ResultPage]: The pages, the last one without a continuation token.
+
+        Raises:
+            ValueError: If the continuation token is invalid.
+        """
+        items = await self.query_by_embedding(embedding, max_results, search_filter)
+        for page in paginate(items, page_size, continuation_token):
+            yield page
+
+    @abstractmethod
+    async def query_by_price(self, max_results: int = 10, search_filter: Optional[SearchFilter] = None,
+                             descending: bool = False) -> list[dict]:
+        """
+        Query items ordered by their normalized price, cheapest first by default.
+
+        Args:
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions of the search. Defaults to no filter.
+            descending (bool, optional): Return the most expensive items first. Defaults to False.
+
+        Returns:
+            list[dict]: Matching items without their embeddings.
+        """
+
+    async def close(self) -> None:
+        """
+        Release the resources held by the repository. Shared clients are closed by their owner.
+        """
+
+
+class ThreadedAsyncRepository(AsyncRepository):
+    """
+    Asynchronous view of a synchronous repository that runs every call on a worker thread.
+
+    Args:
+        repository (Repository): The wrapped repository, which stays usable synchronously.
+    """
+
+    def __init__(self, repository: Repository):
+        self.repository = repository
+
+    async def read_item(self, item_id: str) -> dict:
+        return await asyncio.to_thread(self.repository.read_item, item_id)
+
+    async def read_items(self, item_ids: list[str], fields: list[str]) -> dict[str, dict]:
+        return await asyncio.to_thread(self.repository.read_items, item_ids, fields)
+
+    async def upsert_items(self, items: list[dict]) -> BulkWriteResult:
+        return await asyncio.to_thread(self.repository.upsert_items, items)
+
+    async def patch_items(self, patches: list[dict]) -> BulkWriteResult:
+        return await asyncio.to_thread(self.repository.patch_items, patches)
+
+    async def query_by_embedding(self, embedding: Vector, max_results: int = 10,
+                                 search_filter: Optional[SearchFilter] = None) -> list[dict]:
+        return await asyncio.to_thread(self.repository.query_by_embedding, embedding, max_results, search_filter)
+
+    async def query_by_price(self, max_results: int = 10, search_filter: Optional[SearchFilter] = None,
+                             descending: bool = False) -> list[dict]:
+        return await asyncio.to_thread(self.repository.query_by_price, max_results, search_filter, descending)
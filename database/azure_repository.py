@@ -8,26 +8,78 @@ It supports creating, reading, updating, and deleting items using the Azure Cosm
 
 
 import logging
-from azure.cosmos import CosmosClient
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+
+from azure.cosmos import ContainerProxy, CosmosClient
+from azure.cosmos.exceptions import CosmosHttpResponseError
+
+from database.bulk_write_result_model import BulkItemResult, BulkWriteResult
+from database.repository import Repository
+from database.repository_metrics import RequestCharge, observed, request_charge_hook
+from database.result_page_model import (DEFAULT_PAGE_SIZE, ResultPage, decode_continuation_token,
+                                        encode_continuation_token)
+from database.search_filter_model import PRICE_FIELD, SearchFilter
+from embedding.vector import EmbeddingFormat, Vector
 
 logger = logging.getLogger(__name__)
 
-class AzureRepository:
+# Default number of concurrent writes made by the bulk operations
+MAX_BULK_WORKERS = 16
+# Number of IDs looked up by one read_items query
+READ_BATCH_SIZE = 256
+
+class AzureRepository(Repository):
     """
     Repository for Azure Cosmos DB container operations.
 
     Args:
-        connection_string (str): Connection string for Cosmos DB.
-        database_name (str): Name of the Cosmos DB database.
-        container_name (str): Name of the Cosmos DB container.
+        connection_string (str, optional): Connection string for Cosmos DB. Not used when a container is given.
+        database_name (str, optional): Name of the Cosmos DB database. Not used when a container is given.
+        container_name (str, optional): Name of the Cosmos DB container. Not used when a container is given.
+        embedding_format (EmbeddingFormat | None, optional): Format in which embeddings are stored and queried.
+            Defaults to full float32 vectors.
+        max_bulk_workers (int, optional): Maximum number of concurrent writes made by create_items and
+            upsert_items. Defaults to MAX_BULK_WORKERS.
+        container (ContainerProxy | None, optional): Existing container client to use instead of connecting with
+            the connection string. Its client is owned by the caller and not closed by the repository.
     """
 
-    def __init__(self, connection_string: str, database_name: str , container_name: str):
+    def __init__(self, connection_string: str = "", database_name: str = "", container_name: str = "",
+                 embedding_format: Optional[EmbeddingFormat] = None,
+                 max_bulk_workers: int = MAX_BULK_WORKERS,
+                 *,
+                 container: Optional[ContainerProxy] = None):
         self.connection_string = connection_string
-        self.client = CosmosClient.from_connection_string(connection_string)
-        self.database = self.client.get_database_client(database_name)
-        self.container = self.database.get_container_client(container_name)
+        if container is None:
+            self.client: Optional[CosmosClient] = CosmosClient.from_connection_string(connection_string)
+            self.database = self.client.get_database_client(database_name)
+            self.container = self.database.get_container_client(container_name)
+        else:
+            self.client, self.database, self.container = None, None, container
+        self.embedding_format = embedding_format or EmbeddingFormat()
+        self.max_bulk_workers = max_bulk_workers
+        self.metrics_label = f"cosmos:{getattr(self.container, 'id', 'container')}"
+        self._executor = ThreadPoolExecutor(max_workers=max_bulk_workers, thread_name_prefix="cosmos-bulk")
+
+    @classmethod
+    def from_container(cls, container: ContainerProxy,
+                       embedding_format: Optional[EmbeddingFormat] = None,
+                       max_bulk_workers: int = MAX_BULK_WORKERS) -> "AzureRepository":
+        """
+        Create a repository around an existing container client, for example a shared or in-memory container.
+
+        Args:
+            container (ContainerProxy): The container client to use.
+            embedding_format (EmbeddingFormat | None, optional): Format in which embeddings are stored and queried.
+            max_bulk_workers (int, optional): Maximum number of concurrent writes made by the bulk operations.
+
+        Returns:
+            AzureRepository: Repository using the given container.
+        """
+        return cls(embedding_format=embedding_format, max_bulk_workers=max_bulk_workers, container=container)
 
+    @observed("create_item")
     def create_item(self, item: dict) -> dict:
         """
         Create a new item in the Cosmos DB container.
@@ -38,9 +90,40 @@ class AzureRepository:
         Returns:
             dict: The created item.
         """
-        created = self.container.create_item(item)
+        created = self.container.create_item(self._encode_item(item), response_hook=request_charge_hook())
         return created
 
+    @observed("create_items")
+    def create_items(self, items: list[dict]) -> BulkWriteResult:
+        """
+        Create many items in the Cosmos DB container with concurrent writes.
+
+        A failing item does not abort the batch, its error is reported in its result.
+
+        Args:
+            items (list[dict]): The items to be created.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+        return self._bulk_write(self.container.create_item, items)
+
+    @observed("upsert_items")
+    def upsert_items(self, items: list[dict]) -> BulkWriteResult:
+        """
+        Create or replace many items in the Cosmos DB container with concurrent writes.
+
+        A failing item does not abort the batch, its error is reported in its result.
+
+        Args:
+            items (list[dict]): The items to be upserted.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+        return self._bulk_write(self.container.upsert_item, items)
+
+    @observed("read_item")
     def read_item(self, item_id: str) -> dict:
         """
         Read an item from the Cosmos DB container by its ID.
@@ -51,9 +134,34 @@ class AzureRepository:
         Returns:
             dict: The retrieved item.
         """
-        item = self.container.read_item(item=item_id, partition_key=item_id)
+        item = self.container.read_item(item=item_id, partition_key=item_id, response_hook=request_charge_hook())
         return item
 
+    @observed("read_items")
+    def read_items(self, item_ids: list[str], fields: list[str]) -> dict[str, dict]:
+        """
+        Read many items from the Cosmos DB container with projected queries, without transferring embeddings
+        unless they are asked for.
+
+        Args:
+            item_ids (list[str]): The IDs of the items to read.
+            fields (list[str]): Names of the fields to return for every item, "id" is always returned.
+
+        Returns:
+            dict[str, dict]: The projected items by ID, missing items are left out.
+        """
+        projection = ", ".join(f"c.{field}" for field in dict.fromkeys(["id", *fields]))
+        query = f"SELECT {projection} FROM c WHERE ARRAY_CONTAINS(@ids, c.id)"
+        items: dict[str, dict] = {}
+        for start in range(0, len(item_ids), READ_BATCH_SIZE):
+            parameters = [{"name": "@ids", "value": item_ids[start:start + READ_BATCH_SIZE]}]
+            for item in self.container.query_items(query=query, parameters=parameters,
+                                                   enable_cross_partition_query=True,
+                                                   response_hook=request_charge_hook()):
+                items[item["id"]] = item
+        return items
+
+    @observed("update_item")
     def update_item(self, updated_item: dict) -> dict:
         """
         Update an existing item in the Cosmos DB container.
@@ -63,9 +171,10 @@ class AzureRepository:
         Returns:
             dict: The upserted item.
         """
-        upserted = self.container.upsert_item(updated_item)
+        upserted = self.container.upsert_item(self._encode_item(updated_item), response_hook=request_charge_hook())
         return upserted
 
+    @observed("delete_item")
     def delete_item(self, item_id: str) -> dict | None:
         """
         Delete an item from the Cosmos DB container by its ID.
@@ -76,21 +185,44 @@ class AzureRepository:
         Returns:
             dict: The result of the delete operation.
         """
-        result = self.container.delete_item(item=item_id, partition_key=item_id)
+        result = self.container.delete_item(item=item_id, partition_key=item_id, response_hook=request_charge_hook())
         return result
 
-    def query_by_embedding(self, embedding: list[float], max_results: int = 10) -> list[dict]:
+    @observed("delete_items")
+    def delete_items(self, item_ids: list[str]) -> BulkWriteResult:
+        """
+        Delete many items from the Cosmos DB container with concurrent deletes.
+
+        A failing delete, for example of an item that does not exist, does not abort the batch.
+
+        Args:
+            item_ids (list[str]): The IDs of the items to delete.
+
+        Returns:
+            BulkWriteResult: One result per ID, in input order.
+        """
+        def delete(item: dict, response_hook: Optional[RequestCharge] = None) -> None:
+            self.container.delete_item(item=item["id"], partition_key=item["id"], response_hook=response_hook)
+
+        return self._bulk_write(delete, [{"id": item_id} for item_id in item_ids])
+
+    @observed("query_by_embedding")
+    def query_by_embedding(self, embedding: Vector, max_results: int = 10,
+                           search_filter: Optional[SearchFilter] = None) -> list[dict]:
         """
         Query items in the Cosmos DB container by vector similarity using the VectorDistance function.
         
         This method performs a semantic similarity search against the vector embeddings stored in Cosmos DB.
         It calculates the distance between the provided embedding vector and the embeddings in the database,
-        returning the closest matches sorted by similarity.
+        returning the closest matches sorted by similarity. The filter is compiled into the WHERE clause of the
+        same parameterized query, and its keywords into a FullTextScore fused with the vector rank by RRF.
 
         Args:
-            embedding (list[float]): The embedding vector to query by. Should be a list of floating point 
-                                     numbers representing the vector embedding of the query text.
+            embedding (Vector): The embedding vector to query by, encoded with the repository embedding format
+                                before it is sent.
             max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+                Defaults to no filter.
 
         Returns:
             list[dict]: A list of items matching the embedding query, with only specific fields:
@@ -100,29 +232,299 @@ class AzureRepository:
                         - item_code: The product code from the retailer
                         - store_name: The name of the retailer
                         - date_time: When the item was retrieved
-                        - similarity_score: The vector distance value (lower is better)
+                        - similarity_score: The cosine similarity to the query (higher is better)
                         
         Note:
             This function leverages Cosmos DB's vector capabilities to perform similarity search.
-            The results are ordered by increasing vector distance (meaning the most similar 
-            items appear first).
-        """
-        # Only select the fields defined in RetrievedDatabaseExtractedItem
-        select_fields = [
-            "c.id",
-            "c.price",
-            "c.description",
-            "c.item_code",
-            "c.store_name",
-            "c.date_time",
-            "VectorDistance(c.embedding, @embedding) AS similarity_score"
-        ]
-        select_clause = ", ".join(select_fields)
-        query = f"""
-        SELECT TOP {max_results} {select_clause}
-        FROM c
-        ORDER BY VectorDistance(c.embedding, @embedding)
-        """
-        parameters = [{"name": "@embedding", "value": embedding}]
-        items = self.container.query_items(query=query, parameters=parameters, enable_cross_partition_query=True)
-        return list(items)
\ No newline at end of file
+            The results are ordered by decreasing similarity (meaning the most similar 
+            items appear first), or by fused rank when keywords are given.
+        """
+        query, parameters = build_similarity_query(max_results, search_filter)
+        parameters.append({"name": "@embedding", "value": self.embedding_format.encode(embedding)})
+        items = self.container.query_items(query=query, parameters=parameters, enable_cross_partition_query=True,
+                                           response_hook=request_charge_hook())
+        return list(items)
+
+    @observed("query_pages_by_embedding")
+    def query_pages_by_embedding(self, embedding: Vector, max_results: int = 10,
+                                 search_filter: Optional[SearchFilter] = None,
+                                 page_size: int = DEFAULT_PAGE_SIZE,
+                                 continuation_token: Optional[str] = None) -> Iterator[ResultPage]:
+        """
+        Lazily yield the results of query_by_embedding page by page, fetching one Cosmos DB result page at a time.
+
+        The continuation token wraps the continuation token of Cosmos DB, so the query resumes on the server.
+
+        Args:
+            embedding (Vector): The embedding vector to query by.
+            max_results (int, optional): Maximum number of results over all pages. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+                Defaults to no filter.
+            page_size (int, optional): Maximum number of results per page. Defaults to DEFAULT_PAGE_SIZE.
+            continuation_token (str | None, optional): Token of a previous page of the same query.
+                Defaults to the first page.
+
+        Returns:
+            Iterator[ResultPage]: The pages, the last one without a continuation token.
+
+        Raises:
+            ValueError: If the continuation token was not created by this repository.
+        """
+        cosmos_token = decode_cosmos_token(continuation_token)
+        query, parameters = build_similarity_query(max_results, search_filter)
+        parameters.append({"name": "@embedding", "value": self.embedding_format.encode(embedding)})
+        pager = self.container.query_items(query=query, parameters=parameters, enable_cross_partition_query=True,
+                                           max_item_count=page_size,
+                                           response_hook=request_charge_hook()).by_page(cosmos_token)
+        for page in pager:
+            yield ResultPage(items=list(page), continuation_token=encode_cosmos_token(pager.continuation_token))
+
+    @observed("query_by_price")
+    def query_by_price(self, max_results: int = 10, search_filter: Optional[SearchFilter] = None,
+                       descending: bool = False) -> list[dict]:
+        """
+        Query items in the Cosmos DB container ordered by their numeric price, cheapest first by default.
+
+        Items without a parsed price are never returned.
+
+        Args:
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions of the search, keywords have to match at
+                least one description term. Defaults to no filter.
+            descending (bool, optional): Return the most expensive items first. Defaults to False.
+
+        Returns:
+            list[dict]: Matching items without their embeddings.
+        """
+        query, parameters = build_price_query(max_results, search_filter, descending)
+        items = self.container.query_items(query=query, parameters=parameters, enable_cross_partition_query=True,
+                                           response_hook=request_charge_hook())
+        return list(items)
+
+    @observed("iter_items")
+    def iter_items(self, fields: list[str]) -> Iterator[dict]:
+        """
+        Iterate over all items in the Cosmos DB container, projected to the given fields.
+
+        Args:
+            fields (list[str]): Names of the fields to return for every item.
+
+        Returns:
+            Iterator[dict]: The projected items, fetched page by page.
+        """
+        query = f"SELECT {', '.join('c.' + field for field in fields)} FROM c"
+        return iter(self.container.query_items(query=query, enable_cross_partition_query=True,
+                                               response_hook=request_charge_hook()))
+
+    @observed("patch_items")
+    def patch_items(self, patches: list[dict]) -> BulkWriteResult:
+        """
+        Set fields of existing items with concurrent partial updates, leaving the rest of the documents untouched.
+
+        Args:
+            patches (list[dict]): One dictionary per item with its "id" and the fields to set.
+
+        Returns:
+            BulkWriteResult: One result per patch, in input order.
+        """
+        def patch(item: dict, response_hook: Optional[RequestCharge] = None) -> dict:
+            operations = [{"op": "set", "path": f"/{field}", "value": value}
+                          for field, value in item.items() if field != "id"]
+            return self.container.patch_item(item=item["id"], partition_key=item["id"], patch_operations=operations,
+                                              response_hook=response_hook)
+
+        return self._bulk_write(patch, patches)
+
+    def close(self) -> None:
+        """
+        Shut down the bulk write workers and close the client the repository created from a connection string.
+        """
+        self._executor.shutdown(wait=True)
+        if self.client is not None:
+            self.client.close()
+
+    def _encode_item(self, item: dict) -> dict:
+        """
+        Return a copy of the item with its embedding serialized in the repository embedding format.
+
+        Args:
+            item (dict): The item to encode.
+
+        Returns:
+            dict: The item ready to be written to Cosmos DB.
+        """
+        if "embedding" not in item:
+            return item
+        return {**item, "embedding": self.embedding_format.encode(item["embedding"])}
+
+    def _bulk_write(self, write: Callable[..., dict], items: list[dict]) -> BulkWriteResult:
+        """
+        Run a single-item write operation for every item on the bulk worker pool.
+
+        The response hook of the observed operation is captured here and passed to the writes, because the worker
+        threads do not inherit the context.
+
+        Args:
+            write (Callable[..., dict]): Container operation writing one item, accepting a response_hook.
+            items (list[dict]): The items to write.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+        response_hook = request_charge_hook()
+
+        def write_one(item: dict) -> BulkItemResult:
+            try:
+                write(self._encode_item(item), response_hook=response_hook)
+                return BulkItemResult(id=item.get("id"), success=True)
+            except CosmosHttpResponseError as e:
+                logger.warning("Bulk write of item %s failed with status %s: %s", item.get("id"), e.status_code, e)
+                return BulkItemResult(id=item.get("id"), success=False, status_code=e.status_code, error=str(e))
+            except Exception as e:
+                logger.warning("Bulk write of item %s failed: %s", item.get("id"), e)
+                return BulkItemResult(id=item.get("id"), success=False, error=str(e))
+
+        result = BulkWriteResult(results=list(self._executor.map(write_one, items)))
+        logger.info("Bulk write finished: %d of %d items written", result.succeeded, len(items))
+        return result
+
+
+# Fields of RetrievedDatabaseExtractedItem selected by the queries
+RESULT_FIELDS = ["c.id", "c.price", "c.price_minor", "c.currency", "c.description", "c.item_code", "c.store_name",
+                 "c.date_time"]
+
+
+def build_similarity_query(max_results: int, search_filter: Optional[SearchFilter] = None) -> tuple[str, list[dict]]:
+    """
+    Compile a similarity search into one parameterized Cosmos DB query.
+
+    Args:
+        max_results (int): Maximum number of results to return.
+        search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+
+    Returns:
+        tuple[str, list[dict]]: The query text and its parameters, without the @embedding parameter.
+    """
+    select_clause = ", ".join(RESULT_FIELDS + ["VectorDistance(c.embedding, @embedding) AS similarity_score"])
+    conditions, parameters = build_filter_conditions(search_filter)
+    order_clause = "ORDER BY VectorDistance(c.embedding, @embedding)"
+    terms = search_filter.terms() if search_filter else []
+    if terms:
+        term_parameters = _term_parameters(terms, parameters)
+        order_clause = (f"ORDER BY RANK RRF(VectorDistance(c.embedding, @embedding), "
+                        f"FullTextScore(c.description, {term_parameters}))")
+    return _query(max_results, select_clause, conditions, order_clause), parameters
+
+
+def build_price_query(max_results: int, search_filter: Optional[SearchFilter] = None,
+                      descending: bool = False) -> tuple[str, list[dict]]:
+    """
+    Compile a price ordered search into one parameterized Cosmos DB query served by the range index on the price.
+
+    Args:
+        max_results (int): Maximum number of results to return.
+        search_filter (SearchFilter | None, optional): Restrictions of the search, keywords have to match at least
+            one description term.
+        descending (bool, optional): Order the most expensive items first. Defaults to False.
+
+    Returns:
+        tuple[str, list[dict]]: The query text and its parameters.
+    """
+    conditions, parameters = build_filter_conditions(search_filter)
+    conditions.append(f"IS_NUMBER(c.{PRICE_FIELD})")
+    terms = search_filter.terms() if search_filter else []
+    if terms:
+        conditions.append(f"FullTextContainsAny(c.description, {_term_parameters(terms, parameters)})")
+    order_clause = f"ORDER BY c.{PRICE_FIELD} {'DESC' if descending else 'ASC'}"
+    return _query(max_results, ", ".join(RESULT_FIELDS), conditions, order_clause), parameters
+
+
+def build_filter_conditions(search_filter: Optional[SearchFilter]) -> tuple[list[str], list[dict]]:
+    """
+    Compile the restrictions of a search filter into WHERE conditions and their parameters.
+
+    Args:
+        search_filter (SearchFilter | None): The filter to compile.
+
+    Returns:
+        tuple[list[str], list[dict]]: Conditions to be joined with AND, and the query parameters they use.
+    """
+    conditions: list[str] = []
+    parameters: list[dict] = []
+    if search_filter is None:
+        return conditions, parameters
+    if search_filter.store_names:
+        conditions.append("ARRAY_CONTAINS(@store_names, c.store_name)")
+        parameters.append({"name": "@store_names", "value": search_filter.store_names})
+    earliest, latest = search_filter.earliest(), search_filter.latest()
+    if earliest:
+        conditions.append("c.date_time >= @since")
+        parameters.append({"name": "@since", "value": earliest})
+    if latest:
+        conditions.append("c.date_time <= @until")
+        parameters.append({"name": "@until", "value": latest})
+    if search_filter.currency:
+        conditions.append("c.currency = @currency")
+        parameters.append({"name": "@currency", "value": search_filter.currency})
+    min_price, max_price = search_filter.price_bounds()
+    if min_price is not None:
+        conditions.append(f"c.{PRICE_FIELD} >= @min_price")
+        parameters.append({"name": "@min_price", "value": min_price})
+    if max_price is not None:
+        conditions.append(f"c.{PRICE_FIELD} <= @max_price")
+        parameters.append({"name": "@max_price", "value": max_price})
+    return conditions, parameters
+
+
+def encode_cosmos_token(cosmos_token: Optional[str]) -> Optional[str]:
+    """
+    Wrap a Cosmos DB continuation token in an opaque continuation token.
+
+    Args:
+        cosmos_token (str | None): The continuation token of Cosmos DB, None after the last page.
+
+    Returns:
+        str | None: The continuation token, None after the last page.
+    """
+    return encode_continuation_token({"cosmos": cosmos_token}) if cosmos_token else None
+
+
+def decode_cosmos_token(continuation_token: Optional[str]) -> Optional[str]:
+    """
+    Unwrap the Cosmos DB continuation token of an opaque continuation token.
+
+    Args:
+        continuation_token (str | None): Token created by encode_cosmos_token, None for the first page.
+
+    Returns:
+        str | None: The continuation token of Cosmos DB, None for the first page.
+
+    Raises:
+        ValueError: If the token does not hold a Cosmos DB continuation token.
+    """
+    state = decode_continuation_token(continuation_token)
+    if state and not isinstance(state.get("cosmos"), str):
+        raise ValueError("Invalid continuation token")
+    return state.get("cosmos")
+
+
+def _term_parameters(terms: list[str], parameters: list[dict]) -> str:
+    """
+    Add one parameter per keyword term and return their names as an argument list.
+    """
+    names = [f"@term{i}" for i in range(len(terms))]
+    parameters.extend({"name": name, "value": term} for name, term in zip(names, terms))
+    return ", ".join(names)
+
+
+def _query(max_results: int, select_clause: str, conditions: list[str], order_clause: str) -> str:
+    """
+    Assemble a TOP query over the container.
+    """
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"""
+    SELECT TOP {max_results} {select_clause}
+    FROM c
+    {where_clause}
+    {order_clause}
+    """
@@ -0,0 +1,45 @@
+"""
+Pydantic models describing the outcome of bulk repository writes.
+
+Bulk writes do not stop at the first failing item, so every item gets its own result and the batch result
+summarizes how many writes succeeded.
+"""
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class BulkItemResult(BaseModel):
+    """
+    Outcome of writing a single item as part of a bulk operation.
+
+    Fields:
+        id (str | None): Identifier of the item, if it had one.
+        success (bool): Whether the item was written.
+        status_code (int | None): Status code of the failed write, if the store reported one.
+        error (str | None): Error message of the failed write.
+    """
+    id: Optional[str] = Field(description="Identifier of the item", default=None)
+    success: bool = Field(description="Whether the item was written")
+    status_code: Optional[int] = Field(description="Status code of the failed write", default=None)
+    error: Optional[str] = Field(description="Error message of the failed write", default=None)
+
+
+class BulkWriteResult(BaseModel):
+    """
+    Outcome of a bulk write, with one result per input item in input order.
+
+    Fields:
+        results (list[BulkItemResult]): Per-item results.
+    """
+    results: list[BulkItemResult] = Field(description="Per-item results in input order", default_factory=list)
+
+    @property
+    def succeeded(self) -> int:
+        """Number of items that were written."""
+        return sum(1 for result in self.results if result.success)
+
+    @property
+    def failed(self) -> list[BulkItemResult]:
+        """Results of the items that could not be written."""
+        return [result for result in self.results if not result.success]
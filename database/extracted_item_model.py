@@ -2,42 +2,107 @@
 Database model for storing extracted items with store information and timestamp.
 
 Defines a Pydantic model for encapsulating extracted item data, store name, and extraction timestamp.
+Item IDs are derived from the store name and the store item code, so every scrape of the same product addresses
+the same document. Items listed without a code are identified by their normalized description instead.
 """
+import hashlib
 import uuid
-from pydantic import BaseModel, Field
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from embedding.cached_embedder import normalize_text
+from embedding.vector import EmbeddingVector, empty_vector
+
+# Namespace of the name based item IDs
+ITEM_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/mmaracic/ai-agent-python-pcbuilder/items")
+
+
+def item_id(store_name: str, item_code: str, description: str = "") -> str:
+    """
+    Derive the database ID of an item from its store and its code in the store.
+
+    Stores do not always show a code, so an item with a blank code is identified by the hash of its normalized
+    description instead, keeping different code-less items of a store apart.
+
+    Args:
+        store_name (str): Name of the store.
+        item_code (str): Unique identifier of the item in the store, may be blank.
+        description (str, optional): Description of the item, used when the code is blank. Defaults to "".
+
+    Returns:
+        str: The deterministic item ID.
+    """
+    identity = item_code.strip() or "description:" + description_hash(description)
+    return "item_" + str(uuid.uuid5(ITEM_ID_NAMESPACE, f"{normalize_text(store_name)}\x00{identity}"))
+
+
+def description_hash(description: str) -> str:
+    """
+    Hash an item description, ignoring differences that do not change its embedding.
+
+    Args:
+        description (str): The item description.
+
+    Returns:
+        str: Hex SHA-256 digest of the normalized description.
+    """
+    return hashlib.sha256(normalize_text(description).encode("utf-8")).hexdigest()
 
 class DatabaseExtractedItem(BaseModel):
     """
     Represents an item extracted from a store page for database storage, including store info and timestamp.
 
     Attributes:
-        id (str): Unique identifier for the item in the database.
-        price (str): Price of the item.
+        id (str): Unique identifier for the item in the database, derived from store_name and item_code, or the
+            description when the code is blank, when not given.
+        price (str): Price of the item as shown by the store.
+        price_minor (int | None): Price in integer minor units of the currency, None if it could not be parsed.
+        currency (str | None): ISO 4217 currency code of the price.
         description (str): Description of the item.
+        description_hash (str): Hash of the normalized description, used to detect changed descriptions.
         item_code (str): Unique identifier for the item in the store.
         store_name (str): Name of the store.
         date_time (str): Date and time of extraction.
+        embedding (EmbeddingVector): Float32 embedding of the description, converted to the store format by the
+            repository when the item is written.
     """
-    id: str = Field(
-        description="Unique identifier for the item in the database",
-        default_factory=lambda: "item_" + str(uuid.uuid4())
-    )
+    id: str = Field(description="Unique identifier for the item in the database", default="")
     price: str = Field(description="Price of the item")
+    price_minor: Optional[int] = Field(description="Price in minor units of the currency", default=None)
+    currency: Optional[str] = Field(description="ISO 4217 currency code of the price", default=None)
     description: str = Field(description="Description of the item")
-    embedding: list[float] = Field(
+    description_hash: str = Field(description="Hash of the normalized description", default="")
+    embedding: EmbeddingVector = Field(
         description="Embedding vector for the item description",
-        default_factory=list
+        default_factory=empty_vector
     )
     item_code: str = Field(description="Unique identifier for the item in the store")
     store_name: str = Field(description="Name of the store")
     date_time: str = Field(description="Date and time of extraction")
 
-    def to_dict(self) -> dict[str, str]:
+    @model_validator(mode="after")
+    def derive_identity(self) -> "DatabaseExtractedItem":
+        """
+        Fill in the ID and the description hash when they are not given.
+
+        Returns:
+            DatabaseExtractedItem: The item.
+        """
+        if not self.id:
+            self.id = item_id(self.store_name, self.item_code, self.description)
+        if not self.description_hash:
+            self.description_hash = description_hash(self.description)
+        return self
+
+    def to_dict(self) -> dict[str, Any]:
         """
         Convert the DatabaseExtractedItem instance to a dictionary.
 
+        The embedding stays a float32 array, repositories serialize it when the item is written.
+
         Returns:
-            dict[str, str]: Dictionary representation of the item.
+            dict[str, Any]: Dictionary representation of the item.
         """
         return self.model_dump()
 
@@ -0,0 +1,26 @@
+"""
+Pydantic model describing the outcome of ingesting the items of one extraction.
+"""
+from pydantic import BaseModel, Field
+
+from database.bulk_write_result_model import BulkItemResult
+
+
+class IngestionResult(BaseModel):
+    """
+    Counts of how the items of an extraction compared to the stored items.
+
+    Fields:
+        created (int): Items that were not stored before.
+        updated (int): Stored items whose description or price changed.
+        unchanged (int): Stored items without changes, only their extraction time was refreshed.
+        embedded (int): Descriptions that had to be embedded.
+        price_changes (int): Price history records written.
+        failed (list[BulkItemResult]): Writes that failed.
+    """
+    created: int = Field(description="Items that were not stored before", default=0)
+    updated: int = Field(description="Stored items whose description or price changed", default=0)
+    unchanged: int = Field(description="Stored items without changes", default=0)
+    embedded: int = Field(description="Descriptions that had to be embedded", default=0)
+    price_changes: int = Field(description="Price history records written", default=0)
+    failed: list[BulkItemResult] = Field(description="Writes that failed", default_factory=list)
@@ -0,0 +1,115 @@
+"""
+Change-only ingestion of extracted items into long-term memory.
+
+Items have deterministic IDs, so the stored version of every extracted item is read first with one projected bulk
+read. Only new items and items with a changed description are embedded and written in full. Price changes of
+otherwise unchanged items are partial updates that keep the stored embedding, and unchanged items only get their
+extraction time refreshed. Every observed price change is recorded in a separate price history repository.
+"""
+import logging
+from typing import Optional
+
+from database.extracted_item_model import DatabaseExtractedItem
+from database.ingestion_result_model import IngestionResult
+from database.price_history_model import PriceHistoryRecord
+from database.repository import Repository
+from database.search_filter_model import PRICE_FIELD
+from embedding.embedder import Embedder
+
+logger = logging.getLogger(__name__)
+
+# Stored fields compared with the extracted items
+COMPARED_FIELDS = ["price", PRICE_FIELD, "currency", "description_hash"]
+
+
+class ItemIngestor:
+    """
+    Writes extracted items to long-term memory, skipping the work for items that did not change.
+
+    Args:
+        long_term_memory (Repository): Repository holding the items.
+        embedder (Embedder): Embedder for new and changed descriptions.
+        price_history (Repository | None, optional): Repository receiving a record for every new or changed price.
+            None keeps no history. Defaults to None.
+    """
+
+    def __init__(self, long_term_memory: Repository, embedder: Embedder, price_history: Optional[Repository] = None):
+        self.long_term_memory = long_term_memory
+        self.embedder = embedder
+        self.price_history = price_history
+
+    def ingest(self, items: list[DatabaseExtractedItem]) -> IngestionResult:
+        """
+        Store the items of one extraction.
+
+        Args:
+            items (list[DatabaseExtractedItem]): The extracted items without embeddings. Items with the same ID
+                after the first are ignored.
+
+        Returns:
+            IngestionResult: How the items compared to the stored items and which writes failed.
+        """
+        unique = list({item.id: item for item in reversed(items)}.values())[::-1]
+        stored = self.long_term_memory.read_items([item.id for item in unique], COMPARED_FIELDS)
+        result = IngestionResult()
+        full_writes: list[DatabaseExtractedItem] = []
+        patches: list[dict] = []
+        history: list[PriceHistoryRecord] = []
+        for item in unique:
+            previous = stored.get(item.id)
+            price_changed = previous is None or _price_changed(previous, item)
+            if previous is None or previous.get("description_hash") != item.description_hash:
+                full_writes.append(item)
+                if previous is None:
+                    result.created += 1
+                else:
+                    result.updated += 1
+            elif price_changed:
+                patches.append({"id": item.id, "price": item.price, PRICE_FIELD: item.price_minor,
+                                "currency": item.currency, "date_time": item.date_time})
+                result.updated += 1
+            else:
+                patches.append({"id": item.id, "date_time": item.date_time})
+                result.unchanged += 1
+            if price_changed:
+                history.append(PriceHistoryRecord(
+                    item_id=item.id,
+                    store_name=item.store_name,
+                    item_code=item.item_code,
+                    price=item.price,
+                    price_minor=item.price_minor,
+                    currency=item.currency,
+                    previous_price_minor=previous.get(PRICE_FIELD) if previous else None,
+                    date_time=item.date_time
+                ))
+
+        if full_writes:
+            embeddings = self.embedder.embed_batch([item.description for item in full_writes])
+            result.embedded = len(full_writes)
+            documents = []
+            for item, embedding in zip(full_writes, embeddings):
+                document = item.model_copy(update={"embedding": embedding}).to_dict()
+                if len(embedding) == 0:
+                    # Without a stored hash the next extraction embeds the description again
+                    document["description_hash"] = ""
+                documents.append(document)
+            result.failed.extend(self.long_term_memory.upsert_items(documents).failed)
+        if patches:
+            result.failed.extend(self.long_term_memory.patch_items(patches).failed)
+        if history and self.price_history is not None:
+            history_result = self.price_history.upsert_items([record.to_dict() for record in history])
+            result.price_changes = history_result.succeeded
+            result.failed.extend(history_result.failed)
+        logger.info("Ingested %d items: %d created, %d updated, %d unchanged, %d embedded, %d failed",
+                    len(unique), result.created, result.updated, result.unchanged, result.embedded,
+                    len(result.failed))
+        return result
+
+
+def _price_changed(previous: dict, item: DatabaseExtractedItem) -> bool:
+    """
+    Compare the stored price with the extracted price, by value when both were parsed and by text otherwise.
+    """
+    if previous.get(PRICE_FIELD) is not None and item.price_minor is not None:
+        return (previous[PRICE_FIELD], previous.get("currency")) != (item.price_minor, item.currency)
+    return previous.get("price") != item.price
@@ -0,0 +1,339 @@
+"""
+Approximate nearest neighbour index for the local vector store, using an inverted file with product quantization.
+
+Vectors are assigned to the nearest of n_lists k-means centroids, and the residual to that centroid is compressed
+to quantization_bytes one-byte product quantization codes. A query scores only the vectors in its n_probe nearest
+lists, using precomputed lookup tables instead of the full vectors, and the repository re-ranks the
+search_list_size best candidates with exact cosine similarity. quantization_bytes and search_list_size play the same
+role as quantizationByteSize and indexingSearchListSize of the Cosmos DB diskANN index.
+"""
+import json
+import logging
+import math
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel, Field
+
+from embedding.vector import Vector
+
+logger = logging.getLogger(__name__)
+
+# Number of codewords of every product quantization subspace, so that one code fits in a byte
+CODEBOOK_SIZE = 256
+# Lloyd iterations used to train the coarse centroids and the codebooks
+KMEANS_ITERATIONS = 10
+# Maximum number of vectors sampled to train the coarse centroids and the codebooks
+MAX_TRAINING_SAMPLES = 65536
+MAX_CODEBOOK_SAMPLES = 8192
+# Rows processed at a time when assigning vectors to centroids
+ASSIGN_BLOCK_ROWS = 16384
+
+
+class IvfPqParameters(BaseModel):
+    """
+    Tunable parameters of the IVF-PQ index, trading recall for latency and memory.
+
+    Fields:
+        n_lists (int | None): Number of inverted lists, None chooses 4 * sqrt(n) at training time.
+        n_probe (int): Number of lists scanned per query. More lists give higher recall and slower queries.
+        quantization_bytes (int): Bytes per compressed vector, the number of product quantization subspaces.
+        search_list_size (int): Number of approximate candidates re-ranked with exact similarity.
+        min_train_size (int): Number of vectors below which exact search is used and the index is not trained.
+        retrain_factor (float): The index is retrained once it holds this many times the vectors it was trained on.
+    """
+    n_lists: Optional[int] = Field(default=None, description="Number of inverted lists")
+    n_probe: int = Field(default=8, description="Number of lists scanned per query")
+    quantization_bytes: int = Field(default=128, description="Bytes per compressed vector")
+    search_list_size: int = Field(default=100, description="Number of candidates re-ranked exactly")
+    min_train_size: int = Field(default=10000, description="Vectors needed before the index is trained")
+    retrain_factor: float = Field(default=4.0, description="Growth factor that triggers retraining")
+
+
+class IvfPqIndex:
+    """
+    Inverted file index with product quantized residuals over unit length vectors, addressed by integer labels.
+
+    Args:
+        dimensions (int): Number of dimensions of the indexed vectors.
+        parameters (IvfPqParameters | None, optional): Index parameters. Defaults to IvfPqParameters().
+    """
+
+    def __init__(self, dimensions: int, parameters: Optional[IvfPqParameters] = None):
+        self.dimensions = dimensions
+        self.parameters = parameters or IvfPqParameters()
+        self.subspaces = _subspace_count(dimensions, self.parameters.quantization_bytes)
+        self.trained_size = 0
+        self.centroids: Optional[npt.NDArray[np.float32]] = None
+        self.codebooks: Optional[npt.NDArray[np.float32]] = None
+        self._codes: list[npt.NDArray[np.uint8]] = []
+        self._labels: list[npt.NDArray[np.int64]] = []
+        self._assignment: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._assignment)
+
+    @property
+    def trained(self) -> bool:
+        """Whether the centroids and codebooks have been trained."""
+        return self.centroids is not None
+
+    def needs_training(self, size: int) -> bool:
+        """
+        Whether the index should be (re)trained for a store of the given size.
+
+        Args:
+            size (int): Number of vectors in the store.
+
+        Returns:
+            bool: True if the store is large enough and the index is untrained or has outgrown its training.
+        """
+        if size < self.parameters.min_train_size:
+            return False
+        return not self.trained or size > self.trained_size * self.parameters.retrain_factor
+
+    def train(self, vectors: npt.NDArray[np.float32], seed: int = 0) -> None:
+        """
+        Train the coarse centroids and the residual codebooks and clear the index.
+
+        Args:
+            vectors (npt.NDArray[np.float32]): Unit length training vectors, one per row.
+            seed (int, optional): Seed of the training sample and centroid initialization. Defaults to 0.
+        """
+        rng = np.random.default_rng(seed)
+        if len(vectors) > MAX_TRAINING_SAMPLES:
+            vectors = vectors[np.sort(rng.choice(len(vectors), MAX_TRAINING_SAMPLES, replace=False))]
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_lists = self.parameters.n_lists or max(1, int(4 * math.sqrt(len(vectors))))
+        self.centroids = kmeans(vectors, min(n_lists, len(vectors)), rng)
+        sample = vectors
+        if len(vectors) > MAX_CODEBOOK_SAMPLES:
+            sample = vectors[rng.choice(len(vectors), MAX_CODEBOOK_SAMPLES, replace=False)]
+        residuals = sample - self.centroids[assign(sample, self.centroids)]
+        sub_dimensions = self.dimensions // self.subspaces
+        self.codebooks = np.stack([
+            kmeans(np.ascontiguousarray(residuals[:, j * sub_dimensions:(j + 1) * sub_dimensions]),
+                   min(CODEBOOK_SIZE, len(sample)), rng)
+            for j in range(self.subspaces)
+        ])
+        self.trained_size = len(vectors)
+        self._codes = [np.empty((0, self.subspaces), dtype=np.uint8) for _ in range(len(self.centroids))]
+        self._labels = [np.empty(0, dtype=np.int64) for _ in range(len(self.centroids))]
+        self._assignment = {}
+        logger.info("Trained IVF-PQ index with %d lists and %d byte codes on %d vectors",
+                    len(self.centroids), self.subspaces, len(vectors))
+
+    def add(self, labels: npt.ArrayLike, vectors: npt.NDArray[np.float32]) -> None:
+        """
+        Add vectors to the trained index.
+
+        Args:
+            labels (npt.ArrayLike): Integer label of every vector, returned by search.
+            vectors (npt.NDArray[np.float32]): Unit length vectors, one per row.
+        """
+        labels = np.asarray(labels, dtype=np.int64).reshape(-1)
+        if len(labels) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(labels), self.dimensions)
+        lists = assign(vectors, self.centroids)
+        codes = self._encode(vectors - self.centroids[lists])
+        for list_id in np.unique(lists):
+            members = lists == list_id
+            self._codes[list_id] = np.concatenate([self._codes[list_id], codes[members]])
+            self._labels[list_id] = np.concatenate([self._labels[list_id], labels[members]])
+        self._assignment.update(zip(labels.tolist(), lists.tolist()))
+
+    def remove(self, label: int) -> None:
+        """
+        Remove a vector from the index. Unknown labels are ignored.
+
+        Args:
+            label (int): Label of the vector to remove.
+        """
+        list_id = self._assignment.pop(label, None)
+        if list_id is None:
+            return
+        keep = self._labels[list_id] != label
+        self._labels[list_id] = self._labels[list_id][keep]
+        self._codes[list_id] = self._codes[list_id][keep]
+
+    def relabel(self, label: int, new_label: int) -> None:
+        """
+        Change the label of an indexed vector, used when the store moves a vector to another row.
+
+        Args:
+            label (int): Current label of the vector.
+            new_label (int): New label of the vector.
+        """
+        list_id = self._assignment.pop(label, None)
+        if list_id is None:
+            return
+        self._labels[list_id][self._labels[list_id] == label] = new_label
+        self._assignment[new_label] = list_id
+
+    def search(self, query: Vector, count: int, n_probe: Optional[int] = None) -> npt.NDArray[np.int64]:
+        """
+        Return the labels of the vectors with the highest approximate inner product with the query.
+
+        Args:
+            query (Vector): Unit length query vector.
+            count (int): Maximum number of labels to return.
+            n_probe (int | None, optional): Number of lists to scan. Defaults to the index parameter.
+
+        Returns:
+            npt.NDArray[np.int64]: Labels in decreasing approximate score order.
+        """
+        coarse = self.centroids @ query
+        probed = np.argsort(-coarse)[:n_probe or self.parameters.n_probe]
+        sub_dimensions = self.dimensions // self.subspaces
+        # Inner products of every query subvector with every codeword of its subspace
+        tables = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.subspaces, sub_dimensions))
+        subspace_index = np.arange(self.subspaces)
+        scores = [coarse[list_id] + tables[subspace_index, self._codes[list_id]].sum(axis=1) for list_id in probed]
+        labels = np.concatenate([self._labels[list_id] for list_id in probed])
+        scores = np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+        if len(scores) > count:
+            best = np.argpartition(-scores, count - 1)[:count]
+        else:
+            best = np.arange(len(scores))
+        return labels[best[np.argsort(-scores[best], kind="stable")]]
+
+    def save(self, file) -> None:
+        """
+        Write the index to a file or file object in NumPy .npz format.
+
+        Args:
+            file: Path or binary file object to write to.
+        """
+        sizes = np.array([len(labels) for labels in self._labels], dtype=np.int64)
+        np.savez(
+            file,
+            header=np.array(json.dumps({
+                "dimensions": self.dimensions,
+                "trained_size": self.trained_size,
+                "parameters": self.parameters.model_dump()
+            })),
+            centroids=self.centroids,
+            codebooks=self.codebooks,
+            sizes=sizes,
+            codes=np.concatenate(self._codes) if self._codes else np.empty((0, self.subspaces), dtype=np.uint8),
+            labels=np.concatenate(self._labels) if self._labels else np.empty(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, file, parameters: Optional[IvfPqParameters] = None) -> "IvfPqIndex":
+        """
+        Read an index written by save.
+
+        Args:
+            file: Path or binary file object to read from.
+            parameters (IvfPqParameters | None, optional): Parameters replacing the saved search parameters.
+                The list count and code size always come from the file. Defaults to the saved parameters.
+
+        Returns:
+            IvfPqIndex: The loaded index.
+        """
+        with np.load(file) as data:
+            header = json.loads(str(data["header"]))
+            saved = IvfPqParameters(**header["parameters"])
+            if parameters is not None:
+                saved = parameters.model_copy(update={"quantization_bytes": saved.quantization_bytes})
+            index = cls(header["dimensions"], saved)
+            index.trained_size = header["trained_size"]
+            index.centroids = data["centroids"]
+            index.codebooks = data["codebooks"]
+            offsets = np.concatenate([[0], np.cumsum(data["sizes"])])
+            codes, labels = data["codes"], data["labels"]
+        index._codes = [codes[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        index._labels = [labels[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        index._assignment = {
+            label: list_id for list_id, list_labels in enumerate(index._labels) for label in list_labels.tolist()
+        }
+        return index
+
+    def _encode(self, residuals: npt.NDArray[np.float32]) -> npt.NDArray[np.uint8]:
+        """
+        Product quantize residual vectors to one codeword index per subspace.
+        """
+        sub_dimensions = self.dimensions // self.subspaces
+        codes = np.empty((len(residuals), self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            codes[:, j] = assign(residuals[:, j * sub_dimensions:(j + 1) * sub_dimensions], self.codebooks[j])
+        return codes
+
+
+def kmeans(data: npt.NDArray[np.float32], k: int, rng: np.random.Generator,
+           iterations: int = KMEANS_ITERATIONS) -> npt.NDArray[np.float32]:
+    """
+    Cluster rows with Lloyd's algorithm, starting from randomly chosen rows.
+
+    Args:
+        data (npt.NDArray[np.float32]): Rows to cluster.
+        k (int): Number of clusters, at most the number of rows.
+        rng (np.random.Generator): Random generator for the initialization.
+        iterations (int, optional): Number of Lloyd iterations. Defaults to KMEANS_ITERATIONS.
+
+    Returns:
+        npt.NDArray[np.float32]: The k centroids, one per row.
+    """
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        empty = counts == 0
+        # Sum the rows of every cluster with one pass over the rows sorted by cluster
+        order = np.argsort(labels, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[~empty]
+        centroids[~empty] = np.add.reduceat(data[order], starts, axis=0) / counts[~empty, None]
+        # Restart empty clusters from random rows so every centroid stays in use
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+    return centroids
+
+
+def assign(data: npt.NDArray[np.float32], centroids: npt.NDArray[np.float32]) -> npt.NDArray[np.intp]:
+    """
+    Return the index of the nearest centroid in Euclidean distance for every row.
+
+    Args:
+        data (npt.NDArray[np.float32]): Rows to assign.
+        centroids (npt.NDArray[np.float32]): Centroids, one per row.
+
+    Returns:
+        npt.NDArray[np.intp]: Nearest centroid of every row.
+    """
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(data), dtype=np.intp)
+    for start in range(0, len(data), ASSIGN_BLOCK_ROWS):
+        block = data[start:start + ASSIGN_BLOCK_ROWS]
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return labels
+
+
+def recall_at_k(exact: npt.ArrayLike, approximate: npt.ArrayLike) -> float:
+    """
+    Fraction of the exact nearest neighbours found by an approximate search, averaged over queries.
+
+    Args:
+        exact (npt.ArrayLike): Exact neighbour labels, one row of k labels per query.
+        approximate (npt.ArrayLike): Approximate neighbour labels, one row per query.
+
+    Returns:
+        float: Recall@k between 0 and 1.
+    """
+    exact = np.atleast_2d(exact)
+    approximate = np.atleast_2d(approximate)
+    found = [len(np.intersect1d(e, a)) / len(e) for e, a in zip(exact, approximate) if len(e)]
+    return float(np.mean(found)) if found else 1.0
+
+
+def _subspace_count(dimensions: int, quantization_bytes: int) -> int:
+    """
+    Return the largest number of subspaces not above quantization_bytes that divides the dimensions.
+    """
+    requested = max(1, min(quantization_bytes, dimensions))
+    subspaces = next(m for m in range(requested, 0, -1) if dimensions % m == 0)
+    if subspaces != quantization_bytes:
+        logger.info("Using %d byte codes for %d dimensions instead of %d", subspaces, dimensions, quantization_bytes)
+    return subspaces
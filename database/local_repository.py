@@ -0,0 +1,675 @@
+"""
+LocalVectorRepository keeps items and their embeddings in process for local development and benchmarking.
+
+Embeddings are stored as rows of one contiguous matrix of unit length vectors, so cosine similarity against every
+item is a single matrix-vector product and the top results are selected with argpartition instead of a full sort.
+The store persists to a directory holding the matrix as a memory-mapped .npy file and the item documents as JSON.
+For large stores an IVF-PQ index can narrow the search to a few candidates that are then re-ranked exactly.
+Search filters are applied to the rows before they are scored, and keywords are ranked with an inverted index over
+the descriptions and fused with the vector rank the same way Cosmos DB does.
+"""
+import json
+import logging
+import math
+import os
+import threading
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from database.bulk_write_result_model import BulkItemResult, BulkWriteResult
+from database.ivf_index import IvfPqIndex, IvfPqParameters
+from database.repository import Repository
+from database.repository_metrics import observed
+from database.search_filter_model import PRICE_FIELD, RRF_K, SearchFilter, tokenize
+from embedding.vector import EmbeddingFormat, Vector, normalize, quantize_int8, to_vector
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+NORMS_FILE = "norms.npy"
+METADATA_FILE = "metadata.json"
+INDEX_FILE = "ivf_index.npz"
+
+# Number of rows of an int8 matrix converted to float32 at a time while scoring
+SCORE_BLOCK_ROWS = 16384
+# Rows allocated when the first embedding is stored
+INITIAL_CAPACITY = 1024
+
+# Number of best vector and keyword matches fused with reciprocal rank fusion
+RRF_WINDOW = 100
+
+# Fields returned by query_by_embedding, the same as the Cosmos DB projection
+RESULT_FIELDS = ("id", "price", "price_minor", "currency", "description", "item_code", "store_name", "date_time")
+
+
+class LocalVectorRepository(Repository):
+    """
+    In-process repository with cosine similarity search over a NumPy matrix.
+
+    Args:
+        path (str | None, optional): Directory the store is loaded from and saved to. None keeps the store
+            in memory only. Defaults to None.
+        embedding_format (EmbeddingFormat | None, optional): Format in which embeddings are stored. int8
+            quantization keeps one byte per dimension and the norm of every row. Defaults to full float32 vectors.
+        index_parameters (IvfPqParameters | None, optional): Parameters of the approximate IVF-PQ index used once
+            the store holds min_train_size embeddings. None always searches exactly. Defaults to None.
+    """
+
+    def __init__(self, path: Optional[str] = None, embedding_format: Optional[EmbeddingFormat] = None,
+                 index_parameters: Optional[IvfPqParameters] = None):
+        self.path = path
+        self.embedding_format = embedding_format or EmbeddingFormat()
+        self.index_parameters = index_parameters
+        self.metrics_label = f"local:{os.path.basename(os.path.normpath(path))}" if path else "local"
+        self._index: Optional[IvfPqIndex] = None
+        self._dtype = np.int8 if self.embedding_format.quantization == "int8" else np.float32
+        self._lock = threading.RLock()
+        self._documents: dict[str, dict] = {}
+        self._ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._norms: npt.NDArray[np.float32] = np.empty(0, dtype=np.float32)
+        self._postings: dict[str, set[str]] = {}
+        self._columns: Optional[dict[str, np.ndarray]] = None
+        if path and os.path.exists(os.path.join(path, METADATA_FILE)):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @property
+    def dimensions(self) -> Optional[int]:
+        """Number of dimensions of the stored embeddings, None while no embedding is stored."""
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    def vectors(self) -> tuple[list[str], npt.NDArray[np.float32]]:
+        """
+        Return a snapshot of the stored embeddings, for example to benchmark or rebuild an index on them.
+
+        Returns:
+            tuple[list[str], np.ndarray]: The IDs of the items with an embedding and a float32 matrix holding their
+            stored embeddings in the same order, with zero columns while no embedding is stored.
+        """
+        with self._lock:
+            count = len(self._ids)
+            if self._matrix is None:
+                return list(self._ids), np.empty((count, 0), dtype=np.float32)
+            return list(self._ids), np.array(self._matrix[:count], dtype=np.float32)
+
+    @observed("create_item")
+    def create_item(self, item: dict) -> dict:
+        """
+        Create a new item.
+
+        Args:
+            item (dict): The item to be created.
+
+        Returns:
+            dict: The created item.
+
+        Raises:
+            ValueError: If an item with the same ID already exists.
+        """
+        with self._lock:
+            if item["id"] in self._documents:
+                raise ValueError(f"Item {item['id']} already exists")
+            self._put(item)
+        return item
+
+    @observed("create_items")
+    def create_items(self, items: list[dict]) -> BulkWriteResult:
+        """
+        Create many items. A failing item does not abort the batch, its error is reported in its result.
+
+        Args:
+            items (list[dict]): The items to be created.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+        return self._bulk_write(self.create_item, items)
+
+    @observed("upsert_items")
+    def upsert_items(self, items: list[dict]) -> BulkWriteResult:
+        """
+        Create or replace many items. A failing item does not abort the batch, its error is reported in its result.
+
+        Args:
+            items (list[dict]): The items to be upserted.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+        return self._bulk_write(self.update_item, items)
+
+    @observed("read_item")
+    def read_item(self, item_id: str) -> dict:
+        """
+        Read an item by its ID.
+
+        Args:
+            item_id (str): The ID of the item to read.
+
+        Returns:
+            dict: The retrieved item, with its stored embedding as a float32 array if it has one.
+
+        Raises:
+            KeyError: If the item does not exist.
+        """
+        with self._lock:
+            item = dict(self._documents[item_id])
+            row = self._rows.get(item_id)
+            if row is not None:
+                item["embedding"] = np.array(self._matrix[row], dtype=np.float32)
+        return item
+
+    @observed("read_items")
+    def read_items(self, item_ids: list[str], fields: list[str]) -> dict[str, dict]:
+        """
+        Read many items by their IDs, projected to the given fields.
+
+        Args:
+            item_ids (list[str]): The IDs of the items to read.
+            fields (list[str]): Names of the fields to return for every item, "id" is always returned.
+
+        Returns:
+            dict[str, dict]: The projected items by ID, missing items are left out.
+        """
+        fields = list(dict.fromkeys(["id", *fields]))
+        with self._lock:
+            return {
+                item_id: {field: self._documents[item_id].get(field) for field in fields}
+                for item_id in item_ids if item_id in self._documents
+            }
+
+    @observed("update_item")
+    def update_item(self, updated_item: dict) -> dict:
+        """
+        Create or replace an item.
+
+        Args:
+            updated_item (dict): The updated item data.
+
+        Returns:
+            dict: The upserted item.
+        """
+        with self._lock:
+            self._put(updated_item)
+        return updated_item
+
+    @observed("delete_item")
+    def delete_item(self, item_id: str) -> dict | None:
+        """
+        Delete an item by its ID.
+
+        Args:
+            item_id (str): The ID of the item to delete.
+
+        Returns:
+            dict | None: The deleted item document, None if the item did not exist.
+        """
+        with self._lock:
+            document = self._documents.pop(item_id, None)
+            if document is not None:
+                self._index_terms(item_id, document, add=False)
+            self._remove_row(item_id)
+        return document
+
+    @observed("delete_items")
+    def delete_items(self, item_ids: list[str]) -> BulkWriteResult:
+        """
+        Delete many items and their embedding rows. IDs that are not stored are reported as successful.
+
+        Args:
+            item_ids (list[str]): The IDs of the items to delete.
+
+        Returns:
+            BulkWriteResult: One result per ID, in input order.
+        """
+        return self._bulk_write(lambda item: self.delete_item(item["id"]), [{"id": item_id} for item_id in item_ids])
+
+    @observed("query_by_embedding")
+    def query_by_embedding(self, embedding: Vector, max_results: int = 10,
+                           search_filter: Optional[SearchFilter] = None) -> list[dict]:
+        """
+        Return the items with the highest cosine similarity to the embedding.
+
+        Filtered searches score only the rows passing the filter. Unfiltered searches use the approximate index
+        when it is configured and trained, scoring only its search_list_size best candidates exactly. Keywords are
+        fused with the vector rank by reciprocal rank fusion.
+
+        Args:
+            embedding (Vector): The embedding vector to query by, prepared with the repository embedding format.
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+                Defaults to no filter.
+
+        Returns:
+            list[dict]: Matching items with the same fields as the Cosmos DB query and a similarity_score,
+                        most similar first.
+        """
+        query = normalize(self.embedding_format.prepare(embedding))
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or max_results <= 0 or len(query) == 0:
+                return []
+            if len(query) != self.dimensions:
+                raise ValueError(f"Query has {len(query)} dimensions, the store has {self.dimensions}")
+            terms = search_filter.terms() if search_filter else []
+            rows = None
+            if search_filter is not None and search_filter.restricts():
+                rows = np.flatnonzero(self._filter_mask(search_filter))
+            if rows is None and not terms:
+                rows = self._candidates(query, max_results)
+                if rows is None:
+                    scores = self._scores(query)
+                    return [self._result(self._ids[row], float(scores[row])) for row in top_k(scores, max_results)]
+            if rows is None:
+                rows = np.arange(count)
+            scores = self._scores(query, rows)
+            order = self._fuse(rows, scores, terms, max_results) if terms else top_k(scores, max_results)
+            return [self._result(self._ids[rows[i]], float(scores[i])) for i in order]
+
+    @observed("query_by_price")
+    def query_by_price(self, max_results: int = 10, search_filter: Optional[SearchFilter] = None,
+                       descending: bool = False) -> list[dict]:
+        """
+        Return items ordered by their numeric price, cheapest first by default, using a cached price order.
+
+        Items without a parsed price are never returned.
+
+        Args:
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions of the search, keywords have to match at
+                least one description term. Defaults to no filter.
+            descending (bool, optional): Return the most expensive items first. Defaults to False.
+
+        Returns:
+            list[dict]: Matching items without their embeddings.
+        """
+        with self._lock:
+            if not self._ids or max_results <= 0:
+                return []
+            order = self._filter_columns()["price_order"]
+            if descending:
+                order = order[::-1]
+            if search_filter is not None:
+                mask = self._filter_mask(search_filter)
+                terms = search_filter.terms()
+                if terms:
+                    mask &= self._keyword_scores(np.arange(len(self._ids)), terms) > 0
+                order = order[mask[order]]
+            return [self._result(self._ids[row]) for row in order[:max_results]]
+
+    @observed("iter_items")
+    def iter_items(self, fields: list[str]) -> Iterator[dict]:
+        """
+        Iterate over a snapshot of all stored items, projected to the given fields.
+
+        Args:
+            fields (list[str]): Names of the fields to return for every item.
+
+        Returns:
+            Iterator[dict]: The projected items.
+        """
+        with self._lock:
+            documents = list(self._documents.values())
+        return ({field: document.get(field) for field in fields} for document in documents)
+
+    @observed("patch_items")
+    def patch_items(self, patches: list[dict]) -> BulkWriteResult:
+        """
+        Set fields of existing items, leaving their embeddings untouched.
+
+        Args:
+            patches (list[dict]): One dictionary per item with its "id" and the fields to set.
+
+        Returns:
+            BulkWriteResult: One result per patch, in input order.
+        """
+        def patch(item: dict) -> dict:
+            with self._lock:
+                document = self._documents[item["id"]]
+                self._index_terms(item["id"], document, add=False)
+                document.update({field: value for field, value in item.items() if field != "embedding"})
+                self._index_terms(item["id"], document, add=True)
+                self._columns = None
+                return document
+
+        return self._bulk_write(patch, patches)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Write the store to a directory. Files are replaced atomically so a crash never leaves a partial store.
+
+        Args:
+            path (str | None, optional): Directory to write to. Defaults to the path of the repository.
+
+        Raises:
+            ValueError: If neither the argument nor the repository has a path.
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("LocalVectorRepository has no path to save to")
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            count = len(self._ids)
+            matrix = self._matrix[:count] if self._matrix is not None else np.empty((0, 0), dtype=self._dtype)
+            _replace(os.path.join(path, EMBEDDINGS_FILE), lambda f: np.save(f, matrix))
+            if self._dtype == np.int8:
+                _replace(os.path.join(path, NORMS_FILE), lambda f: np.save(f, self._norms[:count]))
+            if self._index is not None and self._index.trained:
+                _replace(os.path.join(path, INDEX_FILE), self._index.save)
+            metadata = {"quantization": self.embedding_format.quantization, "ids": self._ids,
+                        "documents": self._documents}
+            _replace(os.path.join(path, METADATA_FILE),
+                     lambda f: f.write(json.dumps(metadata, default=str).encode("utf-8")))
+        logger.info("Saved %d items with %d embeddings to %s", len(self._documents), count, path)
+
+    def close(self) -> None:
+        """
+        Save the store if the repository has a path.
+        """
+        if self.path:
+            self.save()
+
+    def _load(self) -> None:
+        """
+        Load the store from the repository path, memory-mapping the embedding matrix.
+        """
+        with open(os.path.join(self.path, METADATA_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata.get("quantization", "float32") != self.embedding_format.quantization:
+            raise ValueError(f"Store at {self.path} uses {metadata.get('quantization')} embeddings, "
+                             f"configured {self.embedding_format.quantization}")
+        self._documents = metadata["documents"]
+        self._ids = metadata["ids"]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        for item_id, document in self._documents.items():
+            self._index_terms(item_id, document, add=True)
+        if self._ids:
+            self._matrix = np.load(os.path.join(self.path, EMBEDDINGS_FILE), mmap_mode="r")
+            if self._dtype == np.int8:
+                self._norms = np.load(os.path.join(self.path, NORMS_FILE))
+            else:
+                self._norms = np.ones(len(self._ids), dtype=np.float32)
+        index_file = os.path.join(self.path, INDEX_FILE)
+        if self.index_parameters is not None and self._ids and os.path.exists(index_file):
+            self._index = IvfPqIndex.load(index_file, self.index_parameters)
+        logger.info("Loaded %d items with %d embeddings from %s", len(self._documents), len(self._ids), self.path)
+
+    def _put(self, item: dict) -> None:
+        """
+        Store an item document and its embedding, replacing an existing item with the same ID.
+        """
+        item_id = item["id"]
+        vector = self._encode(item.get("embedding"))
+        if item_id in self._documents:
+            self._index_terms(item_id, self._documents[item_id], add=False)
+        self._documents[item_id] = {key: value for key, value in item.items() if key != "embedding"}
+        self._index_terms(item_id, self._documents[item_id], add=True)
+        self._columns = None
+        if vector is None:
+            self._remove_row(item_id)
+            return
+        row = self._rows.get(item_id)
+        if row is None:
+            row = len(self._ids)
+            self._reserve(row + 1, len(vector))
+            self._ids.append(item_id)
+            self._rows[item_id] = row
+        self._writable()
+        self._matrix[row] = vector
+        if self._dtype == np.int8:
+            self._norms[row] = np.linalg.norm(vector.astype(np.float32))
+        if self._index is not None and self._index.trained:
+            self._index.remove(row)
+            self._index.add([row], self._unit_rows(np.array([row])))
+
+    def _encode(self, embedding: Any) -> Optional[np.ndarray]:
+        """
+        Convert an embedding to a stored row, None for items without an embedding.
+        """
+        vector = self.embedding_format.prepare(embedding) if embedding is not None else to_vector(None)
+        if len(vector) == 0:
+            return None
+        if self.dimensions is not None and len(vector) != self.dimensions:
+            raise ValueError(f"Embedding has {len(vector)} dimensions, the store has {self.dimensions}")
+        if self._dtype == np.int8:
+            return quantize_int8(vector)
+        return normalize(vector)
+
+    def _remove_row(self, item_id: str) -> None:
+        """
+        Remove the embedding row of an item by moving the last row into its place.
+        """
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        self._columns = None
+        last = len(self._ids) - 1
+        last_id = self._ids.pop()
+        if self._index is not None:
+            self._index.remove(row)
+        if row != last:
+            self._writable()
+            self._matrix[row] = self._matrix[last]
+            self._norms[row] = self._norms[last]
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+            if self._index is not None:
+                self._index.relabel(last, row)
+
+    def _reserve(self, rows: int, dimensions: int) -> None:
+        """
+        Grow the matrix geometrically so appends stay amortized constant time.
+        """
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        capacity = max(INITIAL_CAPACITY, rows, capacity * 2)
+        matrix = np.zeros((capacity, dimensions), dtype=self._dtype)
+        norms = np.ones(capacity, dtype=np.float32)
+        count = len(self._ids)
+        if self._matrix is not None:
+            matrix[:count] = self._matrix[:count]
+            norms[:count] = self._norms[:count]
+        self._matrix = matrix
+        self._norms = norms
+
+    def _writable(self) -> None:
+        """
+        Copy a read-only memory-mapped matrix into memory before it is modified.
+        """
+        if not self._matrix.flags.writeable:
+            self._matrix = np.array(self._matrix)
+
+    def _index_terms(self, item_id: str, document: dict, add: bool) -> None:
+        """
+        Add or remove the description terms of an item in the keyword inverted index.
+        """
+        for term in set(tokenize(document.get("description") or "")):
+            if add:
+                self._postings.setdefault(term, set()).add(item_id)
+            else:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.discard(item_id)
+                    if not postings:
+                        del self._postings[term]
+
+    def _filter_columns(self) -> dict[str, np.ndarray]:
+        """
+        Return the filterable fields of every row as arrays, and the rows with a price sorted by price.
+
+        The columns are rebuilt only after the store changed.
+        """
+        if self._columns is None:
+            documents = [self._documents[item_id] for item_id in self._ids]
+            prices = np.array(
+                [np.nan if d.get(PRICE_FIELD) is None else d[PRICE_FIELD] for d in documents], dtype=np.float64
+            )
+            priced = np.flatnonzero(~np.isnan(prices))
+            self._columns = {
+                "store_name": np.array([d.get("store_name") or "" for d in documents], dtype=object),
+                "date_time": np.array([d.get("date_time") or "" for d in documents], dtype=object),
+                "currency": np.array([d.get("currency") or "" for d in documents], dtype=object),
+                PRICE_FIELD: prices,
+                "price_order": priced[np.argsort(prices[priced], kind="stable")],
+            }
+        return self._columns
+
+    def _filter_mask(self, search_filter: SearchFilter) -> npt.NDArray[np.bool_]:
+        """
+        Return which rows pass the store, time, currency and price restrictions of the filter.
+        """
+        columns = self._filter_columns()
+        mask = np.ones(len(self._ids), dtype=bool)
+        if search_filter.store_names:
+            mask &= np.isin(columns["store_name"], search_filter.store_names)
+        earliest, latest = search_filter.earliest(), search_filter.latest()
+        if earliest:
+            mask &= columns["date_time"] >= earliest
+        if latest:
+            mask &= (columns["date_time"] <= latest) & (columns["date_time"] != "")
+        if search_filter.currency:
+            mask &= columns["currency"] == search_filter.currency
+        min_price, max_price = search_filter.price_bounds()
+        prices = columns[PRICE_FIELD]
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+        return mask
+
+    def _keyword_scores(self, rows: npt.NDArray[np.intp], terms: list[str]) -> npt.NDArray[np.float64]:
+        """
+        Score rows by the summed inverse document frequency of the terms their description contains.
+        """
+        keyword_scores = np.zeros(len(rows), dtype=np.float64)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            matched = np.fromiter((self._rows[i] for i in postings if i in self._rows), dtype=np.intp)
+            keyword_scores += math.log(1 + len(self._documents) / len(postings)) * np.isin(rows, matched)
+        return keyword_scores
+
+    def _fuse(self, rows: npt.NDArray[np.intp], scores: npt.NDArray[np.float32], terms: list[str],
+              max_results: int) -> npt.NDArray[np.intp]:
+        """
+        Rank rows by reciprocal rank fusion of their vector rank and keyword rank.
+
+        Returns:
+            npt.NDArray[np.intp]: Positions in rows of the best fused results, best first.
+        """
+        window = max(RRF_WINDOW, max_results)
+        keyword_scores = self._keyword_scores(rows, terms)
+        fused = np.zeros(len(rows), dtype=np.float64)
+        vector_ranked = top_k(scores, window)
+        fused[vector_ranked] += 1 / (RRF_K + 1 + np.arange(len(vector_ranked)))
+        keyword_matches = np.flatnonzero(keyword_scores > 0)
+        keyword_ranked = keyword_matches[top_k(keyword_scores[keyword_matches], window)]
+        fused[keyword_ranked] += 1 / (RRF_K + 1 + np.arange(len(keyword_ranked)))
+        candidates = np.flatnonzero(fused)
+        return candidates[top_k(fused[candidates], max_results)]
+
+    def _candidates(self, query: Vector, max_results: int) -> Optional[npt.NDArray[np.int64]]:
+        """
+        Return the rows proposed by the approximate index, None when the search has to be exact.
+
+        The index is trained on the stored embeddings the first time the store is large enough, and retrained
+        once it has outgrown its training.
+        """
+        if self.index_parameters is None:
+            return None
+        count = len(self._ids)
+        if self._index is None:
+            self._index = IvfPqIndex(self.dimensions, self.index_parameters)
+        if self._index.needs_training(count):
+            rows = np.arange(count)
+            self._index.train(self._unit_rows(rows))
+            self._index.add(rows, self._unit_rows(rows))
+        if not self._index.trained:
+            return None
+        return self._index.search(query, max(max_results, self.index_parameters.search_list_size))
+
+    def _unit_rows(self, rows: npt.NDArray[np.intp]) -> npt.NDArray[np.float32]:
+        """
+        Return stored rows as unit length float32 vectors.
+        """
+        vectors = self._matrix[rows].astype(np.float32)
+        if self._dtype == np.int8:
+            vectors /= self._norms[rows, None]
+        return vectors
+
+    def _scores(self, query: Vector, rows: Optional[npt.NDArray[np.intp]] = None) -> npt.NDArray[np.float32]:
+        """
+        Compute the cosine similarity of the unit length query to the given rows, all stored rows by default.
+        """
+        if rows is not None:
+            return self._unit_rows(rows) @ query
+        count = len(self._ids)
+        if self._dtype == np.float32:
+            return self._matrix[:count] @ query
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, count)
+            scores[start:end] = self._matrix[start:end].astype(np.float32) @ query
+        return scores / self._norms[:count]
+
+    def _result(self, item_id: str, score: Optional[float] = None) -> dict:
+        """
+        Project an item document to the query result fields, with the similarity score of similarity queries.
+        """
+        document = self._documents[item_id]
+        result = {field: document.get(field) for field in RESULT_FIELDS}
+        if score is not None:
+            result["similarity_score"] = score
+        return result
+
+    def _bulk_write(self, write: Callable[[dict], dict], items: list[dict]) -> BulkWriteResult:
+        """
+        Write every item with a single-item operation and collect the per-item results.
+        """
+        results = []
+        for item in items:
+            try:
+                write(item)
+                results.append(BulkItemResult(id=item.get("id"), success=True))
+            except Exception as e:
+                logger.warning("Bulk write of item %s failed: %s", item.get("id"), e)
+                results.append(BulkItemResult(id=item.get("id"), success=False, error=str(e)))
+        result = BulkWriteResult(results=results)
+        logger.info("Bulk write finished: %d of %d items written", result.succeeded, len(items))
+        return result
+
+
+def top_k(scores: npt.NDArray[np.float32], k: int) -> npt.NDArray[np.intp]:
+    """
+    Return the indices of the k largest scores, largest first, without sorting all scores.
+
+    Args:
+        scores (npt.NDArray[np.float32]): The scores to select from.
+        k (int): Number of indices to return.
+
+    Returns:
+        npt.NDArray[np.intp]: Indices of the largest scores in decreasing score order.
+    """
+    if k >= len(scores):
+        candidates = np.arange(len(scores))
+    else:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _replace(path: str, write: Callable[[Any], Any]) -> None:
+    """
+    Write a file through a temporary file that atomically replaces the target.
+    """
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        write(f)
+    os.replace(temporary, path)
@@ -0,0 +1,47 @@
+"""
+Backfill of the normalized price fields for items stored before prices were parsed at ingestion.
+"""
+import logging
+from itertools import islice
+
+from database.price_parser import DEFAULT_CURRENCY, parse_prices
+from database.repository import Repository
+from database.search_filter_model import PRICE_FIELD
+
+logger = logging.getLogger(__name__)
+
+# Number of items parsed and patched together
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_prices(repository: Repository, default_currency: str = DEFAULT_CURRENCY,
+                    batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Parse the raw price of every item without a normalized price and patch the result into the item.
+
+    Only the price fields are written, embeddings and other fields are left untouched. Items whose price cannot
+    be parsed are skipped and picked up again by the next run.
+
+    Args:
+        repository (Repository): The repository to backfill.
+        default_currency (str, optional): Currency of prices that do not name one. Defaults to DEFAULT_CURRENCY.
+        batch_size (int, optional): Number of items parsed and patched together. Defaults to BACKFILL_BATCH_SIZE.
+
+    Returns:
+        int: Number of items that were patched.
+    """
+    pending = (item for item in repository.iter_items(["id", "price", PRICE_FIELD]) if item.get(PRICE_FIELD) is None)
+    patched = 0
+    while batch := list(islice(pending, batch_size)):
+        prices = parse_prices([item.get("price") for item in batch], default_currency)
+        patches = [
+            {"id": item["id"], PRICE_FIELD: price.minor, "currency": price.currency}
+            for item, price in zip(batch, prices) if price is not None
+        ]
+        if patches:
+            result = repository.patch_items(patches)
+            patched += result.succeeded
+            if result.failed:
+                logger.warning("Failed to backfill prices of %d items", len(result.failed))
+    logger.info("Backfilled prices of %d items", patched)
+    return patched
@@ -0,0 +1,119 @@
+"""
+Database model for price history records.
+
+Items are stored once per store product and updated in place, so every observed price change is kept as a separate
+record in the price history repository. Old records are compacted by the retention sweep into one daily summary per
+item and day.
+"""
+import uuid
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from database.extracted_item_model import ITEM_ID_NAMESPACE
+
+
+class PriceHistoryRecord(BaseModel):
+    """
+    A price of an item observed at one extraction.
+
+    Fields:
+        id (str): Unique identifier of the record, derived from item_id and date_time when not given.
+        item_id (str): ID of the item the price belongs to.
+        store_name (str): Name of the store.
+        item_code (str): Unique identifier for the item in the store.
+        price (str): Price as shown by the store.
+        price_minor (int | None): Price in integer minor units of the currency.
+        currency (str | None): ISO 4217 currency code of the price.
+        previous_price_minor (int | None): Previously stored price in minor units, None for the first observation.
+        date_time (str): Date and time of the extraction that observed the price.
+    """
+    id: str = Field(description="Unique identifier of the record", default="")
+    item_id: str = Field(description="ID of the item the price belongs to")
+    store_name: str = Field(description="Name of the store")
+    item_code: str = Field(description="Unique identifier for the item in the store")
+    price: str = Field(description="Price as shown by the store")
+    price_minor: Optional[int] = Field(description="Price in minor units of the currency", default=None)
+    currency: Optional[str] = Field(description="ISO 4217 currency code of the price", default=None)
+    previous_price_minor: Optional[int] = Field(description="Previously stored price in minor units", default=None)
+    date_time: str = Field(description="Date and time of extraction")
+
+    @model_validator(mode="after")
+    def derive_id(self) -> "PriceHistoryRecord":
+        """
+        Fill in the ID when it is not given, so re-ingesting an extraction rewrites the same record.
+
+        Returns:
+            PriceHistoryRecord: The record.
+        """
+        if not self.id:
+            self.id = "price_" + str(uuid.uuid5(ITEM_ID_NAMESPACE, f"{self.item_id}\x00{self.date_time}"))
+        return self
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert the record to a dictionary.
+
+        Returns:
+            dict[str, Any]: Dictionary representation of the record.
+        """
+        return self.model_dump()
+
+
+class DailyPriceSummary(BaseModel):
+    """
+    The prices of an item observed during one day, replacing the individual price history records of that day.
+
+    Fields:
+        id (str): Unique identifier of the summary, derived from item_id and day when not given.
+        item_id (str): ID of the item the prices belong to.
+        store_name (str): Name of the store.
+        item_code (str): Unique identifier for the item in the store.
+        day (str): ISO date of the observations.
+        price (str): Last price of the day as shown by the store.
+        currency (str | None): ISO 4217 currency code of the prices.
+        open_price_minor (int | None): First price of the day in minor units.
+        close_price_minor (int | None): Last price of the day in minor units.
+        min_price_minor (int | None): Lowest price of the day in minor units.
+        max_price_minor (int | None): Highest price of the day in minor units.
+        observations (int): Number of price history records summarized.
+        first_date_time (str): Date and time of the first summarized record.
+        last_date_time (str): Date and time of the last summarized record.
+        ttl (int | None): Cosmos DB time to live in seconds, None uses the container default.
+    """
+    id: str = Field(description="Unique identifier of the summary", default="")
+    item_id: str = Field(description="ID of the item the prices belong to")
+    store_name: str = Field(description="Name of the store")
+    item_code: str = Field(description="Unique identifier for the item in the store")
+    day: str = Field(description="ISO date of the observations")
+    price: str = Field(description="Last price of the day as shown by the store")
+    currency: Optional[str] = Field(description="ISO 4217 currency code of the prices", default=None)
+    open_price_minor: Optional[int] = Field(description="First price of the day in minor units", default=None)
+    close_price_minor: Optional[int] = Field(description="Last price of the day in minor units", default=None)
+    min_price_minor: Optional[int] = Field(description="Lowest price of the day in minor units", default=None)
+    max_price_minor: Optional[int] = Field(description="Highest price of the day in minor units", default=None)
+    observations: int = Field(description="Number of price history records summarized", default=0)
+    first_date_time: str = Field(description="Date and time of the first summarized record")
+    last_date_time: str = Field(description="Date and time of the last summarized record")
+    ttl: Optional[int] = Field(description="Cosmos DB time to live in seconds", default=None)
+
+    @model_validator(mode="after")
+    def derive_id(self) -> "DailyPriceSummary":
+        """
+        Fill in the ID when it is not given, so compacting the same day again updates the same summary.
+
+        Returns:
+            DailyPriceSummary: The summary.
+        """
+        if not self.id:
+            self.id = "summary_" + str(uuid.uuid5(ITEM_ID_NAMESPACE, f"{self.item_id}\x00{self.day}"))
+        return self
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert the summary to a dictionary, without ttl when it is not set.
+
+        Returns:
+            dict[str, Any]: Dictionary representation of the summary.
+        """
+        return self.model_dump(exclude={"ttl"} if self.ttl is None else None)
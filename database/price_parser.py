@@ -0,0 +1,179 @@
+"""
+Parsing of free-form store prices into integer minor units and an ISO 4217 currency code.
+
+Store pages show prices such as "249,99 €", "1.249,99 kn" or "$1,249.99". Prices are stored as integer minor units
+next to the raw string, so they can be compared, ranged and sorted by the database without any float rounding.
+"""
+import re
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Iterable, Optional
+
+from pydantic import BaseModel, Field
+
+# Currency of prices that do not name one, the Croatian stores price in euros
+DEFAULT_CURRENCY = "EUR"
+
+# Minor unit exponent of currencies that do not use cents
+CURRENCY_EXPONENTS = {"JPY": 0, "KRW": 0}
+
+# Currency symbols and names found in prices, checked in order
+CURRENCY_PATTERNS = [
+    (re.compile(r"€|\bEUR\b|\beura?\b", re.IGNORECASE), "EUR"),
+    (re.compile(r"\bHRK\b|\bkn\b", re.IGNORECASE), "HRK"),
+    (re.compile(r"£|\bGBP\b", re.IGNORECASE), "GBP"),
+    (re.compile(r"\bCHF\b", re.IGNORECASE), "CHF"),
+    (re.compile(r"\bRSD\b|\bdin\b", re.IGNORECASE), "RSD"),
+    (re.compile(r"\bBAM\b|\bKM\b"), "BAM"),
+    (re.compile(r"\bUSD\b|\$", re.IGNORECASE), "USD"),
+]
+
+# A number with space or apostrophe thousands groups, or a run of digits and separators ending in a digit
+NUMBER_PATTERN = re.compile(r"\d{1,3}(?:[\s\u00a0\u202f']\d{3})+(?:[.,]\d+)?(?!\d)|\d[\d.,]*\d|\d")
+GROUP_SEPARATORS = re.compile(r"[\s\u00a0\u202f']")
+# Text after a number that makes it a percentage or a quantity rather than an amount, as in "-10%" or "2 x"
+NOT_AMOUNT_SUFFIX = re.compile(r"\s*(?:%|(?:x|×|kom|pcs|komada)\b)", re.IGNORECASE)
+
+
+class ParsedPrice(BaseModel):
+    """
+    A price in integer minor units of its currency.
+
+    Fields:
+        minor (int): Price in minor units, for example cents.
+        currency (str): ISO 4217 currency code.
+    """
+    minor: int = Field(description="Price in minor units of the currency")
+    currency: str = Field(description="ISO 4217 currency code")
+
+    @property
+    def amount(self) -> Decimal:
+        """The price in major units."""
+        return Decimal(self.minor).scaleb(-currency_exponent(self.currency))
+
+
+def currency_exponent(currency: str) -> int:
+    """
+    Return the number of decimal digits of the minor unit of a currency.
+
+    Args:
+        currency (str): ISO 4217 currency code.
+
+    Returns:
+        int: The minor unit exponent, 2 for most currencies.
+    """
+    return CURRENCY_EXPONENTS.get(currency.upper(), 2)
+
+
+def to_minor_units(amount: float | Decimal | str, currency: str = DEFAULT_CURRENCY) -> int:
+    """
+    Convert an amount in major units to integer minor units, rounding half up.
+
+    Args:
+        amount (float | Decimal | str): The amount in major units.
+        currency (str, optional): ISO 4217 currency code. Defaults to DEFAULT_CURRENCY.
+
+    Returns:
+        int: The amount in minor units.
+    """
+    scaled = Decimal(str(amount)).scaleb(currency_exponent(currency))
+    return int(scaled.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def parse_price(text: Optional[str], default_currency: str = DEFAULT_CURRENCY) -> Optional[ParsedPrice]:
+    """
+    Parse the amount of a price string.
+
+    The amount is the number next to the currency symbol or code, so discounts and quantities such as
+    "Akcija -10% 249,99 €" or "2 x 49,99 €" parse to the price. Percentages and quantities are never taken as the
+    amount, without a currency the first remaining number is.
+
+    Both European ("1.249,99") and English ("1,249.99") separators are understood. A single separator followed by
+    exactly three digits is read as a thousands separator, as in "2.499", otherwise as the decimal separator.
+
+    Args:
+        text (str | None): The price as shown by the store.
+        default_currency (str, optional): Currency of prices that do not name one. Defaults to DEFAULT_CURRENCY.
+
+    Returns:
+        ParsedPrice | None: The parsed price, None if the text holds no amount.
+    """
+    if not text:
+        return None
+    match = _find_amount(text)
+    if match is None:
+        return None
+    currency = detect_currency(text) or default_currency
+    number = GROUP_SEPARATORS.sub("", match.group())
+    comma, dot = number.rfind(","), number.rfind(".")
+    if comma >= 0 and dot >= 0:
+        decimal_separator = "," if comma > dot else "."
+    elif comma >= 0 or dot >= 0:
+        separator = "," if comma >= 0 else "."
+        digits_after = len(number) - number.rfind(separator) - 1
+        decimal_separator = separator if number.count(separator) == 1 and digits_after != 3 else None
+    else:
+        decimal_separator = None
+    if decimal_separator is None:
+        integer, fraction = number, ""
+    else:
+        integer, _, fraction = number.rpartition(decimal_separator)
+    integer = integer.replace(",", "").replace(".", "")
+    try:
+        return ParsedPrice(minor=to_minor_units(f"{integer}.{fraction or '0'}", currency), currency=currency)
+    except InvalidOperation:
+        return None
+
+
+def parse_prices(texts: Iterable[Optional[str]],
+                 default_currency: str = DEFAULT_CURRENCY) -> list[Optional[ParsedPrice]]:
+    """
+    Parse all prices of a page in one pass. Repeated strings, common on listing pages, are parsed once.
+
+    Args:
+        texts (Iterable[str | None]): The prices as shown by the store.
+        default_currency (str, optional): Currency of prices that do not name one. Defaults to DEFAULT_CURRENCY.
+
+    Returns:
+        list[ParsedPrice | None]: The parsed prices in input order, None where a text holds no amount.
+    """
+    parsed: dict[Optional[str], Optional[ParsedPrice]] = {}
+    results = []
+    for text in texts:
+        if text not in parsed:
+            parsed[text] = parse_price(text, default_currency)
+        results.append(parsed[text])
+    return results
+
+
+def _find_amount(text: str) -> Optional[re.Match]:
+    """
+    Return the number of a price string closest to its currency, skipping percentages and quantities.
+    """
+    numbers = [match for match in NUMBER_PATTERN.finditer(text) if not NOT_AMOUNT_SUFFIX.match(text, match.end())]
+    if not numbers:
+        return None
+    currency_spans = [currency_match.span() for pattern, _ in CURRENCY_PATTERNS
+                      for currency_match in pattern.finditer(text)]
+    if not currency_spans:
+        return numbers[0]
+
+    def distance(match: re.Match) -> int:
+        return min(max(start - match.end(), match.start() - end, 0) for start, end in currency_spans)
+
+    return min(numbers, key=distance)
+
+
+def detect_currency(text: str) -> Optional[str]:
+    """
+    Return the currency named in a price string by symbol, code or name.
+
+    Args:
+        text (str): The price as shown by the store.
+
+    Returns:
+        str | None: The ISO 4217 currency code, None if the text names no known currency.
+    """
+    for pattern, currency in CURRENCY_PATTERNS:
+        if pattern.search(text):
+            return currency
+    return None
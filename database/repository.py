@@ -0,0 +1,209 @@
+"""
+Repository interface for long-term memory backends.
+
+Defines the abstract base class implemented by the Azure Cosmos DB repository and the local in-process vector store,
+so the extraction pipeline and the API can work with either backend.
+"""
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+
+from database.bulk_write_result_model import BulkWriteResult
+from database.result_page_model import DEFAULT_PAGE_SIZE, ResultPage, paginate
+from database.search_filter_model import SearchFilter
+from embedding.vector import Vector
+
+
+class Repository(ABC):
+    """
+    Abstract base class for item repositories with vector similarity search.
+
+    Items are dictionaries with an "id" key and an optional "embedding" key holding the vector of the item description.
+    """
+
+    @abstractmethod
+    def create_item(self, item: dict) -> dict:
+        """
+        Create a new item.
+
+        Args:
+            item (dict): The item to be created.
+
+        Returns:
+            dict: The created item.
+        """
+
+    @abstractmethod
+    def create_items(self, items: list[dict]) -> BulkWriteResult:
+        """
+        Create many items, reporting the outcome of every item without aborting the batch.
+
+        Args:
+            items (list[dict]): The items to be created.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+
+    @abstractmethod
+    def upsert_items(self, items: list[dict]) -> BulkWriteResult:
+        """
+        Create or replace many items, reporting the outcome of every item without aborting the batch.
+
+        Args:
+            items (list[dict]): The items to be upserted.
+
+        Returns:
+            BulkWriteResult: One result per item, in input order.
+        """
+
+    @abstractmethod
+    def read_item(self, item_id: str) -> dict:
+        """
+        Read an item by its ID.
+
+        Args:
+            item_id (str): The ID of the item to read.
+
+        Returns:
+            dict: The retrieved item.
+        """
+
+    @abstractmethod
+    def read_items(self, item_ids: list[str], fields: list[str]) -> dict[str, dict]:
+        """
+        Read many items by their IDs, projected to the given fields. Missing items are left out.
+
+        Args:
+            item_ids (list[str]): The IDs of the items to read.
+            fields (list[str]): Names of the fields to return for every item, "id" is always returned.
+
+        Returns:
+            dict[str, dict]: The projected items by ID.
+        """
+
+    @abstractmethod
+    def update_item(self, updated_item: dict) -> dict:
+        """
+        Create or replace an item.
+
+        Args:
+            updated_item (dict): The updated item data.
+
+        Returns:
+            dict: The upserted item.
+        """
+
+    @abstractmethod
+    def delete_item(self, item_id: str) -> dict | None:
+        """
+        Delete an item by its ID.
+
+        Args:
+            item_id (str): The ID of the item to delete.
+
+        Returns:
+            dict | None: The result of the delete operation.
+        """
+
+    @abstractmethod
+    def delete_items(self, item_ids: list[str]) -> BulkWriteResult:
+        """
+        Delete many items, reporting the outcome of every item without aborting the batch.
+
+        Args:
+            item_ids (list[str]): The IDs of the items to delete.
+
+        Returns:
+            BulkWriteResult: One result per ID, in input order.
+        """
+
+    @abstractmethod
+    def query_by_embedding(self, embedding: Vector, max_results: int = 10,
+                           search_filter: Optional[SearchFilter] = None) -> list[dict]:
+        """
+        Return the items most similar to the given embedding, most similar first.
+
+        Args:
+            embedding (Vector): The embedding vector to query by.
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions applied before ranking, and keywords fused
+                with the vector rank. Defaults to no filter.
+
+        Returns:
+            list[dict]: Matching items without their embeddings, with a similarity_score field.
+        """
+
+    def query_pages_by_embedding(self, embedding: Vector, max_results: int = 10,
+                                 search_filter: Optional[SearchFilter] = None,
+                                 page_size: int = DEFAULT_PAGE_SIZE,
+                                 continuation_token: Optional[str] = None) -> Iterator[ResultPage]:
+        """
+        Lazily yield the results of query_by_embedding page by page.
+
+        The default implementation ranks the results once, when the first page is requested, and resumes at the
+        offset stored in the continuation token. Backends that page natively override it.
+
+        Args:
+            embedding (Vector): The embedding vector to query by.
+            max_results (int, optional): Maximum number of results over all pages. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions and keywords of the search.
+                Defaults to no filter.
+            page_size (int, optional): Maximum number of results per page. Defaults to DEFAULT_PAGE_SIZE.
+            continuation_token (str | None, optional): Token of a previous page of the same query.
+                Defaults to the first page.
+
+        Returns:
+            Iterator[ResultPage]: The pages, the last one without a continuation token.
+
+        Raises:
+            ValueError: If the continuation token is invalid.
+        """
+        yield from paginate(self.query_by_embedding(embedding, max_results, search_filter), page_size,
+                            continuation_token)
+
+    @abstractmethod
+    def query_by_price(self, max_results: int = 10, search_filter: Optional[SearchFilter] = None,
+                       descending: bool = False) -> list[dict]:
+        """
+        Return items ordered by their numeric price, cheapest first by default.
+
+        Items without a parsed price are never returned.
+
+        Args:
+            max_results (int, optional): Maximum number of results to return. Defaults to 10.
+            search_filter (SearchFilter | None, optional): Restrictions of the search, keywords have to match at
+                least one description term. Defaults to no filter.
+            descending (bool, optional): Return the most expensive items first. Defaults to False.
+
+        Returns:
+            list[dict]: Matching items without their embeddings.
+        """
+
+    @abstractmethod
+    def iter_items(self, fields: list[str]) -> Iterator[dict]:
+        """
+        Iterate over all stored items, projected to the given fields.
+
+        Args:
+            fields (list[str]): Names of the fields to return for every item.
+
+        Returns:
+            Iterator[dict]: The projected items.
+        """
+
+    @abstractmethod
+    def patch_items(self, patches: list[dict]) -> BulkWriteResult:
+        """
+        Set fields of existing items without rewriting them, reporting the outcome of every item.
+
+        Args:
+            patches (list[dict]): One dictionary per item with its "id" and the fields to set.
+
+        Returns:
+            BulkWriteResult: One result per patch, in input order.
+        """
+
+    def close(self) -> None:
+        """
+        Release resources held by the repository. The default implementation does nothing.
+        """
@@ -0,0 +1,368 @@
+"""
+Latency, request unit, item count and error metrics of repository operations.
+
+Repository methods are decorated with observed, which records every call in the process-wide REPOSITORY_METRICS
+registry labeled by repository and operation. Cosmos DB operations add their x-ms-request-charge header through the
+response hook returned by request_charge_hook. The registry renders the Prometheus text format for the /metrics
+endpoint of the API and returns OperationStats snapshots for benchmarks.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Iterator, Mapping, Optional
+
+from pydantic import BaseModel, Field
+
+from database.bulk_write_result_model import BulkWriteResult
+from database.result_page_model import ResultPage
+
+# Response header of Cosmos DB holding the request units consumed by a request
+REQUEST_CHARGE_HEADER = "x-ms-request-charge"
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestCharge:
+    """
+    Response hook summing the request charges of all Cosmos DB requests made by one operation.
+
+    It is shared by the worker threads and result pages of the operation, so additions are locked.
+    """
+
+    def __init__(self):
+        self.request_units = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, headers: Mapping[str, str], result: Any = None) -> None:
+        charge = headers.get(REQUEST_CHARGE_HEADER) if headers else None
+        if charge:
+            with self._lock:
+                self.request_units += float(charge)
+
+
+_current_charge: ContextVar[Optional[RequestCharge]] = ContextVar("request_charge", default=None)
+
+
+def request_charge_hook() -> Optional[RequestCharge]:
+    """
+    Return the response hook of the observed operation running in the current context.
+
+    Operations that hand requests to worker threads capture the hook first, because threads do not inherit the
+    context.
+
+    Returns:
+        RequestCharge | None: The response hook, None outside an observed operation.
+    """
+    return _current_charge.get()
+
+
+class OperationStats(BaseModel):
+    """
+    Aggregated metrics of one operation of one repository.
+
+    Fields:
+        calls (int): Number of calls.
+        errors (dict[str, int]): Failed calls and failed items of bulk operations by error class.
+        total_seconds (float): Summed latency of the calls.
+        max_seconds (float): Highest latency of a call.
+        request_units (float): Cosmos DB request units consumed.
+        items (int): Items returned or written.
+        bucket_counts (list[int]): Calls per latency bucket of LATENCY_BUCKETS, the last entry counts slower calls.
+    """
+    calls: int = Field(description="Number of calls", default=0)
+    errors: dict[str, int] = Field(description="Failures by error class", default_factory=dict)
+    total_seconds: float = Field(description="Summed latency of the calls", default=0.0)
+    max_seconds: float = Field(description="Highest latency of a call", default=0.0)
+    request_units: float = Field(description="Cosmos DB request units consumed", default=0.0)
+    items: int = Field(description="Items returned or written", default=0)
+    bucket_counts: list[int] = Field(description="Calls per latency bucket",
+                                     default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    @property
+    def mean_seconds(self) -> float:
+        """Mean latency of the calls."""
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a latency quantile as the upper bound of the bucket containing it.
+
+        Args:
+            q (float): The quantile between 0 and 1.
+
+        Returns:
+            float: The estimated latency in seconds, max_seconds for calls slower than the last bucket.
+        """
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return self.max_seconds
+
+
+class RepositoryMetrics:
+    """
+    Thread-safe registry of the metrics of repository operations.
+    """
+
+    def __init__(self):
+        self._stats: dict[tuple[str, str], OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, repository: str, operation: str, seconds: float, request_units: float = 0.0, items: int = 0,
+               errors: Optional[dict[str, int]] = None) -> None:
+        """
+        Record one call of an operation.
+
+        Args:
+            repository (str): Label of the repository.
+            operation (str): Name of the operation.
+            seconds (float): Latency of the call.
+            request_units (float, optional): Request units consumed. Defaults to 0.
+            items (int, optional): Items returned or written. Defaults to 0.
+            errors (dict[str, int] | None, optional): Failures of the call by error class. Defaults to none.
+        """
+        with self._lock:
+            stats = self._stats.setdefault((repository, operation), OperationStats())
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.request_units += request_units
+            stats.items += items
+            stats.bucket_counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            for error_class, count in (errors or {}).items():
+                stats.errors[error_class] = stats.errors.get(error_class, 0) + count
+
+    def snapshot(self) -> dict[tuple[str, str], OperationStats]:
+        """
+        Return a copy of the current metrics.
+
+        Returns:
+            dict[tuple[str, str], OperationStats]: The metrics by repository label and operation.
+        """
+        with self._lock:
+            return {key: stats.model_copy(deep=True) for key, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """
+        Remove all recorded metrics, for example between benchmark runs.
+        """
+        with self._lock:
+            self._stats.clear()
+
+    def render_prometheus(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP repository_operation_duration_seconds Latency of repository operations.",
+            "# TYPE repository_operation_duration_seconds histogram",
+        ]
+        for (repository, operation), stats in sorted(snapshot.items()):
+            labels = f'repository="{_escape(repository)}",operation="{_escape(operation)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.bucket_counts):
+                cumulative += count
+                lines.append(f'repository_operation_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'repository_operation_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.calls}')
+            lines.append(f"repository_operation_duration_seconds_sum{{{labels}}} {stats.total_seconds}")
+            lines.append(f"repository_operation_duration_seconds_count{{{labels}}} {stats.calls}")
+        for name, help_text, value in (
+                ("repository_request_units_total", "Cosmos DB request units consumed by repository operations.",
+                 lambda stats: stats.request_units),
+                ("repository_items_total", "Items returned or written by repository operations.",
+                 lambda stats: stats.items)):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} counter"])
+            for (repository, operation), stats in sorted(snapshot.items()):
+                lines.append(f'{name}{{repository="{_escape(repository)}",operation="{_escape(operation)}"}} '
+                             f"{value(stats)}")
+        lines.extend(["# HELP repository_errors_total Failed repository operations and bulk items by error class.",
+                      "# TYPE repository_errors_total counter"])
+        for (repository, operation), stats in sorted(snapshot.items()):
+            for error_class, count in sorted(stats.errors.items()):
+                lines.append(f'repository_errors_total{{repository="{_escape(repository)}",'
+                             f'operation="{_escape(operation)}",error_class="{_escape(error_class)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry of all repositories
+REPOSITORY_METRICS = RepositoryMetrics()
+
+
+def error_class(error: BaseException) -> str:
+    """
+    Return the metrics label of an error, the HTTP status for errors of the Cosmos DB service.
+
+    Args:
+        error (BaseException): The error.
+
+    Returns:
+        str: The error class label.
+    """
+    status_code = getattr(error, "status_code", None)
+    return f"http_{status_code}" if status_code else type(error).__name__
+
+
+def observed(operation: str) -> Callable:
+    """
+    Decorate a repository method so that every call is recorded in REPOSITORY_METRICS.
+
+    The repository is labeled by its metrics_label attribute. Iterators and async iterators returned by the method
+    are recorded when they are exhausted or closed, counting the items of every element.
+
+    Args:
+        operation (str): Name of the operation.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(method: Callable) -> Callable:
+        if inspect.isasyncgenfunction(method):
+            @functools.wraps(method)
+            def async_generator_wrapper(self, *args, **kwargs):
+                return _track_async(method(self, *args, **kwargs), self, operation, RequestCharge())
+            return async_generator_wrapper
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                charge = RequestCharge()
+                token = _current_charge.set(charge)
+                start = time.perf_counter()
+                try:
+                    result = await method(self, *args, **kwargs)
+                except Exception as e:
+                    _record(self, operation, start, charge, errors={error_class(e): 1})
+                    raise
+                finally:
+                    _current_charge.reset(token)
+                _record(self, operation, start, charge, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            charge = RequestCharge()
+            token = _current_charge.set(charge)
+            start = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception as e:
+                _record(self, operation, start, charge, errors={error_class(e): 1})
+                raise
+            finally:
+                _current_charge.reset(token)
+            if isinstance(result, Iterator):
+                return _track(result, self, operation, charge, start)
+            _record(self, operation, start, charge, result)
+            return result
+        return wrapper
+    return decorator
+
+
+def _track(iterator: Iterator, repository: Any, operation: str, charge: RequestCharge, start: float) -> Iterator:
+    """
+    Yield the elements of an iterator returned by an observed method and record the call when it ends.
+
+    The response hook is set while every element is fetched, so generators making requests lazily find it.
+    """
+    items = 0
+    errors: dict[str, int] = {}
+    try:
+        while True:
+            token = _current_charge.set(charge)
+            try:
+                element = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current_charge.reset(token)
+            items += _count(element)
+            yield element
+    except Exception as e:
+        errors[error_class(e)] = 1
+        raise
+    finally:
+        _record(repository, operation, start, charge, items=items, errors=errors)
+
+
+async def _track_async(iterator: AsyncIterator, repository: Any, operation: str,
+                       charge: RequestCharge) -> AsyncIterator:
+    """
+    Yield the elements of an async iterator returned by an observed method and record the call when it ends.
+
+    The response hook is set only while an element is fetched, the steps of the iteration may run in different
+    contexts.
+    """
+    start = time.perf_counter()
+    items = 0
+    errors: dict[str, int] = {}
+    try:
+        while True:
+            token = _current_charge.set(charge)
+            try:
+                element = await anext(iterator)
+            except StopAsyncIteration:
+                return
+            finally:
+                _current_charge.reset(token)
+            items += _count(element)
+            yield element
+    except Exception as e:
+        errors[error_class(e)] = 1
+        raise
+    finally:
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+        _record(repository, operation, start, charge, items=items, errors=errors)
+
+
+def _count(result: Any) -> int:
+    """
+    Return the number of items in the result of an operation.
+    """
+    if result is None:
+        return 0
+    if isinstance(result, BulkWriteResult):
+        return result.succeeded
+    if isinstance(result, ResultPage):
+        return len(result.items)
+    if isinstance(result, (list, tuple)) or (isinstance(result, dict) and "id" not in result):
+        return len(result)
+    return 1
+
+
+def _record(repository: Any, operation: str, start: float, charge: RequestCharge, result: Any = None,
+            items: Optional[int] = None, errors: Optional[dict[str, int]] = None) -> None:
+    """
+    Record a finished call, including the failed items of a bulk result.
+    """
+    errors = dict(errors or {})
+    if isinstance(result, BulkWriteResult):
+        for failure in result.failed:
+            label = f"http_{failure.status_code}" if failure.status_code else "error"
+            errors[label] = errors.get(label, 0) + 1
+    REPOSITORY_METRICS.record(
+        getattr(repository, "metrics_label", type(repository).__name__),
+        operation,
+        time.perf_counter() - start,
+        charge.request_units,
+        _count(result) if items is None else items,
+        errors
+    )
+
+
+def _escape(value: str) -> str:
+    """
+    Escape a Prometheus label value.
+    """
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
@@ -0,0 +1,95 @@
+"""
+Pydantic model for one page of query results and the opaque continuation tokens of paged queries.
+
+A continuation token is URL-safe base64 of a small JSON state. Backends that page natively, such as Cosmos DB, keep
+their own token in the state, the other backends keep the offset of the next result. Clients only pass the token
+back unchanged with the same query.
+"""
+import base64
+import binascii
+import json
+from typing import Iterator, Optional
+
+from pydantic import BaseModel, Field
+
+# Default number of results per page of paged queries
+DEFAULT_PAGE_SIZE = 20
+
+
+class ResultPage(BaseModel):
+    """
+    One page of the results of a query.
+
+    Fields:
+        items (list[dict]): The results of the page, in query order.
+        continuation_token (str | None): Token resuming the query after this page, None on the last page.
+    """
+    items: list[dict] = Field(description="The results of the page", default_factory=list)
+    continuation_token: Optional[str] = Field(description="Token resuming the query after this page", default=None)
+
+
+def encode_continuation_token(state: dict) -> str:
+    """
+    Encode the resume state of a query as an opaque token.
+
+    Args:
+        state (dict): JSON serializable state of the query.
+
+    Returns:
+        str: The continuation token.
+    """
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_continuation_token(token: Optional[str]) -> dict:
+    """
+    Decode a continuation token into the resume state of a query.
+
+    Args:
+        token (str | None): The continuation token, None or empty for the first page.
+
+    Returns:
+        dict: The resume state, empty for the first page.
+
+    Raises:
+        ValueError: If the token was not created by encode_continuation_token.
+    """
+    if not token:
+        return {}
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (UnicodeEncodeError, binascii.Error, ValueError) as e:
+        raise ValueError("Invalid continuation token") from e
+    if not isinstance(state, dict):
+        raise ValueError("Invalid continuation token")
+    return state
+
+
+def paginate(items: list[dict], page_size: int, continuation_token: Optional[str] = None) -> Iterator[ResultPage]:
+    """
+    Split already ranked results into pages, starting at the offset stored in the continuation token.
+
+    Args:
+        items (list[dict]): All results of the query, in query order.
+        page_size (int): Number of results per page.
+        continuation_token (str | None, optional): Token of a previous page. Defaults to the first page.
+
+    Returns:
+        Iterator[ResultPage]: The pages, at least one even when there are no results.
+
+    Raises:
+        ValueError: If the token is invalid or was created by a backend that pages natively.
+    """
+    if page_size <= 0:
+        raise ValueError("Page size has to be positive")
+    state = decode_continuation_token(continuation_token)
+    offset = state.get("offset", 0)
+    if set(state) - {"offset"} or not isinstance(offset, int) or offset < 0:
+        raise ValueError("Invalid continuation token")
+    while True:
+        end = offset + page_size
+        token = encode_continuation_token({"offset": end}) if end < len(items) else None
+        yield ResultPage(items=items[offset:end], continuation_token=token)
+        if token is None:
+            return
+        offset = end
@@ -0,0 +1,203 @@
+"""
+Retention of extracted items and compaction of their price history.
+
+Items are refreshed by every extraction that sees them, so an item whose date_time is older than the retention age is
+no longer offered by its store. Expiring such items keeps the vector index, and the cost of every similarity query,
+proportional to the current catalogue instead of the whole crawl history. Cosmos DB containers can expire items with
+a time to live instead (see scripts/azure_cosmos/init.py), the sweep then finds nothing to expire. Price history
+observations older than a few days are replaced by one summary per item and day.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Callable, Iterable, Optional
+
+from database.bulk_write_result_model import BulkItemResult, BulkWriteResult
+from database.price_history_model import DailyPriceSummary
+from database.repository import Repository
+from database.retention_model import RetentionPolicy, RetentionReport
+
+logger = logging.getLogger(__name__)
+
+# Number of items deleted or written together
+SWEEP_BATCH_SIZE = 500
+# Fields of price history records and daily summaries read by the compaction
+HISTORY_FIELDS = ["id", "item_id", "store_name", "item_code", "price", "price_minor", "currency", "date_time", "day"]
+SUMMARY_FIELDS = ["open_price_minor", "close_price_minor", "min_price_minor", "max_price_minor", "observations",
+                  "first_date_time", "last_date_time", "price", "currency"]
+
+
+def apply_retention(long_term_memory: Repository, price_history: Optional[Repository],
+                    policy: Optional[RetentionPolicy] = None, now: Optional[datetime] = None) -> RetentionReport:
+    """
+    Expire stale items and compact the price history.
+
+    Args:
+        long_term_memory (Repository): Repository holding the extracted items.
+        price_history (Repository | None): Repository holding the price history, None skips the compaction.
+        policy (RetentionPolicy | None, optional): Retention ages. Defaults to RetentionPolicy().
+        now (datetime | None, optional): Current time. Defaults to datetime.now().
+
+    Returns:
+        RetentionReport: What the sweep removed, including how much the long-term memory shrank.
+    """
+    policy = policy or RetentionPolicy()
+    now = now or datetime.now()
+    report = expire_items(long_term_memory, policy, now)
+    if price_history is not None:
+        compaction = compact_price_history(price_history, policy, now)
+        report = report.model_copy(update={
+            "observations_compacted": compaction.observations_compacted,
+            "summaries_written": compaction.summaries_written,
+            "summaries_expired": compaction.summaries_expired,
+            "failed": report.failed + compaction.failed
+        })
+    logger.info("Retention sweep: long-term memory shrank from %d to %d items (%.1f%%), %d price observations "
+                "compacted into %d daily summaries, %d summaries expired, %d failed",
+                report.items_before, report.items_after, report.shrinkage * 100, report.observations_compacted,
+                report.summaries_written, report.summaries_expired, len(report.failed))
+    return report
+
+
+def expire_items(repository: Repository, policy: RetentionPolicy, now: Optional[datetime] = None) -> RetentionReport:
+    """
+    Delete the items that were not extracted again within the retention age.
+
+    Items without a date_time are kept.
+
+    Args:
+        repository (Repository): Repository holding the extracted items.
+        policy (RetentionPolicy): Retention ages.
+        now (datetime | None, optional): Current time. Defaults to datetime.now().
+
+    Returns:
+        RetentionReport: The number of items before the sweep and the number of expired items.
+    """
+    cutoff = ((now or datetime.now()) - timedelta(days=policy.max_age_days)).isoformat()
+    report = RetentionReport()
+    expired: list[str] = []
+    for item in repository.iter_items(["id", "date_time"]):
+        report.items_before += 1
+        if item.get("date_time") and item["date_time"] < cutoff:
+            expired.append(item["id"])
+    result = _in_batches(repository.delete_items, expired)
+    report.items_expired = result.succeeded
+    report.failed = result.failed
+    return report
+
+
+def compact_price_history(price_history: Repository, policy: RetentionPolicy,
+                          now: Optional[datetime] = None) -> RetentionReport:
+    """
+    Replace the price observations of complete days older than compact_after_days with daily summaries, and delete
+    summaries older than summary_max_age_days.
+
+    Summaries are written before the observations are deleted, so a failed write loses no data. Observations of a
+    day that was compacted before are merged into its summary.
+
+    Args:
+        price_history (Repository): Repository holding the price history records and summaries.
+        policy (RetentionPolicy): Retention ages.
+        now (datetime | None, optional): Current time. Defaults to datetime.now().
+
+    Returns:
+        RetentionReport: The compaction counts, the item counts are left at zero.
+    """
+    now = now or datetime.now()
+    compact_before = (now - timedelta(days=policy.compact_after_days)).date().isoformat()
+    expire_before = ((now - timedelta(days=policy.summary_max_age_days)).date().isoformat()
+                     if policy.summary_max_age_days else None)
+    observations: dict[tuple[str, str], list[dict]] = defaultdict(list)
+    expired: list[str] = []
+    for record in price_history.iter_items(HISTORY_FIELDS):
+        if record.get("day"):
+            if expire_before and record["day"] < expire_before:
+                expired.append(record["id"])
+        elif (day := _day(record.get("date_time"))) and day < compact_before:
+            observations[(record["item_id"], day)].append(record)
+
+    summaries = [_summarize(records, day, policy, now) for (_, day), records in observations.items()]
+    stored = price_history.read_items([summary.id for summary in summaries], SUMMARY_FIELDS) if summaries else {}
+    summaries = [_merge(summary, stored.get(summary.id)) for summary in summaries]
+    written = _in_batches(price_history.upsert_items, [summary.to_dict() for summary in summaries])
+    written_ids = {result.id for result in written.results if result.success}
+    compacted = [record["id"] for summary, records in zip(summaries, observations.values())
+                 if summary.id in written_ids for record in records]
+    deleted = _in_batches(price_history.delete_items, compacted)
+    expired_result = _in_batches(price_history.delete_items, expired)
+    return RetentionReport(
+        observations_compacted=deleted.succeeded,
+        summaries_written=written.succeeded,
+        summaries_expired=expired_result.succeeded,
+        failed=written.failed + deleted.failed + expired_result.failed
+    )
+
+
+def _day(date_time: Optional[str]) -> Optional[str]:
+    """
+    Return the ISO date of an extraction time, None if it does not start with one.
+    """
+    try:
+        return date.fromisoformat(date_time[:10]).isoformat() if date_time else None
+    except ValueError:
+        return None
+
+
+def _summarize(records: list[dict], day: str, policy: RetentionPolicy, now: datetime) -> DailyPriceSummary:
+    """
+    Summarize the observations of one item and day. The time to live counts from the day, not from the sweep.
+    """
+    records = sorted(records, key=lambda record: record["date_time"])
+    first, last = records[0], records[-1]
+    prices = [record["price_minor"] for record in records if record.get("price_minor") is not None]
+    ttl = policy.summary_ttl()
+    if ttl is not None:
+        age = now - datetime.combine(date.fromisoformat(day), time())
+        ttl = max(1, ttl - int(age.total_seconds()))
+    return DailyPriceSummary(
+        item_id=last["item_id"],
+        store_name=last.get("store_name") or "",
+        item_code=last.get("item_code") or "",
+        day=day,
+        price=last.get("price") or "",
+        currency=last.get("currency"),
+        open_price_minor=first.get("price_minor"),
+        close_price_minor=last.get("price_minor"),
+        min_price_minor=min(prices, default=None),
+        max_price_minor=max(prices, default=None),
+        observations=len(records),
+        first_date_time=first["date_time"],
+        last_date_time=last["date_time"],
+        ttl=ttl
+    )
+
+
+def _merge(summary: DailyPriceSummary, stored: Optional[dict]) -> DailyPriceSummary:
+    """
+    Merge a new summary with the stored summary of the same item and day.
+    """
+    if not stored:
+        return summary
+    update: dict = {"observations": summary.observations + (stored.get("observations") or 0)}
+    if stored.get("first_date_time") and stored["first_date_time"] < summary.first_date_time:
+        update.update(first_date_time=stored["first_date_time"], open_price_minor=stored.get("open_price_minor"))
+    if stored.get("last_date_time") and stored["last_date_time"] > summary.last_date_time:
+        update.update(last_date_time=stored["last_date_time"], close_price_minor=stored.get("close_price_minor"),
+                      price=stored.get("price") or summary.price, currency=stored.get("currency"))
+    lows = [value for value in (summary.min_price_minor, stored.get("min_price_minor")) if value is not None]
+    highs = [value for value in (summary.max_price_minor, stored.get("max_price_minor")) if value is not None]
+    update.update(min_price_minor=min(lows, default=None), max_price_minor=max(highs, default=None))
+    return summary.model_copy(update=update)
+
+
+def _in_batches(operation: Callable[[list], BulkWriteResult], values: Iterable,
+                batch_size: int = SWEEP_BATCH_SIZE) -> BulkWriteResult:
+    """
+    Run a bulk operation on batches of the values and combine the per-item results.
+    """
+    values = iter(values)
+    results: list[BulkItemResult] = []
+    while batch := list(islice(values, batch_size)):
+        results.extend(operation(batch).results)
+    return BulkWriteResult(results=results)
@@ -0,0 +1,74 @@
+"""
+Pydantic models configuring the retention of stored items and price history, and describing the outcome of a sweep.
+"""
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from database.bulk_write_result_model import BulkItemResult
+
+SECONDS_PER_DAY = 86400
+
+
+class RetentionPolicy(BaseModel):
+    """
+    How long extracted items and their price history are kept.
+
+    Fields:
+        max_age_days (int): Items not extracted again within this many days are expired.
+        compact_after_days (int): Price history observations older than this many days are compacted into one
+            summary per item and day.
+        summary_max_age_days (int | None): Daily summaries older than this many days are expired, None keeps them.
+    """
+    max_age_days: int = Field(description="Age after which items are expired", default=7, gt=0)
+    compact_after_days: int = Field(description="Age after which price observations are compacted", default=2, ge=0)
+    summary_max_age_days: Optional[int] = Field(description="Age after which daily summaries are expired",
+                                                default=365, gt=0)
+
+    def item_ttl(self) -> int:
+        """
+        Return the Cosmos DB time to live of items in seconds, matching max_age_days.
+
+        Returns:
+            int: The time to live in seconds.
+        """
+        return self.max_age_days * SECONDS_PER_DAY
+
+    def summary_ttl(self) -> Optional[int]:
+        """
+        Return the Cosmos DB time to live of daily summaries in seconds, matching summary_max_age_days.
+
+        Returns:
+            int | None: The time to live in seconds, None if summaries are kept.
+        """
+        return self.summary_max_age_days * SECONDS_PER_DAY if self.summary_max_age_days else None
+
+
+class RetentionReport(BaseModel):
+    """
+    Outcome of one retention sweep.
+
+    Fields:
+        items_before (int): Items in long-term memory before the sweep.
+        items_expired (int): Items deleted because they were not extracted again in time.
+        observations_compacted (int): Price history observations replaced by daily summaries.
+        summaries_written (int): Daily summaries created or updated.
+        summaries_expired (int): Daily summaries deleted because of their age.
+        failed (list[BulkItemResult]): Writes and deletes that failed.
+    """
+    items_before: int = Field(description="Items in long-term memory before the sweep", default=0)
+    items_expired: int = Field(description="Items deleted because they were not extracted again", default=0)
+    observations_compacted: int = Field(description="Observations replaced by daily summaries", default=0)
+    summaries_written: int = Field(description="Daily summaries created or updated", default=0)
+    summaries_expired: int = Field(description="Daily summaries deleted because of their age", default=0)
+    failed: list[BulkItemResult] = Field(description="Writes and deletes that failed", default_factory=list)
+
+    @property
+    def items_after(self) -> int:
+        """Items left in long-term memory, the rows searched by similarity queries."""
+        return self.items_before - self.items_expired
+
+    @property
+    def shrinkage(self) -> float:
+        """Fraction of the long-term memory removed by the sweep."""
+        return self.items_expired / self.items_before if self.items_before else 0.0
@@ -7,6 +7,8 @@ Note:
     This model does not include the vector embedding itself; only metadata and similarity scores are retrieved.
 """
 import uuid
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 class RetrievedDatabaseExtractedItem(BaseModel):
@@ -20,6 +22,8 @@ class RetrievedDatabaseExtractedItem(BaseModel):
     Fields:
         id (str): Unique identifier for the item in the database (auto-generated if not provided).
         price (str): Price of the item as stored in the database.
+        price_minor (int | None): Price in integer minor units of the currency, if it was parsed.
+        currency (str | None): ISO 4217 currency code of the price.
         description (str): Textual description of the item.
         item_code (str): Store-specific unique identifier for the item.
         store_name (str): Name of the store from which the item was extracted.
@@ -31,6 +35,8 @@ class RetrievedDatabaseExtractedItem(BaseModel):
         default_factory=lambda: "item_" + str(uuid.uuid4())
     )
     price: str = Field(description="Price of the item")
+    price_minor: Optional[int] = Field(description="Price in minor units of the currency", default=None)
+    currency: Optional[str] = Field(description="ISO 4217 currency code of the price", default=None)
     description: str = Field(description="Description of the item")
     item_code: str = Field(description="Unique identifier for the item in the store")
     store_name: str = Field(description="Name of the store")
@@ -0,0 +1,132 @@
+"""
+Pydantic model for restricting and re-ranking similarity searches over stored items.
+
+A SearchFilter is compiled by every repository into its native form: a parameterized WHERE clause and hybrid rank
+for Cosmos DB, a pre-filtered scan for the local vector store.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from database.price_parser import DEFAULT_CURRENCY, to_minor_units
+
+# Stored field holding the item price in integer minor units (cents)
+PRICE_FIELD = "price_minor"
+# Constant of reciprocal rank fusion, the same value Cosmos DB uses for RRF
+RRF_K = 60
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase word terms for keyword matching.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list[str]: The terms in order of appearance.
+    """
+    return re.findall(r"\w+", text.lower())
+
+
+class SearchFilter(BaseModel):
+    """
+    Restrictions and keyword component of a similarity search.
+
+    Fields:
+        store_names (list[str]): Only return items of these stores, all stores when empty.
+        since (datetime | None): Only return items extracted at or after this time. Times with a timezone are
+            converted to naive local time, the time of the stored date_time values.
+        until (datetime | None): Only return items extracted at or before this time, converted like since.
+        max_age_days (int | None): Only return items extracted in the last days, combined with since.
+        min_price (float | None): Only return items with at least this price, in major currency units.
+        max_price (float | None): Only return items with at most this price, in major currency units.
+        currency (str | None): Only return items priced in this ISO 4217 currency.
+        keywords (str | None): Keywords matched against the description and fused with the vector rank.
+    """
+    store_names: list[str] = Field(default_factory=list, description="Stores to search, all when empty")
+    since: Optional[datetime] = Field(default=None, description="Earliest extraction time")
+    until: Optional[datetime] = Field(default=None, description="Latest extraction time")
+    max_age_days: Optional[int] = Field(default=None, description="Maximum age of the extraction in days")
+    min_price: Optional[float] = Field(default=None, description="Lowest price in major currency units")
+    max_price: Optional[float] = Field(default=None, description="Highest price in major currency units")
+    currency: Optional[str] = Field(default=None, description="ISO 4217 currency of the items")
+    keywords: Optional[str] = Field(default=None, description="Keywords fused with the vector similarity")
+
+    @field_validator("since", "until")
+    @classmethod
+    def to_naive_local(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """
+        Convert a time with a timezone to the naive local time of the stored date_time values.
+
+        Extraction times are stored as naive datetime.now() strings, UTC on the servers, so aware times could neither
+        be compared with max_age_days nor with the stored strings.
+
+        Args:
+            value (datetime | None): The time given to the filter.
+
+        Returns:
+            datetime | None: The naive time.
+        """
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone().replace(tzinfo=None)
+        return value
+
+    def restricts(self) -> bool:
+        """
+        Whether the filter excludes any items, as opposed to only adding keywords to the ranking.
+
+        Returns:
+            bool: True if a store, time or price restriction is set.
+        """
+        return bool(self.store_names) or any(
+            value is not None
+            for value in (self.since, self.until, self.max_age_days, self.min_price, self.max_price, self.currency)
+        )
+
+    def earliest(self, now: Optional[datetime] = None) -> Optional[str]:
+        """
+        Return the earliest allowed extraction time as an ISO string, comparable with stored date_time values.
+
+        Args:
+            now (datetime | None, optional): Current time used with max_age_days. Defaults to datetime.now().
+
+        Returns:
+            str | None: The later of since and now - max_age_days, None if neither is set.
+        """
+        bounds = [self.since] if self.since else []
+        if self.max_age_days is not None:
+            bounds.append((now or datetime.now()) - timedelta(days=self.max_age_days))
+        return max(bounds).isoformat() if bounds else None
+
+    def latest(self) -> Optional[str]:
+        """
+        Return the latest allowed extraction time as an ISO string.
+
+        Returns:
+            str | None: until as an ISO string, None if it is not set.
+        """
+        return self.until.isoformat() if self.until else None
+
+    def price_bounds(self) -> tuple[Optional[int], Optional[int]]:
+        """
+        Return the price bounds in minor units of the filter currency, as stored in PRICE_FIELD.
+
+        Returns:
+            tuple[int | None, int | None]: The lowest and highest allowed price.
+        """
+        currency = self.currency or DEFAULT_CURRENCY
+        def to_minor(price: Optional[float]) -> Optional[int]:
+            return None if price is None else to_minor_units(price, currency)
+        return to_minor(self.min_price), to_minor(self.max_price)
+
+    def terms(self) -> list[str]:
+        """
+        Return the distinct keyword terms.
+
+        Returns:
+            list[str]: Lowercase keyword terms in order of appearance.
+        """
+        return list(dict.fromkeys(tokenize(self.keywords or "")))
@@ -0,0 +1,158 @@
+"""
+Unit tests for the asynchronous repositories in database/async_repository.py and database/async_azure_repository.py.
+
+AsyncAzureRepository is created around an in-memory fake of the asynchronous container client, so no Cosmos DB
+account is needed.
+"""
+import asyncio
+
+import numpy as np
+import pytest
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+from database.async_azure_repository import AsyncAzureRepository
+from database.async_repository import ThreadedAsyncRepository
+from database.local_repository import LocalVectorRepository
+from database.result_page_model import encode_continuation_token
+from database.search_filter_model import SearchFilter
+
+
+class FakeAsyncContainer:
+    """In-memory stand-in for an azure.cosmos.aio container client that records write concurrency."""
+
+    def __init__(self, delay: float = 0.0):
+        self.items: dict[str, dict] = {}
+        self.queries: list[tuple[str, list[dict]]] = []
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    async def upsert_item(self, item: dict, response_hook=None) -> dict:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            self.items[item["id"]] = item
+            return item
+        finally:
+            self.active -= 1
+
+    async def patch_item(self, item: str, partition_key: str, patch_operations: list[dict], response_hook=None) -> dict:
+        if item not in self.items:
+            raise CosmosResourceNotFoundError(status_code=404, message=f"Item {item} not found")
+        for operation in patch_operations:
+            self.items[item][operation["path"].lstrip("/")] = operation["value"]
+        return self.items[item]
+
+    def query_items(self, query: str, parameters: list[dict], max_item_count: int = 2, response_hook=None):
+        self.queries.append((query, parameters))
+        ids = next((p["value"] for p in parameters if p["name"] == "@ids"), list(self.items))
+        return FakeAsyncPaged([{"id": item_id, "price": self.items[item_id].get("price")}
+                               for item_id in ids if item_id in self.items], max_item_count)
+
+
+class FakeAsyncPaged:
+    """Stand-in for the async query iterator of the SDK that pages with the offset as continuation token."""
+
+    def __init__(self, items: list[dict], page_size: int):
+        self.items = items
+        self.page_size = page_size
+
+    async def __aiter__(self):
+        for item in self.items:
+            yield item
+
+    def by_page(self, continuation_token=None):
+        return FakeAsyncPageIterator(self.items, self.page_size, int(continuation_token or 0))
+
+
+class FakeAsyncPageIterator:
+    """Stand-in for the async page iterator of the SDK exposing the continuation token of the last page."""
+
+    def __init__(self, items: list[dict], page_size: int, offset: int):
+        self.items = items
+        self.page_size = page_size
+        self.offset = offset
+        self.continuation_token = None
+
+    async def __aiter__(self):
+        while self.offset < len(self.items):
+            page = self.items[self.offset:self.offset + self.page_size]
+            self.offset += self.page_size
+            self.continuation_token = str(self.offset) if self.offset < len(self.items) else None
+            yield FakeAsyncPaged(page, self.page_size)
+
+
+def test_upsert_items_is_concurrent_and_bounded():
+    """Test that bulk upserts run concurrently but never exceed max_bulk_workers writes in flight."""
+    container = FakeAsyncContainer(delay=0.01)
+    repository = AsyncAzureRepository(container, max_bulk_workers=4)
+
+    result = asyncio.run(repository.upsert_items([{"id": f"item_{i}"} for i in range(20)]))
+
+    assert result.succeeded == 20
+    assert [r.id for r in result.results] == [f"item_{i}" for i in range(20)]
+    assert container.max_active == 4
+
+
+def test_patch_items_reports_failures():
+    """Test that a patch of a missing item is reported without aborting the batch."""
+    container = FakeAsyncContainer()
+    repository = AsyncAzureRepository(container)
+    asyncio.run(repository.upsert_items([{"id": "a", "price": "1"}]))
+
+    result = asyncio.run(repository.patch_items([{"id": "a", "price": "2"}, {"id": "b", "price": "3"}]))
+
+    assert result.succeeded == 1
+    assert result.failed[0].id == "b" and result.failed[0].status_code == 404
+    assert container.items["a"]["price"] == "2"
+
+
+def test_read_items_and_query_by_embedding():
+    """Test that reads are projected queries and similarity queries send the encoded embedding."""
+    container = FakeAsyncContainer()
+    repository = AsyncAzureRepository(container)
+    asyncio.run(repository.upsert_items([{"id": "a", "price": "1", "embedding": np.array([1.0, 0.0])}]))
+
+    assert asyncio.run(repository.read_items(["a", "missing"], ["price"])) == {"a": {"id": "a", "price": "1"}}
+    assert container.items["a"]["embedding"] == [1.0, 0.0]
+
+    asyncio.run(repository.query_by_embedding(np.array([0.5, 0.5]), 3, SearchFilter(store_names=["Links"])))
+    query, parameters = container.queries[-1]
+    assert "SELECT TOP 3" in query and "ARRAY_CONTAINS(@store_names, c.store_name)" in query
+    assert {"name": "@embedding", "value": [0.5, 0.5]} in parameters
+
+
+def test_threaded_repository_wraps_local_store():
+    """Test that the threaded adapter awaits the calls of a synchronous repository."""
+    local = LocalVectorRepository()
+    repository = ThreadedAsyncRepository(local)
+    asyncio.run(repository.upsert_items([
+        {"id": "a", "price": "1", "description": "a", "embedding": np.array([1, 0], dtype=np.float32)},
+        {"id": "b", "price": "2", "description": "b", "embedding": np.array([0, 1], dtype=np.float32)},
+    ]))
+
+    items = asyncio.run(repository.query_by_embedding(np.array([0.1, 1.0], dtype=np.float32), 1))
+
+    assert [item["id"] for item in items] == ["b"]
+    assert asyncio.run(repository.read_item("a"))["price"] == "1"
+
+
+def test_query_pages_wrap_cosmos_continuation_tokens():
+    """Test that paged queries fetch Cosmos DB pages lazily and resume from the wrapped continuation token."""
+    container = FakeAsyncContainer()
+    repository = AsyncAzureRepository(container)
+    asyncio.run(repository.upsert_items([{"id": f"item_{i}", "price": str(i)} for i in range(5)]))
+
+    async def collect(token=None):
+        return [page async for page in repository.query_pages_by_embedding(np.array([1.0]), 5, page_size=2,
+                                                                            continuation_token=token)]
+
+    pages = asyncio.run(collect())
+    assert [[item["id"] for item in page.items] for page in pages] == [["item_0", "item_1"], ["item_2", "item_3"],
+                                                                        ["item_4"]]
+    assert pages[-1].continuation_token is None
+    resumed = asyncio.run(collect(pages[0].continuation_token))
+    assert resumed[0].items[0]["id"] == "item_2"
+    with pytest.raises(ValueError):
+        asyncio.run(collect(encode_continuation_token({"offset": 2})))
@@ -0,0 +1,199 @@
+"""
+Unit tests for AzureRepository in database/azure_repository.py.
+
+The repository is created around an in-memory fake container so no Cosmos DB account is needed.
+"""
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+from azure.cosmos.exceptions import CosmosResourceExistsError, CosmosResourceNotFoundError
+
+from database.azure_repository import AzureRepository, build_price_query, build_similarity_query
+from database.search_filter_model import SearchFilter
+from embedding.vector import EmbeddingFormat
+
+
+class FakeContainer:
+    """In-memory stand-in for a Cosmos DB container client that records write concurrency."""
+
+    def __init__(self, delay: float = 0.0):
+        self.items: dict[str, dict] = {}
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def _write(self, item: dict, overwrite: bool, response_hook=None) -> dict:
+        if response_hook is not None:
+            response_hook({"x-ms-request-charge": "5.5"}, item)
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            with self._lock:
+                if not overwrite and item["id"] in self.items:
+                    raise CosmosResourceExistsError(status_code=409, message=f"Item {item['id']} already exists")
+                self.items[item["id"]] = item
+            return item
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def create_item(self, item: dict, response_hook=None) -> dict:
+        return self._write(item, overwrite=False, response_hook=response_hook)
+
+    def upsert_item(self, item: dict, response_hook=None) -> dict:
+        return self._write(item, overwrite=True, response_hook=response_hook)
+
+    def delete_item(self, item: str, partition_key: str, response_hook=None) -> None:
+        with self._lock:
+            if item not in self.items:
+                raise CosmosResourceNotFoundError(status_code=404, message=f"Item {item} not found")
+            del self.items[item]
+
+    def patch_item(self, item: str, partition_key: str, patch_operations: list[dict], response_hook=None) -> dict:
+        with self._lock:
+            document = self.items[item]
+            for operation in patch_operations:
+                document[operation["path"].lstrip("/")] = operation["value"]
+            return document
+
+
+@pytest.fixture
+def container():
+    """Fixture returning an empty fake container."""
+    return FakeContainer()
+
+
+def test_create_items_writes_all_items(container):
+    """Test that create_items writes every item and reports success in input order."""
+    repository = AzureRepository.from_container(container)
+    result = repository.create_items([{"id": f"item_{i}", "price": str(i)} for i in range(20)])
+
+    assert result.succeeded == 20
+    assert [r.id for r in result.results] == [f"item_{i}" for i in range(20)]
+    assert len(container.items) == 20
+
+
+def test_create_items_reports_failures_without_aborting(container):
+    """Test that a failing item is reported and the remaining items are still written."""
+    repository = AzureRepository.from_container(container)
+    repository.create_item({"id": "item_1"})
+    result = repository.create_items([{"id": "item_0"}, {"id": "item_1"}, {"id": "item_2"}])
+
+    assert result.succeeded == 2
+    assert [r.id for r in result.failed] == ["item_1"]
+    assert result.failed[0].status_code == 409
+    assert set(container.items) == {"item_0", "item_1", "item_2"}
+
+
+def test_upsert_items_overwrites_existing(container):
+    """Test that upsert_items replaces existing items."""
+    repository = AzureRepository.from_container(container)
+    repository.create_item({"id": "item_1", "price": "1"})
+    result = repository.upsert_items([{"id": "item_1", "price": "2"}])
+
+    assert result.succeeded == 1
+    assert container.items["item_1"]["price"] == "2"
+
+
+def test_bulk_writes_are_concurrent_and_bounded():
+    """Test that bulk writes run concurrently but never exceed the worker limit."""
+    container = FakeContainer(delay=0.02)
+    repository = AzureRepository.from_container(container, max_bulk_workers=4)
+    started = time.perf_counter()
+    result = repository.create_items([{"id": f"item_{i}"} for i in range(16)])
+    elapsed = time.perf_counter() - started
+
+    assert result.succeeded == 16
+    assert container.max_active == 4
+    assert elapsed < 16 * 0.02
+
+
+def test_close_shuts_down_bulk_workers(container):
+    """Test that closing the repository stops its bulk write executor."""
+    repository = AzureRepository.from_container(container)
+    repository.create_items([{"id": "item_1"}])
+    repository.close()
+
+    with pytest.raises(RuntimeError):
+        repository.create_items([{"id": "item_2"}])
+
+
+def test_constructor_accepts_existing_container(container):
+    """Test that the constructor wraps a given container without creating a client, like from_container."""
+    repository = AzureRepository(container=container, max_bulk_workers=2)
+
+    assert repository.client is None and repository.container is container
+    assert repository.max_bulk_workers == 2
+    assert repository.create_items([{"id": "item_1"}]).succeeded == 1
+    repository.close()
+
+
+def test_bulk_writes_encode_embeddings(container):
+    """Test that embeddings are serialized in the repository embedding format at write time."""
+    repository = AzureRepository.from_container(container, embedding_format=EmbeddingFormat(quantization="int8"))
+    repository.create_items([{"id": "item_1", "embedding": np.array([0.5, -1.0], dtype=np.float32)}])
+
+    assert container.items["item_1"]["embedding"] == [64, -127]
+
+
+def test_build_similarity_query_compiles_filters():
+    """Test that filters become parameterized WHERE conditions and keywords an RRF hybrid rank."""
+    search_filter = SearchFilter(store_names=["Links"], since=datetime(2025, 1, 1), max_price=99.99, keywords="ryzen 7")
+    query, parameters = build_similarity_query(5, search_filter)
+    values = {parameter["name"]: parameter["value"] for parameter in parameters}
+
+    assert "SELECT TOP 5" in query
+    assert "WHERE ARRAY_CONTAINS(@store_names, c.store_name) AND c.date_time >= @since AND c.price_minor <= @max_price" \
+        in query
+    assert "ORDER BY RANK RRF(VectorDistance(c.embedding, @embedding), FullTextScore(c.description, @term0, @term1))" \
+        in query
+    assert values == {"@store_names": ["Links"], "@since": "2025-01-01T00:00:00", "@max_price": 9999,
+                      "@term0": "ryzen", "@term1": "7"}
+
+
+def test_build_similarity_query_without_filter():
+    """Test that an unfiltered query keeps the plain vector ordering."""
+    query, parameters = build_similarity_query(10)
+
+    assert "WHERE" not in query
+    assert "ORDER BY VectorDistance(c.embedding, @embedding)" in query
+    assert parameters == []
+
+
+def test_build_price_query_orders_by_price():
+    """Test that price queries require a numeric price and use keywords as a full-text condition."""
+    query, parameters = build_price_query(3, SearchFilter(currency="EUR", min_price=10, keywords="ssd"), descending=True)
+
+    assert "c.currency = @currency AND c.price_minor >= @min_price AND IS_NUMBER(c.price_minor) AND " \
+           "FullTextContainsAny(c.description, @term0)" in query
+    assert "ORDER BY c.price_minor DESC" in query
+    assert {p["name"]: p["value"] for p in parameters} == {"@currency": "EUR", "@min_price": 1000, "@term0": "ssd"}
+
+
+def test_patch_items_sets_fields(container):
+    """Test that patch_items sends set operations for the given fields only."""
+    repository = AzureRepository.from_container(container)
+    repository.create_item({"id": "item_1", "price": "1,00 €"})
+
+    result = repository.patch_items([{"id": "item_1", "price_minor": 100, "currency": "EUR"}])
+
+    assert result.succeeded == 1
+    assert container.items["item_1"] == {"id": "item_1", "price": "1,00 €", "price_minor": 100, "currency": "EUR"}
+
+
+def test_delete_items_reports_missing_items(container):
+    """Test that delete_items removes stored items and reports the ones that do not exist."""
+    repository = AzureRepository.from_container(container)
+    repository.create_items([{"id": "item_0"}, {"id": "item_1"}])
+
+    result = repository.delete_items(["item_0", "missing"])
+
+    assert result.succeeded == 1
+    assert result.failed[0].id == "missing" and result.failed[0].status_code == 404
+    assert list(container.items) == ["item_1"]
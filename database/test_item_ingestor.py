@@ -0,0 +1,105 @@
+"""
+Unit tests for ItemIngestor in database/item_ingestor.py.
+"""
+import numpy as np
+import pytest
+
+from database.extracted_item_model import DatabaseExtractedItem, item_id
+from database.item_ingestor import ItemIngestor
+from database.local_repository import LocalVectorRepository
+from embedding.embedder import Embedder
+from embedding.vector import Vector
+
+
+class CountingEmbedder(Embedder):
+    """Embedder returning a fixed vector and recording the embedded texts."""
+
+    def __init__(self):
+        self.texts: list[str] = []
+
+    def embed(self, text: str) -> Vector:
+        self.texts.append(text)
+        return np.array([1.0, float(len(text))], dtype=np.float32)
+
+
+def make_item(code: str, price: str, description: str, date_time: str = "2025-01-01T00:00:00"):
+    """Return an extracted item of the test store."""
+    return DatabaseExtractedItem(price=price, price_minor=int(price) * 100, currency="EUR", description=description,
+                                 item_code=code, store_name="Store", date_time=date_time)
+
+
+def test_item_id_is_deterministic():
+    """Test that the ID depends only on store name and item code."""
+    first = make_item("A1", "10", "Item")
+    second = make_item("A1", "20", "Other", "2025-02-01T00:00:00")
+
+    assert first.id == second.id == item_id("Store", "A1")
+    assert first.id != make_item("A2", "10", "Item").id
+
+
+def test_items_without_code_are_kept_apart():
+    """Test that code-less items of a store get IDs from their descriptions and are all ingested."""
+    repository = LocalVectorRepository()
+    ingestor = ItemIngestor(repository, CountingEmbedder())
+
+    result = ingestor.ingest([make_item(" ", "10", "Intel Core i5"), make_item("", "20", "AMD Ryzen 5")])
+
+    assert result.created == 2
+    assert make_item("", "10", "Intel  Core i5 ").id == make_item(" ", "30", "Intel Core i5").id
+    assert make_item("", "10", "Intel Core i5").id != item_id("Store", "")
+
+
+def test_ingest_writes_only_new_and_changed_items():
+    """Test that re-ingesting skips unchanged items and embeds only changed descriptions."""
+    repository = LocalVectorRepository()
+    history = LocalVectorRepository()
+    embedder = CountingEmbedder()
+    ingestor = ItemIngestor(repository, embedder, history)
+
+    first = ingestor.ingest([make_item("A", "10", "Alpha"), make_item("B", "20", "Beta"), make_item("C", "30", "Gamma")])
+    assert (first.created, first.embedded, first.price_changes) == (3, 3, 3)
+
+    embedder.texts.clear()
+    second = ingestor.ingest([
+        make_item("A", "10", "Alpha", "2025-01-02T00:00:00"),
+        make_item("B", "15", "Beta", "2025-01-02T00:00:00"),
+        make_item("C", "30", "Gamma  v2", "2025-01-02T00:00:00"),
+        make_item("D", "40", "Delta", "2025-01-02T00:00:00"),
+    ])
+
+    assert (second.created, second.updated, second.unchanged) == (1, 2, 1)
+    assert embedder.texts == ["Gamma  v2", "Delta"]
+    assert second.price_changes == 2
+    assert not second.failed
+
+    unchanged = repository.read_item(item_id("Store", "A"))
+    assert unchanged["date_time"] == "2025-01-02T00:00:00"
+    repriced = repository.read_item(item_id("Store", "B"))
+    assert repriced["price_minor"] == 1500
+    # The price-only change kept the embedding of "Beta"
+    assert repriced["embedding"][1] / repriced["embedding"][0] == pytest.approx(4.0)
+    records = list(history.iter_items(["item_id", "price_minor", "previous_price_minor"]))
+    assert {"item_id": item_id("Store", "B"), "price_minor": 1500, "previous_price_minor": 2000} in records
+
+
+def test_whitespace_changes_do_not_reembed():
+    """Test that descriptions differing only in whitespace are not embedded again."""
+    repository = LocalVectorRepository()
+    embedder = CountingEmbedder()
+    ingestor = ItemIngestor(repository, embedder)
+    ingestor.ingest([make_item("A", "10", "Alpha  Beta")])
+    embedder.texts.clear()
+
+    result = ingestor.ingest([make_item("A", "10", " Alpha Beta ")])
+
+    assert result.unchanged == 1
+    assert not embedder.texts
+
+
+def test_duplicate_items_are_ingested_once():
+    """Test that an item repeated on a page is written once."""
+    repository = LocalVectorRepository()
+    result = ItemIngestor(repository, CountingEmbedder()).ingest([make_item("A", "10", "Alpha")] * 2)
+
+    assert result.created == 1
+    assert len(repository) == 1
@@ -0,0 +1,109 @@
+"""
+Unit tests for the IVF-PQ index in database/ivf_index.py and its use by LocalVectorRepository.
+"""
+import numpy as np
+import pytest
+
+from database.ivf_index import IvfPqIndex, IvfPqParameters, recall_at_k
+from database.local_repository import LocalVectorRepository, top_k
+
+
+def clustered_vectors(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """Return unit vectors drawn around a few random cluster centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((20, dimensions)).astype(np.float32)
+    vectors = centres[rng.integers(0, 20, count)] + 0.5 * rng.standard_normal((count, dimensions))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    """Fixture returning clustered unit vectors."""
+    return clustered_vectors(2000, 32)
+
+
+@pytest.fixture
+def index(vectors):
+    """Fixture returning an index trained on and filled with the vectors."""
+    index = IvfPqIndex(32, IvfPqParameters(n_lists=16, n_probe=4, quantization_bytes=8))
+    index.train(vectors)
+    index.add(np.arange(len(vectors)), vectors)
+    return index
+
+
+def test_recall_at_k():
+    """Test recall@k averaged over queries."""
+    assert recall_at_k([[1, 2], [3, 4]], [[2, 1], [3, 5]]) == pytest.approx(0.75)
+
+
+def test_search_recall_against_exact(index, vectors):
+    """Test that re-ranked approximate candidates recover most exact neighbours."""
+    queries = vectors[:50]
+    exact = [top_k(vectors @ query, 10) for query in queries]
+    approximate = []
+    for query in queries:
+        candidates = index.search(query, 100)
+        approximate.append(candidates[top_k(vectors[candidates] @ query, 10)])
+
+    assert recall_at_k(exact, approximate) >= 0.9
+
+
+def test_more_probes_do_not_lower_recall(index, vectors):
+    """Test that scanning all lists finds at least as many neighbours as scanning one."""
+    queries = vectors[:50]
+    exact = [top_k(vectors @ query, 10) for query in queries]
+    one = [index.search(query, 10, n_probe=1) for query in queries]
+    every = [index.search(query, 10, n_probe=16) for query in queries]
+
+    assert recall_at_k(exact, every) >= recall_at_k(exact, one)
+
+
+def test_remove_and_relabel(index, vectors):
+    """Test that removed labels disappear and relabelled vectors are returned under their new label."""
+    index.remove(0)
+    index.relabel(1, 5000)
+
+    labels = index.search(vectors[1], 20, n_probe=16)
+
+    assert 0 not in labels and 1 not in labels
+    assert labels[0] == 5000
+    assert len(index) == len(vectors) - 1
+
+
+def test_save_and_load(index, vectors, tmp_path):
+    """Test that a loaded index returns the same results and takes new search parameters."""
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = IvfPqIndex.load(path, IvfPqParameters(n_probe=2, quantization_bytes=64))
+
+    assert loaded.parameters.n_probe == 2
+    assert loaded.subspaces == 8
+    assert np.array_equal(loaded.search(vectors[3], 10), index.search(vectors[3], 10, n_probe=2))
+
+
+def test_subspaces_divide_dimensions():
+    """Test that the code size is reduced to a divisor of the dimensions."""
+    assert IvfPqIndex(30, IvfPqParameters(quantization_bytes=8)).subspaces == 6
+
+
+def test_repository_uses_index_once_large_enough(vectors, tmp_path):
+    """Test that the repository trains the index at min_train_size and keeps it in sync with writes."""
+    parameters = IvfPqParameters(n_lists=16, n_probe=16, quantization_bytes=8, min_train_size=1000)
+    repository = LocalVectorRepository(path=str(tmp_path), index_parameters=parameters)
+    repository.create_items([{"id": f"item_{i}", "embedding": vector} for i, vector in enumerate(vectors[:999])])
+    repository.query_by_embedding(vectors[0])
+    assert not repository._index.trained
+
+    repository.create_items([{"id": f"item_{i}", "embedding": vectors[i]} for i in range(999, len(vectors))])
+    assert repository.query_by_embedding(vectors[0], 1)[0]["id"] == "item_0"
+    assert repository._index.trained and len(repository._index) == len(vectors)
+
+    repository.delete_item("item_0")
+    repository.create_item({"id": "new", "embedding": vectors[0]})
+    assert repository.query_by_embedding(vectors[0], 1)[0]["id"] == "new"
+
+    repository.save()
+    loaded = LocalVectorRepository(path=str(tmp_path), index_parameters=parameters)
+    assert loaded._index is not None and len(loaded._index) == len(vectors)
+    assert loaded.query_by_embedding(vectors[5], 1)[0]["id"] == "item_5"
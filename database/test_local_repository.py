@@ -0,0 +1,250 @@
+"""
+Unit tests for LocalVectorRepository in database/local_repository.py.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from database.local_repository import LocalVectorRepository, top_k
+from database.search_filter_model import SearchFilter
+from embedding.vector import EmbeddingFormat
+
+
+def make_item(index: int, embedding) -> dict:
+    """Return an item dictionary with the given embedding."""
+    return {
+        "id": f"item_{index}",
+        "price": str(index),
+        "description": f"Item {index}",
+        "item_code": f"code_{index}",
+        "store_name": "Store",
+        "date_time": "2025-01-01T00:00:00",
+        "embedding": np.asarray(embedding, dtype=np.float32),
+    }
+
+
+def test_top_k_returns_largest_first():
+    """Test that top_k selects the largest scores in decreasing order."""
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3], dtype=np.float32)
+
+    assert top_k(scores, 3).tolist() == [1, 3, 2]
+    assert top_k(scores, 10).tolist() == [1, 3, 2, 4, 0]
+
+
+def test_query_matches_exact_cosine_ranking():
+    """Test that query results match a brute-force cosine ranking."""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    repository = LocalVectorRepository()
+    repository.create_items([make_item(i, vector) for i, vector in enumerate(vectors)])
+    query = rng.standard_normal(16).astype(np.float32)
+
+    results = repository.query_by_embedding(query, max_results=5)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:5]
+    assert [r["id"] for r in results] == [f"item_{i}" for i in expected]
+    assert set(results[0]) == {"id", "price", "price_minor", "currency", "description", "item_code", "store_name",
+                               "date_time", "similarity_score"}
+    assert results[0]["similarity_score"] >= results[-1]["similarity_score"]
+
+
+def test_create_items_reports_duplicates():
+    """Test that creating an existing item fails for that item only."""
+    repository = LocalVectorRepository()
+    repository.create_item(make_item(1, [1, 0]))
+    result = repository.create_items([make_item(0, [0, 1]), make_item(1, [1, 0])])
+
+    assert result.succeeded == 1
+    assert [r.id for r in result.failed] == ["item_1"]
+
+
+def test_upsert_and_delete_update_the_index():
+    """Test that upserts replace embeddings and deletes remove items from search results."""
+    repository = LocalVectorRepository()
+    repository.create_items([make_item(0, [1, 0]), make_item(1, [0, 1]), make_item(2, [1, 1])])
+    repository.upsert_items([make_item(1, [-1, 0])])
+    repository.delete_item("item_0")
+
+    results = repository.query_by_embedding(np.array([1, 0], dtype=np.float32), max_results=10)
+
+    assert [r["id"] for r in results] == ["item_2", "item_1"]
+    assert len(repository) == 2
+    with pytest.raises(KeyError):
+        repository.read_item("item_0")
+
+
+def test_items_without_embedding_are_stored_but_not_searched():
+    """Test that items with an empty embedding can be read but are not returned by queries."""
+    repository = LocalVectorRepository()
+    repository.create_items([make_item(0, []), make_item(1, [1, 0])])
+
+    results = repository.query_by_embedding(np.array([1, 0], dtype=np.float32))
+
+    assert [r["id"] for r in results] == ["item_1"]
+    assert "embedding" not in repository.read_item("item_0")
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """Test that a saved store is memory-mapped on load and stays writable."""
+    repository = LocalVectorRepository(path=str(tmp_path))
+    repository.create_items([make_item(0, [1, 0]), make_item(1, [0, 1])])
+    repository.close()
+
+    loaded = LocalVectorRepository(path=str(tmp_path))
+    assert isinstance(loaded._matrix, np.memmap)
+    assert loaded.read_item("item_1")["description"] == "Item 1"
+    loaded.create_item(make_item(2, [1, 1]))
+    loaded.delete_item("item_0")
+
+    results = loaded.query_by_embedding(np.array([1, 0], dtype=np.float32))
+    assert [r["id"] for r in results] == ["item_2", "item_1"]
+
+
+def test_int8_store_ranks_like_float32(tmp_path):
+    """Test that an int8 quantized store keeps the ranking of the float32 store and persists its norms."""
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((100, 32)).astype(np.float32)
+    items = [make_item(i, vector) for i, vector in enumerate(vectors)]
+    exact = LocalVectorRepository()
+    exact.create_items(items)
+    quantized = LocalVectorRepository(path=str(tmp_path), embedding_format=EmbeddingFormat(quantization="int8"))
+    quantized.create_items(items)
+    quantized.save()
+    reloaded = LocalVectorRepository(path=str(tmp_path), embedding_format=EmbeddingFormat(quantization="int8"))
+
+    query = rng.standard_normal(32).astype(np.float32)
+    expected = [r["id"] for r in exact.query_by_embedding(query, max_results=3)]
+    assert [r["id"] for r in reloaded.query_by_embedding(query, max_results=3)] == expected
+    assert reloaded._matrix.dtype == np.int8
+
+
+def test_truncates_to_configured_dimensions():
+    """Test that embeddings and queries are shortened to the configured dimensions."""
+    repository = LocalVectorRepository(embedding_format=EmbeddingFormat(dimensions=2))
+    repository.create_item(make_item(0, [1, 0, 5]))
+
+    assert repository.dimensions == 2
+    assert repository.query_by_embedding(np.array([1, 0, -5], dtype=np.float32))[0]["similarity_score"] == \
+        pytest.approx(1.0)
+
+
+def test_vectors_returns_ids_and_stored_embeddings():
+    """Test that vectors returns the IDs and embeddings of the stored items in matching order."""
+    repository = LocalVectorRepository()
+    assert repository.vectors()[1].shape == (0, 0)
+    repository.create_items([make_item(0, [1, 0]), make_item(1, [0, 1]), make_item(2, [0.6, 0.8])])
+    repository.delete_item("item_0")
+
+    ids, matrix = repository.vectors()
+
+    assert matrix.dtype == np.float32
+    assert {item_id: row.tolist() for item_id, row in zip(ids, matrix)} == {"item_1": [0, 1], "item_2": pytest.approx([0.6, 0.8])}
+
+
+def filter_items() -> list[dict]:
+    """Return items of two stores with different dates, prices and descriptions."""
+    items = []
+    for index, (store, day, price, description) in enumerate([
+        ("Links", "2025-01-01", 10000, "AMD Ryzen 7 processor"),
+        ("Links", "2025-01-08", 20000, "Intel Core i7 processor"),
+        ("Protis", "2025-01-08", 30000, "AMD Radeon graphics card"),
+        ("Protis", "2025-01-09", None, "Kingston memory module"),
+    ]):
+        item = make_item(index, [1, index / 10])
+        item.update(store_name=store, date_time=f"{day}T12:00:00", price_minor=price, description=description)
+        items.append(item)
+    return items
+
+
+def test_query_applies_filters_before_ranking():
+    """Test that store, time and price restrictions exclude items before the top results are selected."""
+    repository = LocalVectorRepository()
+    repository.create_items(filter_items())
+    query = np.array([1, 0], dtype=np.float32)
+
+    def ids(**filters) -> list[str]:
+        return [r["id"] for r in repository.query_by_embedding(query, 10, SearchFilter(**filters))]
+
+    assert ids(store_names=["Protis"]) == ["item_2", "item_3"]
+    assert ids(since=datetime(2025, 1, 5)) == ["item_1", "item_2", "item_3"]
+    assert ids(until=datetime(2025, 1, 8, 23)) == ["item_0", "item_1", "item_2"]
+    assert ids(min_price=150, max_price=300) == ["item_1", "item_2"]
+    assert ids(store_names=["Links"], min_price=150) == ["item_1"]
+    assert ids(store_names=["Other"]) == []
+
+
+def test_filter_times_with_timezone_compare_with_stored_times():
+    """Test that since and until given with a timezone are converted to naive local time before filtering."""
+    since = datetime(2025, 1, 5, tzinfo=timezone.utc)
+    search_filter = SearchFilter.model_validate({"since": "2025-01-05T00:00:00Z", "max_age_days": 30})
+
+    assert search_filter.since == since.astimezone().replace(tzinfo=None)
+    assert search_filter.earliest(datetime(2025, 1, 10)) == search_filter.since.isoformat()
+    assert "+" not in SearchFilter(until=since).latest()
+
+    repository = LocalVectorRepository()
+    repository.create_items(filter_items())
+    results = repository.query_by_embedding(np.array([1, 0], dtype=np.float32), 10, SearchFilter(since=since))
+    assert [r["id"] for r in results] == ["item_1", "item_2", "item_3"]
+
+
+def test_query_fuses_keywords_with_vector_rank():
+    """Test that keyword matches are ranked above closer vectors that do not match."""
+    repository = LocalVectorRepository()
+    repository.create_items(filter_items())
+    query = np.array([1, 0], dtype=np.float32)
+
+    results = repository.query_by_embedding(query, 2, SearchFilter(keywords="AMD"))
+
+    assert {r["id"] for r in results} == {"item_0", "item_2"}
+    results = repository.query_by_embedding(query, 1, SearchFilter(keywords="Kingston memory"))
+    assert results[0]["id"] == "item_3"
+
+
+def test_query_by_price_orders_and_filters():
+    """Test that price queries use the price order, skip unpriced items and apply filters."""
+    repository = LocalVectorRepository()
+    repository.create_items(filter_items())
+
+    def ids(descending: bool = False, **filters) -> list[str]:
+        return [r["id"] for r in repository.query_by_price(10, SearchFilter(**filters), descending)]
+
+    assert ids() == ["item_0", "item_1", "item_2"]
+    assert ids(descending=True) == ["item_2", "item_1", "item_0"]
+    assert ids(max_price=250) == ["item_0", "item_1"]
+    assert ids(keywords="processor", descending=True) == ["item_1", "item_0"]
+    assert "similarity_score" not in repository.query_by_price(1)[0]
+
+
+def test_patch_items_updates_fields_and_price_order():
+    """Test that patches change fields of existing items and fail for unknown items."""
+    repository = LocalVectorRepository()
+    repository.create_items(filter_items())
+
+    result = repository.patch_items([{"id": "item_3", "price_minor": 1}, {"id": "missing", "price_minor": 1}])
+
+    assert [r.success for r in result.results] == [True, False]
+    assert repository.query_by_price(1)[0]["id"] == "item_3"
+    assert repository.read_item("item_3")["description"] == "Kingston memory module"
+
+
+def test_query_pages_resume_with_continuation_token():
+    """Test that paged queries return the ranking of query_by_embedding in pages and resume from a token."""
+    rng = np.random.default_rng(2)
+    repository = LocalVectorRepository()
+    repository.create_items([make_item(i, vector) for i, vector in enumerate(rng.standard_normal((30, 8)))])
+    query = rng.standard_normal(8).astype(np.float32)
+    expected = [item["id"] for item in repository.query_by_embedding(query, 25)]
+
+    pages = list(repository.query_pages_by_embedding(query, 25, page_size=10))
+    assert [len(page.items) for page in pages] == [10, 10, 5]
+    assert [item["id"] for page in pages for item in page.items] == expected
+    assert pages[-1].continuation_token is None
+
+    resumed = next(repository.query_pages_by_embedding(query, 25, page_size=10,
+                                                       continuation_token=pages[0].continuation_token))
+    assert [item["id"] for item in resumed.items] == expected[10:20]
+    with pytest.raises(ValueError):
+        next(repository.query_pages_by_embedding(query, 25, continuation_token="not a token"))
@@ -0,0 +1,71 @@
+"""
+Unit tests for price parsing in database/price_parser.py and the backfill in database/price_backfill.py.
+"""
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from database.local_repository import LocalVectorRepository
+from database.price_backfill import backfill_prices
+from database.price_parser import ParsedPrice, parse_price, parse_prices, to_minor_units
+
+
+@pytest.mark.parametrize("text, minor, currency", [
+    ("249,99 €", 24999, "EUR"),
+    ("1.249,99 kn", 124999, "HRK"),
+    ("$1,249.99", 124999, "USD"),
+    ("2.499 EUR", 249900, "EUR"),
+    ("1 249,99 €", 124999, "EUR"),
+    ("1 249,99", 124999, "EUR"),
+    ("249,- €", 24900, "EUR"),
+    ("99.9", 9990, "EUR"),
+    ("Cijena: 1.299,00€ (PDV uključen)", 129900, "EUR"),
+    ("1.234.567", 123456700, "EUR"),
+    ("Akcija -10% 249,99 €", 24999, "EUR"),
+    ("2 x 49,99 €", 4999, "EUR"),
+    ("3 kom 1.299,00 kn", 129900, "HRK"),
+    ("Popust 15 % cijena 199,00", 19900, "EUR"),
+    ("Akcija 229,99 € (bilo 279,99 €)", 22999, "EUR"),
+])
+def test_parse_price(text, minor, currency):
+    """Test parsing of European and English formatted prices, next to their currency among discounts and quantities."""
+    assert parse_price(text) == ParsedPrice(minor=minor, currency=currency)
+
+
+def test_parse_price_without_amount():
+    """Test that texts without an amount are not parsed."""
+    assert parse_price("Na upit") is None
+    assert parse_price("") is None
+
+
+def test_parse_prices_keeps_order_and_default_currency():
+    """Test that a page of prices is parsed in input order with the default currency."""
+    prices = parse_prices(["10,00", "Na upit", "10,00", "5 $"], default_currency="HRK")
+
+    assert prices == [ParsedPrice(minor=1000, currency="HRK"), None, ParsedPrice(minor=1000, currency="HRK"),
+                      ParsedPrice(minor=500, currency="USD")]
+
+
+def test_minor_units_round_trip():
+    """Test conversion between major and minor units."""
+    assert to_minor_units(19.995) == 2000
+    assert to_minor_units("1500", "JPY") == 1500
+    assert ParsedPrice(minor=24999, currency="EUR").amount == Decimal("249.99")
+
+
+def test_backfill_prices_patches_missing_fields():
+    """Test that the backfill sets the normalized price of items without one and keeps their embeddings."""
+    repository = LocalVectorRepository()
+    repository.create_items([
+        {"id": "a", "price": "249,99 €", "embedding": np.array([1, 0], dtype=np.float32)},
+        {"id": "b", "price": "Na upit", "embedding": np.array([0, 1], dtype=np.float32)},
+        {"id": "c", "price": "5,00 €", "price_minor": 500, "currency": "EUR"},
+    ])
+
+    assert backfill_prices(repository, batch_size=1) == 1
+
+    item = repository.read_item("a")
+    assert (item["price_minor"], item["currency"]) == (24999, "EUR")
+    assert item["embedding"].tolist() == [1, 0]
+    assert repository.read_item("b").get("price_minor") is None
@@ -0,0 +1,91 @@
+"""
+Unit tests for the repository operation metrics in database/repository_metrics.py.
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from database.async_azure_repository import AsyncAzureRepository
+from database.azure_repository import AzureRepository
+from database.local_repository import LocalVectorRepository
+from database.repository_metrics import LATENCY_BUCKETS, REPOSITORY_METRICS, OperationStats
+from database.test_async_repository import FakeAsyncContainer
+from database.test_azure_repository import FakeContainer
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Fixture starting every test with an empty registry."""
+    REPOSITORY_METRICS.reset()
+    yield
+    REPOSITORY_METRICS.reset()
+
+
+def test_bulk_writes_record_request_units_and_failures():
+    """Test that bulk writes sum the request charges of all worker threads and count failed items by class."""
+    container = FakeContainer()
+    container.id = "items"
+    repository = AzureRepository.from_container(container)
+    repository.create_items([{"id": f"item_{i}"} for i in range(4)])
+    repository.create_items([{"id": "item_0"}, {"id": "item_9"}])
+
+    stats = REPOSITORY_METRICS.snapshot()[("cosmos:items", "create_items")]
+
+    assert stats.calls == 2
+    assert stats.items == 5
+    assert stats.request_units == pytest.approx(6 * 5.5)
+    assert stats.errors == {"http_409": 1}
+
+
+def test_failed_calls_and_iterators_are_recorded():
+    """Test that raised errors are counted by class and iterators are recorded with their item count."""
+    repository = LocalVectorRepository()
+    repository.create_items([{"id": "a", "embedding": np.array([1, 0], dtype=np.float32)},
+                             {"id": "b", "embedding": np.array([0, 1], dtype=np.float32)}])
+    with pytest.raises(ValueError):
+        repository.query_by_embedding(np.array([1, 0, 0], dtype=np.float32))
+    assert len(list(repository.iter_items(["id"]))) == 2
+    pages = list(repository.query_pages_by_embedding(np.array([1, 0], dtype=np.float32), 2, page_size=1))
+
+    snapshot = REPOSITORY_METRICS.snapshot()
+    assert snapshot[("local", "query_by_embedding")].errors == {"ValueError": 1}
+    assert snapshot[("local", "query_by_embedding")].calls == 2
+    assert snapshot[("local", "iter_items")].items == 2
+    assert len(pages) == 2
+
+
+def test_async_operations_are_recorded():
+    """Test that coroutine and async generator operations are recorded."""
+    container = FakeAsyncContainer()
+    repository = AsyncAzureRepository(container)
+
+    async def run():
+        await repository.upsert_items([{"id": f"item_{i}", "price": "1"} for i in range(3)])
+        return [page async for page in repository.query_pages_by_embedding(np.array([1.0]), 3, page_size=2)]
+
+    asyncio.run(run())
+    snapshot = REPOSITORY_METRICS.snapshot()
+
+    assert snapshot[("cosmos_async:container", "upsert_items")].items == 3
+    assert snapshot[("cosmos_async:container", "query_pages_by_embedding")].items == 3
+
+
+def test_render_prometheus_and_quantiles():
+    """Test the Prometheus text format and the bucket quantile estimate."""
+    REPOSITORY_METRICS.record("cosmos:items", "read_items", 0.003, request_units=2.5, items=4)
+    REPOSITORY_METRICS.record("cosmos:items", "read_items", 0.2, errors={"http_429": 1})
+
+    text = REPOSITORY_METRICS.render_prometheus()
+
+    assert '# TYPE repository_operation_duration_seconds histogram' in text
+    assert ('repository_operation_duration_seconds_bucket{repository="cosmos:items",operation="read_items",le="0.005"} 1'
+            in text)
+    assert 'repository_operation_duration_seconds_count{repository="cosmos:items",operation="read_items"} 2' in text
+    assert 'repository_request_units_total{repository="cosmos:items",operation="read_items"} 2.5' in text
+    assert ('repository_errors_total{repository="cosmos:items",operation="read_items",error_class="http_429"} 1'
+            in text)
+    stats = REPOSITORY_METRICS.snapshot()[("cosmos:items", "read_items")]
+    assert stats.quantile(0.5) == 0.005
+    assert stats.quantile(0.95) == 0.25
+    assert OperationStats().bucket_counts == [0] * (len(LATENCY_BUCKETS) + 1)
@@ -0,0 +1,79 @@
+"""
+Unit tests for the retention sweep in database/retention.py.
+"""
+from datetime import datetime
+
+import numpy as np
+
+from database.local_repository import LocalVectorRepository
+from database.price_history_model import DailyPriceSummary, PriceHistoryRecord
+from database.retention import apply_retention, compact_price_history
+from database.retention_model import RetentionPolicy
+
+NOW = datetime(2025, 3, 10, 12, 0, 0)
+
+
+def make_record(item_id: str, price_minor: int, date_time: str) -> dict:
+    """Return a price history record of the test store."""
+    return PriceHistoryRecord(item_id=item_id, store_name="Store", item_code=item_id, price=str(price_minor / 100),
+                              price_minor=price_minor, currency="EUR", date_time=date_time).to_dict()
+
+
+def test_apply_retention_expires_stale_items():
+    """Test that items not extracted within max_age_days are deleted and the shrinkage is reported."""
+    repository = LocalVectorRepository()
+    repository.create_items([
+        {"id": f"item_{day}", "date_time": f"2025-03-{day:02d}T08:00:00",
+         "embedding": np.array([1.0, day], dtype=np.float32)}
+        for day in range(1, 11)
+    ])
+
+    report = apply_retention(repository, None, RetentionPolicy(max_age_days=7), now=NOW)
+
+    assert (report.items_before, report.items_expired, report.items_after) == (10, 3, 7)
+    assert report.shrinkage == 0.3
+    assert len(repository) == 7
+    assert {item["id"] for item in repository.iter_items(["id"])} == {f"item_{day}" for day in range(4, 11)}
+
+
+def test_compaction_summarizes_complete_old_days():
+    """Test that observations older than compact_after_days become one summary per item and day."""
+    history = LocalVectorRepository()
+    history.create_items([
+        make_record("a", 1000, "2025-03-01T08:00:00"),
+        make_record("a", 900, "2025-03-01T12:00:00"),
+        make_record("a", 950, "2025-03-01T18:00:00"),
+        make_record("b", 500, "2025-03-01T09:00:00"),
+        make_record("a", 800, "2025-03-09T08:00:00"),
+    ])
+
+    report = compact_price_history(history, RetentionPolicy(compact_after_days=2, summary_max_age_days=30), now=NOW)
+
+    assert (report.observations_compacted, report.summaries_written) == (4, 2)
+    summary = history.read_item(DailyPriceSummary(item_id="a", store_name="", item_code="", day="2025-03-01",
+                                                  price="", first_date_time="", last_date_time="").id)
+    assert (summary["open_price_minor"], summary["close_price_minor"]) == (1000, 950)
+    assert (summary["min_price_minor"], summary["max_price_minor"], summary["observations"]) == (900, 1000, 3)
+    # The time to live counts from the summarized day
+    assert summary["ttl"] == 30 * 86400 - int((NOW - datetime(2025, 3, 1)).total_seconds())
+    remaining = [record for record in history.iter_items(["date_time", "day"]) if not record["day"]]
+    assert [record["date_time"] for record in remaining] == ["2025-03-09T08:00:00"]
+
+
+def test_compaction_merges_late_observations_and_expires_summaries():
+    """Test that a later compaction of the same day updates its summary and old summaries are deleted."""
+    history = LocalVectorRepository()
+    policy = RetentionPolicy(compact_after_days=2, summary_max_age_days=30)
+    history.create_items([make_record("a", 1000, "2025-03-01T08:00:00")])
+    compact_price_history(history, policy, now=NOW)
+    history.create_items([make_record("a", 1200, "2025-03-01T20:00:00")])
+
+    compact_price_history(history, policy, now=NOW)
+
+    summaries = [record for record in history.iter_items(["day", "observations", "close_price_minor",
+                                                          "max_price_minor"]) if record["day"]]
+    assert summaries == [{"day": "2025-03-01", "observations": 2, "close_price_minor": 1200, "max_price_minor": 1200}]
+
+    report = compact_price_history(history, policy, now=datetime(2025, 5, 1))
+    assert report.summaries_expired == 1
+    assert len(history) == 0
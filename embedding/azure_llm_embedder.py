@@ -1,10 +1,83 @@
+import asyncio
 import logging
-from openai import AzureOpenAI
+import weakref
+from typing import Optional
+
+from openai import AsyncAzureOpenAI, AzureOpenAI
 from embedding.embedder import Embedder
+from embedding.vector import Vector, empty_vector, to_vector, truncate_dimensions
 from azure.core.credentials import AzureKeyCredential
 
 logger = logging.getLogger(__name__)
 
+# Azure OpenAI embedding request limits
+MAX_BATCH_SIZE = 2048
+MAX_BATCH_TOKENS = 300_000
+MAX_INPUT_TOKENS = 8191
+# Rough token estimate used for chunking, avoids a tokenizer dependency
+CHARS_PER_TOKEN = 4
+# Default number of concurrent requests made by the async client
+MAX_CONCURRENCY = 8
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in the given text.
+
+    Args:
+        text (str): The text to estimate.
+
+    Returns:
+        int: Approximate token count.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_texts(texts: list[str],
+                max_batch_size: int = MAX_BATCH_SIZE,
+                max_batch_tokens: int = MAX_BATCH_TOKENS) -> list[list[int]]:
+    """
+    Split texts into chunks of indices that respect the per-request input count and token limits.
+
+    Args:
+        texts (list[str]): The texts to split.
+        max_batch_size (int, optional): Maximum number of inputs per chunk. Defaults to MAX_BATCH_SIZE.
+        max_batch_tokens (int, optional): Maximum estimated tokens per chunk. Defaults to MAX_BATCH_TOKENS.
+
+    Returns:
+        list[list[int]]: Chunks of indices into texts, in input order.
+    """
+    chunks: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = min(estimate_tokens(text), MAX_INPUT_TOKENS)
+        if current and (len(current) >= max_batch_size or current_tokens + tokens > max_batch_tokens):
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class _LoopState:
+    """
+    Async client, concurrency semaphore and in-flight texts of one event loop.
+
+    Futures, semaphores and the connections of the async client belong to the loop they were created on, so every
+    loop using the embedder gets its own.
+    """
+
+    def __init__(self, client: AsyncAzureOpenAI, max_concurrency: int):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Texts currently being embedded on the loop, shared by concurrent callers
+        self.in_flight: dict[str, asyncio.Future] = {}
+
+
 class AzureLlmEmbedder(Embedder):
     """
     Class for embedding text using a Large Language Model (LLM).
@@ -12,23 +85,64 @@ class AzureLlmEmbedder(Embedder):
     client: AzureOpenAI
     model: str
 
-    def __init__(self, endpoint: str, api_version: str, deployment: str, model: str, api_key: str):
+    def __init__(self, endpoint: str, api_version: str, deployment: str, model: str, api_key: str,
+                 max_batch_size: int = MAX_BATCH_SIZE, max_batch_tokens: int = MAX_BATCH_TOKENS,
+                 max_concurrency: int = MAX_CONCURRENCY, dimensions: Optional[int] = None):
         """
         Initialize the LLM embedder with a chat model.
 
         Args:
             model (BaseChatModel): The chat model to use for embedding.
+            max_batch_size (int, optional): Maximum number of inputs per embedding request.
+            max_batch_tokens (int, optional): Maximum estimated tokens per embedding request.
+            max_concurrency (int, optional): Maximum number of concurrent requests made by the async methods on one
+                event loop.
+            dimensions (int | None, optional): Number of embedding dimensions to request from the model. None keeps
+                the model default.
         """
 
         self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.dimensions = dimensions
         self.client = AzureOpenAI(
             azure_deployment=deployment,
             api_version=api_version,
             azure_endpoint=endpoint,
             api_key=api_key
         )
+        self._async_client_arguments = {
+            "azure_deployment": deployment,
+            "api_version": api_version,
+            "azure_endpoint": endpoint,
+            "api_key": api_key
+        }
+        self._loop_states: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState] = \
+            weakref.WeakKeyDictionary()
+
+    @property
+    def async_client(self) -> AsyncAzureOpenAI:
+        """
+        Async client of the running event loop used by aembed and aembed_batch, created on first use.
+
+        Returns:
+            AsyncAzureOpenAI: The async embeddings client.
+        """
+        return self._loop_state().client
 
-    def embed(self, text: str) -> list[float]:
+    def _loop_state(self) -> _LoopState:
+        """
+        Return the async state of the running event loop, created on first use.
+        """
+        loop = asyncio.get_running_loop()
+        state = self._loop_states.get(loop)
+        if state is None:
+            state = _LoopState(AsyncAzureOpenAI(**self._async_client_arguments), self.max_concurrency)
+            self._loop_states[loop] = state
+        return state
+
+    def embed(self, text: str) -> Vector:
         """
         Embed the given text using the LLM.
 
@@ -36,11 +150,168 @@ class AzureLlmEmbedder(Embedder):
             text (str): The text to embed.
 
         Returns:
-            list[float]: The embedding vector.
+            Vector: The embedding vector as a float32 array.
         """
         response = self.client.embeddings.create(
             input=[text],
-            model=self.model
+            model=self.model,
+            **self._request_options()
         )
         logger.debug("Embedding response: %s", response)
-        return response.data[0].embedding if response.data else []
\ No newline at end of file
+        return self._to_vector(response.data[0].embedding) if response.data else empty_vector()
+
+    def embed_batch(self, texts: list[str]) -> list[Vector]:
+        """
+        Embed a list of texts using as few requests as the API limits allow.
+
+        Texts are chunked by input count and estimated token count. Empty texts are not sent and get an empty
+        vector. If a whole chunk fails, its texts are retried one by one so a single bad input only loses its
+        own embedding.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[Vector]: One embedding vector per input text, in input order.
+        """
+        embeddings: list[Vector] = [empty_vector() for _ in texts]
+        indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        inputs = [texts[i][:MAX_INPUT_TOKENS * CHARS_PER_TOKEN] for i in indices]
+        for chunk in chunk_texts(inputs, self.max_batch_size, self.max_batch_tokens):
+            chunk_inputs = [inputs[i] for i in chunk]
+            try:
+                response = self.client.embeddings.create(
+                    input=chunk_inputs,
+                    model=self.model,
+                    **self._request_options()
+                )
+                # The API tags each result with the index of its input, do not rely on response order
+                for data in response.data:
+                    embeddings[indices[chunk[data.index]]] = self._to_vector(data.embedding)
+            except Exception as e:
+                logger.error("Error embedding batch of %d texts, retrying one by one: %s", len(chunk), e)
+                for i in chunk:
+                    try:
+                        embeddings[indices[i]] = self.embed(inputs[i])
+                    except Exception as item_error:
+                        logger.error("Error embedding text of length %d: %s", len(inputs[i]), item_error)
+        logger.info("Embedded %d of %d texts", sum(1 for e in embeddings if len(e) > 0), len(texts))
+        return embeddings
+
+    async def aembed(self, text: str) -> Vector:
+        """
+        Asynchronously embed the given text using the LLM.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            Vector: The embedding vector as a float32 array.
+        """
+        return (await self.aembed_batch([text]))[0]
+
+    async def aembed_batch(self, texts: list[str]) -> list[Vector]:
+        """
+        Asynchronously embed a list of texts with bounded concurrency and request coalescing.
+
+        Texts already being embedded by another caller are not sent again, the caller waits for the in-flight
+        result instead, and gets its error if the request fails. The remaining texts are chunked like in embed_batch
+        and the chunks are sent concurrently, limited by max_concurrency across all callers of the event loop.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[Vector]: One embedding vector per input text, in input order.
+        """
+        loop = asyncio.get_running_loop()
+        in_flight = self._loop_state().in_flight
+        pending: dict[str, asyncio.Future] = {}
+        owned: dict[str, asyncio.Future] = {}
+        for text in texts:
+            if not text or not text.strip() or text in pending:
+                continue
+            if text in in_flight:
+                pending[text] = in_flight[text]
+            else:
+                future = loop.create_future()
+                in_flight[text] = future
+                pending[text] = owned[text] = future
+        if owned:
+            error: Optional[BaseException] = None
+            try:
+                owned_texts = list(owned)
+                vectors = await self._aembed_chunks(owned_texts)
+                for text, vector in zip(owned_texts, vectors):
+                    owned[text].set_result(vector)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                for text, future in owned.items():
+                    if not future.done():
+                        # Waiting callers get the error of the request, or learn that its owner was cancelled
+                        future.set_exception(error if isinstance(error, Exception)
+                                             else RuntimeError("Embedding request was cancelled"))
+                        # Mark the exception as retrieved when no other caller is waiting for it
+                        future.exception()
+                    in_flight.pop(text, None)
+        results = []
+        for text in texts:
+            future = pending.get(text)
+            # Shield the shared future so a cancelled caller does not cancel it for the others
+            results.append(await asyncio.shield(future) if future is not None else empty_vector())
+        return results
+
+    async def _aembed_chunks(self, texts: list[str]) -> list[Vector]:
+        """
+        Embed non-empty texts by sending their chunks concurrently.
+        """
+        embeddings: list[Vector] = [empty_vector() for _ in texts]
+        inputs = [text[:MAX_INPUT_TOKENS * CHARS_PER_TOKEN] for text in texts]
+
+        async def embed_chunk(chunk: list[int]) -> None:
+            try:
+                response = await self._acreate([inputs[i] for i in chunk])
+                for data in response.data:
+                    embeddings[chunk[data.index]] = self._to_vector(data.embedding)
+            except Exception as e:
+                logger.error("Error embedding batch of %d texts, retrying one by one: %s", len(chunk), e)
+                for i in chunk:
+                    try:
+                        response = await self._acreate([inputs[i]])
+                        embeddings[i] = self._to_vector(response.data[0].embedding) if response.data else empty_vector()
+                    except Exception as item_error:
+                        logger.error("Error embedding text of length %d: %s", len(inputs[i]), item_error)
+
+        await asyncio.gather(*(embed_chunk(chunk)
+                               for chunk in chunk_texts(inputs, self.max_batch_size, self.max_batch_tokens)))
+        return embeddings
+
+    async def _acreate(self, inputs: list[str]):
+        """
+        Send one embedding request with the async client of the running loop, limited by its concurrency semaphore.
+        """
+        state = self._loop_state()
+        async with state.semaphore:
+            response = await state.client.embeddings.create(input=inputs, model=self.model,
+                                                            **self._request_options())
+        logger.debug("Async embedding response: %s", response)
+        return response
+
+    def _request_options(self) -> dict:
+        """
+        Options added to every embeddings request.
+
+        Vectors are requested as base64 encoded float32 so they can be decoded straight into arrays.
+        """
+        options: dict = {"encoding_format": "base64"}
+        if self.dimensions is not None:
+            options["dimensions"] = self.dimensions
+        return options
+
+    def _to_vector(self, embedding) -> Vector:
+        """
+        Decode an embedding returned by the API and shorten it to the requested dimensions.
+        """
+        return truncate_dimensions(to_vector(embedding), self.dimensions)
@@ -0,0 +1,305 @@
+"""
+Caching wrapper for any Embedder.
+
+Embeddings are keyed by the embedding model name and a hash of the normalized text. Lookups go through an
+in-process LRU tier first and then through an on-disk SQLite tier that stores vectors as float32 blobs. Both tiers
+are bounded by entry count and evict the least recently used entries.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from embedding.embedder import Embedder
+from embedding.vector import Vector, empty_vector
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of parameters in a single SQLite IN (...) lookup
+SQLITE_LOOKUP_CHUNK = 500
+
+
+class EmbeddingCacheStats(BaseModel):
+    """
+    Snapshot of embedding cache counters.
+
+    Fields:
+        memory_hits (int): Lookups served by the in-process tier.
+        disk_hits (int): Lookups served by the on-disk tier.
+        misses (int): Lookups that had to call the wrapped embedder.
+        memory_evictions (int): Entries evicted from the in-process tier.
+        disk_evictions (int): Entries evicted from the on-disk tier.
+        memory_entries (int): Current number of entries in the in-process tier.
+        disk_entries (int): Current number of entries in the on-disk tier.
+    """
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+    memory_entries: int = 0
+    disk_entries: int = 0
+
+    @property
+    def hits(self) -> int:
+        """Total number of cache hits across both tiers."""
+        return self.memory_hits + self.disk_hits
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text before hashing so that insignificant differences map to the same cache entry.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: Unicode NFC normalized text with collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbedder(Embedder):
+    """
+    Embedder that caches the results of a wrapped embedder in memory and on disk.
+
+    Args:
+        embedder (Embedder): The embedder whose results are cached.
+        cache_path (str | None, optional): Path of the SQLite cache file. If None only the in-process tier is used.
+        max_memory_entries (int, optional): Maximum number of vectors kept in memory. Defaults to 10000.
+        max_disk_entries (int, optional): Maximum number of vectors kept on disk. Defaults to 500000.
+        model_name (str | None, optional): Model name used in cache keys. Defaults to the wrapped embedder model
+            and its requested dimensions.
+    """
+
+    def __init__(self,
+                 embedder: Embedder,
+                 cache_path: Optional[str] = None,
+                 max_memory_entries: int = 10_000,
+                 max_disk_entries: int = 500_000,
+                 model_name: Optional[str] = None):
+        self.embedder = embedder
+        default_model_name = getattr(embedder, "model", type(embedder).__name__)
+        dimensions = getattr(embedder, "dimensions", None)
+        # Shortened embeddings of the same model are different vectors and must not share entries
+        if dimensions:
+            default_model_name = f"{default_model_name}:{dimensions}"
+        self.model_name = model_name or default_model_name
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: OrderedDict[str, Vector] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = EmbeddingCacheStats()
+        self._connection: Optional[sqlite3.Connection] = None
+        if cache_path:
+            directory = os.path.dirname(cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(cache_path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+            self._connection.commit()
+            self._stats.disk_entries = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def cache_key(self, text: str) -> str:
+        """
+        Compute the cache key of the given text for the wrapped model.
+
+        Args:
+            text (str): The text to compute the key for.
+
+        Returns:
+            str: Hex digest of the model name and normalized text.
+        """
+        return hashlib.sha256(f"{self.model_name}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def embed(self, text: str) -> Vector:
+        """
+        Embed the given text, serving it from the cache when possible.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            Vector: The embedding vector as a float32 array.
+        """
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: list[str]) -> list[Vector]:
+        """
+        Embed a list of texts, sending only cache misses to the wrapped embedder in a single batch.
+
+        Identical texts within one batch are embedded once. Empty results are not cached.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[Vector]: One embedding vector per input text, in input order.
+        """
+        keys, found, missing = self._find(texts)
+        if missing:
+            self._add_computed(found, missing, self.embedder.embed_batch(list(missing.values())))
+        return [found[key] if key in found else empty_vector() for key in keys]
+
+    async def aembed_batch(self, texts: list[str]) -> list[Vector]:
+        """
+        Asynchronously embed a list of texts, sending only cache misses to the wrapped embedder.
+
+        With an on-disk tier the cache lookups and writes run in a worker thread, so SQLite never blocks the event
+        loop. Without one only the in-process tier is used and it is served on the loop.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[Vector]: One embedding vector per input text, in input order.
+        """
+        if self._connection is None:
+            keys, found, missing = self._find(texts)
+        else:
+            keys, found, missing = await asyncio.to_thread(self._find, texts)
+        if missing:
+            embedded = await self.embedder.aembed_batch(list(missing.values()))
+            if self._connection is None:
+                self._add_computed(found, missing, embedded)
+            else:
+                await asyncio.to_thread(self._add_computed, found, missing, embedded)
+        return [found[key] if key in found else empty_vector() for key in keys]
+
+    def stats(self) -> EmbeddingCacheStats:
+        """
+        Return a snapshot of the cache counters.
+
+        Returns:
+            EmbeddingCacheStats: Current hit, miss, eviction and size counters.
+        """
+        with self._lock:
+            self._stats.memory_entries = len(self._memory)
+            return self._stats.model_copy()
+
+    def clear(self) -> None:
+        """
+        Remove all entries from both cache tiers. Counters are kept.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM embeddings")
+                self._connection.commit()
+            self._stats.disk_entries = 0
+
+    def close(self) -> None:
+        """
+        Close the on-disk tier.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _find(self, texts: list[str]) -> tuple[list[str], dict[str, Vector], dict[str, str]]:
+        """
+        Compute the keys of the texts, look them up and collect the unique missing texts by key.
+        """
+        keys = [self.cache_key(text) for text in texts]
+        found = self._lookup(keys)
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        with self._lock:
+            self._stats.misses += len(missing)
+        return keys, found, missing
+
+    def _add_computed(self,
+                      found: dict[str, Vector],
+                      missing: dict[str, str],
+                      embedded: list[Vector]) -> None:
+        """
+        Store the vectors computed for the missing texts and add them to the found vectors.
+        """
+        computed = {key: vector for key, vector in zip(missing, embedded) if len(vector) > 0}
+        self._store(computed)
+        found.update(computed)
+
+    def _lookup(self, keys: list[str]) -> dict[str, Vector]:
+        """
+        Look up keys in the in-process tier and then in the on-disk tier, promoting disk hits to memory.
+        """
+        found: dict[str, Vector] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self._stats.memory_hits += 1
+            disk_keys = list({key for key in keys if key not in found})
+            if self._connection is None or not disk_keys:
+                return found
+            now = time.time()
+            key_counts = Counter(keys)
+            for start in range(0, len(disk_keys), SQLITE_LOOKUP_CHUNK):
+                chunk = disk_keys[start:start + SQLITE_LOOKUP_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).copy()
+                    self._remember(key, found[key])
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key, _ in rows])
+                self._stats.disk_hits += sum(key_counts[key] for key, _ in rows)
+            self._connection.commit()
+        return found
+
+    def _store(self, vectors: dict[str, Vector]) -> None:
+        """
+        Store newly computed vectors in both tiers and evict the least recently used disk entries if needed.
+        """
+        if not vectors:
+            return
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            if self._connection is None:
+                return
+            now = time.time()
+            cursor = self._connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_access) VALUES (?, ?, ?, ?)",
+                [(key, self.model_name, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                 for key, vector in vectors.items()]
+            )
+            self._stats.disk_entries += cursor.rowcount
+            overflow = self._stats.disk_entries - self.max_disk_entries
+            if overflow > 0:
+                self._connection.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)", (overflow,))
+                self._stats.disk_evictions += overflow
+                self._stats.disk_entries -= overflow
+                logger.debug("Evicted %d embeddings from the disk cache", overflow)
+            self._connection.commit()
+
+    def _remember(self, key: str, vector: Vector) -> None:
+        """
+        Put a vector in the in-process tier, evicting the least recently used entries. Caller holds the lock.
+        """
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats.memory_evictions += 1
@@ -1,4 +1,10 @@
 from abc import ABC, abstractmethod
+import asyncio
+import logging
+
+from embedding.vector import Vector, empty_vector
+
+logger = logging.getLogger(__name__)
 
 
 class Embedder(ABC):
@@ -7,7 +13,7 @@ class Embedder(ABC):
     """
 
     @abstractmethod
-    def embed(self, text: str) -> list[float]:
+    def embed(self, text: str) -> Vector:
         """
         Embed the given text using the specified model.
 
@@ -15,6 +21,62 @@ class Embedder(ABC):
             text (str): The text to embed.
 
         Returns:
-            list[float]: The embedding vector.
+            Vector: The embedding vector as a float32 array.
+        """
+        pass
+
+    def embed_batch(self, texts: list[str]) -> list[Vector]:
+        """
+        Embed a list of texts, preserving the input order.
+
+        The default implementation embeds texts one by one. Subclasses backed by an API that accepts multiple
+        inputs per request should override it to reduce the number of round trips.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[Vector]: One embedding vector per input text. Empty texts and texts that failed to embed
+            get an empty vector.
+        """
+        embeddings: list[Vector] = []
+        for text in texts:
+            if not text or not text.strip():
+                embeddings.append(empty_vector())
+                continue
+            try:
+                embeddings.append(self.embed(text))
+            except Exception as e:
+                logger.error("Error embedding text of length %d: %s", len(text), e)
+                embeddings.append(empty_vector())
+        return embeddings
+
+    async def aembed(self, text: str) -> Vector:
+        """
+        Asynchronously embed the given text.
+
+        The default implementation delegates to aembed_batch with a single text.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            Vector: The embedding vector as a float32 array.
+        """
+        return (await self.aembed_batch([text]))[0]
+
+    async def aembed_batch(self, texts: list[str]) -> list[Vector]:
+        """
+        Asynchronously embed a list of texts, preserving the input order.
+
+        The default implementation runs embed_batch in a worker thread. Subclasses with an async client should
+        override it.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[Vector]: One embedding vector per input text. Empty texts and texts that failed to embed
+            get an empty vector.
         """
-        pass
\ No newline at end of file
+        return await asyncio.to_thread(self.embed_batch, texts)
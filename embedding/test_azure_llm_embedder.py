@@ -1,6 +1,10 @@
 
+import asyncio
+import base64
 import pytest
 import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from dotenv import load_dotenv
 from embedding.azure_llm_embedder import AzureLlmEmbedder
 
@@ -36,7 +40,7 @@ def mock_azure_openai_for_embedding(monkeypatch):
             self.embeddings = self.MockEmbeddings()
         
         class MockEmbeddings:
-            def create(self, input, model):
+            def create(self, input, model, **kwargs):
                 return MockResponse()
     
     # Apply the mock
@@ -58,7 +62,7 @@ def mock_azure_openai_for_empty(monkeypatch):
             self.embeddings = self.MockEmbeddings()
         
         class MockEmbeddings:
-            def create(self, input, model):
+            def create(self, input, model, **kwargs):
                 return MockResponse()
     
     # Apply the mock
@@ -81,9 +85,10 @@ def test_embed_returns_embedding(mock_azure_openai_for_embedding, env_vars):
     result = embedder.embed(text)
     
     # Assert using the mock_embedding value returned from the fixture
-    assert result is not None and isinstance(result, list)
+    assert result is not None and isinstance(result, np.ndarray)
+    assert result.dtype == np.float32
     assert len(result) > 0, "Embedding vector should not be empty"
-    assert result == mock_azure_openai_for_embedding, "Embedding vector should match the mock data"
+    assert np.allclose(result, mock_azure_openai_for_embedding), "Embedding vector should match the mock data"
 
 
 def test_embed_returns_empty_on_no_data(mock_azure_openai_for_empty, env_vars):
@@ -101,7 +106,189 @@ def test_embed_returns_empty_on_no_data(mock_azure_openai_for_empty, env_vars):
     text = "test text"
     result = embedder.embed(text)
     
-    assert result == []
+    assert len(result) == 0
+
+
+# This is a separate fixture that creates a mock AzureOpenAI client which records batch requests
+@pytest.fixture
+def mock_azure_openai_for_batch(monkeypatch):
+    """Fixture to create a mock AzureOpenAI client that embeds each input as [len(input)] and records calls"""
+    calls = []
+
+    class MockResponse:
+        def __init__(self, inputs):
+            # Return results in reverse order to check that the embedder uses the result index
+            self.data = [
+                type('obj', (object,), {'index': i, 'embedding': [float(len(text))]})
+                for i, text in reversed(list(enumerate(inputs)))
+            ]
+
+    class MockAzureOpenAI:
+        def __init__(self, azure_deployment, api_version, azure_endpoint, api_key):
+            self.embeddings = self.MockEmbeddings()
+
+        class MockEmbeddings:
+            def create(self, input, model, **kwargs):
+                calls.append(list(input))
+                if any(text == "fail" for text in input):
+                    raise ValueError("Invalid input")
+                return MockResponse(input)
+
+    monkeypatch.setattr("embedding.azure_llm_embedder.AzureOpenAI", MockAzureOpenAI)
+    return calls
+
+
+def test_embed_batch_uses_single_request(mock_azure_openai_for_batch, env_vars):
+    """Test that embed_batch sends all texts in one request and keeps the input order."""
+    embedder = AzureLlmEmbedder(**env_vars)
+    texts = ["a", "bb", "ccc"]
+    result = embedder.embed_batch(texts)
+
+    assert [vector.tolist() for vector in result] == [[1.0], [2.0], [3.0]]
+    assert mock_azure_openai_for_batch == [texts]
+
+
+def test_embed_batch_chunks_by_size(mock_azure_openai_for_batch, env_vars):
+    """Test that embed_batch splits the texts into chunks of at most max_batch_size inputs."""
+    embedder = AzureLlmEmbedder(**env_vars, max_batch_size=2)
+    result = embedder.embed_batch(["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert [vector.tolist() for vector in result] == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert [len(call) for call in mock_azure_openai_for_batch] == [2, 2, 1]
+
+
+def test_embed_batch_chunks_by_tokens(mock_azure_openai_for_batch, env_vars):
+    """Test that embed_batch splits the texts when the estimated token limit would be exceeded."""
+    embedder = AzureLlmEmbedder(**env_vars, max_batch_tokens=10)
+    texts = ["x" * 20, "y" * 20, "z" * 20]
+    result = embedder.embed_batch(texts)
+
+    assert [vector.tolist() for vector in result] == [[20.0], [20.0], [20.0]]
+    assert len(mock_azure_openai_for_batch) == 3
+
+
+def test_embed_batch_handles_empty_and_failed_texts(mock_azure_openai_for_batch, env_vars):
+    """Test that empty texts are not sent and a failing text only loses its own embedding."""
+    embedder = AzureLlmEmbedder(**env_vars)
+    result = embedder.embed_batch(["a", "", "fail", "   ", "dddd"])
+
+    assert [vector.tolist() for vector in result] == [[1.0], [], [], [], [4.0]]
+    # One batch request followed by one retry per text of the failed batch
+    assert mock_azure_openai_for_batch == [["a", "fail", "dddd"], ["a"], ["fail"], ["dddd"]]
+
+
+# This is a separate fixture that creates a mock AsyncAzureOpenAI client which records concurrent requests
+@pytest.fixture
+def mock_async_azure_openai(monkeypatch):
+    """Fixture to create a mock AsyncAzureOpenAI client that embeds each input as [len(input)] after a short delay"""
+    state = {"calls": [], "active": 0, "max_active": 0}
+
+    class MockResponse:
+        def __init__(self, inputs):
+            self.data = [type('obj', (object,), {'index': i, 'embedding': [float(len(text))]})
+                         for i, text in enumerate(inputs)]
+
+    class MockAsyncAzureOpenAI:
+        def __init__(self, azure_deployment, api_version, azure_endpoint, api_key):
+            self.embeddings = self.MockEmbeddings()
+
+        class MockEmbeddings:
+            async def create(self, input, model, **kwargs):
+                state["calls"].append(list(input))
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+                await asyncio.sleep(0.01)
+                state["active"] -= 1
+                return MockResponse(input)
+
+    monkeypatch.setattr("embedding.azure_llm_embedder.AsyncAzureOpenAI", MockAsyncAzureOpenAI)
+    return state
+
+
+def test_aembed_batch_returns_embeddings(mock_azure_openai_for_batch, mock_async_azure_openai, env_vars):
+    """Test that aembed_batch embeds texts in input order and skips empty texts."""
+    embedder = AzureLlmEmbedder(**env_vars)
+    result = asyncio.run(embedder.aembed_batch(["a", "", "ccc"]))
+
+    assert [vector.tolist() for vector in result] == [[1.0], [], [3.0]]
+    assert mock_async_azure_openai["calls"] == [["a", "ccc"]]
+    assert mock_azure_openai_for_batch == []
+
+
+def test_aembed_coalesces_concurrent_requests(mock_azure_openai_for_batch, mock_async_azure_openai, env_vars):
+    """Test that concurrent requests for the same text share one upstream call."""
+    embedder = AzureLlmEmbedder(**env_vars)
+
+    async def run():
+        return await asyncio.gather(*(embedder.aembed("same text") for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert [vector.tolist() for vector in results] == [[9.0]] * 10
+    assert mock_async_azure_openai["calls"] == [["same text"]]
+
+
+def test_aembed_batch_limits_concurrency(mock_azure_openai_for_batch, mock_async_azure_openai, env_vars):
+    """Test that the number of concurrent upstream requests does not exceed max_concurrency."""
+    embedder = AzureLlmEmbedder(**env_vars, max_batch_size=1, max_concurrency=2)
+    result = asyncio.run(embedder.aembed_batch(["a", "bb", "ccc", "dddd", "eeeee"]))
+
+    assert [vector.tolist() for vector in result] == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(mock_async_azure_openai["calls"]) == 5
+    assert mock_async_azure_openai["max_active"] == 2
+
+
+def test_aembed_works_on_several_event_loops(mock_azure_openai_for_batch, mock_async_azure_openai, env_vars):
+    """Test that one embedder is used from consecutive event loops and from a loop of another thread."""
+    embedder = AzureLlmEmbedder(**env_vars)
+    results = []
+
+    results.append(asyncio.run(embedder.aembed("a")))
+    results.append(asyncio.run(embedder.aembed("bb")))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        results.append(executor.submit(asyncio.run, embedder.aembed("ccc")).result())
+
+    assert [vector.tolist() for vector in results] == [[1.0], [2.0], [3.0]]
+
+
+def test_aembed_passes_request_error_to_coalesced_callers(mock_azure_openai_for_batch, mock_async_azure_openai,
+                                                          env_vars):
+    """Test that callers waiting for a shared request get the error of the request."""
+    embedder = AzureLlmEmbedder(**env_vars)
+
+    async def failing(texts):
+        await asyncio.sleep(0.01)
+        raise ValueError("deployment not found")
+
+    embedder._aembed_chunks = failing
+
+    async def run():
+        return await asyncio.gather(*(embedder.aembed("same text") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_embed_decodes_base64_and_truncates(monkeypatch, env_vars):
+    """Test that base64 float32 embeddings are decoded into arrays and shortened to the requested dimensions."""
+    vector = np.array([3.0, 4.0, 12.0], dtype=np.float32)
+    requests = []
+
+    class MockAzureOpenAI:
+        def __init__(self, azure_deployment, api_version, azure_endpoint, api_key):
+            self.embeddings = self
+
+        def create(self, input, model, **kwargs):
+            requests.append(kwargs)
+            encoded = base64.b64encode(vector.tobytes()).decode("ascii")
+            return type('obj', (object,), {'data': [type('obj', (object,), {'index': 0, 'embedding': encoded})]})
+
+    monkeypatch.setattr("embedding.azure_llm_embedder.AzureOpenAI", MockAzureOpenAI)
+    embedder = AzureLlmEmbedder(**env_vars, dimensions=2)
+    result = embedder.embed("test text")
+
+    assert requests == [{"encoding_format": "base64", "dimensions": 2}]
+    assert result.dtype == np.float32
+    assert np.allclose(result, [0.6, 0.8])
 
 
 # For the real test, we use a fixture to create the real embedder
@@ -132,9 +319,9 @@ def test_real_embedding(real_embedder, env_vars):
     result = real_embedder.embed(text)
     
     # Verify that we got a reasonable embedding vector back
-    assert isinstance(result, list)
+    assert isinstance(result, np.ndarray)
     assert len(result) > 0, "Embedding vector should not be empty"
-    assert isinstance(result[0], float), "Embedding vector should contain float values"
+    assert result.dtype == np.float32, "Embedding vector should contain float32 values"
     
     # Most embedding models produce normalized vectors
     vector_magnitude = sum(val**2 for val in result)**0.5
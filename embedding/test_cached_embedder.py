@@ -0,0 +1,159 @@
+"""
+Unit tests for the CachedEmbedder wrapper in embedding/cached_embedder.py.
+
+A counting fake embedder is wrapped to check memory and disk cache hits, key normalization, eviction and counters.
+"""
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from embedding.cached_embedder import CachedEmbedder
+from embedding.embedder import Embedder
+
+
+class CountingEmbedder(Embedder):
+    """Fake embedder that embeds text as [len(text)] and records every batch it receives."""
+
+    def __init__(self, model: str = "test-model"):
+        self.model = model
+        self.batches: list[list[str]] = []
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: list[str]) -> list[np.ndarray]:
+        self.batches.append(list(texts))
+        return [np.array([len(text)] if text else [], dtype=np.float32) for text in texts]
+
+
+def as_lists(vectors: list[np.ndarray]) -> list[list[float]]:
+    """Convert embedding arrays to lists for comparison."""
+    return [vector.tolist() for vector in vectors]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Fixture returning a path for the on-disk cache tier."""
+    return str(tmp_path / "cache" / "embeddings.sqlite")
+
+
+def test_memory_hit_skips_wrapped_embedder():
+    """Test that a repeated text is served from memory without calling the wrapped embedder."""
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner)
+
+    assert embedder.embed("intel procesor").tolist() == [14.0]
+    assert embedder.embed("intel procesor").tolist() == [14.0]
+    assert len(inner.batches) == 1
+    stats = embedder.stats()
+    assert stats.memory_hits == 1
+    assert stats.misses == 1
+
+
+def test_normalized_text_shares_entry():
+    """Test that texts differing only in whitespace map to the same cache entry."""
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner)
+
+    embedder.embed("intel  procesor ")
+    embedder.embed(" intel procesor")
+    assert len(inner.batches) == 1
+
+
+def test_batch_sends_only_unique_misses():
+    """Test that embed_batch sends each missing text once and keeps the input order."""
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner)
+    embedder.embed("a")
+
+    result = embedder.embed_batch(["a", "bb", "bb", "ccc"])
+    assert as_lists(result) == [[1.0], [2.0], [2.0], [3.0]]
+    assert inner.batches[-1] == ["bb", "ccc"]
+
+
+def test_empty_results_are_not_cached():
+    """Test that empty embeddings are returned but not stored."""
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner)
+
+    assert len(embedder.embed("")) == 0
+    assert len(embedder.embed("")) == 0
+    assert len(inner.batches) == 2
+
+
+def test_model_name_is_part_of_key():
+    """Test that the same text embedded by different models uses different keys."""
+    assert CachedEmbedder(CountingEmbedder("a")).cache_key("x") != CachedEmbedder(CountingEmbedder("b")).cache_key("x")
+
+
+def test_disk_tier_survives_restart(cache_path):
+    """Test that vectors stored on disk are served by a new cache instance."""
+    first = CachedEmbedder(CountingEmbedder(), cache_path=cache_path)
+    first.embed_batch(["a", "bb"])
+    first.close()
+
+    inner = CountingEmbedder()
+    second = CachedEmbedder(inner, cache_path=cache_path)
+    assert as_lists(second.embed_batch(["a", "bb"])) == [[1.0], [2.0]]
+    assert not inner.batches
+    stats = second.stats()
+    assert stats.disk_hits == 2
+    assert stats.disk_entries == 2
+
+
+def test_memory_eviction_falls_back_to_disk(cache_path):
+    """Test that entries evicted from memory are still served from disk."""
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner, cache_path=cache_path, max_memory_entries=1)
+    embedder.embed("a")
+    embedder.embed("bb")
+
+    assert embedder.embed("a").tolist() == [1.0]
+    stats = embedder.stats()
+    assert stats.memory_evictions >= 1
+    assert stats.disk_hits == 1
+    assert len(inner.batches) == 2
+
+
+def test_disk_eviction_is_size_bounded(cache_path):
+    """Test that the disk tier evicts least recently used entries beyond its size limit."""
+    embedder = CachedEmbedder(CountingEmbedder(), cache_path=cache_path, max_disk_entries=2)
+    embedder.embed_batch(["a", "bb", "ccc"])
+
+    stats = embedder.stats()
+    assert stats.disk_entries == 2
+    assert stats.disk_evictions == 1
+
+
+def test_async_batch_uses_cache():
+    """Test that aembed_batch serves cached texts and sends only misses to the wrapped embedder."""
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner)
+    embedder.embed("a")
+
+    assert as_lists(asyncio.run(embedder.aembed_batch(["a", "bb"]))) == [[1.0], [2.0]]
+    assert inner.batches[-1] == ["bb"]
+    assert embedder.stats().memory_hits == 1
+
+
+def test_async_batch_uses_disk_tier_off_the_event_loop(cache_path):
+    """Test that aembed_batch runs the on-disk tier in a worker thread and serves disk hits."""
+    inner = CountingEmbedder()
+    CachedEmbedder(inner, cache_path=cache_path).embed("a")
+    embedder = CachedEmbedder(inner, cache_path=cache_path)
+    lookup_threads = []
+    lookup = embedder._lookup
+
+    def recording_lookup(keys):
+        lookup_threads.append(threading.current_thread())
+        return lookup(keys)
+
+    embedder._lookup = recording_lookup
+
+    assert as_lists(asyncio.run(embedder.aembed_batch(["a", "bb"]))) == [[1.0], [2.0]]
+    assert lookup_threads and threading.main_thread() not in lookup_threads
+    assert embedder.stats().disk_hits == 1
+    assert CachedEmbedder(inner, cache_path=cache_path).embed("bb").tolist() == [2.0]
+    assert inner.batches == [["a"], ["bb"]]
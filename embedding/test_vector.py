@@ -0,0 +1,63 @@
+"""
+Unit tests for the compact embedding representation in embedding/vector.py.
+"""
+import base64
+
+import numpy as np
+
+from database.extracted_item_model import DatabaseExtractedItem
+from embedding.vector import EmbeddingFormat, quantize_int8, to_vector, truncate_dimensions
+
+
+def test_to_vector_converts_representations():
+    """Test that lists, bytes and base64 strings are converted to float32 arrays."""
+    values = np.array([0.5, -1.0, 2.0], dtype=np.float32)
+
+    for source in (values.tolist(), values.tobytes(), base64.b64encode(values.tobytes()).decode("ascii")):
+        result = to_vector(source)
+        assert result.dtype == np.float32
+        assert np.array_equal(result, values)
+    assert to_vector(values) is values
+    assert len(to_vector(None)) == 0
+
+
+def test_truncate_dimensions_renormalizes():
+    """Test that a shortened vector keeps its prefix direction and has unit length."""
+    result = truncate_dimensions(np.array([3.0, 4.0, 100.0], dtype=np.float32), 2)
+
+    assert np.allclose(result, [0.6, 0.8])
+    assert truncate_dimensions(result, None) is result
+
+
+def test_quantize_int8_preserves_cosine_similarity():
+    """Test that int8 quantized vectors keep approximately the same cosine similarity."""
+    rng = np.random.default_rng(0)
+    a, b = rng.standard_normal((2, 256)).astype(np.float32)
+    qa, qb = quantize_int8(a).astype(np.float32), quantize_int8(b).astype(np.float32)
+
+    def cosine(x, y):
+        return float(x @ y / (np.linalg.norm(x) * np.linalg.norm(y)))
+
+    assert quantize_int8(a).dtype == np.int8
+    assert abs(cosine(a, b) - cosine(qa, qb)) < 0.01
+    assert quantize_int8(np.zeros(3, dtype=np.float32)).tolist() == [0, 0, 0]
+
+
+def test_embedding_format_encode():
+    """Test that the embedding format shortens and quantizes vectors only when configured."""
+    vector = np.array([3.0, 4.0, 0.0], dtype=np.float32)
+
+    assert EmbeddingFormat().encode(vector) == [3.0, 4.0, 0.0]
+    assert np.allclose(EmbeddingFormat(dimensions=2).encode(vector), [0.6, 0.8])
+    assert EmbeddingFormat(quantization="int8").encode(vector) == [95, 127, 0]
+
+
+def test_item_model_keeps_array():
+    """Test that the database item model stores the embedding as a float32 array without copying it."""
+    embedding = np.ones(3072, dtype=np.float32)
+    item = DatabaseExtractedItem(price="219,99 €", description="Procesor INTEL Core i5 12600K", item_code="050.600.196",
+                                 store_name="Links", date_time="2025-07-06T10:00:00", embedding=embedding)
+
+    assert item.embedding is embedding
+    assert DatabaseExtractedItem(**{**item.to_dict(), "embedding": [1, 2]}).embedding.dtype == np.float32
+    assert '"embedding":[1.0,1.0' in item.model_dump_json()
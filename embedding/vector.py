@@ -0,0 +1,150 @@
+"""
+Compact embedding vector representation.
+
+Embeddings are passed around as contiguous NumPy float32 arrays instead of lists of Python floats. The helpers in
+this module convert other representations to arrays, shorten vectors Matryoshka-style and quantize them to int8.
+EmbeddingFormat describes how a deployment stores vectors and is applied only when items are written to or queried
+from a store.
+"""
+import base64
+from typing import Annotated, Any, Literal, Optional
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel, Field, PlainSerializer, PlainValidator, WithJsonSchema
+
+Vector = npt.NDArray[np.float32]
+
+# Largest magnitude of an int8 quantized component
+INT8_SCALE = 127
+
+
+def empty_vector() -> Vector:
+    """
+    Return an empty embedding vector, used for texts that could not be embedded.
+
+    Returns:
+        Vector: A float32 array of length 0.
+    """
+    return np.empty(0, dtype=np.float32)
+
+
+def to_vector(values: Any) -> Vector:
+    """
+    Convert an embedding to a one-dimensional float32 array without per-element Python processing.
+
+    Args:
+        values (Any): A NumPy array, a sequence of numbers, float32 bytes, a base64 string of float32 bytes
+            as returned by the embeddings API, or None.
+
+    Returns:
+        Vector: The embedding as a float32 array. Arrays that already are float32 are returned without a copy.
+    """
+    if values is None:
+        return empty_vector()
+    if isinstance(values, np.ndarray) and values.dtype == np.float32 and values.ndim == 1:
+        return values
+    if isinstance(values, str):
+        return np.frombuffer(base64.b64decode(values), dtype=np.float32)
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        return np.frombuffer(values, dtype=np.float32)
+    return np.asarray(values, dtype=np.float32).reshape(-1)
+
+
+def normalize(vector: Vector) -> Vector:
+    """
+    Scale a vector to unit length. Zero and empty vectors are returned unchanged.
+
+    Args:
+        vector (Vector): The vector to normalize.
+
+    Returns:
+        Vector: The unit length vector.
+    """
+    norm = float(np.linalg.norm(vector))
+    return vector / np.float32(norm) if norm > 0 else vector
+
+
+def truncate_dimensions(vector: Vector, dimensions: Optional[int]) -> Vector:
+    """
+    Shorten a Matryoshka embedding to its first dimensions and renormalize it.
+
+    Models such as text-embedding-3 are trained so that a prefix of the vector is itself a usable embedding.
+
+    Args:
+        vector (Vector): The vector to shorten.
+        dimensions (int | None): Number of dimensions to keep. None keeps the vector as is.
+
+    Returns:
+        Vector: The shortened unit length vector, or the input if it is not longer than dimensions.
+    """
+    if dimensions is None or len(vector) <= dimensions:
+        return vector
+    return normalize(vector[:dimensions])
+
+
+def quantize_int8(vector: Vector) -> npt.NDArray[np.int8]:
+    """
+    Quantize a vector to int8 with symmetric scalar quantization.
+
+    Each vector is scaled by its own largest absolute component. The scale is not kept because cosine similarity
+    does not depend on vector length, so quantized vectors can be compared with each other directly.
+
+    Args:
+        vector (Vector): The vector to quantize.
+
+    Returns:
+        npt.NDArray[np.int8]: The quantized vector.
+    """
+    peak = float(np.max(np.abs(vector))) if len(vector) else 0.0
+    if peak == 0:
+        return np.zeros(len(vector), dtype=np.int8)
+    return np.clip(np.rint(vector * (INT8_SCALE / peak)), -INT8_SCALE, INT8_SCALE).astype(np.int8)
+
+
+class EmbeddingFormat(BaseModel):
+    """
+    Storage format of embedding vectors for a deployment.
+
+    Fields:
+        dimensions (int | None): Number of leading dimensions to keep, None keeps the full vector.
+        quantization (str): "float32" to store floats or "int8" to store scalar quantized vectors.
+    """
+    dimensions: Optional[int] = Field(default=None, description="Number of leading dimensions to keep")
+    quantization: Literal["float32", "int8"] = Field(default="float32", description="Stored component type")
+
+    def prepare(self, values: Any) -> Vector:
+        """
+        Convert an embedding to a float32 array and shorten it to the configured dimensions.
+
+        Args:
+            values (Any): The embedding in any representation accepted by to_vector.
+
+        Returns:
+            Vector: The prepared vector.
+        """
+        return truncate_dimensions(to_vector(values), self.dimensions)
+
+    def encode(self, values: Any) -> list:
+        """
+        Serialize an embedding for a document store that takes JSON arrays.
+
+        Args:
+            values (Any): The embedding in any representation accepted by to_vector.
+
+        Returns:
+            list: The vector as a list of floats, or of ints when int8 quantization is configured.
+        """
+        vector = self.prepare(values)
+        if self.quantization == "int8":
+            return quantize_int8(vector).tolist()
+        return vector.tolist()
+
+
+# Pydantic field type for embeddings, validated as one array conversion instead of per element
+EmbeddingVector = Annotated[
+    np.ndarray,
+    PlainValidator(to_vector),
+    PlainSerializer(lambda vector: vector.tolist(), return_type=list[float], when_used="json"),
+    WithJsonSchema({"type": "array", "items": {"type": "number"}}),
+]
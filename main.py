@@ -4,27 +4,55 @@ Main FastAPI application module for the AI agent service.
 This module sets up the FastAPI app, application state, and endpoints for model setup and querying.
 It integrates LangChain, OpenRouter, and custom agent/tool logic for conversational AI.
 """
+import asyncio
 import logging
 import os
-from typing import Annotated, Optional
+import threading
+import time
+from contextlib import asynccontextmanager, suppress
+from typing import Annotated, AsyncIterator, Optional
 
+from azure.cosmos.aio import CosmosClient as AsyncCosmosClient
+from azure.cosmos.exceptions import CosmosHttpResponseError
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.params import Body, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from langchain.chat_models.base import BaseChatModel
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from pydantic import BaseModel, SecretStr
+from pydantic import BaseModel, Field, SecretStr
 
 from agents.agent import AbstractAgent
 from agents import get_agent
+from database.async_azure_repository import AsyncAzureRepository
+from database.async_repository import AsyncRepository, ThreadedAsyncRepository
 from database.azure_repository import AzureRepository
+from database.ivf_index import IvfPqParameters
+from database.local_repository import LocalVectorRepository
+from database.repository import Repository
+from database.repository_metrics import REPOSITORY_METRICS
+from database.result_page_model import DEFAULT_PAGE_SIZE
+from database.retention import apply_retention
+from database.retention_model import RetentionPolicy
+from database.search_filter_model import SearchFilter
 from database.retrieved_item_model import RetrievedDatabaseExtractedItem
 from embedding.azure_llm_embedder import AzureLlmEmbedder
+from embedding.cached_embedder import CachedEmbedder
 from embedding.embedder import Embedder
-from tools.item_extractor_agent import ExtractedData, ItemExtractorAgent
-from tools import get_provider_tools, get_tools
+from embedding.vector import EmbeddingFormat
+from tools.item_extractor_agent import DEFAULT_MAX_CONCURRENCY, ExtractedData, ItemExtractorAgent
+from tools.listing_chunks import DEFAULT_CHUNK_TOKENS
+from tools.content_pruner import CONTENT_PRUNER
+from tools.page_cache import DEFAULT_TTL, PageCache
+from tools.page_fetcher import configure_page_fetcher, get_page_fetcher
+from tools.page_fetcher_model import DomainLimits, FetchSettings
+from tools import get_tools
+from tools.provider_registry import PROVIDER_REGISTRY
+from tools.provider_result_cache import (DEFAULT_MAX_ENTRIES, DEFAULT_RESULT_TTL, ProviderResultCache,
+                                         configure_provider_result_cache, get_provider_result_cache)
+from tools.provider_tool_interface import ProviderToolInterface
 from utils import filter_messages_until_condition
 
 # Constants
@@ -42,11 +70,55 @@ class AppState:
         self.model: Optional[BaseChatModel] = None
         self.agent: Optional[AbstractAgent] = None
         self.prompt_template: Optional[ChatPromptTemplate] = None
-        self.long_term_memory: Optional[AzureRepository] = None
+        self.long_term_memory: Optional[Repository] = None
+        self.price_history: Optional[Repository] = None
         self.embedder: Optional[Embedder] = None
+        self.cosmos_client: Optional[AsyncCosmosClient] = None
+        self.async_long_term_memory: Optional[AsyncRepository] = None
+        # Incremented whenever the model, repositories or embedder are replaced
+        self.config_version: int = 0
+        # Serializes setup_embedder_and_lt_memory, which /setup and lazily initializing endpoints run in threads
+        self.setup_lock = threading.Lock()
+
+
+@asynccontextmanager
+async def lifespan(fastapi_app: FastAPI):
+    """
+    Opens the asynchronous Cosmos DB client shared by the async endpoints, configures the pooled page fetcher and the
+    provider result cache and starts the retention sweeper on startup. On shutdown stops the sweeper, closes the
+    clients, releases the long-term memory and the price history, which saves local stores to disk, and closes the
+    embedding cache.
+    """
+    state: AppState = fastapi_app.state.app_state
+    state.cosmos_client = create_cosmos_client()
+    page_fetcher = configure_page_fetcher(get_fetch_settings(), create_page_cache())
+    configure_provider_result_cache(create_provider_result_cache())
+    interval_hours = get_retention_sweep_interval_hours()
+    sweeper = asyncio.create_task(sweep_retention(state, interval_hours)) if interval_hours > 0 else None
+    yield
+    if sweeper is not None:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
+    if state.async_long_term_memory is not None:
+        await state.async_long_term_memory.close()
+        state.async_long_term_memory = None
+    if state.cosmos_client is not None:
+        await state.cosmos_client.close()
+        state.cosmos_client = None
+    await page_fetcher.aclose()
+    configure_provider_result_cache(None)
+    for repository in (state.long_term_memory, state.price_history):
+        if repository is not None:
+            repository.close()
+    state.long_term_memory, state.price_history = None, None
+    if isinstance(state.embedder, CachedEmbedder):
+        state.embedder.close()
+    state.embedder = None
+    state.config_version += 1
 
 load_dotenv()
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.state.app_state = AppState()
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -102,13 +174,7 @@ def setup(
     application_state.agent = get_agent(
         agent_type=agent_type,
         model=application_state.model,
-        tools=get_tools(
-            ItemExtractorAgent(
-                model=application_state.model,
-                long_term_memory=application_state.long_term_memory,
-                embedder=application_state.embedder
-            )
-        ),
+        tools=get_tools(get_cached_provider_tools(application_state)),
         prompt_template=application_state.prompt_template,
         prompt_size=prompt_size
     )
@@ -120,24 +186,393 @@ def setup_embedder_and_lt_memory(
     """
     Sets up the embedder and long-term memory for the application state.
 
+    The repositories and the embedder are created by the first setup and reused by later ones, they hold unsaved
+    local items, client connections and the embedding cache file and are closed when the application shuts down.
+    Concurrent calls are serialized by the setup lock of the state, so each of them is created exactly once.
+
     Args:
         application_state (AppState): The application state to update.
     """
-    application_state.long_term_memory = AzureRepository(
+    with application_state.setup_lock:
+        if application_state.long_term_memory is None:
+            application_state.long_term_memory = create_long_term_memory()
+        if application_state.async_long_term_memory is None:
+            application_state.async_long_term_memory = create_async_long_term_memory(
+                application_state.cosmos_client,
+                application_state.long_term_memory
+            )
+        if application_state.price_history is None:
+            application_state.price_history = create_price_history()
+        if application_state.embedder is None:
+            application_state.embedder = create_embedder()
+        application_state.config_version += 1
+
+def create_item_extractor_agent(state: AppState) -> ItemExtractorAgent:
+    """
+    Creates the agent extracting items from store pages with the model, memory and embedder of the application.
+
+    EXTRACTION_CHUNK_TOKENS is the token budget of the page text of one extraction call and
+    EXTRACTION_MAX_CONCURRENCY the number of chunks of a page extracted at the same time.
+
+    Args:
+        state (AppState): Application state holding the model, created repositories and embedder.
+
+    Returns:
+        ItemExtractorAgent: The item extractor agent.
+    """
+    return ItemExtractorAgent(
+        model=state.model,
+        long_term_memory=state.long_term_memory if state.long_term_memory is not None else create_long_term_memory(),
+        embedder=state.embedder if state.embedder is not None else create_embedder(),
+        price_history=state.price_history if state.price_history is not None else create_price_history(),
+        chunk_tokens=int(os.environ.get("EXTRACTION_CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS)),
+        max_concurrency=int(os.environ.get("EXTRACTION_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+    )
+
+def get_provider_config_key(state: AppState) -> tuple:
+    """
+    Returns the key of the configuration the item extractor agent and the provider tools are built from.
+
+    The key holds the configuration version of the application, incremented whenever /setup replaces the model,
+    repositories or embedder, and the extraction settings of the environment. Object ids are not used, a replaced
+    object can get the id of the one it replaced.
+
+    Args:
+        state (AppState): Application state holding the model, created repositories and embedder.
+
+    Returns:
+        tuple: The configuration key.
+    """
+    return (
+        state.config_version,
+        os.environ.get("EXTRACTION_CHUNK_TOKENS"), os.environ.get("EXTRACTION_MAX_CONCURRENCY")
+    )
+
+def get_cached_provider_tools(state: AppState) -> list[ProviderToolInterface]:
+    """
+    Returns the provider tools of the application, built once per configuration and shared by the agent of /setup and
+    all requests.
+
+    Args:
+        state (AppState): Application state holding the model, created repositories and embedder.
+
+    Returns:
+        list[ProviderToolInterface]: The cached provider tools.
+    """
+    return PROVIDER_REGISTRY.tools(get_provider_config_key(state), lambda: create_item_extractor_agent(state))
+
+def create_cosmos_client() -> Optional[AsyncCosmosClient]:
+    """
+    Creates the asynchronous Cosmos DB client shared by the async repositories.
+
+    Returns:
+        AsyncCosmosClient | None: The client, None if LONG_TERM_MEMORY_BACKEND is not "azure" or
+        AZURE_COSMOS_CONNECTION_STRING is not set.
+    """
+    connection_string = os.environ.get("AZURE_COSMOS_CONNECTION_STRING", "")
+    if os.environ.get("LONG_TERM_MEMORY_BACKEND", "azure") != "azure" or not connection_string:
+        return None
+    return AsyncCosmosClient.from_connection_string(connection_string)
+
+def create_async_long_term_memory(cosmos_client: Optional[AsyncCosmosClient],
+                                  long_term_memory: Repository) -> AsyncRepository:
+    """
+    Creates the long-term memory awaited by the async endpoints.
+
+    With a shared Cosmos DB client the container is queried with the asynchronous SDK, otherwise the calls to the
+    synchronous long-term memory run on worker threads.
+
+    Args:
+        cosmos_client (AsyncCosmosClient | None): The shared asynchronous client.
+        long_term_memory (Repository): The synchronous long-term memory.
+
+    Returns:
+        AsyncRepository: The asynchronous long-term memory.
+    """
+    if cosmos_client is None or not isinstance(long_term_memory, AzureRepository):
+        return ThreadedAsyncRepository(long_term_memory)
+    return AsyncAzureRepository.from_client(
+        cosmos_client,
+        database_name=os.environ.get("AZURE_COSMOS_DATABASE_NAME", "pcbuilder"),
+        container_name=os.environ.get("AZURE_COSMOS_CONTAINER_NAME", "extracted_items"),
+        embedding_format=get_embedding_format()
+    )
+
+def create_long_term_memory() -> Repository:
+    """
+    Creates the long-term memory repository selected by LONG_TERM_MEMORY_BACKEND.
+
+    "azure" (default) uses the Cosmos DB container, "local" uses the in-process vector store persisted to
+    LOCAL_VECTOR_STORE_PATH, which needs no Azure account. LOCAL_VECTOR_INDEX=ivfpq enables the approximate index
+    of the local store, see get_index_parameters.
+
+    Returns:
+        Repository: The configured repository.
+    """
+    backend = os.environ.get("LONG_TERM_MEMORY_BACKEND", "azure")
+    if backend == "local":
+        return LocalVectorRepository(
+            path=os.environ.get("LOCAL_VECTOR_STORE_PATH", ".cache/vector_store"),
+            embedding_format=get_embedding_format(),
+            index_parameters=get_index_parameters()
+        )
+    if backend != "azure":
+        raise ValueError(f"Unknown long-term memory backend: {backend}")
+    return AzureRepository(
+        connection_string=os.environ.get("AZURE_COSMOS_CONNECTION_STRING", ""),
+        database_name=os.environ.get("AZURE_COSMOS_DATABASE_NAME", "pcbuilder"),
+        container_name=os.environ.get("AZURE_COSMOS_CONTAINER_NAME", "extracted_items"),
+        embedding_format=get_embedding_format()
+    )
+
+def create_price_history() -> Repository:
+    """
+    Creates the price history repository on the backend selected by LONG_TERM_MEMORY_BACKEND.
+
+    The Cosmos DB container is set by AZURE_COSMOS_PRICE_HISTORY_CONTAINER_NAME and the local store directory by
+    LOCAL_PRICE_HISTORY_PATH.
+
+    Returns:
+        Repository: The price history repository.
+    """
+    if os.environ.get("LONG_TERM_MEMORY_BACKEND", "azure") == "local":
+        return LocalVectorRepository(path=os.environ.get("LOCAL_PRICE_HISTORY_PATH", ".cache/price_history"))
+    return AzureRepository(
         connection_string=os.environ.get("AZURE_COSMOS_CONNECTION_STRING", ""),
         database_name=os.environ.get("AZURE_COSMOS_DATABASE_NAME", "pcbuilder"),
-        container_name=os.environ.get("AZURE_COSMOS_CONTAINER_NAME", "extracted_items")
+        container_name=os.environ.get("AZURE_COSMOS_PRICE_HISTORY_CONTAINER_NAME", "price_history")
+    )
+
+def create_embedder() -> Embedder:
+    """
+    Creates the Azure embedder wrapped in a persistent embedding cache.
+
+    The cache file is set by EMBEDDING_CACHE_PATH, an empty value keeps only the in-process cache tier.
+
+    Returns:
+        Embedder: The caching embedder.
+    """
+    return CachedEmbedder(
+        AzureLlmEmbedder(
+            endpoint=os.environ.get("AZURE_EMBEDDER_ENDPOINT", ""),
+            api_key=os.environ.get("AZURE_EMBEDDER_API_KEY", ""),
+            api_version=os.environ.get("AZURE_EMBEDDER_API_VERSION", ""),
+            deployment=os.environ.get("AZURE_EMBEDDER_DEPLOYMENT", ""),
+            model=os.environ.get("AZURE_EMBEDDER_MODEL", "text-embedding-3-large"),
+            max_concurrency=int(os.environ.get("AZURE_EMBEDDER_MAX_CONCURRENCY", "8")),
+            dimensions=get_embedding_format().dimensions
+        ),
+        cache_path=os.environ.get("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite"),
+        max_memory_entries=int(os.environ.get("EMBEDDING_CACHE_MEMORY_ENTRIES", "10000")),
+        max_disk_entries=int(os.environ.get("EMBEDDING_CACHE_DISK_ENTRIES", "500000"))
+    )
+
+def get_index_parameters() -> Optional[IvfPqParameters]:
+    """
+    Reads the approximate index parameters of the local vector store from the environment.
+
+    The LOCAL_VECTOR_INDEX_* variables tune the recall and latency of the index, QUANTIZATION_BYTES and
+    SEARCH_LIST_SIZE correspond to quantizationByteSize and indexingSearchListSize of the Cosmos DB diskANN index.
+
+    Returns:
+        IvfPqParameters | None: The index parameters, None if LOCAL_VECTOR_INDEX is not "ivfpq".
+    """
+    if os.environ.get("LOCAL_VECTOR_INDEX", "exact") != "ivfpq":
+        return None
+    n_lists = os.environ.get("LOCAL_VECTOR_INDEX_LISTS")
+    return IvfPqParameters(
+        n_lists=int(n_lists) if n_lists else None,
+        n_probe=int(os.environ.get("LOCAL_VECTOR_INDEX_PROBES", "8")),
+        quantization_bytes=int(os.environ.get("LOCAL_VECTOR_INDEX_QUANTIZATION_BYTES", "128")),
+        search_list_size=int(os.environ.get("LOCAL_VECTOR_INDEX_SEARCH_LIST_SIZE", "100")),
+        min_train_size=int(os.environ.get("LOCAL_VECTOR_INDEX_MIN_TRAIN_SIZE", "10000"))
+    )
+
+def get_retention_policy() -> RetentionPolicy:
+    """
+    Reads the retention of items and price history from the environment.
+
+    RETENTION_MAX_AGE_DAYS is the age after which items that were not extracted again are expired, it also sets the
+    time to live of the Cosmos DB container in scripts/azure_cosmos/init.py. PRICE_HISTORY_COMPACT_AFTER_DAYS is the
+    age after which price observations are compacted into daily summaries, PRICE_HISTORY_SUMMARY_MAX_AGE_DAYS the
+    age after which the summaries are expired, an empty value keeps them.
+
+    Returns:
+        RetentionPolicy: The configured retention policy.
+    """
+    summary_max_age_days = os.environ.get("PRICE_HISTORY_SUMMARY_MAX_AGE_DAYS", "365")
+    return RetentionPolicy(
+        max_age_days=int(os.environ.get("RETENTION_MAX_AGE_DAYS", "7")),
+        compact_after_days=int(os.environ.get("PRICE_HISTORY_COMPACT_AFTER_DAYS", "2")),
+        summary_max_age_days=int(summary_max_age_days) if summary_max_age_days else None
+    )
+
+def get_retention_sweep_interval_hours() -> float:
+    """
+    Reads the interval of the retention sweeper from RETENTION_SWEEP_INTERVAL_HOURS.
+
+    The local backend has no time to live, so its sweeper runs daily by default. Cosmos DB containers expire items
+    with their time to live and the sweeper is off by default, scripts/apply_retention.py compacts their price
+    history. 0 disables the sweeper.
+
+    Returns:
+        float: Hours between sweeps, 0 if the sweeper is disabled.
+    """
+    default = "24" if os.environ.get("LONG_TERM_MEMORY_BACKEND", "azure") == "local" else "0"
+    return float(os.environ.get("RETENTION_SWEEP_INTERVAL_HOURS", default))
+
+async def sweep_retention(state: AppState, interval_hours: float) -> None:
+    """
+    Applies the retention policy to the long-term memory and the price history every interval_hours.
+
+    The sweep runs on a worker thread and is skipped until the long-term memory is set up. A failed sweep is logged
+    and retried at the next interval.
+
+    Args:
+        state (AppState): The application state holding the repositories.
+        interval_hours (float): Hours between sweeps.
+    """
+    policy = get_retention_policy()
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        if state.long_term_memory is None:
+            continue
+        try:
+            await asyncio.to_thread(apply_retention, state.long_term_memory, state.price_history, policy)
+        except Exception as e:
+            logger.error("Retention sweep failed: %s", e)
+
+def get_embedding_format() -> EmbeddingFormat:
+    """
+    Reads the embedding storage format of the deployment from the environment.
+
+    EMBEDDING_DIMENSIONS shortens embeddings to the given number of dimensions and EMBEDDING_QUANTIZATION selects
+    "float32" or "int8" stored vectors. Both have to match the vector policy of the container.
+
+    Returns:
+        EmbeddingFormat: The configured embedding format.
+    """
+    dimensions = os.environ.get("EMBEDDING_DIMENSIONS")
+    return EmbeddingFormat(
+        dimensions=int(dimensions) if dimensions else None,
+        quantization=os.environ.get("EMBEDDING_QUANTIZATION", "float32")
     )
-    application_state.embedder = AzureLlmEmbedder(
-        endpoint=os.environ.get("AZURE_EMBEDDER_ENDPOINT", ""),
-        api_key=os.environ.get("AZURE_EMBEDDER_API_KEY", ""),
-        api_version=os.environ.get("AZURE_EMBEDDER_API_VERSION", ""),
-        deployment=os.environ.get("AZURE_EMBEDDER_DEPLOYMENT", ""),
-        model=os.environ.get("AZURE_EMBEDDER_MODEL", "text-embedding-3-large")
+
+def get_fetch_settings() -> FetchSettings:
+    """
+    Reads the connection pool and timeouts of the page fetcher from the environment.
+
+    HTTP_CONNECT_TIMEOUT and HTTP_READ_TIMEOUT are in seconds, HTTP_MAX_CONNECTIONS_PER_HOST limits the requests in
+    flight to one store and HTTP2 set to "false" keeps the fetcher on HTTP/1.1. HTTP_REQUESTS_PER_SECOND_PER_HOST,
+    HTTP_BURST_PER_HOST and HTTP_MAX_QUEUE_PER_HOST set the rate limit and queue of each store, requests waiting
+    longer than HTTP_QUEUE_TIMEOUT seconds are rejected. HTTP_DOMAIN_LIMITS overrides the limits per domain as comma
+    separated domain=rate:burst:concurrency entries, for example "links.hr=2:4:2,protis.hr=1", omitted values take
+    the per-host defaults.
+
+    Returns:
+        FetchSettings: The configured fetch settings.
+    """
+    defaults = FetchSettings()
+    rate = float(os.environ.get("HTTP_REQUESTS_PER_SECOND_PER_HOST", defaults.requests_per_second_per_host))
+    burst = int(os.environ.get("HTTP_BURST_PER_HOST", defaults.burst_per_host))
+    max_connections_per_host = int(os.environ.get("HTTP_MAX_CONNECTIONS_PER_HOST", defaults.max_connections_per_host))
+    max_queue = int(os.environ.get("HTTP_MAX_QUEUE_PER_HOST", defaults.max_queue_per_host))
+    domain_limits = {}
+    for entry in os.environ.get("HTTP_DOMAIN_LIMITS", "").split(","):
+        if entry.strip():
+            domain, _, values = entry.partition("=")
+            parts = [part.strip() for part in values.split(":")] + ["", "", ""]
+            domain_limits[domain.strip()] = DomainLimits(
+                rate=float(parts[0] or rate),
+                burst=int(parts[1] or burst),
+                max_concurrency=int(parts[2] or max_connections_per_host),
+                max_queue=max_queue
+            )
+    return FetchSettings(
+        connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", defaults.connect_timeout)),
+        read_timeout=float(os.environ.get("HTTP_READ_TIMEOUT", defaults.read_timeout)),
+        max_connections=int(os.environ.get("HTTP_MAX_CONNECTIONS", defaults.max_connections)),
+        max_connections_per_host=max_connections_per_host,
+        requests_per_second_per_host=rate,
+        burst_per_host=burst,
+        max_queue_per_host=max_queue,
+        queue_timeout=float(os.environ.get("HTTP_QUEUE_TIMEOUT", defaults.queue_timeout)),
+        domain_limits=domain_limits,
+        http2=os.environ.get("HTTP2", "true").lower() != "false",
+        user_agent=os.environ.get("USER_AGENT", defaults.user_agent)
     )
 
+def create_page_cache() -> Optional[PageCache]:
+    """
+    Creates the cache of fetched store pages from the environment.
+
+    PAGE_CACHE_TTL_SECONDS is the default time to live of pages and PAGE_CACHE_DOMAIN_TTLS overrides it per domain
+    as comma separated domain=seconds pairs, for example "links.hr=600,protis.hr=1800". Pages expired for less than
+    PAGE_CACHE_STALE_SECONDS are served while revalidated in the background.
+
+    Returns:
+        PageCache | None: The page cache, None if PAGE_CACHE_PATH is set to an empty value.
+    """
+    path = os.environ.get("PAGE_CACHE_PATH", ".cache/pages.sqlite")
+    if not path:
+        return None
+    domain_ttls = {}
+    for pair in os.environ.get("PAGE_CACHE_DOMAIN_TTLS", "").split(","):
+        if pair.strip():
+            domain, _, ttl = pair.partition("=")
+            domain_ttls[domain.strip()] = float(ttl)
+    return PageCache(
+        path=path,
+        default_ttl=float(os.environ.get("PAGE_CACHE_TTL_SECONDS", DEFAULT_TTL)),
+        domain_ttls=domain_ttls,
+        max_bytes=int(float(os.environ.get("PAGE_CACHE_MAX_MB", "256")) * 1024 * 1024),
+        stale_while_revalidate=float(os.environ.get("PAGE_CACHE_STALE_SECONDS", "0"))
+    )
+
+def create_provider_result_cache() -> Optional[ProviderResultCache]:
+    """
+    Creates the cache of provider search results from the environment.
+
+    PROVIDER_CACHE_TTL_SECONDS is the time a result is fresh, 0 disables the cache. Results expired for less than
+    PROVIDER_CACHE_STALE_SECONDS are served while refreshed in the background, and at most PROVIDER_CACHE_MAX_ENTRIES
+    results are kept.
+
+    Returns:
+        ProviderResultCache | None: The provider result cache, None if it is disabled.
+    """
+    ttl = float(os.environ.get("PROVIDER_CACHE_TTL_SECONDS", DEFAULT_RESULT_TTL))
+    if ttl <= 0:
+        return None
+    return ProviderResultCache(
+        ttl=ttl,
+        stale_while_revalidate=float(os.environ.get("PROVIDER_CACHE_STALE_SECONDS", "600")),
+        max_entries=int(os.environ.get("PROVIDER_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """
+    Handles GET requests to the '/metrics' endpoint scraped by Prometheus.
+
+    Returns:
+        PlainTextResponse: Latency histograms, Cosmos DB request units, item counts and error classes of every
+        repository operation, labeled by repository and operation, the hit ratio and bytes saved by the page cache,
+        the token reduction of page pruning, the queue wait and fetch time of store requests by domain and the
+        lookups of the provider result cache, in the Prometheus text format.
+    """
+    page_fetcher = get_page_fetcher()
+    text = (REPOSITORY_METRICS.render_prometheus() + CONTENT_PRUNER.render_prometheus()
+            + page_fetcher.scheduler.render_prometheus())
+    page_cache = page_fetcher.cache
+    if page_cache is not None:
+        text += page_cache.render_prometheus()
+    result_cache = get_provider_result_cache()
+    if result_cache is not None:
+        text += result_cache.render_prometheus()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
 @app.post("/query")
-def query(state: Annotated[AppState, Depends(get_state)],
+async def query(state: Annotated[AppState, Depends(get_state)],
           text: Annotated[str, Body(media_type="text/plain")],
           user_id: str = "default_user"):
     """
@@ -159,8 +594,8 @@ def query(state: Annotated[AppState, Depends(get_state)],
         return {"response": MODEL_NOT_INITIALIZED_ERROR}
     logger.info("Received query: %s from user %s", text, user_id)
 
-    query_embedding = state.embedder.embed(text)
-    memory_items = state.long_term_memory.query_by_embedding(query_embedding)
+    query_embedding = await state.embedder.aembed(text)
+    memory_items = await state.async_long_term_memory.query_by_embedding(query_embedding)
     structured_memory_items = [
         RetrievedDatabaseExtractedItem.from_dict(item) for item in memory_items
     ]
@@ -169,7 +604,7 @@ def query(state: Annotated[AppState, Depends(get_state)],
         logger.info("Memory item 0: %s", memory_items[0])
 
     input_messages = [HumanMessage(text)]
-    response = state.agent.process_message(input_messages, user_id)
+    response = await state.agent.aprocess_message(input_messages, user_id)
     logger.info("Message count in history: %d", len(response["messages"]))
     reversed_list = response["messages"][::-1]
     new_messages = filter_messages_until_condition(
@@ -187,14 +622,36 @@ class DbQuery(BaseModel):
         text (str): The text to query the database with.
         max_results (int): The maximum number of results to return.
         user_id (str): The ID of the user making the query. Default is "default_user".
+        filters (SearchFilter | None): Store, extraction time and price restrictions, and keywords fused with the
+            similarity ranking. Default is no filter.
+        page_size (int | None): Return one page of at most this many results with a continuation token instead of
+            all results. Default is no paging.
+        continuation_token (str | None): Token of the previous page of the same query. Default is the first page.
+        stream (bool): Stream the results as newline delimited JSON while they are fetched. Default is False.
     """
     text: str
     max_results: int = 10
     user_id: str = "default_user"
+    filters: Optional[SearchFilter] = None
+    page_size: Optional[int] = Field(default=None, gt=0)
+    continuation_token: Optional[str] = None
+    stream: bool = False
+
+
+class RetrievedItemPage(BaseModel):
+    """
+    One page of the results of a database query.
+
+    Attributes:
+        items (list[RetrievedDatabaseExtractedItem]): The results of the page, most similar first.
+        continuation_token (str | None): Token for the next page, None on the last page.
+    """
+    items: list[RetrievedDatabaseExtractedItem]
+    continuation_token: Optional[str] = None
 
 @app.post("/query_db")
-def query_db(state: Annotated[AppState, Depends(get_state)],
-              query: DbQuery) -> list[RetrievedDatabaseExtractedItem]:
+async def query_db(state: Annotated[AppState, Depends(get_state)],
+                   query: DbQuery) -> list[RetrievedDatabaseExtractedItem] | RetrievedItemPage:
     """
     Handles POST requests to the '/query_db' endpoint for semantic similarity search.
 
@@ -208,80 +665,229 @@ def query_db(state: Annotated[AppState, Depends(get_state)],
             - text (str): The text to search for in the database
             - max_results (int): Maximum number of results to return
             - user_id (str, optional): The ID of the user making the query. Defaults to "default_user".
+            - filters (SearchFilter, optional): Restrictions applied by the database before ranking.
+            - page_size (int, optional): Size of the returned page, or of the fetched pages when streaming.
+            - continuation_token (str, optional): Token of the previous page of the same query.
+            - stream (bool, optional): Stream the results as application/x-ndjson, one item per line.
 
     Returns:
-        list[RetrievedDatabaseExtractedItem]: A list of database items that match the query,
-        sorted by similarity score (most similar first).
+        list[RetrievedDatabaseExtractedItem] | RetrievedItemPage: A list of database items that match the query,
+        sorted by similarity score (most similar first), or one page of them when page_size is set.
+        Streamed results are written page by page as they are fetched, so the first rows arrive before the query
+        finishes.
 
     Logs:
         - The number of items found in long-term memory.
     
     Raises:
+        HTTPException: 400 if the continuation token is invalid or rejected by Cosmos DB.
         Exception: If the embedder is not available or the database query fails.
         
     Note:
         If the embedder and long-term memory are not initialized in the application state,
         this method will initialize them automatically using the setup_embedder_and_lt_memory function.
     """
-    if not state.embedder or not state.long_term_memory:
-        setup_embedder_and_lt_memory(state)
+    if not state.embedder or not state.async_long_term_memory:
+        await asyncio.to_thread(setup_embedder_and_lt_memory, state)
         logger.info("Embedder and long-term memory initialized.")
-        
-    query_embedding = state.embedder.embed(query.text)
-    memory_items = state.long_term_memory.query_by_embedding(query_embedding, query.max_results)
-    structured_memory_items = [
-        RetrievedDatabaseExtractedItem.from_dict(item) for item in memory_items
-    ]
-    logger.info("Long term memory items found: %d", len(memory_items))
-    return structured_memory_items
 
+    query_embedding = await state.embedder.aembed(query.text)
+    if not query.stream and query.page_size is None and query.continuation_token is None:
+        memory_items = await state.async_long_term_memory.query_by_embedding(query_embedding, query.max_results,
+                                                                             query.filters)
+        structured_memory_items = [
+            RetrievedDatabaseExtractedItem.from_dict(item) for item in memory_items
+        ]
+        logger.info("Long term memory items found: %d", len(memory_items))
+        return structured_memory_items
+
+    pages = state.async_long_term_memory.query_pages_by_embedding(
+        query_embedding,
+        query.max_results,
+        query.filters,
+        page_size=query.page_size or DEFAULT_PAGE_SIZE,
+        continuation_token=query.continuation_token
+    )
+    try:
+        first_page = await anext(pages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except CosmosHttpResponseError as e:
+        # A well-formed wrapper around a corrupt Cosmos DB continuation token is rejected by the server
+        if e.status_code == 400:
+            raise HTTPException(status_code=400, detail=f"Invalid continuation token: {e.message}") from e
+        raise
+    if not query.stream:
+        await pages.aclose()
+        logger.info("Long term memory items found on page: %d", len(first_page.items))
+        return RetrievedItemPage(
+            items=[RetrievedDatabaseExtractedItem.from_dict(item) for item in first_page.items],
+            continuation_token=first_page.continuation_token
+        )
+
+    async def stream_items() -> AsyncIterator[str]:
+        """
+        Write every item of the fetched pages as one JSON line.
+        """
+        count = 0
+        page = first_page
+        try:
+            while True:
+                count += len(page.items)
+                yield "".join(RetrievedDatabaseExtractedItem.from_dict(item).model_dump_json() + "\n"
+                              for item in page.items)
+                page = await anext(pages)
+        except StopAsyncIteration:
+            pass
+        finally:
+            await pages.aclose()
+            logger.info("Long term memory items streamed: %d", count)
+
+    return StreamingResponse(stream_items(), media_type="application/x-ndjson")
+
+
+class PriceQuery(BaseModel):
+    """
+    Model for querying the database for items ordered by price.
+
+    Attributes:
+        max_results (int): The maximum number of results to return.
+        descending (bool): Return the most expensive items first. Default is cheapest first.
+        filters (SearchFilter | None): Store, extraction time, currency and price restrictions, and keywords that
+            have to match the description. Default is no filter.
+    """
+    max_results: int = 10
+    descending: bool = False
+    filters: Optional[SearchFilter] = None
+
+@app.post("/query_price")
+async def query_price(state: Annotated[AppState, Depends(get_state)],
+                      query: PriceQuery) -> list[RetrievedDatabaseExtractedItem]:
+    """
+    Handles POST requests to the '/query_price' endpoint, for example the cheapest items of a store.
+
+    The items are ordered by the normalized price in the database, items without a parsed price are not returned.
+
+    Args:
+        state (AppState): The application state containing the long-term memory.
+        query (PriceQuery): The maximum number of results, the order and the filters.
+
+    Returns:
+        list[RetrievedDatabaseExtractedItem]: The matching items in price order.
+    """
+    if not state.embedder or not state.async_long_term_memory:
+        await asyncio.to_thread(setup_embedder_and_lt_memory, state)
+        logger.info("Embedder and long-term memory initialized.")
+
+    memory_items = await state.async_long_term_memory.query_by_price(query.max_results, query.filters, query.descending)
+    logger.info("Long term memory items found by price: %d", len(memory_items))
+    return [RetrievedDatabaseExtractedItem.from_dict(item) for item in memory_items]
+
+
+class ProviderResult(BaseModel):
+    """
+    Outcome of one provider tool called by the '/provider' endpoint.
+
+    Attributes:
+        provider (str): Class name of the provider tool.
+        seconds (float): Time the provider took, up to the provider timeout.
+        items (int): Number of items returned.
+        error (str | None): Error or timeout of the provider, None if it returned data.
+        data (ExtractedData | None): The returned data, None if the provider failed.
+    """
+    provider: str
+    seconds: float
+    items: int = 0
+    error: Optional[str] = None
+    data: Optional[ExtractedData] = None
+
+def get_provider_timeout() -> float:
+    """
+    Reads the time limit of a single provider tool called by the '/provider' endpoint from PROVIDER_TIMEOUT_SECONDS.
+
+    Returns:
+        float: The timeout in seconds.
+    """
+    return float(os.environ.get("PROVIDER_TIMEOUT_SECONDS", "60"))
+
+async def run_provider(tool: ProviderToolInterface, params: dict, timeout: float) -> ProviderResult:
+    """
+    Call a provider tool within the provider timeout, recording its time and error.
+
+    Args:
+        tool (ProviderToolInterface): The provider tool.
+        params (dict): The parameters of the tool.
+        timeout (float): Time limit of the tool in seconds, the tool is cancelled when it is exceeded.
+
+    Returns:
+        ProviderResult: The data, time and error of the provider.
+    """
+    provider = tool.__class__.__name__
+    start = time.perf_counter()
+    try:
+        data = await asyncio.wait_for(tool.aget_data(params), timeout)
+    except asyncio.TimeoutError:
+        logger.error("Tool %s timed out after %.1f seconds", provider, timeout)
+        return ProviderResult(provider=provider, seconds=time.perf_counter() - start,
+                              error=f"Timed out after {timeout:g} seconds")
+    except Exception as e:
+        logger.error("Error in tool %s: %s", provider, str(e))
+        return ProviderResult(provider=provider, seconds=time.perf_counter() - start,
+                              error=f"{type(e).__name__}: {e}")
+    logger.info("Tool %s returns : %d", provider, len(data.items))
+    return ProviderResult(provider=provider, seconds=time.perf_counter() - start, items=len(data.items), data=data)
 
 @app.post("/provider")
-def test_providers(state: Annotated[AppState, Depends(get_state)],
-          params: Annotated[dict, Body(media_type="text/json")],
-          user_id: str = "default_user"):
+async def test_providers(state: Annotated[AppState, Depends(get_state)],
+                         params: Annotated[dict, Body(media_type="text/json")],
+                         user_id: str = "default_user",
+                         stream: bool = False):
     """
     Handles POST requests to the '/provider' endpoint.
 
+    All provider tools run concurrently, each cancelled after PROVIDER_TIMEOUT_SECONDS, so a slow or failing store
+    does not delay the others.
+
     Args:
-        request (Request): The incoming HTTP request object.
-        text (str): The text provided in the request body.
+        params (dict): The search parameters passed to every provider tool.
+        user_id (str): The user sending the request.
+        stream (bool): Write each ProviderResult as one JSON line as soon as its provider finishes.
 
     Returns:
-        dict: A dictionary containing the response from the model.
+        dict | StreamingResponse: The data of the providers that succeeded under "response" and the time and error of
+        every provider under "providers", or the NDJSON stream of ProviderResult lines.
+
+    Note:
+        The provider tools fetch their pages over the shared async client, so the event loop keeps serving other
+        requests.
     """
     if not state.agent or not state.model:
         logger.error(MODEL_NOT_INITIALIZED_ERROR)
         return {"response": MODEL_NOT_INITIALIZED_ERROR}
     logger.info("Received paraameters: %s from user %s", params, user_id)
 
-    long_term_memory = AzureRepository(
-        connection_string=os.environ.get("AZURE_COSMOS_CONNECTION_STRING", ""),
-        database_name=os.environ.get("AZURE_COSMOS_DATABASE_NAME", "pcbuilder"),
-        container_name=os.environ.get("AZURE_COSMOS_CONTAINER_NAME", "extracted_items")
-    )
-    provider_agent = ItemExtractorAgent(
-        model=state.model,
-        long_term_memory=long_term_memory,
-        embedder=AzureLlmEmbedder(
-            endpoint=os.environ.get("AZURE_EMBEDDER_ENDPOINT", ""),
-            api_key=os.environ.get("AZURE_EMBEDDER_API_KEY", ""),
-            api_version=os.environ.get("AZURE_EMBEDDER_API_VERSION", ""),
-            deployment=os.environ.get("AZURE_EMBEDDER_DEPLOYMENT", ""),
-            model=os.environ.get("AZURE_EMBEDDER_MODEL", "text-embedding-3-large")
-        )
-    )
-    provider_tools = get_provider_tools(provider_agent)
-    response: list[ExtractedData] = []
-    for tool in provider_tools:
-        try:
-            tool_response = tool.get_data(params)
-            logger.info("Tool %s returns : %d", tool.__class__.__name__, len(tool_response.items))
-            response.append(tool_response)
-        except Exception as e:
-            logger.error("Error in tool %s: %s", tool.__class__.__name__, str(e))
-            continue
+    provider_tools = get_cached_provider_tools(state)
+    timeout = get_provider_timeout()
+    tasks = [asyncio.create_task(run_provider(tool, params, timeout)) for tool in provider_tools]
+
+    if stream:
+        async def stream_results() -> AsyncIterator[str]:
+            """
+            Write every provider result as one JSON line in the order the providers finish.
+            """
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    yield (await next_result).model_dump_json() + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+    results: list[ProviderResult] = await asyncio.gather(*tasks)
+    response = [result.data for result in results if result.data is not None]
+    providers = [result.model_dump(exclude={"data"}) for result in results]
     if not response:
-        return {"response": "No provider tools returned data."}
+        return {"response": "No provider tools returned data.", "providers": providers}
     else:
-        return {"response": response}
+        return {"response": response, "providers": providers}
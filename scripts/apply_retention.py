@@ -0,0 +1,28 @@
+#Run from root with: python ./scripts/apply_retention.py
+"""
+Expires items that were not extracted again within the retention age and compacts the price history into daily
+summaries. Uses the repositories and the retention policy configured by the environment, see get_retention_policy in
+main.py. Run it periodically, for example daily from cron, when the application sweeper is disabled.
+"""
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database.retention import apply_retention  # noqa: E402
+from main import create_long_term_memory, create_price_history, get_retention_policy  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+
+long_term_memory = create_long_term_memory()
+price_history = create_price_history()
+try:
+    report = apply_retention(long_term_memory, price_history, get_retention_policy())
+    print(f"Long-term memory shrank from {report.items_before} to {report.items_after} items "
+          f"({report.shrinkage:.1%}).")
+    print(f"Compacted {report.observations_compacted} price observations into {report.summaries_written} daily "
+          f"summaries, expired {report.summaries_expired} summaries, {len(report.failed)} operations failed.")
+finally:
+    long_term_memory.close()
+    price_history.close()
@@ -9,6 +9,12 @@ load_dotenv()
 connection_string = os.environ.get("AZURE_COSMOS_CONNECTION_STRING", "")
 database_name = os.environ.get("AZURE_COSMOS_DATABASE_NAME", "pcbuilder")
 container_name = os.environ.get("AZURE_COSMOS_CONTAINER_NAME", "computer_parts")
+price_history_container_name = os.environ.get("AZURE_COSMOS_PRICE_HISTORY_CONTAINER_NAME", "price_history")
+# Must match the embedding format used by the application, see get_embedding_format in main.py
+embedding_dimensions = int(os.environ.get("EMBEDDING_DIMENSIONS") or 3072)
+embedding_data_type = "int8" if os.environ.get("EMBEDDING_QUANTIZATION") == "int8" else "float32"
+# Items not extracted again within the retention age expire, see get_retention_policy in main.py
+item_ttl_seconds = int(os.environ.get("RETENTION_MAX_AGE_DAYS", "7")) * 86400
 
 if not connection_string or not database_name or not container_name:
     raise ValueError("Azure Cosmos DB connection string, database name, and container name must be set in environment variables.")
@@ -18,10 +24,10 @@ client = CosmosClient.from_connection_string(connection_string)
 database = client.get_database_client(database_name)
 container = database.create_container(
     id=container_name,
+    # Item IDs are derived from store name and item code, so re-scraped products update their own document
     partition_key=PartitionKey(path="/id"),
-    unique_key_policy={
-        "uniqueKeys": [{"paths": ["/description"]}]
-    },
+    # Every extraction rewrites or patches the items it sees, which restarts their time to live
+    default_ttl=item_ttl_seconds,
     indexing_policy={
         "indexingMode": "consistent",
         "automatic": True,
@@ -38,7 +44,11 @@ container = database.create_container(
                 "path": "/embedding/*"
             }
         ],
-        "fullTextIndexes": [],
+        "fullTextIndexes": [
+            {
+                "path": "/description"
+            }
+        ],
         "vectorIndexes": [
             {
                 "path": "/embedding",
@@ -48,15 +58,33 @@ container = database.create_container(
             }
         ]
     },
+    # Keyword search of query_by_embedding ranks descriptions with FullTextScore
+    full_text_policy={
+        "defaultLanguage": "en-US",
+        "fullTextPaths": [
+            {
+                "path": "/description",
+                "language": "en-US"
+            }
+        ]
+    },
     vector_embedding_policy={
         "vectorEmbeddings": [
             {
                 "path": "/embedding",
-                "dataType": "float32",
+                "dataType": embedding_data_type,
                 "distanceFunction": "cosine",
-                "dimensions": 3072
+                "dimensions": embedding_dimensions
             }
         ]
     }
 )
 print(f"Container '{container_name}' created successfully in database '{database_name}'.")
+
+database.create_container(
+    id=price_history_container_name,
+    partition_key=PartitionKey(path="/id"),
+    # Time to live is enabled without a default, daily price summaries carry their own ttl
+    default_ttl=-1
+)
+print(f"Container '{price_history_container_name}' created successfully in database '{database_name}'.")
@@ -0,0 +1,21 @@
+#Run from root with: python ./scripts/backfill_prices.py
+"""
+Parses the raw prices of stored items into the price_minor and currency fields, for items stored before ingestion
+parsed prices. Uses the long-term memory configured by the environment, see create_long_term_memory in main.py.
+"""
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database.price_backfill import backfill_prices  # noqa: E402
+from main import create_long_term_memory  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+
+repository = create_long_term_memory()
+try:
+    print(f"Backfilled prices of {backfill_prices(repository)} items.")
+finally:
+    repository.close()
@@ -0,0 +1,94 @@
+#Run from root with: python ./scripts/benchmark_vector_index.py [--store .cache/vector_store]
+"""
+Recall@k and latency benchmark of the IVF-PQ index of the local vector store against exact search.
+
+Uses the embeddings of a saved local store when --store is given, otherwise clustered synthetic unit vectors.
+Queries are stored vectors with added noise, so every query has close neighbours like a real product search.
+With --store the queries are also run through the repository and its recorded operation metrics are reported.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database.ivf_index import IvfPqIndex, IvfPqParameters, recall_at_k  # noqa: E402
+from database.local_repository import LocalVectorRepository, top_k  # noqa: E402
+from database.repository_metrics import REPOSITORY_METRICS  # noqa: E402
+
+
+def synthetic_vectors(count: int, dimensions: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Return unit vectors drawn around random cluster centres."""
+    centres = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + 0.5 * rng.standard_normal((count, dimensions))
+    return unit(vectors.astype(np.float32))
+
+
+def unit(vectors: np.ndarray) -> np.ndarray:
+    """Scale every row to unit length."""
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", help="Directory of a saved local vector store to benchmark on")
+    parser.add_argument("--items", type=int, default=50000, help="Number of synthetic vectors")
+    parser.add_argument("--dimensions", type=int, default=256, help="Dimensions of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Number of neighbours per query")
+    parser.add_argument("--lists", type=int, default=None, help="Number of inverted lists")
+    parser.add_argument("--quantization-bytes", type=int, default=128, help="Bytes per compressed vector")
+    parser.add_argument("--search-list-size", type=int, default=100, help="Candidates re-ranked exactly")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="n_probe values to try")
+    arguments = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    if arguments.store:
+        repository = LocalVectorRepository(path=arguments.store)
+        _, stored = repository.vectors()
+        vectors = unit(stored)
+    else:
+        vectors = synthetic_vectors(arguments.items, arguments.dimensions, max(1, arguments.items // 100), rng)
+    queries = vectors[rng.integers(0, len(vectors), arguments.queries)]
+    queries = unit(queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32))
+    print(f"{len(vectors)} vectors with {vectors.shape[1]} dimensions, {len(queries)} queries, k={arguments.k}")
+
+    started = time.perf_counter()
+    exact = np.array([top_k(vectors @ query, arguments.k) for query in queries])
+    exact_ms = 1000 * (time.perf_counter() - started) / len(queries)
+    print(f"exact search: {exact_ms:.2f} ms/query")
+
+    parameters = IvfPqParameters(n_lists=arguments.lists, quantization_bytes=arguments.quantization_bytes,
+                                 search_list_size=arguments.search_list_size)
+    index = IvfPqIndex(vectors.shape[1], parameters)
+    started = time.perf_counter()
+    index.train(vectors)
+    index.add(np.arange(len(vectors)), vectors)
+    print(f"index build: {time.perf_counter() - started:.1f} s, {len(index.centroids)} lists, "
+          f"{index.subspaces} bytes per vector")
+
+    for n_probe in arguments.probes:
+        started = time.perf_counter()
+        approximate = []
+        for query in queries:
+            candidates = index.search(query, max(arguments.k, parameters.search_list_size), n_probe)
+            approximate.append(candidates[top_k(vectors[candidates] @ query, arguments.k)])
+        elapsed_ms = 1000 * (time.perf_counter() - started) / len(queries)
+        recall = np.mean([recall_at_k(e, a) for e, a in zip(exact, approximate)])
+        print(f"n_probe={n_probe:4d}: recall@{arguments.k}={recall:.3f}, {elapsed_ms:.2f} ms/query")
+
+    if arguments.store:
+        REPOSITORY_METRICS.reset()
+        for query in queries:
+            repository.query_by_embedding(query, arguments.k)
+        for (label, operation), stats in REPOSITORY_METRICS.snapshot().items():
+            print(f"{label} {operation}: {stats.calls} calls, mean {1000 * stats.mean_seconds:.2f} ms, "
+                  f"p50 <= {1000 * stats.quantile(0.5):.1f} ms, p95 <= {1000 * stats.quantile(0.95):.1f} ms, "
+                  f"{stats.items} items")
+
+
+if __name__ == "__main__":
+    main()
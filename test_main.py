@@ -1,7 +1,20 @@
+import asyncio
+import json
 import os
+import time
+import numpy as np
 import pytest
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from main import app, OPEN_ROUTER_API_KEY, MODEL_NOT_INITIALIZED_ERROR
+from database.async_repository import ThreadedAsyncRepository
+from database.local_repository import LocalVectorRepository
+from embedding.cached_embedder import CachedEmbedder
+from embedding.embedder import Embedder
+from embedding.vector import Vector
+from main import app, AppState, OPEN_ROUTER_API_KEY, MODEL_NOT_INITIALIZED_ERROR, get_cached_provider_tools, \
+    get_provider_config_key, lifespan, setup, setup_embedder_and_lt_memory
+from tools.item_extractor_agent import ExtractedData, ExtractedItem
 
 client = TestClient(app)
 
@@ -47,4 +60,193 @@ def test_query_without_setup():
     assert (
         MODEL_NOT_INITIALIZED_ERROR in response.text
         or "Model is not initialized" in response.text
-    )
\ No newline at end of file
+    )
+
+class FixedEmbedder(Embedder):
+    """Embedder returning the same vector for every text."""
+
+    def embed(self, text: str) -> Vector:
+        return np.array([1.0, 0.0], dtype=np.float32)
+
+
+def stored_items(count: int) -> LocalVectorRepository:
+    """Return a local store with items ranked by their index for the FixedEmbedder query."""
+    repository = LocalVectorRepository()
+    repository.create_items([
+        {"id": f"item_{i}", "price": str(i), "description": f"Item {i}", "item_code": str(i), "store_name": "Store",
+         "date_time": "2025-01-01T00:00:00", "embedding": np.array([1.0, i / 10], dtype=np.float32)}
+        for i in range(count)
+    ])
+    return repository
+
+
+def test_query_db_pages_and_streams(monkeypatch):
+    """Test the paged and the NDJSON streaming modes of /query_db."""
+    state = app.state.app_state
+    monkeypatch.setattr(state, "embedder", FixedEmbedder())
+    monkeypatch.setattr(state, "async_long_term_memory", ThreadedAsyncRepository(stored_items(5)))
+
+    page = client.post("/query_db", json={"text": "item", "max_results": 5, "page_size": 2}).json()
+    assert [item["id"] for item in page["items"]] == ["item_0", "item_1"]
+    next_page = client.post("/query_db", json={"text": "item", "max_results": 5, "page_size": 2,
+                                               "continuation_token": page["continuation_token"]}).json()
+    assert [item["id"] for item in next_page["items"]] == ["item_2", "item_3"]
+
+    with client.stream("POST", "/query_db", json={"text": "item", "max_results": 5, "page_size": 2,
+                                                  "stream": True}) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+    assert [line["id"] for line in lines] == [f"item_{i}" for i in range(5)]
+
+    invalid = client.post("/query_db", json={"text": "item", "continuation_token": "not a token"})
+    assert invalid.status_code == 400
+
+
+class CorruptTokenRepository(ThreadedAsyncRepository):
+    """Repository whose paged queries are rejected by Cosmos DB like a corrupt inner continuation token."""
+
+    async def query_pages_by_embedding(self, *args, **kwargs):
+        raise CosmosHttpResponseError(status_code=400, message="Invalid continuation token")
+        yield
+
+
+def test_query_db_rejects_corrupt_cosmos_token(monkeypatch):
+    """Test that a paged query rejected by Cosmos DB with 400 is answered with 400 instead of 500."""
+    state = app.state.app_state
+    monkeypatch.setattr(state, "embedder", FixedEmbedder())
+    monkeypatch.setattr(state, "async_long_term_memory", CorruptTokenRepository(stored_items(1)))
+
+    response = client.post("/query_db", json={"text": "item", "page_size": 2, "continuation_token": "token"})
+
+    assert response.status_code == 400
+
+
+class FakeProvider:
+    """Provider tool returning one item after a delay, or failing."""
+
+    def __init__(self, delay: float, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+
+    async def aget_data(self, params: dict) -> ExtractedData:
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return ExtractedData(date_time="2025-01-01T00:00:00", store_name="Store",
+                             items=[ExtractedItem(price="1,00 €", description=params["query"], item_code="1")])
+
+
+class FastProvider(FakeProvider):
+    pass
+
+
+class SlowProvider(FakeProvider):
+    pass
+
+
+class FailingProvider(FakeProvider):
+    pass
+
+
+def test_provider_runs_stores_concurrently_with_timeout(monkeypatch):
+    """Test that /provider reports per-provider times and errors, and streams results as providers finish."""
+    state = app.state.app_state
+    monkeypatch.setattr(state, "agent", object())
+    monkeypatch.setattr(state, "model", object())
+    monkeypatch.setattr("main.get_cached_provider_tools", lambda state: [
+        SlowProvider(5), FailingProvider(0.1, ValueError("layout changed")), FastProvider(0.05)])
+    monkeypatch.setenv("PROVIDER_TIMEOUT_SECONDS", "0.5")
+
+    start = time.perf_counter()
+    body = client.post("/provider", json={"query": "cpu"}).json()
+    assert time.perf_counter() - start < 2
+    assert [data["items"][0]["description"] for data in body["response"]] == ["cpu"]
+    providers = {result["provider"]: result for result in body["providers"]}
+    assert providers["SlowProvider"]["error"] == "Timed out after 0.5 seconds"
+    assert providers["FailingProvider"]["error"] == "ValueError: layout changed"
+    assert providers["FastProvider"]["items"] == 1 and providers["FastProvider"]["error"] is None
+    assert all("data" not in result for result in body["providers"])
+
+    with client.stream("POST", "/provider?stream=true", json={"query": "cpu"}) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+    assert [line["provider"] for line in lines] == ["FastProvider", "FailingProvider", "SlowProvider"]
+    assert lines[0]["data"]["store_name"] == "Store"
+
+
+def test_setup_reuses_repositories(monkeypatch, tmp_path):
+    """Test that a repeated setup keeps the repositories and the embedder, so unsaved local items are not lost."""
+    monkeypatch.setenv("LONG_TERM_MEMORY_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_VECTOR_STORE_PATH", str(tmp_path / "items"))
+    monkeypatch.setenv("LOCAL_PRICE_HISTORY_PATH", str(tmp_path / "history"))
+    monkeypatch.setattr("main.create_embedder", FixedEmbedder)
+    state = AppState()
+
+    setup_embedder_and_lt_memory(state)
+    memory, history, embedder = state.long_term_memory, state.price_history, state.embedder
+    key = get_provider_config_key(state)
+    setup_embedder_and_lt_memory(state)
+
+    assert state.long_term_memory is memory and state.price_history is history
+    assert state.embedder is embedder
+    assert get_provider_config_key(state) != key
+
+
+def test_lifespan_closes_embedding_cache(monkeypatch, tmp_path):
+    """Test that application shutdown closes the embedding cache created by setup."""
+    monkeypatch.setenv("LONG_TERM_MEMORY_BACKEND", "local")
+    monkeypatch.setenv("RETENTION_SWEEP_INTERVAL_HOURS", "0")
+    monkeypatch.setenv("PAGE_CACHE_PATH", "")
+    fastapi_app = FastAPI()
+    fastapi_app.state.app_state = AppState()
+    embedder = CachedEmbedder(FixedEmbedder(), cache_path=str(tmp_path / "embeddings.sqlite"))
+    fastapi_app.state.app_state.embedder = embedder
+
+    async def run_lifespan():
+        async with lifespan(fastapi_app):
+            pass
+
+    asyncio.run(run_lifespan())
+
+    assert fastapi_app.state.app_state.embedder is None
+    assert embedder._connection is None
+
+
+def test_concurrent_setups_create_repositories_once(monkeypatch):
+    """Test that setups running in parallel threads share one set of repositories and one embedder."""
+    created = []
+
+    def create_long_term_memory():
+        time.sleep(0.05)
+        created.append("memory")
+        return LocalVectorRepository()
+
+    monkeypatch.setattr("main.create_long_term_memory", create_long_term_memory)
+    monkeypatch.setattr("main.create_price_history", LocalVectorRepository)
+    monkeypatch.setattr("main.create_embedder", FixedEmbedder)
+    state = AppState()
+
+    async def run_setups():
+        await asyncio.gather(*(asyncio.to_thread(setup_embedder_and_lt_memory, state) for _ in range(4)))
+
+    asyncio.run(run_setups())
+
+    assert created == ["memory"]
+    assert isinstance(state.async_long_term_memory, ThreadedAsyncRepository)
+
+
+def test_setup_gives_the_agent_the_cached_provider_tools(monkeypatch):
+    """Test that the agent built by /setup uses the provider tools of the registry instead of a second set."""
+    monkeypatch.setattr("main.create_long_term_memory", LocalVectorRepository)
+    monkeypatch.setattr("main.create_price_history", LocalVectorRepository)
+    monkeypatch.setattr("main.create_embedder", FixedEmbedder)
+    monkeypatch.setattr("main.get_tools", list)
+    agent_arguments = {}
+    monkeypatch.setattr("main.get_agent", lambda **kwargs: agent_arguments.update(kwargs))
+    state = AppState()
+
+    setup(state, "You are a helpful assistant.")
+
+    provider_tools = get_cached_provider_tools(state)
+    assert provider_tools
+    assert all(any(tool is provider_tool for tool in agent_arguments["tools"]) for provider_tool in provider_tools)
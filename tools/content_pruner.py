@@ -0,0 +1,240 @@
+"""
+Pruning of store page boilerplate before the page text reaches the extraction LLM.
+
+Most of the flattened text of a store page is chrome: navigation menus, category lists with item counters, cart and
+login widgets and the footer, see outputs/web_no_html_sample.txt. Every character of it is sent to the model as
+tokens. The pruner removes boilerplate elements by tag and class name, drops link lists, and keeps the smallest
+element holding most of the prices on the page and more than the prices, which is the product listing. The page title
+is kept for the store name. Token counts before and after pruning are accumulated to measure the reduction.
+"""
+import logging
+import re
+import threading
+from typing import Optional
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from pydantic import BaseModel
+
+from embedding.azure_llm_embedder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Elements that never hold listing content
+NOISE_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "select", "button", "input", "textarea"]
+BOILERPLATE_TAGS = ["nav", "header", "footer", "aside"]
+# Class and id names of store chrome, matched as whole words of hyphenated or underscored names
+BOILERPLATE_NAMES = re.compile(
+    r"(?:^|[-_\s])(?:nav|navbar|navigation|menu|megamenu|header|footer|breadcrumbs?|cart|basket|login|account|"
+    r"newsletter|sidebar|side-\d|cookies?|social|banner|filters?|category-navigation)(?:$|[-_\s])",
+    re.IGNORECASE
+)
+# Class and id names of product content, never dropped as chrome even if they contain a boilerplate name
+PRODUCT_NAMES = re.compile(r"(?:^|[-_\s])(?:products?|items?|artikl[a-z]*|proizvod[a-z]*|listing)(?:$|[-_\s])",
+                           re.IGNORECASE)
+# A price: a number followed or preceded by a currency
+PRICE_PATTERN = re.compile(r"\d[\d.,\s ]*\s?(?:€|EUR|kn|HRK|\$)|(?:€|\$)\s?\d", re.IGNORECASE)
+# Share of the prices of the page the listing region has to contain
+LISTING_PRICE_SHARE = 0.8
+# Blocks with at least this many links whose text is mostly link text are link lists
+MIN_LIST_LINKS = 5
+MAX_LINK_TEXT_SHARE = 0.8
+
+
+class PruningStats(BaseModel):
+    """
+    Accumulated token counts of pruned pages.
+
+    Fields:
+        pages (int): Pages pruned.
+        listing_pages (int): Pages on which a listing region was found.
+        original_tokens (int): Estimated tokens of the unpruned page texts.
+        pruned_tokens (int): Estimated tokens of the pruned page texts.
+    """
+    pages: int = 0
+    listing_pages: int = 0
+    original_tokens: int = 0
+    pruned_tokens: int = 0
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Fraction of the tokens removed by pruning."""
+        return 1 - self.pruned_tokens / self.original_tokens if self.original_tokens else 0.0
+
+
+class PrunedPage(BaseModel):
+    """
+    Text of a page after pruning.
+
+    Fields:
+        text (str): The pruned text.
+        original_tokens (int): Estimated tokens of the unpruned text.
+        pruned_tokens (int): Estimated tokens of the pruned text.
+        listing_found (bool): Whether the text was narrowed to the product listing.
+    """
+    text: str
+    original_tokens: int
+    pruned_tokens: int
+    listing_found: bool = False
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Fraction of the tokens removed by pruning."""
+        return 1 - self.pruned_tokens / self.original_tokens if self.original_tokens else 0.0
+
+
+class ContentPruner:
+    """
+    Prunes store page boilerplate and accumulates the token reduction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = PruningStats()
+
+    def prune(self, content: bytes | str, encoding: Optional[str] = None) -> PrunedPage:
+        """
+        Return the title and product listing text of a page without store chrome.
+
+        If the page shows no prices the whole page without boilerplate is returned.
+
+        Args:
+            content (bytes | str): The HTML of the page.
+            encoding (str | None, optional): Encoding declared by the response headers. Defaults to None.
+
+        Returns:
+            PrunedPage: The pruned text and its token counts.
+        """
+        soup = BeautifulSoup(content, "html.parser", from_encoding=encoding if isinstance(content, bytes) else None)
+        original_tokens = estimate_tokens(soup.get_text())
+        title = collapse_whitespace(soup.title.get_text()) if soup.title else ""
+        for element in soup.find_all(NOISE_TAGS + BOILERPLATE_TAGS + ["head"]):
+            element.decompose()
+        for element in soup.find_all(_is_boilerplate):
+            if not element.decomposed:
+                element.decompose()
+        for element in soup.find_all(["ul", "ol", "div", "table"]):
+            if not element.decomposed and _is_link_list(element):
+                element.decompose()
+        listing = find_listing(soup)
+        body = collapse_whitespace((listing or soup).get_text("\n"))
+        text = f"{title}\n{body}" if title else body
+        page = PrunedPage(text=text, original_tokens=original_tokens, pruned_tokens=estimate_tokens(text),
+                          listing_found=listing is not None)
+        with self._lock:
+            self._stats.pages += 1
+            self._stats.listing_pages += int(page.listing_found)
+            self._stats.original_tokens += page.original_tokens
+            self._stats.pruned_tokens += page.pruned_tokens
+        logger.info("Pruned page text from %d to %d estimated tokens (%.0f%% less)", page.original_tokens,
+                    page.pruned_tokens, 100 * page.reduction_ratio)
+        return page
+
+    def stats(self) -> PruningStats:
+        """
+        Return a snapshot of the accumulated token counts.
+
+        Returns:
+            PruningStats: Pages pruned and their token counts.
+        """
+        with self._lock:
+            return self._stats.model_copy()
+
+    def reset(self) -> None:
+        """
+        Reset the accumulated token counts.
+        """
+        with self._lock:
+            self._stats = PruningStats()
+
+    def render_prometheus(self) -> str:
+        """
+        Render the accumulated token counts in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text.
+        """
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text, value in (
+                ("page_pruning_pages_total", "counter", "Pages pruned before extraction.", stats.pages),
+                ("page_pruning_original_tokens_total", "counter", "Estimated tokens of unpruned page texts.",
+                 stats.original_tokens),
+                ("page_pruning_pruned_tokens_total", "counter", "Estimated tokens of pruned page texts.",
+                 stats.pruned_tokens),
+                ("page_pruning_reduction_ratio", "gauge", "Fraction of page tokens removed by pruning.",
+                 stats.reduction_ratio)):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+        return "\n".join(lines) + "\n"
+
+
+def find_listing(soup: BeautifulSoup) -> Optional[Tag]:
+    """
+    Find the product listing, the deepest element holding LISTING_PRICE_SHARE of the prices of the page.
+
+    The listing has to hold text besides the prices, so that a page with a single result keeps the description and
+    code of the item instead of narrowing to the element of its price.
+
+    Args:
+        soup (BeautifulSoup): The parsed page.
+
+    Returns:
+        Tag | None: The listing element, None if the page shows no prices or no element holds more than them.
+    """
+    prices = [text for text in soup.find_all(string=PRICE_PATTERN) if isinstance(text, NavigableString)]
+    if not prices:
+        return None
+    price_ids = {id(price) for price in prices}
+    counts: dict[int, int] = {}
+    elements: dict[int, tuple[int, Tag]] = {}
+    for price in prices:
+        for depth, parent in enumerate(reversed(list(price.parents))):
+            if isinstance(parent, BeautifulSoup):
+                continue
+            counts[id(parent)] = counts.get(id(parent), 0) + 1
+            elements[id(parent)] = (depth, parent)
+    required = LISTING_PRICE_SHARE * len(prices)
+    candidates = sorted((elements[key] for key, count in counts.items() if count >= required),
+                        key=lambda candidate: candidate[0], reverse=True)
+    for _, element in candidates:
+        if any(text.strip() and id(text) not in price_ids for text in element.strings):
+            return element
+    return None
+
+
+def collapse_whitespace(text: str) -> str:
+    """
+    Collapse runs of spaces within lines and drop empty lines.
+
+    Args:
+        text (str): The text to collapse.
+
+    Returns:
+        str: The collapsed text.
+    """
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _is_boilerplate(element: Tag) -> bool:
+    """
+    Check whether the class or id of an element names store chrome and not product content.
+    """
+    names = " ".join(element.get("class") or []) + " " + str(element.get("id") or "")
+    return (bool(names.strip()) and BOILERPLATE_NAMES.search(names) is not None
+            and PRODUCT_NAMES.search(names) is None)
+
+
+def _is_link_list(element: Tag) -> bool:
+    """
+    Check whether an element is a list of links without prices, such as a category list.
+    """
+    links = element.find_all("a")
+    if len(links) < MIN_LIST_LINKS or element.find(string=PRICE_PATTERN) is not None:
+        return False
+    text_length = len("".join(element.get_text().split()))
+    link_length = sum(len("".join(link.get_text().split())) for link in links)
+    return text_length > 0 and link_length / text_length >= MAX_LINK_TEXT_SHARE
+
+
+# Process-wide pruner of the pages sent to the extraction LLM
+CONTENT_PRUNER = ContentPruner()
@@ -0,0 +1,345 @@
+"""
+Per-domain rate limiting and ordering of the requests to the store hosts.
+
+All scraping tools fetch through the process-wide page fetcher, whose FetchScheduler admits every request. Each
+domain has a token bucket refilled at its request rate, a limit of requests in flight and a bounded queue of waiting
+requests, ordered by priority so that interactive queries overtake background refreshes and first come first served
+within a priority. A request waiting longer than the queue timeout, or arriving at a full queue, is rejected instead
+of piling up behind a throttled store. Queue wait and fetch time are recorded separately per domain and priority.
+
+The scheduler is shared by worker threads and event loops: its state is guarded by a lock, and waiting coroutines are
+woken through their own loop.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Callable, Iterator, Optional
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, Field
+
+from tools.page_fetcher_model import DomainLimits, FetchSettings
+
+
+class Priority(IntEnum):
+    """
+    Priority of a fetch, lower values are admitted first.
+    """
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class FetchRejectedError(Exception):
+    """
+    Raised when a fetch is not admitted by the scheduler of its domain.
+
+    Args:
+        domain (str): The domain of the request.
+        reason (str): Why the request was rejected.
+    """
+
+    def __init__(self, domain: str, reason: str):
+        super().__init__(f"Fetch from {domain} rejected: {reason}")
+        self.domain = domain
+        self.reason = reason
+
+
+class FetchQueueFullError(FetchRejectedError):
+    """
+    Raised when the queue of the domain is full.
+    """
+
+    def __init__(self, domain: str):
+        super().__init__(domain, "queue is full")
+
+
+class FetchQueueTimeoutError(FetchRejectedError):
+    """
+    Raised when a request waited longer than the queue timeout.
+    """
+
+    def __init__(self, domain: str):
+        super().__init__(domain, "queue timeout")
+
+
+class FetchStats(BaseModel):
+    """
+    Accumulated queue and fetch times of the requests of one domain and priority.
+
+    Fields:
+        fetches (int): Requests admitted and finished.
+        queue_seconds (float): Summed time the requests waited for their turn.
+        max_queue_seconds (float): Longest wait of a request.
+        fetch_seconds (float): Summed time of the admitted requests.
+        rejected (int): Requests rejected because the queue was full.
+        timeouts (int): Requests abandoned after the queue timeout.
+    """
+    fetches: int = Field(description="Requests admitted and finished", default=0)
+    queue_seconds: float = Field(description="Summed queue wait", default=0.0)
+    max_queue_seconds: float = Field(description="Longest queue wait", default=0.0)
+    fetch_seconds: float = Field(description="Summed fetch time", default=0.0)
+    rejected: int = Field(description="Requests rejected at a full queue", default=0)
+    timeouts: int = Field(description="Requests abandoned after the queue timeout", default=0)
+
+    @property
+    def mean_queue_seconds(self) -> float:
+        """Mean queue wait of the admitted requests."""
+        return self.queue_seconds / self.fetches if self.fetches else 0.0
+
+    @property
+    def mean_fetch_seconds(self) -> float:
+        """Mean fetch time of the admitted requests."""
+        return self.fetch_seconds / self.fetches if self.fetches else 0.0
+
+
+class _Waiter:
+    """
+    A request waiting for its domain, ordered by priority and arrival.
+    """
+
+    def __init__(self, priority: Priority, sequence: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.sequence = sequence
+        self.wake = wake
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class _Domain:
+    """
+    Token bucket, requests in flight and queue of one domain.
+    """
+
+    def __init__(self, limits: DomainLimits):
+        self.limits = limits
+        self.tokens = float(limits.burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.queue: list[_Waiter] = []
+
+    def refill(self, now: float) -> None:
+        """
+        Add the tokens earned since the last refill, up to the bucket capacity.
+        """
+        self.tokens = min(float(self.limits.burst), self.tokens + (now - self.updated) * self.limits.rate)
+        self.updated = now
+
+
+class FetchScheduler:
+    """
+    Admits requests to the store domains within their rate, concurrency and queue limits.
+
+    Args:
+        settings (FetchSettings | None, optional): Per-domain limits and the queue timeout. Defaults to
+            FetchSettings().
+    """
+
+    def __init__(self, settings: Optional[FetchSettings] = None):
+        self.settings = settings or FetchSettings()
+        self._lock = threading.Lock()
+        self._domains: dict[str, _Domain] = {}
+        self._sequence = itertools.count()
+        self._stats: dict[tuple[str, Priority], FetchStats] = {}
+
+    @contextmanager
+    def slot(self, url: str, priority: Priority = Priority.INTERACTIVE) -> Iterator[None]:
+        """
+        Wait for the turn of a request and hold its slot while the request runs.
+
+        Args:
+            url (str): URL of the request.
+            priority (Priority, optional): Priority of the request. Defaults to Priority.INTERACTIVE.
+
+        Raises:
+            FetchQueueFullError: If the queue of the domain is full.
+            FetchQueueTimeoutError: If the request waited longer than the queue timeout.
+        """
+        name, domain = self._domain(url)
+        event = threading.Event()
+        waiter = self._enqueue(name, domain, priority, event.set)
+        start = time.monotonic()
+        deadline = start + self.settings.queue_timeout
+        try:
+            while True:
+                event.clear()
+                granted, wait = self._poll(domain, waiter)
+                if granted:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise FetchQueueTimeoutError(name)
+                event.wait(remaining if wait is None else min(wait, remaining))
+        except BaseException as e:
+            self._abandon(name, domain, waiter, timed_out=isinstance(e, FetchQueueTimeoutError))
+            raise
+        admitted = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(name, domain, priority, admitted - start, time.monotonic() - admitted)
+
+    @asynccontextmanager
+    async def aslot(self, url: str, priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[None]:
+        """
+        Asynchronously wait for the turn of a request and hold its slot while the request runs.
+
+        Args:
+            url (str): URL of the request.
+            priority (Priority, optional): Priority of the request. Defaults to Priority.INTERACTIVE.
+
+        Raises:
+            FetchQueueFullError: If the queue of the domain is full.
+            FetchQueueTimeoutError: If the request waited longer than the queue timeout.
+        """
+        name, domain = self._domain(url)
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._enqueue(name, domain, priority, lambda: loop.call_soon_threadsafe(event.set))
+        start = time.monotonic()
+        deadline = start + self.settings.queue_timeout
+        try:
+            while True:
+                event.clear()
+                granted, wait = self._poll(domain, waiter)
+                if granted:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise FetchQueueTimeoutError(name)
+                try:
+                    await asyncio.wait_for(event.wait(), remaining if wait is None else min(wait, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException as e:
+            self._abandon(name, domain, waiter, timed_out=isinstance(e, FetchQueueTimeoutError))
+            raise
+        admitted = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(name, domain, priority, admitted - start, time.monotonic() - admitted)
+
+    def stats(self) -> dict[tuple[str, Priority], FetchStats]:
+        """
+        Return a snapshot of the accumulated queue and fetch times.
+
+        Returns:
+            dict[tuple[str, Priority], FetchStats]: The stats by domain and priority.
+        """
+        with self._lock:
+            return {key: stats.model_copy() for key, stats in self._stats.items()}
+
+    def render_prometheus(self) -> str:
+        """
+        Render the queue and fetch times and the current queues in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text.
+        """
+        snapshot = self.stats()
+        with self._lock:
+            gauges = {name: (len(domain.queue), domain.in_flight) for name, domain in self._domains.items()}
+        lines = []
+        for name, help_text, value in (
+                ("fetch_queue_wait_seconds", "Time fetches waited for their domain.", lambda s: s.queue_seconds),
+                ("fetch_duration_seconds", "Time of admitted fetches.", lambda s: s.fetch_seconds)):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} summary"])
+            for (domain, priority), stats in sorted(snapshot.items()):
+                labels = f'domain="{domain}",priority="{priority.name.lower()}"'
+                lines.append(f"{name}_sum{{{labels}}} {value(stats)}")
+                lines.append(f"{name}_count{{{labels}}} {stats.fetches}")
+        lines.extend(["# HELP fetch_rejected_total Fetches rejected by the scheduler.",
+                      "# TYPE fetch_rejected_total counter"])
+        for (domain, priority), stats in sorted(snapshot.items()):
+            labels = f'domain="{domain}",priority="{priority.name.lower()}"'
+            lines.append(f'fetch_rejected_total{{{labels},reason="queue_full"}} {stats.rejected}')
+            lines.append(f'fetch_rejected_total{{{labels},reason="timeout"}} {stats.timeouts}')
+        for name, help_text, index in (("fetch_queue_length", "Fetches waiting for their domain.", 0),
+                                       ("fetch_in_flight", "Fetches running against their domain.", 1)):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge"])
+            for domain, values in sorted(gauges.items()):
+                lines.append(f'{name}{{domain="{domain}"}} {values[index]}')
+        return "\n".join(lines) + "\n"
+
+    def _domain(self, url: str) -> tuple[str, _Domain]:
+        """
+        Return the domain state of a URL, created on first use.
+        """
+        name, limits = self.settings.limits_for(urlsplit(url).hostname or "")
+        with self._lock:
+            if name not in self._domains:
+                self._domains[name] = _Domain(limits)
+            return name, self._domains[name]
+
+    def _record(self, name: str, priority: Priority) -> FetchStats:
+        """
+        Return the stats of a domain and priority, the lock must be held.
+        """
+        return self._stats.setdefault((name, priority), FetchStats())
+
+    def _enqueue(self, name: str, domain: _Domain, priority: Priority, wake: Callable[[], None]) -> _Waiter:
+        """
+        Queue a request, rejecting it if the queue is full.
+        """
+        with self._lock:
+            if len(domain.queue) >= domain.limits.max_queue:
+                self._record(name, priority).rejected += 1
+                raise FetchQueueFullError(name)
+            waiter = _Waiter(priority, next(self._sequence), wake)
+            heapq.heappush(domain.queue, waiter)
+            return waiter
+
+    def _poll(self, domain: _Domain, waiter: _Waiter) -> tuple[bool, Optional[float]]:
+        """
+        Admit the request if it is first in the queue and a slot and a token are free.
+
+        Returns whether the request was admitted and, if it waits only for a token, the seconds until the next one.
+        """
+        with self._lock:
+            if domain.queue[0] is not waiter or domain.in_flight >= domain.limits.max_concurrency:
+                return False, None
+            domain.refill(time.monotonic())
+            if domain.tokens < 1:
+                return False, (1 - domain.tokens) / domain.limits.rate
+            domain.tokens -= 1
+            domain.in_flight += 1
+            heapq.heappop(domain.queue)
+            head = domain.queue[0] if domain.queue else None
+        if head is not None:
+            head.wake()
+        return True, None
+
+    def _abandon(self, name: str, domain: _Domain, waiter: _Waiter, timed_out: bool) -> None:
+        """
+        Remove a request that stopped waiting, after a timeout or a cancellation, from the queue.
+        """
+        with self._lock:
+            was_head = bool(domain.queue) and domain.queue[0] is waiter
+            domain.queue.remove(waiter)
+            heapq.heapify(domain.queue)
+            if timed_out:
+                self._record(name, waiter.priority).timeouts += 1
+            head = domain.queue[0] if was_head and domain.queue else None
+        if head is not None:
+            head.wake()
+
+    def _release(self, name: str, domain: _Domain, priority: Priority, queue_seconds: float,
+                 fetch_seconds: float) -> None:
+        """
+        Free the slot of a finished request, record its times and wake the next request.
+        """
+        with self._lock:
+            domain.in_flight -= 1
+            stats = self._record(name, priority)
+            stats.fetches += 1
+            stats.queue_seconds += queue_seconds
+            stats.max_queue_seconds = max(stats.max_queue_seconds, queue_seconds)
+            stats.fetch_seconds += fetch_seconds
+            head = domain.queue[0] if domain.queue else None
+        if head is not None:
+            head.wake()
@@ -1,25 +1,34 @@
 """
-Module implementing an item extraction agent with ReAct (Reasoning and Acting) capabilities.
+Module implementing the agent extracting search result items from store pages.
 
 Defines Pydantic models for extracted item and store data, and the ItemExtractorAgent class for extracting search result
-items from computer component store web pages using LangGraph's tool-augmented reasoning and prompt templates.
+items from computer component store web pages with structured output calls of the model.
 """
+import asyncio
 import logging
-from typing import Any
+from datetime import datetime
+from typing import Optional
 
 from langchain.chat_models.base import BaseChatModel
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
 from pydantic import BaseModel, Field
-from agents.react_agent import ReActAgent
-from database.azure_repository import AzureRepository
 from database.extracted_item_model import DatabaseExtractedItem
+from database.item_ingestor import ItemIngestor
+from database.price_parser import parse_prices
+from database.repository import Repository
 from embedding.embedder import Embedder
-from tools.time_tool import TimeTool
-from tools.web_scraper_tool import WebScraperTool
+from tools.content_pruner import CONTENT_PRUNER
+from tools.listing_chunks import DEFAULT_CHUNK_TOKENS, chunk_listing
+from tools.page_cache import CachedPage
+from tools.utils import aget_url_text, get_url_text
 
 logger = logging.getLogger(__name__)
 
+# Default number of chunks of one page extracted by concurrent model calls
+DEFAULT_MAX_CONCURRENCY = 4
+
 
 class ExtractedItem(BaseModel):
     """
@@ -51,73 +60,184 @@ class ExtractedData(BaseModel):
         description="List of extracted items", default_factory=list)
 
 
-class ItemExtractorAgent(ReActAgent):
+def merge_extracted_data(parts: list[ExtractedData], date_time: str) -> ExtractedData:
     """
-    Agent for extracting items from computer component store web pages using ReAct (Reasoning and Acting).
+    Merge the data extracted from the chunks of one page.
 
-    Uses a prompt template and LangGraph's tool-augmented reasoning to process incoming messages, extract search result
-    items, and maintain memory for each user thread.
+    The store name is taken from the first chunk naming it, items are kept in page order and an item code repeated
+    across chunks is kept once.
 
     Args:
-        link (str): The URL of the store page to extract items from.
-        model (BaseChatModel): The chat model for generating responses.
-        prompt_size (int, optional): Maximum number of messages to include in the prompt. Defaults to 50.
+        parts (list[ExtractedData]): Data extracted from the chunks, in page order.
+        date_time (str): Date and time of the extraction.
+
+    Returns:
+        ExtractedData: The merged data.
+    """
+    store_name = next((part.store_name for part in parts if part.store_name), "")
+    items: list[ExtractedItem] = []
+    seen: set[str] = set()
+    for part in parts:
+        for item in part.items:
+            if item.item_code and item.item_code in seen:
+                continue
+            seen.add(item.item_code)
+            items.append(item)
+    return ExtractedData(date_time=date_time, store_name=store_name, items=items)
+
+
+class ItemExtractorAgent:
     """
-    long_term_memory: AzureRepository
+    Agent for extracting items from computer component store web pages and storing them in long-term memory.
+
+    Store pages are fetched directly, pruned of store chrome, split into item-aligned chunks and the chunks extracted
+    by concurrent structured output calls of the model. The extracted items are ingested into long-term memory.
+
+    Args:
+        model (BaseChatModel): The chat model extracting the items.
+        long_term_memory (Repository): Repository holding the extracted items.
+        embedder (Embedder): Embedder of the item descriptions.
+        price_history (Repository | None, optional): Repository receiving a record for every new or changed price.
+            Defaults to None, which keeps no history.
+        chunk_tokens (int, optional): Token budget of the page text of one extraction call. Defaults to
+            DEFAULT_CHUNK_TOKENS.
+        max_concurrency (int, optional): Maximum number of concurrent extraction calls of one page. Defaults to
+            DEFAULT_MAX_CONCURRENCY.
+    """
+    long_term_memory: Repository
     embedder: Embedder
+    ingestor: ItemIngestor
+    chunk_extractor: Runnable
 
     def __init__(self,
                  model: BaseChatModel,
-                 long_term_memory: AzureRepository,
+                 long_term_memory: Repository,
                  embedder: Embedder,
-                 prompt_size: int = 50):
+                 price_history: Optional[Repository] = None,
+                 chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.model = model
         self.long_term_memory = long_term_memory
         self.embedder = embedder
-        prompt_template: ChatPromptTemplate = ChatPromptTemplate.from_messages(
+        self.ingestor = ItemIngestor(long_term_memory, embedder, price_history)
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        chunk_prompt: ChatPromptTemplate = ChatPromptTemplate.from_messages(
             [
                 SystemMessage(
                     content="""
-                    I will give you a link of a web page of computer components store.
-                    Access the link to obtain the web page data.
-                    The data consists of store menu, service information and search results.
-                    Extract the store name and search result items in a structured way, no other information is needed.
+                    I will give you a part of the search results of a computer components store web page.
+                    The first line is the title of the page.
+                    Extract the store name and every search result item in a structured way, no other information is needed.
                     """
                 ),
-                MessagesPlaceholder(variable_name="messages"),
+                ("human", "{page}"),
             ]
         )
-        super().__init__(model, [WebScraperTool(), TimeTool(
-        )], prompt_template, prompt_size, response_format=ExtractedData)
+        self.chunk_extractor = chunk_prompt | model.with_structured_output(ExtractedData)
 
-    def process_link(self, link: str,) -> ExtractedData:
+    def process_link(self, link: str, page: Optional[CachedPage] = None) -> ExtractedData:
         """
-        Process a message to extract items from the provided store page link.
+        Extract items from the provided store page link and store them in long-term memory.
 
         Args:
             link (str): The URL of the store page to extract items from.
+            page (CachedPage | None, optional): The page if it was already fetched. Defaults to None, which fetches
+                the link.
 
         Returns:
             ExtractedData: The extracted data including store name and items.
         """
-        messages = [HumanMessage(content=f"Extract items from the following store page: {link}")]
-        result_dict: dict[str, Any] = self.process_message(messages, user_id="default_user")
-        extracted_data: ExtractedData = result_dict['structured_response']
-        if extracted_data is not None:
-            logger.info("Extracted item count: %d", len(extracted_data.items))
-            # Store each extracted item in the Azure Cosmos DB
-            for item in extracted_data.items:
-                embedding = self.embedder.embed(item.description)
-                # Map ExtractedItem to the database item model
-                db_item: DatabaseExtractedItem = DatabaseExtractedItem(
-                    price=item.price,
-                    description=item.description,
-                    item_code=item.item_code,
-                    store_name=extracted_data.store_name,
-                    date_time=extracted_data.date_time,
-                    embedding=embedding
-                )
-                self.long_term_memory.create_item(db_item.to_dict())
+        date_time = datetime.now().isoformat()
+        text = CONTENT_PRUNER.prune(page.content, page.encoding).text if page is not None else get_url_text(link)
+        chunks = chunk_listing(text, self.chunk_tokens)
+        results = self.chunk_extractor.batch([{"page": chunk} for chunk in chunks], self._batch_config(),
+                                             return_exceptions=True)
+        return self._complete(link, chunks, results, date_time)
+
+    async def aprocess_link(self, link: str, page: Optional[CachedPage] = None) -> ExtractedData:
+        """
+        Asynchronously extract items from the provided store page link and store them in long-term memory.
+
+        Args:
+            link (str): The URL of the store page to extract items from.
+            page (CachedPage | None, optional): The page if it was already fetched. Defaults to None, which fetches
+                the link.
+
+        Returns:
+            ExtractedData: The extracted data including store name and items.
+        """
+        date_time = datetime.now().isoformat()
+        if page is not None:
+            text = (await asyncio.to_thread(CONTENT_PRUNER.prune, page.content, page.encoding)).text
         else:
-            logger.warning("No items were extracted from the provided link: %s", link)
+            text = await aget_url_text(link)
+        chunks = chunk_listing(text, self.chunk_tokens)
+        results = await self.chunk_extractor.abatch([{"page": chunk} for chunk in chunks], self._batch_config(),
+                                                    return_exceptions=True)
+        return await asyncio.to_thread(self._complete, link, chunks, results, date_time)
+
+    def _batch_config(self) -> RunnableConfig:
+        """
+        Return the configuration limiting the concurrent extraction calls.
+        """
+        return RunnableConfig(max_concurrency=self.max_concurrency)
+
+    def _complete(self, link: str, chunks: list[str], results: list, date_time: str) -> ExtractedData:
+        """
+        Merge the extraction results of the chunks of a page and ingest the items.
+
+        Failed chunks are logged and skipped, the error of the first one is raised if every chunk failed.
+        """
+        parts = [result for result in results if isinstance(result, ExtractedData)]
+        errors = [result for result in results if isinstance(result, Exception)]
+        for error in errors:
+            logger.warning("Extraction of a chunk of %s failed: %s", link, error)
+        if errors and not parts:
+            raise errors[0]
+        extracted_data = merge_extracted_data(parts, date_time)
+        logger.info("Extracted %d items from %d chunks of %s", len(extracted_data.items), len(chunks), link)
+        self.ingest(extracted_data)
         logger.info("Extraction completed for link: %s", link)
         return extracted_data
+
+    async def aingest(self, extracted_data: ExtractedData) -> None:
+        """
+        Asynchronously store the items extracted from a store page in long-term memory.
+
+        The repositories and the embedder are blocking, so the items are ingested on a worker thread.
+
+        Args:
+            extracted_data (ExtractedData): The extracted data including store name and items.
+        """
+        await asyncio.to_thread(self.ingest, extracted_data)
+
+    def ingest(self, extracted_data: ExtractedData) -> None:
+        """
+        Store the items extracted from a store page in long-term memory.
+
+        Used for the output of the LLM extraction and of the deterministic store parsers alike.
+
+        Args:
+            extracted_data (ExtractedData): The extracted data including store name and items.
+        """
+        logger.info("Extracted item count: %d", len(extracted_data.items))
+        # Normalize all prices of the page to minor units and currency in one pass
+        prices = parse_prices([item.price for item in extracted_data.items])
+        # Map each ExtractedItem to the database item model
+        db_items: list[DatabaseExtractedItem] = [
+            DatabaseExtractedItem(
+                price=item.price,
+                price_minor=price.minor if price else None,
+                currency=price.currency if price else None,
+                description=item.description,
+                item_code=item.item_code,
+                store_name=extracted_data.store_name,
+                date_time=extracted_data.date_time
+            )
+            for item, price in zip(extracted_data.items, prices)
+        ]
+        # Write only new and changed items, embedding only new and changed descriptions
+        ingestion_result = self.ingestor.ingest(db_items)
+        if ingestion_result.failed:
+            logger.warning("Failed %d writes storing %d extracted items", len(ingestion_result.failed), len(db_items))
@@ -9,15 +9,28 @@ import logging
 from typing import Optional
 from urllib.parse import quote
 
-from langchain_core.callbacks import (CallbackManagerForToolRun)
+from langchain_core.callbacks import (AsyncCallbackManagerForToolRun, CallbackManagerForToolRun)
 from langchain_core.tools import BaseTool
 from langchain_core.tools.base import ArgsSchema
 from pydantic import BaseModel, Field
-from tools.provider_tool_interface import ProviderToolInterface
+from tools.provider_tool_interface import DEFAULT_MAX_ITEMS, DEFAULT_MAX_PAGES, ProviderToolInterface
 from tools.item_extractor_agent import ItemExtractorAgent, ExtractedData
+from tools.provider_registry import register_provider
+from tools.store_parser import ParseRules, StoreParser
 
 logger = logging.getLogger(__name__)
 
+# Search result grid of the Links store, each item shows its code, title and current price
+LINKS_PARSER = StoreParser(ParseRules(
+    store_name="Links",
+    item_selector="div.product-item",
+    description_selector="h2.product-title a, .product-title",
+    price_selector="span.actual-price, span.price",
+    item_code_selector="div.sku, .product-sku"
+))
+# Items of one search result page, pages are crawled instead of requesting one huge page
+LINKS_PAGE_SIZE = 36
+
 class SearchSchema(BaseModel):
     """
     Pydantic model for input parameters for Links search.
@@ -26,23 +39,30 @@ class SearchSchema(BaseModel):
         query (str): Search query string.
         min_price (int): Minimum price filter.
         max_price (int): Maximum price filter.
+        max_pages (int): Maximum number of search result pages to crawl.
+        max_items (int): Maximum number of items to return.
     """
     query: str = Field(description="search query to look up")
     min_price: int = Field(default=0, description="minimum price filter")
     max_price: int = Field(default=10000, description="maximum price filter")
+    max_pages: int = Field(default=DEFAULT_MAX_PAGES, ge=1, description="maximum number of result pages")
+    max_items: int = Field(default=DEFAULT_MAX_ITEMS, ge=1, description="maximum number of items")
 
 
 
 
+@register_provider("links")
 class LinksTool(BaseTool, ProviderToolInterface):
     """
     LangChain-compatible tool for retrieving computer components from provider Links.
 
     Constructs a search URL using the provided query and price range, fetches the HTML page, and parses the
-    content to extract structured data using Pydantic models. Supports synchronous and asynchronous execution.
+    content to extract structured data using Pydantic models. The page is parsed with the CSS rules of LINKS_PARSER,
+    the LLM extractor is only used when the parse fails its confidence check. Search result pages of LINKS_PAGE_SIZE
+    items are crawled up to the page and item budgets. Supports synchronous and asynchronous execution.
 
     Example request format:
-        https://www.links.hr/hr/search?orderby=0&pagesize=100&viewmode=grid&q=intel%20procesor&price=0-23400
+        https://www.links.hr/hr/search?orderby=0&pagesize=36&viewmode=grid&q=intel%20procesor&price=0-23400&pagenumber=2
     """
 
     name: str = "links_tool"
@@ -59,7 +79,8 @@ class LinksTool(BaseTool, ProviderToolInterface):
         super().__init__(extractor_agent=extractor_agent)
 
 
-    def _run(self, query: str, min_price: int = 0, max_price: int = 10000, run_manager: Optional[CallbackManagerForToolRun] = None) -> ExtractedData:
+    def _run(self, query: str, min_price: int = 0, max_price: int = 10000, max_pages: int = DEFAULT_MAX_PAGES,
+             max_items: int = DEFAULT_MAX_ITEMS, run_manager: Optional[CallbackManagerForToolRun] = None) -> ExtractedData:
         """
         Retrieve computer components from provider Links and return structured data.
 
@@ -67,14 +88,62 @@ class LinksTool(BaseTool, ProviderToolInterface):
             query (str): Search query string.
             min_price (int): Minimum price filter.
             max_price (int): Maximum price filter.
+            max_pages (int): Maximum number of search result pages to crawl.
+            max_items (int): Maximum number of items to return.
             run_manager (Optional[CallbackManagerForToolRun]): Optional callback manager for tool run.
 
         Returns:
             ExtractedData: Structured data containing extracted items and metadata.
         """
         logger.info("Links tool called with query: %s, min_price: %d, max_price: %d", query, min_price, max_price)
-        url = f"https://www.links.hr/hr/search?orderby=0&pagesize=100&viewmode=grid&q={quote(query)}&price={min_price}-{max_price}"
-        return self.extractor_agent.process_link(url)
+        params = {"query": query, "min_price": min_price, "max_price": max_price}
+        return self.search(params, max_pages, max_items)
+
+    async def _arun(self, query: str, min_price: int = 0, max_price: int = 10000, max_pages: int = DEFAULT_MAX_PAGES,
+                    max_items: int = DEFAULT_MAX_ITEMS,
+                    run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> ExtractedData:
+        """
+        Asynchronously retrieve computer components from provider Links and return structured data.
+
+        Args:
+            query (str): Search query string.
+            min_price (int): Minimum price filter.
+            max_price (int): Maximum price filter.
+            max_pages (int): Maximum number of search result pages to crawl.
+            max_items (int): Maximum number of items to return.
+            run_manager (Optional[AsyncCallbackManagerForToolRun]): Optional callback manager for tool run.
+
+        Returns:
+            ExtractedData: Structured data containing extracted items and metadata.
+        """
+        logger.info("Links tool called with query: %s, min_price: %d, max_price: %d", query, min_price, max_price)
+        params = {"query": query, "min_price": min_price, "max_price": max_price}
+        return await self.asearch(params, max_pages, max_items)
+
+    def page_url(self, params: dict, page_number: int) -> str:
+        """
+        Return the URL of a Links search result page.
+
+        Args:
+            params (dict): The parameters containing the search query and price filters.
+            page_number (int): Number of the page, starting with 1.
+
+        Returns:
+            str: The URL of the page.
+        """
+        query = quote(params.get("query", ""))
+        price = f"{params.get('min_price', 0)}-{params.get('max_price', 10000)}"
+        return (f"https://www.links.hr/hr/search?orderby=0&pagesize={LINKS_PAGE_SIZE}&viewmode=grid&q={query}"
+                f"&price={price}&pagenumber={page_number}")
+
+    def get_parser(self) -> Optional[StoreParser]:
+        """
+        Return the parser of the Links search result pages.
+
+        Returns:
+            StoreParser | None: LINKS_PARSER.
+        """
+        return LINKS_PARSER
 
     def get_data(self, params: dict) -> ExtractedData:
         """
@@ -85,9 +154,25 @@ class LinksTool(BaseTool, ProviderToolInterface):
 
         Returns:
             ExtractedData: Structured data extracted from the web page.
+
+        Raises:
+            ValidationError: If the parameters are not valid search parameters.
+        """
+        search = SearchSchema.model_validate({"query": "", **params})
+        return self._run(**search.model_dump())
+
+    async def aget_data(self, params: dict) -> ExtractedData:
+        """
+        Asynchronously extract computer component data from the given parameters.
+
+        Args:
+            params (dict): The parameters containing the search query and price filters.
+
+        Returns:
+            ExtractedData: Structured data extracted from the web page.
+
+        Raises:
+            ValidationError: If the parameters are not valid search parameters.
         """
-        return self._run(
-            query=params.get("query", ""),
-            min_price=params.get("min_price", 0),
-            max_price=params.get("max_price", 10000)
-        )
\ No newline at end of file
+        search = SearchSchema.model_validate({"query": "", **params})
+        return await self._arun(**search.model_dump())
@@ -0,0 +1,74 @@
+"""
+Splitting of pruned listing text into item-aligned chunks for parallel extraction.
+
+A search page with a hundred results makes one huge prompt and one huge structured response, the slowest and least
+reliable model call. The pruned listing text shows each item as a few lines ending with its price, so the text is
+split after every run of price lines and the items are packed into chunks within a token budget. No item is cut in
+two, and every chunk can be extracted by its own model call.
+"""
+from embedding.azure_llm_embedder import estimate_tokens
+from tools.content_pruner import PRICE_PATTERN
+
+# Default token budget of the listing text of one chunk
+DEFAULT_CHUNK_TOKENS = 3000
+
+
+def split_items(lines: list[str]) -> list[list[str]]:
+    """
+    Split listing lines into item blocks, each ending with a run of price lines such as an old and a new price.
+
+    Lines after the last price form a block of their own.
+
+    Args:
+        lines (list[str]): Lines of the listing text.
+
+    Returns:
+        list[list[str]]: Item blocks in page order.
+    """
+    blocks: list[list[str]] = []
+    current: list[str] = []
+    for index, line in enumerate(lines):
+        current.append(line)
+        is_price = PRICE_PATTERN.search(line) is not None
+        next_is_price = index + 1 < len(lines) and PRICE_PATTERN.search(lines[index + 1]) is not None
+        if is_price and not next_is_price:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def chunk_listing(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> list[str]:
+    """
+    Pack the item blocks of a listing text into chunks of at most max_tokens estimated tokens.
+
+    The first line, the page title naming the store, starts every chunk. An item block larger than the budget forms
+    a chunk of its own.
+
+    Args:
+        text (str): Pruned listing text, the page title on the first line.
+        max_tokens (int, optional): Token budget of one chunk. Defaults to DEFAULT_CHUNK_TOKENS.
+
+    Returns:
+        list[str]: The chunks in page order, a single chunk if the text fits the budget.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    title, _, listing = text.partition("\n")
+    budget = max_tokens - estimate_tokens(title)
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for block in split_items(listing.splitlines()):
+        block_text = "\n".join(block)
+        tokens = estimate_tokens(block_text)
+        if current and current_tokens + tokens > budget:
+            chunks.append("\n".join([title, *current]))
+            current = []
+            current_tokens = 0
+        current.append(block_text)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join([title, *current]))
+    return chunks
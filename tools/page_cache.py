@@ -0,0 +1,365 @@
+"""
+On-disk cache of fetched store pages.
+
+The same search URLs are fetched on every agent turn and every provider call, although store pages change rarely.
+Pages are keyed by the normalized URL and kept zlib compressed in a SQLite file bounded by size, evicting the least
+recently used pages. Access times of hits are written in batches, not on every lookup. A page is served without a
+request while younger than the time to live of its domain. Older pages are revalidated with a conditional GET, so an
+unchanged page costs a 304 response instead of its body. With a stale-while-revalidate window, pages that expired
+within the window are served at once and revalidated in the background.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from enum import Enum
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Default time to live of cached pages in seconds
+DEFAULT_TTL = 300.0
+# Default size cap of the compressed pages on disk in bytes
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Number of page hits whose access time is kept in memory before it is written to the cache file
+ACCESS_FLUSH_BATCH = 256
+
+
+class Freshness(str, Enum):
+    """
+    State of a cached page relative to the time to live of its domain.
+    """
+    FRESH = "fresh"
+    STALE = "stale"
+    EXPIRED = "expired"
+
+
+class CachedPage(BaseModel):
+    """
+    A cached page with the validators needed to revalidate it.
+
+    Fields:
+        url (str): Normalized URL of the page.
+        content (bytes): Body of the page.
+        encoding (str | None): Character encoding declared by the response headers.
+        etag (str | None): ETag header of the response.
+        last_modified (str | None): Last-Modified header of the response.
+        fetched_at (float): Time of the last fetch or revalidation as a UNIX timestamp.
+    """
+    url: str
+    content: bytes
+    encoding: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float
+
+    def conditional_headers(self) -> dict[str, str]:
+        """
+        Return the headers of a conditional GET revalidating the page.
+
+        Returns:
+            dict[str, str]: If-None-Match and If-Modified-Since headers of the known validators.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCacheStats(BaseModel):
+    """
+    Snapshot of page cache counters.
+
+    Fields:
+        hits (int): Lookups served from the cache without a request.
+        stale_hits (int): Lookups served from the cache while the page was revalidated in the background.
+        revalidations (int): Conditional GETs answered with 304 Not Modified.
+        misses (int): Lookups that downloaded the page.
+        bytes_saved (int): Page bytes served from the cache instead of being downloaded.
+        evictions (int): Pages evicted to stay within the size cap.
+        entries (int): Current number of cached pages.
+        stored_bytes (int): Current size of the compressed pages.
+    """
+    hits: int = 0
+    stale_hits: int = 0
+    revalidations: int = 0
+    misses: int = 0
+    bytes_saved: int = 0
+    evictions: int = 0
+    entries: int = 0
+    stored_bytes: int = 0
+
+    @property
+    def lookups(self) -> int:
+        """Total number of lookups."""
+        return self.hits + self.stale_hits + self.revalidations + self.misses
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups that did not download the page body."""
+        return (self.lookups - self.misses) / self.lookups if self.lookups else 0.0
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that equivalent URLs map to the same cache entry.
+
+    The scheme and host are lowercased, default ports and fragments dropped and query parameters sorted.
+
+    Args:
+        url (str): The URL to normalize.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host if parts.port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+class PageCache:
+    """
+    Size-bounded on-disk cache of pages with per-domain time to live.
+
+    Args:
+        path (str | None, optional): Path of the SQLite cache file. If None the cache is kept in memory.
+        default_ttl (float, optional): Seconds a page is served without revalidation. Defaults to DEFAULT_TTL.
+        domain_ttls (dict[str, float] | None, optional): Time to live by domain, applying to its subdomains too.
+        max_bytes (int, optional): Size cap of the compressed pages. Defaults to DEFAULT_MAX_BYTES.
+        stale_while_revalidate (float, optional): Seconds after expiry during which a page is served while it is
+            revalidated in the background. Defaults to 0, which revalidates before serving.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 default_ttl: float = DEFAULT_TTL,
+                 domain_ttls: Optional[dict[str, float]] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 stale_while_revalidate: float = 0.0):
+        self.default_ttl = default_ttl
+        self.domain_ttls = {domain.lower().lstrip("."): ttl for domain, ttl in (domain_ttls or {}).items()}
+        self.max_bytes = max_bytes
+        self.stale_while_revalidate = stale_while_revalidate
+        self._lock = threading.Lock()
+        self._stats = PageCacheStats()
+        # Access times of hits not yet written to the cache file, by normalized URL
+        self._accessed: dict[str, float] = {}
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._connection: Optional[sqlite3.Connection] = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, content BLOB NOT NULL, encoding TEXT, etag TEXT, "
+            "last_modified TEXT, fetched_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._connection.commit()
+        self._stats.entries, self._stats.stored_bytes = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM pages").fetchone()
+
+    def ttl(self, url: str) -> float:
+        """
+        Return the time to live of a page, the TTL of the most specific configured domain of its host.
+
+        Args:
+            url (str): URL of the page.
+
+        Returns:
+            float: Time to live in seconds.
+        """
+        host = (urlsplit(url).hostname or "").lower()
+        while host:
+            if host in self.domain_ttls:
+                return self.domain_ttls[host]
+            host = host.partition(".")[2]
+        return self.default_ttl
+
+    def lookup(self, url: str, now: Optional[float] = None) -> tuple[Optional[CachedPage], Freshness]:
+        """
+        Look up a page and count fresh and stale hits.
+
+        Args:
+            url (str): URL of the page.
+            now (float | None, optional): Current UNIX time. Defaults to time.time().
+
+        Returns:
+            tuple[CachedPage | None, Freshness]: The cached page, None if it is not cached, and whether it can be
+            served as is, served while revalidated, or has to be revalidated first.
+        """
+        now = now or time.time()
+        key = normalize_url(url)
+        with self._lock:
+            if self._connection is None:
+                return None, Freshness.EXPIRED
+            row = self._connection.execute(
+                "SELECT content, encoding, etag, last_modified, fetched_at FROM pages WHERE url = ?", (key,)).fetchone()
+            if row is None:
+                return None, Freshness.EXPIRED
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_BATCH:
+                self._flush_access()
+                self._connection.commit()
+            page = CachedPage(url=key, content=zlib.decompress(row[0]), encoding=row[1], etag=row[2],
+                              last_modified=row[3], fetched_at=row[4])
+            age = now - page.fetched_at
+            ttl = self.ttl(key)
+            if age < ttl:
+                freshness = Freshness.FRESH
+                self._stats.hits += 1
+            elif age < ttl + self.stale_while_revalidate:
+                freshness = Freshness.STALE
+                self._stats.stale_hits += 1
+            else:
+                return page, Freshness.EXPIRED
+            self._stats.bytes_saved += len(page.content)
+            return page, freshness
+
+    def store(self, url: str, response: httpx.Response, page: Optional[CachedPage] = None,
+              now: Optional[float] = None) -> CachedPage:
+        """
+        Store the response of a GET, or renew the cached page if the response is 304 Not Modified.
+
+        Responses other than 200 OK and responses marked no-store are counted but not cached.
+
+        Args:
+            url (str): URL of the page.
+            response (httpx.Response): The response of the GET, with its body read.
+            page (CachedPage | None, optional): The cached page the GET revalidated. Defaults to None.
+            now (float | None, optional): Current UNIX time. Defaults to time.time().
+
+        Returns:
+            CachedPage: The page to serve.
+        """
+        now = now or time.time()
+        key = normalize_url(url)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 304 and page is not None:
+            page = page.model_copy(update={"etag": etag or page.etag, "last_modified": last_modified or page.last_modified,
+                                           "fetched_at": now})
+            with self._lock:
+                self._stats.revalidations += 1
+                self._stats.bytes_saved += len(page.content)
+                if self._connection is not None:
+                    self._connection.execute(
+                        "UPDATE pages SET etag = ?, last_modified = ?, fetched_at = ?, last_access = ? WHERE url = ?",
+                        (page.etag, page.last_modified, now, now, key))
+                    self._connection.commit()
+            return page
+        page = CachedPage(url=key, content=response.content, encoding=response.charset_encoding, etag=etag,
+                          last_modified=last_modified, fetched_at=now)
+        cacheable = response.status_code == 200 and "no-store" not in response.headers.get("Cache-Control", "")
+        with self._lock:
+            self._stats.misses += 1
+            if cacheable and self._connection is not None:
+                self._insert(page, now)
+        return page
+
+    def stats(self) -> PageCacheStats:
+        """
+        Return a snapshot of the cache counters.
+
+        Returns:
+            PageCacheStats: Current hit, revalidation, miss, eviction and size counters.
+        """
+        with self._lock:
+            return self._stats.model_copy()
+
+    def render_prometheus(self) -> str:
+        """
+        Render the cache counters in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text.
+        """
+        stats = self.stats()
+        lines = ["# HELP page_cache_lookups_total Page cache lookups by result.", "# TYPE page_cache_lookups_total counter"]
+        for result, count in (("hit", stats.hits), ("stale", stats.stale_hits), ("revalidated", stats.revalidations),
+                              ("miss", stats.misses)):
+            lines.append(f'page_cache_lookups_total{{result="{result}"}} {count}')
+        for name, kind, help_text, value in (
+                ("page_cache_bytes_saved_total", "counter", "Page bytes served from the cache.", stats.bytes_saved),
+                ("page_cache_evictions_total", "counter", "Pages evicted to stay within the size cap.", stats.evictions),
+                ("page_cache_hit_ratio", "gauge", "Fraction of lookups that did not download the page.", stats.hit_ratio),
+                ("page_cache_entries", "gauge", "Cached pages.", stats.entries),
+                ("page_cache_stored_bytes", "gauge", "Size of the compressed cached pages.", stats.stored_bytes)):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """
+        Remove all cached pages. Counters are kept.
+        """
+        with self._lock:
+            self._accessed.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM pages")
+                self._connection.commit()
+            self._stats.entries = 0
+            self._stats.stored_bytes = 0
+
+    def close(self) -> None:
+        """
+        Write the pending access times and close the cache file.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._flush_access()
+                self._connection.commit()
+                self._connection.close()
+                self._connection = None
+
+    def _flush_access(self) -> None:
+        """
+        Write the pending access times of hits, without committing. Caller holds the lock.
+        """
+        if self._accessed:
+            self._connection.executemany("UPDATE pages SET last_access = ? WHERE url = ?",
+                                         [(accessed, url) for url, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def _insert(self, page: CachedPage, now: float) -> None:
+        """
+        Insert or replace a page and evict the least recently used pages above the size cap. Caller holds the lock.
+        """
+        compressed = zlib.compress(page.content)
+        # Eviction orders by access time, so the recent hits are written first
+        self._accessed.pop(page.url, None)
+        self._flush_access()
+        previous = self._connection.execute("SELECT LENGTH(content) FROM pages WHERE url = ?", (page.url,)).fetchone()
+        if previous is not None:
+            self._stats.entries -= 1
+            self._stats.stored_bytes -= previous[0]
+        self._connection.execute(
+            "INSERT OR REPLACE INTO pages (url, content, encoding, etag, last_modified, fetched_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (page.url, compressed, page.encoding, page.etag, page.last_modified, now, now))
+        self._stats.entries += 1
+        self._stats.stored_bytes += len(compressed)
+        if self._stats.stored_bytes > self.max_bytes:
+            evicted = 0
+            for url, size in self._connection.execute(
+                    "SELECT url, LENGTH(content) FROM pages WHERE url != ? ORDER BY last_access", (page.url,)).fetchall():
+                if self._stats.stored_bytes <= self.max_bytes:
+                    break
+                self._connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._stats.stored_bytes -= size
+                self._stats.entries -= 1
+                evicted += 1
+            self._stats.evictions += evicted
+            logger.debug("Evicted %d pages from the page cache", evicted)
+        self._connection.commit()
@@ -0,0 +1,357 @@
+"""
+Process-wide fetching of store pages over pooled keep-alive HTTP connections.
+
+Every scrape used to build its own loader and session, paying DNS resolution, TCP and TLS setup again against the
+same few store hosts. PageFetcher keeps one httpx client per process, and one async client per event loop, whose
+connections are reused across requests. Every request is admitted by the per-domain rate, concurrency and queue
+limits of a FetchScheduler, see tools/fetch_scheduler.py, responses are transferred compressed and HTTP/2 is
+negotiated when the h2 package is installed. With a PageCache pages are served
+from disk and revalidated with conditional GETs, see tools/page_cache.py.
+"""
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+from tools.fetch_scheduler import FetchScheduler, Priority
+from tools.page_cache import CachedPage, Freshness, PageCache
+from tools.page_fetcher_model import FetchSettings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+
+def html_to_text(content: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Return the text of an HTML document without markup.
+
+    Args:
+        content (bytes): The HTML document.
+        encoding (str | None, optional): Encoding declared by the response headers. Defaults to None, which detects
+            the encoding from the document.
+
+    Returns:
+        str: The text content of the document.
+    """
+    return BeautifulSoup(content, "html.parser", from_encoding=encoding).get_text()
+
+
+def _check_status(response: httpx.Response) -> httpx.Response:
+    """
+    Raise for error responses, so that error pages of a throttled or failing store never reach the extraction.
+
+    304 Not Modified answers the conditional GETs of cached pages and is returned like a successful response.
+    """
+    if response.status_code != httpx.codes.NOT_MODIFIED:
+        response.raise_for_status()
+    return response
+
+
+class PageFetcher:
+    """
+    Fetches web pages over a shared pool of keep-alive connections.
+
+    Args:
+        settings (FetchSettings | None, optional): Pool, protocol and timeout settings. Defaults to FetchSettings().
+        transport (httpx.BaseTransport | None, optional): Transport of the synchronous client, used by tests.
+        async_transport (httpx.AsyncBaseTransport | None, optional): Transport of the async clients, used by tests.
+        cache (PageCache | None, optional): Cache of the fetched pages. Defaults to None, which fetches every page.
+    """
+
+    def __init__(self, settings: Optional[FetchSettings] = None,
+                 transport: Optional[httpx.BaseTransport] = None,
+                 async_transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[PageCache] = None):
+        self.settings = settings or FetchSettings()
+        self.cache = cache
+        self.http2 = self.settings.http2 and importlib.util.find_spec("h2") is not None
+        if self.settings.http2 and not self.http2:
+            logger.info("The h2 package is not installed, pages are fetched over HTTP/1.1")
+        self._transport = transport
+        self._async_transport = async_transport
+        self._client: Optional[httpx.Client] = None
+        self._loop_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = \
+            weakref.WeakKeyDictionary()
+        self.scheduler = FetchScheduler(self.settings)
+        self._lock = threading.Lock()
+        # Background revalidations of stale pages, by normalized URL
+        self._revalidating: set[str] = set()
+        self._revalidation_executor: Optional[ThreadPoolExecutor] = None
+        self._revalidation_tasks: set[asyncio.Task] = set()
+
+    def _client_options(self) -> dict:
+        """
+        Return the options shared by the synchronous and async clients.
+        """
+        return {
+            "headers": {**DEFAULT_HEADERS, "User-Agent": self.settings.user_agent},
+            "timeout": httpx.Timeout(self.settings.read_timeout, connect=self.settings.connect_timeout,
+                                     pool=self.settings.pool_timeout),
+            "limits": httpx.Limits(max_connections=self.settings.max_connections,
+                                   max_keepalive_connections=self.settings.max_connections,
+                                   keepalive_expiry=self.settings.keepalive_expiry),
+            "http2": self.http2,
+            "follow_redirects": True,
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        """The synchronous client, created on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(transport=self._transport, **self._client_options())
+            return self._client
+
+    def _loop_client(self) -> httpx.AsyncClient:
+        """
+        Return the async client of the running event loop, created on first use.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._loop_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(transport=self._async_transport, **self._client_options())
+            self._loop_clients[loop] = client
+        return client
+
+    def fetch(self, url: str, headers: Optional[dict[str, str]] = None,
+              priority: Priority = Priority.INTERACTIVE) -> httpx.Response:
+        """
+        Fetch a page when the scheduler admits it, following redirects.
+
+        Args:
+            url (str): The URL of the page.
+            headers (dict[str, str] | None, optional): Additional request headers. Defaults to None.
+            priority (Priority, optional): Priority of the request. Defaults to Priority.INTERACTIVE.
+
+        Returns:
+            httpx.Response: The response with its body read, successful or 304 Not Modified.
+
+        Raises:
+            httpx.HTTPError: If the request fails, times out or is answered with an error status.
+            FetchRejectedError: If the queue of the domain is full or the request waited too long for its turn.
+        """
+        with self.scheduler.slot(url, priority):
+            return _check_status(self.client.get(url, headers=headers))
+
+    async def afetch(self, url: str, headers: Optional[dict[str, str]] = None,
+                     priority: Priority = Priority.INTERACTIVE) -> httpx.Response:
+        """
+        Asynchronously fetch a page when the scheduler admits it, following redirects.
+
+        Args:
+            url (str): The URL of the page.
+            headers (dict[str, str] | None, optional): Additional request headers. Defaults to None.
+            priority (Priority, optional): Priority of the request. Defaults to Priority.INTERACTIVE.
+
+        Returns:
+            httpx.Response: The response with its body read, successful or 304 Not Modified.
+
+        Raises:
+            httpx.HTTPError: If the request fails, times out or is answered with an error status.
+            FetchRejectedError: If the queue of the domain is full or the request waited too long for its turn.
+        """
+        client = self._loop_client()
+        async with self.scheduler.aslot(url, priority):
+            return _check_status(await client.get(url, headers=headers))
+
+    def get_page(self, url: str, priority: Priority = Priority.INTERACTIVE) -> CachedPage:
+        """
+        Fetch a page, or serve it from the cache.
+
+        Args:
+            url (str): The URL of the page.
+            priority (Priority, optional): Priority of the request. Defaults to Priority.INTERACTIVE.
+
+        Returns:
+            CachedPage: The body and encoding of the page.
+        """
+        if self.cache is None:
+            response = self.fetch(url, priority=priority)
+            return CachedPage(url=url, content=response.content, encoding=response.charset_encoding,
+                              fetched_at=time.time())
+        page, freshness = self.cache.lookup(url)
+        if page is None or freshness == Freshness.EXPIRED:
+            page = self._revalidate(url, page, priority)
+        elif freshness == Freshness.STALE and self._start_revalidation(page):
+            with self._lock:
+                if self._revalidation_executor is None:
+                    self._revalidation_executor = ThreadPoolExecutor(max_workers=2,
+                                                                     thread_name_prefix="page-revalidation")
+                self._revalidation_executor.submit(self._revalidate_in_background, url, page)
+        return page
+
+    async def aget_page(self, url: str, priority: Priority = Priority.INTERACTIVE) -> CachedPage:
+        """
+        Asynchronously fetch a page, or serve it from the cache.
+
+        Args:
+            url (str): The URL of the page.
+            priority (Priority, optional): Priority of the request. Defaults to Priority.INTERACTIVE.
+
+        Returns:
+            CachedPage: The body and encoding of the page.
+        """
+        if self.cache is None:
+            response = await self.afetch(url, priority=priority)
+            return CachedPage(url=url, content=response.content, encoding=response.charset_encoding,
+                              fetched_at=time.time())
+        # The cache reads, decompresses and writes its SQLite file, which would block the event loop
+        page, freshness = await asyncio.to_thread(self.cache.lookup, url)
+        if page is None or freshness == Freshness.EXPIRED:
+            page = await self._arevalidate(url, page, priority)
+        elif freshness == Freshness.STALE and self._start_revalidation(page):
+            task = asyncio.create_task(self._arevalidate_in_background(url, page))
+            self._revalidation_tasks.add(task)
+            task.add_done_callback(self._revalidation_tasks.discard)
+        return page
+
+    def get_text(self, url: str) -> str:
+        """
+        Fetch a page, or serve it from the cache, and return its text without markup.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            str: The text content of the page.
+        """
+        page = self.get_page(url)
+        return html_to_text(page.content, page.encoding)
+
+    async def aget_text(self, url: str) -> str:
+        """
+        Asynchronously fetch a page, or serve it from the cache, and return its text without markup.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            str: The text content of the page.
+        """
+        page = await self.aget_page(url)
+        return html_to_text(page.content, page.encoding)
+
+    def _revalidate(self, url: str, page: Optional[CachedPage], priority: Priority) -> CachedPage:
+        """
+        Fetch a page with a conditional GET if it is cached and store the response.
+        """
+        response = self.fetch(url, page.conditional_headers() if page else None, priority)
+        return self.cache.store(url, response, page)
+
+    async def _arevalidate(self, url: str, page: Optional[CachedPage], priority: Priority) -> CachedPage:
+        """
+        Asynchronously fetch a page with a conditional GET if it is cached and store the response.
+        """
+        response = await self.afetch(url, page.conditional_headers() if page else None, priority)
+        return await asyncio.to_thread(self.cache.store, url, response, page)
+
+    def _start_revalidation(self, page: CachedPage) -> bool:
+        """
+        Mark a stale page as being revalidated, False if a revalidation is already running.
+        """
+        with self._lock:
+            if page.url in self._revalidating:
+                return False
+            self._revalidating.add(page.url)
+            return True
+
+    def _revalidate_in_background(self, url: str, page: CachedPage) -> None:
+        """
+        Revalidate a stale page served from the cache at background priority, logging failures.
+        """
+        try:
+            self._revalidate(url, page, Priority.BACKGROUND)
+        except Exception as e:
+            logger.warning("Background revalidation of %s failed: %s", url, e)
+        finally:
+            with self._lock:
+                self._revalidating.discard(page.url)
+
+    async def _arevalidate_in_background(self, url: str, page: CachedPage) -> None:
+        """
+        Asynchronously revalidate a stale page served from the cache at background priority, logging failures.
+        """
+        try:
+            await self._arevalidate(url, page, Priority.BACKGROUND)
+        except Exception as e:
+            logger.warning("Background revalidation of %s failed: %s", url, e)
+        finally:
+            with self._lock:
+                self._revalidating.discard(page.url)
+
+    def close(self) -> None:
+        """
+        Wait for running background revalidations, then close the connections of the synchronous client and the
+        cache.
+        """
+        with self._lock:
+            executor, self._revalidation_executor = self._revalidation_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    async def aclose(self) -> None:
+        """
+        Close the connections of both the synchronous client and the async client of the running event loop, after
+        cancelling the background revalidations of the loop.
+        """
+        for task in list(self._revalidation_tasks):
+            task.cancel()
+        await asyncio.gather(*self._revalidation_tasks, return_exceptions=True)
+        self.close()
+        client = self._loop_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_page_fetcher: Optional[PageFetcher] = None
+_page_fetcher_lock = threading.Lock()
+
+
+def get_page_fetcher() -> PageFetcher:
+    """
+    Return the process-wide page fetcher, created with default settings on first use.
+
+    Returns:
+        PageFetcher: The shared page fetcher.
+    """
+    global _page_fetcher
+    with _page_fetcher_lock:
+        if _page_fetcher is None:
+            _page_fetcher = PageFetcher()
+        return _page_fetcher
+
+
+def configure_page_fetcher(settings: FetchSettings, cache: Optional[PageCache] = None) -> PageFetcher:
+    """
+    Replace the process-wide page fetcher with one using the given settings and close the previous one.
+
+    Args:
+        settings (FetchSettings): Pool, protocol and timeout settings.
+        cache (PageCache | None, optional): Cache of the fetched pages. Defaults to None, which fetches every page.
+
+    Returns:
+        PageFetcher: The new shared page fetcher.
+    """
+    global _page_fetcher
+    with _page_fetcher_lock:
+        previous, _page_fetcher = _page_fetcher, PageFetcher(settings, cache=cache)
+    if previous is not None:
+        previous.close()
+    return _page_fetcher
@@ -0,0 +1,77 @@
+"""
+Pydantic models configuring the shared HTTP client used to fetch store pages and the per-domain limits of its fetch
+scheduler.
+"""
+from pydantic import BaseModel, Field
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+class DomainLimits(BaseModel):
+    """
+    Rate, concurrency and queue limits of the requests to one store domain.
+
+    Fields:
+        rate (float): Requests per second refilling the token bucket of the domain.
+        burst (int): Capacity of the token bucket, the requests that may start at once after an idle period.
+        max_concurrency (int): Requests in flight to the domain.
+        max_queue (int): Requests waiting for the domain, further requests are rejected.
+    """
+    rate: float = Field(description="Requests per second", default=4.0, gt=0)
+    burst: int = Field(description="Token bucket capacity", default=8, gt=0)
+    max_concurrency: int = Field(description="Requests in flight to the domain", default=4, gt=0)
+    max_queue: int = Field(description="Requests waiting for the domain", default=100, gt=0)
+
+
+class FetchSettings(BaseModel):
+    """
+    Connection pool, protocol and timeout settings of the page fetcher.
+
+    Fields:
+        connect_timeout (float): Seconds to wait for a connection, including the TLS handshake.
+        read_timeout (float): Seconds to wait for a chunk of the response.
+        pool_timeout (float): Seconds to wait for a free connection of the pool.
+        max_connections (int): Connections open to all hosts together.
+        max_connections_per_host (int): Requests in flight to a single host without domain limits.
+        requests_per_second_per_host (float): Request rate of a host without domain limits.
+        burst_per_host (int): Token bucket capacity of a host without domain limits.
+        max_queue_per_host (int): Requests waiting for a host without domain limits.
+        queue_timeout (float): Seconds a request waits for its turn before it is abandoned.
+        domain_limits (dict[str, DomainLimits]): Limits by domain, applied to the domain and its subdomains.
+        keepalive_expiry (float): Seconds an idle connection is kept open for reuse.
+        http2 (bool): Negotiate HTTP/2 with servers supporting it, requires the h2 package.
+        user_agent (str): User-Agent header sent with every request.
+    """
+    connect_timeout: float = Field(description="Connection timeout in seconds", default=5.0, gt=0)
+    read_timeout: float = Field(description="Read timeout in seconds", default=20.0, gt=0)
+    pool_timeout: float = Field(description="Timeout waiting for a pooled connection in seconds", default=30.0, gt=0)
+    max_connections: int = Field(description="Connections open to all hosts", default=20, gt=0)
+    max_connections_per_host: int = Field(description="Requests in flight to a single host", default=4, gt=0)
+    requests_per_second_per_host: float = Field(description="Request rate of a single host", default=4.0, gt=0)
+    burst_per_host: int = Field(description="Token bucket capacity of a single host", default=8, gt=0)
+    max_queue_per_host: int = Field(description="Requests waiting for a single host", default=100, gt=0)
+    queue_timeout: float = Field(description="Seconds a request waits for its turn", default=30.0, gt=0)
+    domain_limits: dict[str, DomainLimits] = Field(description="Limits by domain", default_factory=dict)
+    keepalive_expiry: float = Field(description="Idle time before a kept-alive connection is closed", default=60.0,
+                                    ge=0)
+    http2: bool = Field(description="Negotiate HTTP/2 where the server supports it", default=True)
+    user_agent: str = Field(description="User-Agent header of the requests", default=DEFAULT_USER_AGENT)
+
+    def limits_for(self, host: str) -> tuple[str, DomainLimits]:
+        """
+        Return the limits of a host, those of its most specific configured domain or the per-host defaults.
+
+        Args:
+            host (str): Host name of the request.
+
+        Returns:
+            tuple[str, DomainLimits]: The configured domain, or the host itself, and its limits.
+        """
+        domain = host.lower()
+        while domain:
+            if domain in self.domain_limits:
+                return domain, self.domain_limits[domain]
+            domain = domain.partition(".")[2]
+        return host.lower(), DomainLimits(rate=self.requests_per_second_per_host, burst=self.burst_per_host,
+                                          max_concurrency=self.max_connections_per_host,
+                                          max_queue=self.max_queue_per_host)
@@ -8,36 +8,56 @@ text extracted from the HTML response.
 import logging
 from typing import Optional
 
-from langchain_core.callbacks import (CallbackManagerForToolRun)
+from langchain_core.callbacks import (AsyncCallbackManagerForToolRun, CallbackManagerForToolRun)
 from langchain_core.tools import BaseTool
 from langchain_core.tools.base import ArgsSchema
 from pydantic import BaseModel, Field
 
 from tools.item_extractor_agent import ExtractedData, ItemExtractorAgent
-from tools.provider_tool_interface import ProviderToolInterface
+from tools.provider_tool_interface import DEFAULT_MAX_ITEMS, DEFAULT_MAX_PAGES, ProviderToolInterface
+from tools.provider_registry import register_provider
+from tools.store_parser import ParseRules, StoreParser
 
 logger = logging.getLogger(__name__)
 
+# Search result list of the Protis store, the item code follows a "Šifra:" label
+PROTIS_PARSER = StoreParser(ParseRules(
+    store_name="Protis",
+    item_selector="div.product-item",
+    description_selector=".product-name a, .product-name",
+    price_selector=".product-price .price, .product-price",
+    item_code_selector=".product-code",
+    item_code_pattern=r"([\w./-]+)\s*$"
+))
+
 class SearchSchema(BaseModel):
     """
     Pydantic model for input parameters for Protis search.
 
     Attributes:
         query (str): Search query string.
+        max_pages (int): Maximum number of search result pages to crawl.
+        max_items (int): Maximum number of items to return.
     """
     query: str = Field(description="search query to look up")
+    max_pages: int = Field(default=DEFAULT_MAX_PAGES, ge=1, description="maximum number of result pages")
+    max_items: int = Field(default=DEFAULT_MAX_ITEMS, ge=1, description="maximum number of items")
 
 
 
+@register_provider("protis")
 class ProtisTool(BaseTool, ProviderToolInterface):
     """
     LangChain-compatible tool for retrieving unstructured computer components from provider Protis.
 
     Constructs a search URL using the provided query, fetches the HTML page, and parses the
-    content to extract unstructured text. Supports synchronous and asynchronous execution.
+    content to extract unstructured text. The page is parsed with the CSS rules of PROTIS_PARSER, the LLM extractor
+    is only used when the parse fails its confidence check. Search result pages are crawled up to the page and item
+    budgets. Supports synchronous and asynchronous execution.
 
     Example request format:
         https://www.protis.hr/products/search?exp=cpu+intel+1400
+        https://www.protis.hr/products/search?exp=cpu+intel+1400&page=2
     """
 
     name: str = "protis_tool"
@@ -53,20 +73,62 @@ class ProtisTool(BaseTool, ProviderToolInterface):
         """
         super().__init__(extractor_agent=extractor_agent)
 
-    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> ExtractedData:
+    def _run(self, query: str, max_pages: int = DEFAULT_MAX_PAGES, max_items: int = DEFAULT_MAX_ITEMS,
+             run_manager: Optional[CallbackManagerForToolRun] = None) -> ExtractedData:
         """
         Retrieve unstructured computer components from provider Protis and return extracted data.
 
         Args:
             query (str): Search query string.
+            max_pages (int): Maximum number of search result pages to crawl.
+            max_items (int): Maximum number of items to return.
             run_manager (Optional[CallbackManagerForToolRun]): Optional callback manager for tool run.
 
         Returns:
             ExtractedData: Unstructured computer components from provider Protis as plain text and metadata.
         """
         logger.info("Protis tool called with query: %s", query)
-        url = f"https://www.protis.hr/products/search?exp={query.replace(' ', '+')}"
-        return self.extractor_agent.process_link(url)
+        return self.search({"query": query}, max_pages, max_items)
+
+    async def _arun(self, query: str, max_pages: int = DEFAULT_MAX_PAGES, max_items: int = DEFAULT_MAX_ITEMS,
+                    run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> ExtractedData:
+        """
+        Asynchronously retrieve unstructured computer components from provider Protis and return extracted data.
+
+        Args:
+            query (str): Search query string.
+            max_pages (int): Maximum number of search result pages to crawl.
+            max_items (int): Maximum number of items to return.
+            run_manager (Optional[AsyncCallbackManagerForToolRun]): Optional callback manager for tool run.
+
+        Returns:
+            ExtractedData: Unstructured computer components from provider Protis as plain text and metadata.
+        """
+        logger.info("Protis tool called with query: %s", query)
+        return await self.asearch({"query": query}, max_pages, max_items)
+
+    def page_url(self, params: dict, page_number: int) -> str:
+        """
+        Return the URL of a Protis search result page.
+
+        Args:
+            params (dict): The parameters containing the search query.
+            page_number (int): Number of the page, starting with 1.
+
+        Returns:
+            str: The URL of the page.
+        """
+        url = f"https://www.protis.hr/products/search?exp={params.get('query', '').replace(' ', '+')}"
+        return url if page_number == 1 else f"{url}&page={page_number}"
+
+    def get_parser(self) -> Optional[StoreParser]:
+        """
+        Return the parser of the Protis search result pages.
+
+        Returns:
+            StoreParser | None: PROTIS_PARSER.
+        """
+        return PROTIS_PARSER
 
     def get_data(self, params: dict) -> ExtractedData:
         """
@@ -77,7 +139,25 @@ class ProtisTool(BaseTool, ProviderToolInterface):
 
         Returns:
             ExtractedData: Structured data extracted from the web page.
+
+        Raises:
+            ValidationError: If the parameters are not valid search parameters.
+        """
+        search = SearchSchema.model_validate({"query": "", **params})
+        return self._run(**search.model_dump())
+
+    async def aget_data(self, params: dict) -> ExtractedData:
+        """
+        Asynchronously extract computer component data from the given parameters.
+
+        Args:
+            params (dict): The parameters containing the search query.
+
+        Returns:
+            ExtractedData: Structured data extracted from the web page.
+
+        Raises:
+            ValidationError: If the parameters are not valid search parameters.
         """
-        return self._run(
-            query=params.get("query", "")
-        )
\ No newline at end of file
+        search = SearchSchema.model_validate({"query": "", **params})
+        return await self._arun(**search.model_dump())
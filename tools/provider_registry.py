@@ -0,0 +1,134 @@
+"""
+Registry of the provider tools and cache of their instances.
+
+Provider tool classes register themselves with the register_provider decorator. Their modules are listed in
+PROVIDER_MODULES, or published by installed packages under the ENTRY_POINT_GROUP entry point group, and are imported
+on the first lookup rather than with the tools package. The ProviderRegistry builds the item extractor agent with
+its structured output chain and ingestor, and one instance of every provider tool once per configuration, so that
+requests share them instead of building them again until the configuration changes.
+"""
+import importlib
+import logging
+import threading
+from importlib.metadata import entry_points
+from typing import Callable, Hashable, Optional
+
+from tools.item_extractor_agent import ItemExtractorAgent
+from tools.provider_tool_interface import ProviderToolInterface
+
+logger = logging.getLogger(__name__)
+
+# Modules of the provider tools of this repository, imported on first lookup
+PROVIDER_MODULES = ("tools.links_tool", "tools.protis_tool")
+# Entry point group of provider tools of installed packages
+ENTRY_POINT_GROUP = "pcbuilder.providers"
+
+_providers: dict[str, type[ProviderToolInterface]] = {}
+_providers_lock = threading.RLock()
+_providers_loaded = False
+
+
+def register_provider(name: str) -> Callable[[type[ProviderToolInterface]], type[ProviderToolInterface]]:
+    """
+    Decorate a provider tool class to register it under a name.
+
+    Args:
+        name (str): Name of the provider.
+
+    Returns:
+        Callable: The class decorator.
+
+    Raises:
+        ValueError: If another class is registered under the name.
+    """
+    def decorator(cls: type[ProviderToolInterface]) -> type[ProviderToolInterface]:
+        with _providers_lock:
+            registered = _providers.get(name)
+            if registered is not None and registered.__qualname__ != cls.__qualname__:
+                raise ValueError(f"Provider {name} is already registered by {registered.__qualname__}")
+            _providers[name] = cls
+        return cls
+    return decorator
+
+
+def provider_classes() -> dict[str, type[ProviderToolInterface]]:
+    """
+    Return the registered provider tool classes, importing the provider modules and entry points on first use.
+
+    Returns:
+        dict[str, type[ProviderToolInterface]]: The provider tool classes by name, in registration order.
+    """
+    global _providers_loaded
+    with _providers_lock:
+        if not _providers_loaded:
+            for module in PROVIDER_MODULES:
+                importlib.import_module(module)
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+                try:
+                    register_provider(entry_point.name)(entry_point.load())
+                except Exception as e:
+                    logger.error("Loading provider %s failed: %s", entry_point.name, e)
+            _providers_loaded = True
+        return dict(_providers)
+
+
+class ProviderRegistry:
+    """
+    Cache of the item extractor agent and provider tool instances of the current configuration.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[Hashable] = None
+        self._agent: Optional[ItemExtractorAgent] = None
+        self._tools: list[ProviderToolInterface] = []
+
+    def agent(self, key: Hashable, create_agent: Callable[[], ItemExtractorAgent]) -> ItemExtractorAgent:
+        """
+        Return the item extractor agent of a configuration, created on first use or when the configuration changed.
+
+        Args:
+            key (Hashable): Key of the configuration the agent is built from.
+            create_agent (Callable[[], ItemExtractorAgent]): Factory of the agent.
+
+        Returns:
+            ItemExtractorAgent: The cached agent.
+        """
+        return self._build(key, create_agent)[0]
+
+    def tools(self, key: Hashable, create_agent: Callable[[], ItemExtractorAgent]) -> list[ProviderToolInterface]:
+        """
+        Return the provider tools of a configuration, created on first use or when the configuration changed.
+
+        Args:
+            key (Hashable): Key of the configuration the agent is built from.
+            create_agent (Callable[[], ItemExtractorAgent]): Factory of the agent shared by the tools.
+
+        Returns:
+            list[ProviderToolInterface]: The cached provider tool instances.
+        """
+        return list(self._build(key, create_agent)[1])
+
+    def clear(self) -> None:
+        """
+        Drop the cached instances, the next lookup builds them again.
+        """
+        with self._lock:
+            self._key, self._agent, self._tools = None, None, []
+
+    def _build(self, key: Hashable,
+               create_agent: Callable[[], ItemExtractorAgent]) -> tuple[ItemExtractorAgent, list[ProviderToolInterface]]:
+        """
+        Return the cached agent and tools, rebuilding them if the configuration key changed.
+        """
+        with self._lock:
+            if self._agent is None or self._key != key:
+                agent = create_agent()
+                self._tools = [cls(extractor_agent=agent) for cls in provider_classes().values()]  # type: ignore
+                self._agent, self._key = agent, key
+                logger.info("Built item extractor agent and %d provider tools", len(self._tools))
+            return self._agent, self._tools
+
+
+# Process-wide cache of the provider tools used by the API
+PROVIDER_REGISTRY = ProviderRegistry()
@@ -0,0 +1,310 @@
+"""
+Cache of the ExtractedData returned by provider searches.
+
+The same searches of the Links and Protis stores repeat across users within minutes, and every repetition scraped the
+store again, ran the LLM extraction and wrote the items to the database once more. Results are cached by provider
+and normalized search parameters for a time to live. An entry expired for less than the stale window is served at
+once while a single background job refreshes it. Concurrent identical misses wait for one upstream job instead of
+each starting their own, whether they come from worker threads or from coroutines.
+
+The cache is process-wide and disabled until configure_provider_result_cache installs one.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel, Field
+
+from tools.item_extractor_agent import ExtractedData
+
+logger = logging.getLogger(__name__)
+
+# Default time to live of a cached result in seconds
+DEFAULT_RESULT_TTL = 300.0
+# Default number of cached results
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class ProviderResultCacheStats(BaseModel):
+    """
+    Counters of the provider result cache.
+
+    Fields:
+        hits (int): Lookups served by a fresh entry.
+        stale_hits (int): Lookups served by a stale entry while it was refreshed.
+        misses (int): Lookups that started an upstream job.
+        coalesced (int): Lookups that waited for the upstream job of an identical lookup.
+        refreshes (int): Background refreshes of stale entries.
+        errors (int): Upstream jobs that failed.
+        entries (int): Cached results.
+    """
+    hits: int = Field(description="Lookups served by a fresh entry", default=0)
+    stale_hits: int = Field(description="Lookups served by a stale entry", default=0)
+    misses: int = Field(description="Lookups that started an upstream job", default=0)
+    coalesced: int = Field(description="Lookups that joined a running job", default=0)
+    refreshes: int = Field(description="Background refreshes of stale entries", default=0)
+    errors: int = Field(description="Failed upstream jobs", default=0)
+    entries: int = Field(description="Cached results", default=0)
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of the lookups served without waiting for the store."""
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return (self.hits + self.stale_hits) / lookups if lookups else 0.0
+
+
+class _Entry:
+    """
+    A cached result and the time it was stored.
+    """
+
+    def __init__(self, data: ExtractedData, stored_at: float):
+        self.data = data
+        self.stored_at = stored_at
+
+
+def cache_key(provider: str, params: dict) -> str:
+    """
+    Return the cache key of a provider search, equal for parameters differing only in case, spacing or order.
+
+    Args:
+        provider (str): Name of the provider.
+        params (dict): The search parameters.
+
+    Returns:
+        str: The cache key.
+    """
+    normalized = {name: " ".join(value.lower().split()) if isinstance(value, str) else value
+                  for name, value in params.items()}
+    return f"{provider}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+class ProviderResultCache:
+    """
+    In-memory cache of provider search results with stale-while-revalidate and coalescing of identical misses.
+
+    Args:
+        ttl (float, optional): Seconds a result is fresh. Defaults to DEFAULT_RESULT_TTL.
+        stale_while_revalidate (float, optional): Seconds after expiry a result is still served while refreshed.
+            Defaults to 0.
+        max_entries (int, optional): Results kept, the least recently used are evicted. Defaults to
+            DEFAULT_MAX_ENTRIES.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_RESULT_TTL, stale_while_revalidate: float = 0.0,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._jobs: dict[str, Future] = {}
+        self._stats = ProviderResultCacheStats()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def get(self, provider: str, params: dict, load: Callable[[], ExtractedData]) -> ExtractedData:
+        """
+        Return the cached result of a search, or load it once for all identical concurrent lookups.
+
+        Args:
+            provider (str): Name of the provider.
+            params (dict): The search parameters.
+            load (Callable[[], ExtractedData]): Runs the search against the store.
+
+        Returns:
+            ExtractedData: The result of the search.
+        """
+        key = cache_key(provider, params)
+        cached, job, owner = self._lookup(key)
+        if cached is not None:
+            if job is not None:
+                with self._lock:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="result-refresh")
+                self._executor.submit(self._run_job, key, job, load)
+            return cached
+        if owner:
+            self._run_job(key, job, load)
+        return job.result()
+
+    async def aget(self, provider: str, params: dict, load: Callable[[], Awaitable[ExtractedData]]) -> ExtractedData:
+        """
+        Asynchronously return the cached result of a search, or load it once for all identical concurrent lookups.
+
+        The upstream job runs as its own task, so a lookup cancelled by its caller leaves the job to finish for the
+        other lookups and the cache.
+
+        Args:
+            provider (str): Name of the provider.
+            params (dict): The search parameters.
+            load (Callable[[], Awaitable[ExtractedData]]): Runs the search against the store.
+
+        Returns:
+            ExtractedData: The result of the search.
+        """
+        key = cache_key(provider, params)
+        cached, job, owner = self._lookup(key)
+        if owner:
+            task = asyncio.create_task(self._arun_job(key, job, load))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if cached is not None:
+            return cached
+        return await asyncio.shield(asyncio.wrap_future(job))
+
+    def stats(self) -> ProviderResultCacheStats:
+        """
+        Return a snapshot of the cache counters.
+
+        Returns:
+            ProviderResultCacheStats: The counters and the number of cached results.
+        """
+        with self._lock:
+            return self._stats.model_copy(update={"entries": len(self._entries)})
+
+    def render_prometheus(self) -> str:
+        """
+        Render the cache counters in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text.
+        """
+        stats = self.stats()
+        lines = ["# HELP provider_result_cache_lookups_total Provider result cache lookups by result.",
+                 "# TYPE provider_result_cache_lookups_total counter"]
+        for result, value in (("hit", stats.hits), ("stale", stats.stale_hits), ("miss", stats.misses),
+                              ("coalesced", stats.coalesced)):
+            lines.append(f'provider_result_cache_lookups_total{{result="{result}"}} {value}')
+        for name, kind, help_text, value in (
+                ("provider_result_cache_refreshes_total", "counter", "Background refreshes of stale results.",
+                 stats.refreshes),
+                ("provider_result_cache_errors_total", "counter", "Failed provider searches.", stats.errors),
+                ("provider_result_cache_entries", "gauge", "Cached provider results.", stats.entries)):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """
+        Remove all cached results.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        """
+        Wait for running background refreshes of worker threads.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _lookup(self, key: str) -> tuple[Optional[ExtractedData], Optional[Future], bool]:
+        """
+        Look up a key and join or start its upstream job.
+
+        Returns the cached data if it can be served, the job to wait for or to run, and whether the caller owns the
+        job and has to run it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry.stored_at if entry is not None else None
+            if entry is not None and age <= self.ttl:
+                self._stats.hits += 1
+                self._entries.move_to_end(key)
+                return entry.data, None, False
+            job = self._jobs.get(key)
+            if entry is not None and age <= self.ttl + self.stale_while_revalidate:
+                self._stats.stale_hits += 1
+                self._entries.move_to_end(key)
+                if job is not None:
+                    return entry.data, None, False
+                self._stats.refreshes += 1
+                self._jobs[key] = job = Future()
+                return entry.data, job, True
+            if job is not None:
+                self._stats.coalesced += 1
+                return None, job, False
+            self._stats.misses += 1
+            self._jobs[key] = job = Future()
+            return None, job, True
+
+    def _store(self, key: str, job: Future, data: Optional[ExtractedData], error: Optional[BaseException]) -> None:
+        """
+        Store the result of a finished upstream job and hand it to the waiting lookups.
+        """
+        with self._lock:
+            self._jobs.pop(key, None)
+            if error is None:
+                self._entries[key] = _Entry(data, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._stats.errors += 1
+        if error is None:
+            job.set_result(data)
+        else:
+            logger.warning("Provider search %s failed: %s", key, error)
+            job.set_exception(error)
+
+    def _run_job(self, key: str, job: Future, load: Callable[[], ExtractedData]) -> None:
+        """
+        Run an upstream job on the current thread.
+        """
+        try:
+            data = load()
+        except BaseException as e:
+            self._store(key, job, None, e)
+            return
+        self._store(key, job, data, None)
+
+    async def _arun_job(self, key: str, job: Future, load: Callable[[], Awaitable[ExtractedData]]) -> None:
+        """
+        Run an upstream job on the running event loop.
+        """
+        try:
+            data = await load()
+        except BaseException as e:
+            self._store(key, job, None, e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        self._store(key, job, data, None)
+
+
+_provider_result_cache: Optional[ProviderResultCache] = None
+
+
+def get_provider_result_cache() -> Optional[ProviderResultCache]:
+    """
+    Return the process-wide provider result cache.
+
+    Returns:
+        ProviderResultCache | None: The cache, None while caching is disabled.
+    """
+    return _provider_result_cache
+
+
+def configure_provider_result_cache(cache: Optional[ProviderResultCache]) -> Optional[ProviderResultCache]:
+    """
+    Replace the process-wide provider result cache and close the previous one.
+
+    Args:
+        cache (ProviderResultCache | None): The new cache, None disables caching.
+
+    Returns:
+        ProviderResultCache | None: The new cache.
+    """
+    global _provider_result_cache
+    previous, _provider_result_cache = _provider_result_cache, cache
+    if previous is not None:
+        previous.close()
+    return cache
@@ -3,10 +3,32 @@
 Interface for provider tools that extract computer component data from a web page.
 
 Defines an abstract base class for provider tools, requiring implementation of a get_data method that takes parameters and returns ExtractedData.
-"""
 
+Provider tools crawl the numbered search result pages of their store. The next page is fetched while the current one
+is extracted, and the crawl stops at the page and item budgets, at a page without new items, or as soon as the caller
+stops iterating. Whole searches are served from the provider result cache when one is configured.
+"""
+import asyncio
+import logging
 from abc import ABC, abstractmethod
-from tools.item_extractor_agent import ExtractedData, ItemExtractorAgent
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional
+
+import httpx
+
+from tools.fetch_scheduler import FetchRejectedError
+from tools.item_extractor_agent import ExtractedData, ItemExtractorAgent, merge_extracted_data
+from tools.page_cache import CachedPage
+from tools.page_fetcher import get_page_fetcher
+from tools.provider_result_cache import get_provider_result_cache
+from tools.store_parser import StoreParser
+
+logger = logging.getLogger(__name__)
+
+# Default budgets of a crawl
+DEFAULT_MAX_PAGES = 3
+DEFAULT_MAX_ITEMS = 100
 
 
 
@@ -14,11 +36,245 @@ class ProviderToolInterface(ABC):
     """
     Abstract base class for provider tools.
 
-    Requires implementation of a get_data method that takes parameters and returns ExtractedData.
+    Requires implementation of get_data and aget_data methods that take parameters and return ExtractedData, and of a
+    page_url method returning the URL of a numbered search result page for the crawl.
     """
 
     extractor_agent: ItemExtractorAgent
 
+    @abstractmethod
+    def page_url(self, params: dict, page_number: int) -> str:
+        """
+        Return the URL of a search result page.
+
+        Args:
+            params (dict): The parameters containing the search query and filters.
+            page_number (int): Number of the page, starting with 1.
+
+        Returns:
+            str: The URL of the page.
+        """
+
+    def get_parser(self) -> Optional[StoreParser]:
+        """
+        Return the parser of the store pages, None extracts every page with the LLM extractor.
+
+        Returns:
+            StoreParser | None: The store parser.
+        """
+        return None
+
+    def search(self, params: dict, max_pages: int = DEFAULT_MAX_PAGES,
+               max_items: int = DEFAULT_MAX_ITEMS) -> ExtractedData:
+        """
+        Crawl the search result pages and merge their items, served from the provider result cache when enabled.
+
+        Args:
+            params (dict): The parameters containing the search query and filters.
+            max_pages (int, optional): Maximum number of pages, nothing is crawled below one. Defaults to
+                DEFAULT_MAX_PAGES.
+            max_items (int, optional): Maximum number of items of all pages. Defaults to DEFAULT_MAX_ITEMS.
+
+        Returns:
+            ExtractedData: The items of all crawled pages.
+        """
+        def load() -> ExtractedData:
+            pages = list(self.crawl(params, max_pages, max_items))
+            return merge_extracted_data(pages, pages[0].date_time if pages else datetime.now().isoformat())
+
+        cache = get_provider_result_cache()
+        if cache is None:
+            return load()
+        return cache.get(type(self).__name__, {**params, "max_pages": max_pages, "max_items": max_items}, load)
+
+    async def asearch(self, params: dict, max_pages: int = DEFAULT_MAX_PAGES,
+                      max_items: int = DEFAULT_MAX_ITEMS) -> ExtractedData:
+        """
+        Asynchronously crawl the search result pages and merge their items, served from the provider result cache
+        when enabled.
+
+        Args:
+            params (dict): The parameters containing the search query and filters.
+            max_pages (int, optional): Maximum number of pages, nothing is crawled below one. Defaults to
+                DEFAULT_MAX_PAGES.
+            max_items (int, optional): Maximum number of items of all pages. Defaults to DEFAULT_MAX_ITEMS.
+
+        Returns:
+            ExtractedData: The items of all crawled pages.
+        """
+        async def load() -> ExtractedData:
+            pages = [page async for page in self.acrawl(params, max_pages, max_items)]
+            return merge_extracted_data(pages, pages[0].date_time if pages else datetime.now().isoformat())
+
+        cache = get_provider_result_cache()
+        if cache is None:
+            return await load()
+        return await cache.aget(type(self).__name__, {**params, "max_pages": max_pages, "max_items": max_items}, load)
+
+    def crawl(self, params: dict, max_pages: int = DEFAULT_MAX_PAGES,
+              max_items: int = DEFAULT_MAX_ITEMS) -> Iterator[ExtractedData]:
+        """
+        Extract the search result pages one by one, fetching the next page while the current one is extracted.
+
+        Closing the generator, for example by breaking out of the loop once enough items arrived, stops the crawl
+        and discards the prefetched page.
+
+        Args:
+            params (dict): The parameters containing the search query and filters.
+            max_pages (int, optional): Maximum number of pages, nothing is crawled below one. Defaults to
+                DEFAULT_MAX_PAGES.
+            max_items (int, optional): Maximum number of items of all pages. Defaults to DEFAULT_MAX_ITEMS.
+
+        Yields:
+            ExtractedData: The items of each page not seen on a previous page.
+        """
+        if max_pages < 1 or max_items < 1:
+            return
+        fetcher = get_page_fetcher()
+        parser = self.get_parser()
+        budget = _CrawlBudget(max_items)
+        url = self.page_url(params, 1)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-prefetch")
+        prefetch: Optional[Future] = executor.submit(fetcher.get_page, url)
+        try:
+            for page_number in range(1, max_pages + 1):
+                try:
+                    page: Optional[CachedPage] = prefetch.result()
+                except (httpx.HTTPError, FetchRejectedError) as e:
+                    if page_number > 1:
+                        logger.warning("Fetching page %d of %s failed, stopping the crawl: %s", page_number, url, e)
+                        return
+                    if isinstance(e, FetchRejectedError):
+                        raise
+                    page = None
+                next_url = self.page_url(params, page_number + 1) if page_number < max_pages else None
+                prefetch = executor.submit(fetcher.get_page, next_url) if next_url else None
+                if budget.is_repeat(page):
+                    return
+                data = budget.take(self.extract(url, parser, page), first=page_number == 1)
+                if data is None:
+                    return
+                yield data
+                if budget.exhausted or not data.items:
+                    return
+                url = next_url
+        finally:
+            # Do not wait for a prefetch already running, its page is discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def acrawl(self, params: dict, max_pages: int = DEFAULT_MAX_PAGES,
+                     max_items: int = DEFAULT_MAX_ITEMS) -> AsyncIterator[ExtractedData]:
+        """
+        Asynchronously extract the search result pages one by one, fetching the next page while the current one is
+        extracted.
+
+        Args:
+            params (dict): The parameters containing the search query and filters.
+            max_pages (int, optional): Maximum number of pages, nothing is crawled below one. Defaults to
+                DEFAULT_MAX_PAGES.
+            max_items (int, optional): Maximum number of items of all pages. Defaults to DEFAULT_MAX_ITEMS.
+
+        Yields:
+            ExtractedData: The items of each page not seen on a previous page.
+        """
+        if max_pages < 1 or max_items < 1:
+            return
+        fetcher = get_page_fetcher()
+        parser = self.get_parser()
+        budget = _CrawlBudget(max_items)
+        url = self.page_url(params, 1)
+        prefetch: Optional[asyncio.Task] = asyncio.create_task(fetcher.aget_page(url))
+        try:
+            for page_number in range(1, max_pages + 1):
+                try:
+                    page: Optional[CachedPage] = await prefetch
+                except (httpx.HTTPError, FetchRejectedError) as e:
+                    if page_number > 1:
+                        logger.warning("Fetching page %d of %s failed, stopping the crawl: %s", page_number, url, e)
+                        return
+                    if isinstance(e, FetchRejectedError):
+                        raise
+                    page = None
+                next_url = self.page_url(params, page_number + 1) if page_number < max_pages else None
+                prefetch = asyncio.create_task(fetcher.aget_page(next_url)) if next_url else None
+                if budget.is_repeat(page):
+                    return
+                data = budget.take(await self.aextract(url, parser, page), first=page_number == 1)
+                if data is None:
+                    return
+                yield data
+                if budget.exhausted or not data.items:
+                    return
+                url = next_url
+        finally:
+            if prefetch is not None:
+                prefetch.cancel()
+                # Retrieve the error of a prefetch that failed before it was awaited, so it is not logged as lost
+                prefetch.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    def extract(self, url: str, parser: Optional[StoreParser] = None,
+                page: Optional[CachedPage] = None) -> ExtractedData:
+        """
+        Extract the search result items of a store page with the store parser, falling back to the LLM extractor.
+
+        The LLM extractor is used when there is no parser, the page can not be fetched or the parse fails its
+        confidence check. Items of a trusted parse are stored in long-term memory like those of the LLM extractor.
+
+        Args:
+            url (str): The URL of the store page.
+            parser (StoreParser | None, optional): Parser of the store pages. Defaults to None.
+            page (CachedPage | None, optional): The page if it was already fetched. Defaults to None, which fetches
+                the URL.
+
+        Returns:
+            ExtractedData: Structured data extracted from the web page.
+        """
+        if parser is not None:
+            try:
+                page = page if page is not None else get_page_fetcher().get_page(url)
+                parsed = parser.parse(page.content, page.encoding)
+                if parser.is_confident(parsed):
+                    logger.info("Parsed %d items of %s without the LLM extractor", len(parsed.data.items), url)
+                    self.extractor_agent.ingest(parsed.data)
+                    return parsed.data
+                logger.warning("Parser of %s matched %d items, %d complete, falling back to the LLM extractor",
+                               parser.rules.store_name, parsed.candidates, len(parsed.data.items))
+            except httpx.HTTPError as e:
+                logger.warning("Fetching %s failed, falling back to the LLM extractor: %s", url, e)
+        return self.extractor_agent.process_link(url, page)
+
+    async def aextract(self, url: str, parser: Optional[StoreParser] = None,
+                       page: Optional[CachedPage] = None) -> ExtractedData:
+        """
+        Asynchronously extract the search result items of a store page with the store parser, falling back to the LLM
+        extractor.
+
+        The page is fetched over the shared async client, parsing and ingestion run on worker threads so that the
+        event loop keeps serving other fetches.
+
+        Args:
+            url (str): The URL of the store page.
+            parser (StoreParser | None, optional): Parser of the store pages. Defaults to None.
+            page (CachedPage | None, optional): The page if it was already fetched. Defaults to None, which fetches
+                the URL.
+
+        Returns:
+            ExtractedData: Structured data extracted from the web page.
+        """
+        if parser is not None:
+            try:
+                page = page if page is not None else await get_page_fetcher().aget_page(url)
+                parsed = await asyncio.to_thread(parser.parse, page.content, page.encoding)
+                if parser.is_confident(parsed):
+                    logger.info("Parsed %d items of %s without the LLM extractor", len(parsed.data.items), url)
+                    await self.extractor_agent.aingest(parsed.data)
+                    return parsed.data
+                logger.warning("Parser of %s matched %d items, %d complete, falling back to the LLM extractor",
+                               parser.rules.store_name, parsed.candidates, len(parsed.data.items))
+            except httpx.HTTPError as e:
+                logger.warning("Fetching %s failed, falling back to the LLM extractor: %s", url, e)
+        return await self.extractor_agent.aprocess_link(url, page)
+
     @abstractmethod
     def get_data(self, params: dict) -> ExtractedData:
         """
@@ -31,3 +287,53 @@ class ProviderToolInterface(ABC):
             ExtractedData: Structured data extracted from the web page.
         """
 
+    @abstractmethod
+    async def aget_data(self, params: dict) -> ExtractedData:
+        """
+        Asynchronously extract computer component data from the given parameters.
+
+        Args:
+            params (dict): Parameters containing the URL and extraction options.
+
+        Returns:
+            ExtractedData: Structured data extracted from the web page.
+        """
+
+
+class _CrawlBudget:
+    """
+    Items seen by a crawl and its remaining item budget.
+    """
+
+    def __init__(self, max_items: int):
+        self.remaining = max_items
+        self.seen: set[str] = set()
+        self.previous: Optional[bytes] = None
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the item budget is used up."""
+        return self.remaining <= 0
+
+    def is_repeat(self, page: Optional[CachedPage]) -> bool:
+        """
+        Check whether a page repeats the previous one, as stores serve the last page for page numbers past the end.
+        """
+        repeat = page is not None and page.content == self.previous
+        self.previous = page.content if page is not None else None
+        return repeat
+
+    def take(self, data: ExtractedData, first: bool) -> Optional[ExtractedData]:
+        """
+        Keep the items of a page not seen on previous pages, within the remaining item budget.
+
+        Returns None if the page has no new items, which ends the crawl. The first page is returned even without
+        items, as the result of an empty search.
+        """
+        items = [item for item in data.items if not item.item_code or item.item_code not in self.seen]
+        if not items and not first:
+            return None
+        items = items[:self.remaining]
+        self.seen.update(item.item_code for item in items)
+        self.remaining -= len(items)
+        return data if len(items) == len(data.items) else data.model_copy(update={"items": items})
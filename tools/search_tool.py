@@ -1,6 +1,7 @@
 """
 Module providing a web search tool using DuckDuckGo and a Pydantic schema for input validation.
 """
+import asyncio
 import logging
 from typing import Optional
 
@@ -63,16 +64,16 @@ class SearchTool(BaseTool):
     async def _arun(self, query: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> str:
         """
         Perform an asynchronous web search using DuckDuckGo.
-        If the calculation is cheap, you can just delegate to the sync implementation
-        as shown below.
-        If the sync calculation is expensive, you should delete the entire _arun method.
-        LangChain will automatically provide a better implementation that will
-        kick off the task in a thread to make sure it doesn't block other async code.
+
+        The DuckDuckGo and Google search wrappers only have blocking clients, so the search runs on a worker thread
+        and the event loop keeps serving the other tools of the agent step.
 
         Returns:
             str: The search results as a string.
         """
-        return self._run(query=query)
+        if self.duckduck is not None:
+            return await asyncio.to_thread(self.run_search_tool, query=query)
+        raise ValueError("DuckDuckGoSearchRun is not initialized.")
 
     def run_search_tool(self, query: str) -> str:
         """
@@ -0,0 +1,168 @@
+"""
+Deterministic parsers of store search result pages.
+
+Store pages render their search results from templates, so CSS selector rules over the raw HTML find every item
+with its description, price and item code. Parsing with the rules takes milliseconds where the LLM extractor needs
+tens of seconds and many tokens to read the flattened page text. A parse is trusted only if it passes a confidence
+check, otherwise the provider tool falls back to the LLM extractor, so a changed store layout degrades to the slow
+path instead of returning wrong items.
+"""
+import logging
+import re
+from datetime import datetime
+from typing import Optional
+
+from bs4 import BeautifulSoup, Tag
+from pydantic import BaseModel, Field
+
+from database.price_parser import parse_price
+from tools.item_extractor_agent import ExtractedData, ExtractedItem
+
+logger = logging.getLogger(__name__)
+
+
+class ParseRules(BaseModel):
+    """
+    CSS selector rules locating the search result items of a store page.
+
+    Selectors may list alternatives separated by commas, which are tried in order until one matches.
+
+    Fields:
+        store_name (str): Name of the store written to the extracted data.
+        item_selector (str): Selector of the element of one search result.
+        description_selector (str): Selector of the item description within the item element.
+        price_selector (str): Selector of the current price within the item element.
+        item_code_selector (str | None): Selector of the item code within the item element, None reads the item
+            element itself.
+        item_code_attribute (str | None): Attribute holding the item code, None reads the element text.
+        item_code_pattern (str | None): Regular expression whose first group is the item code within the text.
+        min_complete_ratio (float): Fraction of item elements that must yield a complete item with a parseable price.
+    """
+    store_name: str = Field(description="Name of the store")
+    item_selector: str = Field(description="Selector of a search result item")
+    description_selector: str = Field(description="Selector of the item description")
+    price_selector: str = Field(description="Selector of the item price")
+    item_code_selector: Optional[str] = Field(description="Selector of the item code", default=None)
+    item_code_attribute: Optional[str] = Field(description="Attribute holding the item code", default=None)
+    item_code_pattern: Optional[str] = Field(description="Pattern extracting the item code", default=None)
+    min_complete_ratio: float = Field(description="Fraction of complete items of a trusted parse", default=0.8,
+                                      gt=0, le=1)
+
+
+class ParsedPage(BaseModel):
+    """
+    Items parsed from a store page and the counts of its confidence check.
+
+    Fields:
+        data (ExtractedData): The extracted store name and complete items.
+        candidates (int): Item elements matched on the page.
+    """
+    data: ExtractedData = Field(description="Extracted store name and items")
+    candidates: int = Field(description="Item elements matched on the page", default=0)
+
+    @property
+    def confidence(self) -> float:
+        """Fraction of the matched item elements that yielded a complete item."""
+        return len(self.data.items) / self.candidates if self.candidates else 0.0
+
+
+class StoreParser:
+    """
+    Parser of the search result pages of one store.
+
+    Args:
+        rules (ParseRules): Selector rules of the store pages.
+    """
+
+    def __init__(self, rules: ParseRules):
+        self.rules = rules
+        self._item_code_pattern = re.compile(rules.item_code_pattern) if rules.item_code_pattern else None
+
+    def parse(self, content: bytes | str, encoding: Optional[str] = None,
+              date_time: Optional[str] = None) -> ParsedPage:
+        """
+        Parse the search result items of a page.
+
+        Items missing a description, item code or parseable price are skipped, the same item code is kept once.
+
+        Args:
+            content (bytes | str): The HTML of the page.
+            encoding (str | None, optional): Encoding declared by the response headers. Defaults to None.
+            date_time (str | None, optional): Extraction time in ISO format. Defaults to the current time.
+
+        Returns:
+            ParsedPage: The parsed items and the number of matched item elements.
+        """
+        soup = BeautifulSoup(content, "html.parser", from_encoding=encoding if isinstance(content, bytes) else None)
+        elements = soup.select(self.rules.item_selector)
+        items: list[ExtractedItem] = []
+        seen: set[str] = set()
+        for element in elements:
+            item = self._parse_item(element)
+            if item is not None and item.item_code not in seen:
+                seen.add(item.item_code)
+                items.append(item)
+        data = ExtractedData(date_time=date_time or datetime.now().isoformat(), store_name=self.rules.store_name,
+                             items=items)
+        return ParsedPage(data=data, candidates=len(elements))
+
+    def is_confident(self, page: ParsedPage) -> bool:
+        """
+        Check whether a parse can be trusted instead of the LLM extractor.
+
+        A parse is trusted if it found items and enough of the matched item elements yielded complete items. A page
+        without matches may be an empty search or a changed layout, both are left to the LLM extractor.
+
+        Args:
+            page (ParsedPage): The parsed page.
+
+        Returns:
+            bool: True if the parse is trusted.
+        """
+        return bool(page.data.items) and page.confidence >= self.rules.min_complete_ratio
+
+    def _parse_item(self, element: Tag) -> Optional[ExtractedItem]:
+        """
+        Parse one search result element, None if any field is missing or the price does not parse.
+        """
+        description = _text(_select(element, self.rules.description_selector))
+        price = _text(_select(element, self.rules.price_selector))
+        code_element = _select(element, self.rules.item_code_selector) if self.rules.item_code_selector else element
+        if code_element is None:
+            return None
+        if self.rules.item_code_attribute:
+            item_code = str(code_element.get(self.rules.item_code_attribute) or "").strip()
+        else:
+            item_code = _text(code_element)
+        if self._item_code_pattern is not None:
+            match = self._item_code_pattern.search(item_code)
+            item_code = match.group(1) if match else ""
+        if not description or not item_code or parse_price(price) is None:
+            return None
+        return ExtractedItem(price=price, description=description, item_code=item_code)
+
+
+def _select(element: Tag, selector: str) -> Optional[Tag]:
+    """
+    Return the first element matching the first alternative of the selector that matches anything.
+    """
+    depth = 0
+    start = 0
+    alternatives = []
+    for index, char in enumerate(selector):
+        depth += {"(": 1, "[": 1, ")": -1, "]": -1}.get(char, 0)
+        if char == "," and depth == 0:
+            alternatives.append(selector[start:index])
+            start = index + 1
+    alternatives.append(selector[start:])
+    for alternative in alternatives:
+        if alternative.strip() and (match := element.select_one(alternative)) is not None:
+            return match
+    return None
+
+
+def _text(element: Optional[Tag]) -> str:
+    """
+    Return the whitespace-collapsed text of an element, empty if there is no element.
+    """
+    return " ".join(element.get_text(" ").split()) if element is not None else ""
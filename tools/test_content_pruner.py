@@ -0,0 +1,76 @@
+"""
+Unit tests for the page boilerplate pruning in tools/content_pruner.py.
+"""
+import os
+
+from tools.content_pruner import ContentPruner, collapse_whitespace
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name: str) -> bytes:
+    """Return the content of a saved store page."""
+    with open(os.path.join(FIXTURES, name), "rb") as file:
+        return file.read()
+
+
+def test_prune_keeps_title_and_listing():
+    """Test that the store chrome is dropped and the title and product listing are kept."""
+    pruner = ContentPruner()
+
+    page = pruner.prune(read_fixture("links_search.html"))
+
+    assert page.listing_found
+    assert page.text.splitlines()[0] == "Pretraga | Links"
+    for kept in ("050.600.196", "Procesor INTEL Core i5 14600KF BOX", "264,99 €", "284,99 €"):
+        assert kept in page.text
+    for dropped in ("Kategorije", "Novosti", "košarica", "NEWSLETTER", "Sva prava", "Pozicija", "Dodaj"):
+        assert dropped not in page.text
+    assert page.pruned_tokens < page.original_tokens / 2
+    assert 0.5 < page.reduction_ratio < 1
+
+
+def test_page_without_prices_keeps_content_without_boilerplate():
+    """Test that pages without a listing keep their content, and link lists and menus are still dropped."""
+    pruner = ContentPruner()
+    html = ("<html><head><title>Pretraga</title></head><body><nav><a href='/'>Početna</a></nav>"
+            "<ul>" + "".join(f"<li><a href='/c/{i}'>Kategorija {i}</a> 0</li>" for i in range(10)) + "</ul>"
+            "<div class='content'><p>Nema   rezultata\n\n za   upit.</p></div></body></html>")
+
+    page = pruner.prune(html)
+
+    assert not page.listing_found
+    assert page.text == "Pretraga\nNema rezultata\nza upit."
+
+
+def test_single_result_keeps_item_text():
+    """Test that a page with one price keeps the description and code of the item, also under a product header."""
+    pruner = ContentPruner()
+    html = ("<html><head><title>Links</title></head><body><div class='site-header'>Prijava</div>"
+            "<div class=product-item><div class=product-header><h2>Intel Core i5-14400F</h2></div>"
+            "<div class=sku>ABC123</div><span class=price>199,99 €</span></div></body></html>")
+
+    page = pruner.prune(html)
+
+    assert page.listing_found
+    assert page.text == "Links\nIntel Core i5-14400F\nABC123\n199,99 €"
+
+
+def test_stats_accumulate_reduction():
+    """Test that the token counts of all pruned pages are accumulated and exported."""
+    pruner = ContentPruner()
+    first = pruner.prune(read_fixture("links_search.html"))
+    second = pruner.prune(read_fixture("protis_search.html"))
+
+    stats = pruner.stats()
+    assert (stats.pages, stats.listing_pages) == (2, 2)
+    assert stats.original_tokens == first.original_tokens + second.original_tokens
+    assert stats.reduction_ratio > 0.3
+    assert "page_pruning_pages_total 2" in pruner.render_prometheus()
+    pruner.reset()
+    assert pruner.stats().pages == 0
+
+
+def test_collapse_whitespace():
+    """Test that space runs are collapsed and empty lines dropped."""
+    assert collapse_whitespace("  a \t b \n\n \n c  ") == "a b\nc"
@@ -0,0 +1,83 @@
+"""
+Unit tests for the per-domain fetch scheduler in tools/fetch_scheduler.py.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tools.fetch_scheduler import FetchQueueFullError, FetchQueueTimeoutError, FetchScheduler, Priority
+from tools.page_fetcher_model import DomainLimits, FetchSettings
+
+
+def test_token_bucket_limits_rate_per_domain():
+    """Test that requests beyond the burst wait for tokens, while other domains and subdomains are limited apart."""
+    scheduler = FetchScheduler(FetchSettings(domain_limits={"links.hr": DomainLimits(rate=20, burst=2)}))
+
+    start = time.monotonic()
+    for url in ["https://www.links.hr/1", "https://links.hr/2", "https://www.links.hr/3", "https://www.links.hr/4"]:
+        with scheduler.slot(url):
+            pass
+    elapsed = time.monotonic() - start
+    with scheduler.slot("https://www.protis.hr/1"):
+        pass
+
+    assert 0.09 <= elapsed < 1
+    stats = scheduler.stats()
+    assert stats[("links.hr", Priority.INTERACTIVE)].fetches == 4
+    assert stats[("links.hr", Priority.INTERACTIVE)].max_queue_seconds >= 0.04
+    assert stats[("www.protis.hr", Priority.INTERACTIVE)].fetches == 1
+
+
+def test_interactive_requests_overtake_background_ones():
+    """Test that a queued interactive request is admitted before background requests queued earlier."""
+    scheduler = FetchScheduler(FetchSettings(domain_limits={"links.hr": DomainLimits(max_concurrency=1)}))
+    order: list[str] = []
+    release = threading.Event()
+
+    def fetch(name: str, priority: Priority) -> None:
+        with scheduler.slot("https://www.links.hr/", priority):
+            order.append(name)
+            if name == "first":
+                release.wait(5)
+
+    threads = [threading.Thread(target=fetch, args=("first", Priority.INTERACTIVE))]
+    threads[0].start()
+    while not order:
+        time.sleep(0.001)
+    for name, priority in [("refresh-1", Priority.BACKGROUND), ("refresh-2", Priority.BACKGROUND),
+                           ("query", Priority.INTERACTIVE)]:
+        threads.append(threading.Thread(target=fetch, args=(name, priority)))
+        threads[-1].start()
+        time.sleep(0.02)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["first", "query", "refresh-1", "refresh-2"]
+
+
+def test_full_queue_and_queue_timeout_reject_requests():
+    """Test that async requests are rejected at a full queue and after the queue timeout, and counted."""
+    scheduler = FetchScheduler(FetchSettings(queue_timeout=0.05, domain_limits={
+        "links.hr": DomainLimits(max_concurrency=1, max_queue=1)}))
+
+    async def run():
+        async with scheduler.aslot("https://www.links.hr/1"):
+            waiting = asyncio.create_task(scheduler.aslot("https://www.links.hr/2").__aenter__())
+            await asyncio.sleep(0)
+            with pytest.raises(FetchQueueFullError):
+                async with scheduler.aslot("https://www.links.hr/3"):
+                    pass
+            with pytest.raises(FetchQueueTimeoutError):
+                await waiting
+
+    asyncio.run(run())
+
+    stats = scheduler.stats()[("links.hr", Priority.INTERACTIVE)]
+    assert (stats.fetches, stats.rejected, stats.timeouts) == (1, 1, 1)
+    metrics = scheduler.render_prometheus()
+    assert 'fetch_rejected_total{domain="links.hr",priority="interactive",reason="timeout"} 1' in metrics
+    assert 'fetch_queue_wait_seconds_count{domain="links.hr",priority="interactive"} 1' in metrics
+    assert 'fetch_queue_length{domain="links.hr"} 0' in metrics
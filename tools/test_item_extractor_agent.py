@@ -0,0 +1,103 @@
+"""
+Unit tests for the chunked extraction of tools/item_extractor_agent.py.
+
+The structured output model call is replaced by a runnable that reads the items from the chunk lines, so no model
+is needed.
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from tools.item_extractor_agent import ExtractedData, ExtractedItem, ItemExtractorAgent, merge_extracted_data
+from tools.test_listing_chunks import LISTING
+
+
+class FakeChunkExtractor:
+    """Extracts the items of a chunk from its lines and records the number of concurrent calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, inputs: dict) -> ExtractedData:
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        lines = inputs["page"].splitlines()[1:]
+        items = [ExtractedItem(item_code=lines[i], description=lines[i + 1], price=lines[i + 3])
+                 for i in range(0, len(lines), 4)]
+        # Every chunk repeats the first item of the page, which has to be kept once
+        items.append(ExtractedItem(item_code="010.501.000", description="Procesor", price="200,99 €"))
+        with self.lock:
+            self.active -= 1
+        return ExtractedData(date_time="model time", store_name="Links", items=items)
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """Fixture returning an extractor agent with a fake chunk extractor and ingestion, reading LISTING pages."""
+    monkeypatch.setattr("tools.item_extractor_agent.get_url_text", lambda url: LISTING)
+
+    async def aget_url_text(url: str) -> str:
+        return LISTING
+
+    monkeypatch.setattr("tools.item_extractor_agent.aget_url_text", aget_url_text)
+    extractor_agent = ItemExtractorAgent(model=MagicMock(), long_term_memory=MagicMock(), embedder=MagicMock(),
+                                         chunk_tokens=200, max_concurrency=2)
+    extractor_agent.fake = FakeChunkExtractor()
+    extractor_agent.chunk_extractor = RunnableLambda(extractor_agent.fake)
+    extractor_agent.ingest = MagicMock()
+    return extractor_agent
+
+
+def test_process_link_extracts_chunks_concurrently(agent):
+    """Test that chunks are extracted under the concurrency limit and merged without duplicate item codes."""
+    data = agent.process_link("https://www.links.hr/hr/search?q=intel")
+
+    assert agent.fake.calls > 2
+    assert agent.fake.max_active == 2
+    assert [item.item_code for item in data.items] == [f"010.501.{index:03d}" for index in range(30)]
+    assert data.items[0].price == "200,99 €"
+    assert data.store_name == "Links" and data.date_time != "model time"
+    agent.ingest.assert_called_once_with(data)
+
+
+def test_failed_chunks_are_skipped(agent):
+    """Test that a failed chunk does not discard the others, and that failing every chunk raises."""
+    fake = agent.fake
+
+    def flaky(inputs: dict) -> ExtractedData:
+        if "010.501.000" in inputs["page"]:
+            raise ValueError("Invalid structured output")
+        return fake(inputs)
+
+    agent.chunk_extractor = RunnableLambda(flaky)
+    data = asyncio.run(agent.aprocess_link("https://www.links.hr/hr/search?q=intel"))
+    assert "010.501.001" not in [item.item_code for item in data.items]
+    assert "010.501.020" in [item.item_code for item in data.items]
+
+    agent.chunk_extractor = RunnableLambda(lambda inputs: (_ for _ in ()).throw(ValueError("Model unavailable")))
+    with pytest.raises(ValueError):
+        agent.process_link("https://www.links.hr/hr/search?q=intel")
+
+
+def test_merge_takes_store_name_once():
+    """Test that the first store name is kept and items without a code are not merged."""
+    parts = [
+        ExtractedData(date_time="a", store_name="", items=[ExtractedItem(item_code="", description="x", price="1 €")]),
+        ExtractedData(date_time="b", store_name="Protis",
+                      items=[ExtractedItem(item_code="", description="y", price="2 €")]),
+        ExtractedData(date_time="c", store_name="Other", items=[])
+    ]
+
+    merged = merge_extracted_data(parts, "now")
+
+    assert (merged.store_name, merged.date_time, len(merged.items)) == ("Protis", "now", 2)
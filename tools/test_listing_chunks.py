@@ -0,0 +1,28 @@
+"""
+Unit tests for the item-aligned chunking of listing text in tools/listing_chunks.py.
+"""
+from embedding.azure_llm_embedder import estimate_tokens
+from tools.listing_chunks import chunk_listing, split_items
+
+LISTING = "\n".join(["Pretraga | Links"] + [line for index in range(30) for line in (
+    f"010.501.{index:03d}", f"Procesor INTEL Core i5 model {index}, s. 1700, 3.5GHz, 24MB cache", "289,99 €",
+    f"{200 + index},99 €")])
+
+
+def test_split_items_ends_blocks_after_price_runs():
+    """Test that an old and a new price stay in the block of their item."""
+    blocks = split_items(["A", "10,00 €", "B", "12,00 €", "11,00 €", "footer"])
+
+    assert blocks == [["A", "10,00 €"], ["B", "12,00 €", "11,00 €"], ["footer"]]
+
+
+def test_chunk_listing_respects_budget_and_item_boundaries():
+    """Test that chunks stay within the token budget, start with the title and never split an item."""
+    chunks = chunk_listing(LISTING, max_tokens=200)
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith("Pretraga | Links\n") for chunk in chunks)
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    items = [block for chunk in chunks for block in split_items(chunk.splitlines()[1:])]
+    assert len(items) == 30 and all(len(block) == 4 for block in items)
+    assert chunk_listing(LISTING, max_tokens=10_000) == [LISTING]
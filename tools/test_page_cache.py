@@ -0,0 +1,128 @@
+"""
+Unit tests for the page cache in tools/page_cache.py and its use by the page fetcher.
+
+Pages are served by an httpx mock transport that records the requests and answers conditional GETs.
+"""
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from tools.page_cache import PageCache, normalize_url
+from tools.page_fetcher import PageFetcher
+
+
+class FakeStore:
+    """Mock store server answering conditional GETs with 304 while the page is unchanged."""
+
+    def __init__(self):
+        self.version = 1
+        self.requests: list[httpx.Request] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        etag = f'"v{self.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=f"<p>{request.url.host} v{self.version}</p>".encode(),
+                              headers={"ETag": etag, "Content-Type": "text/html; charset=utf-8"})
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Fixture returning a path for the on-disk cache."""
+    return str(tmp_path / "cache" / "pages.sqlite")
+
+
+def test_normalize_url():
+    """Test that equivalent URLs map to the same key."""
+    assert normalize_url("HTTPS://www.Links.hr:443/hr/search?q=cpu&orderby=0#results") == \
+        normalize_url("https://www.links.hr/hr/search?orderby=0&q=cpu")
+    assert normalize_url("https://www.links.hr:8443") == "https://www.links.hr:8443/"
+
+
+def test_fresh_pages_are_served_and_expired_pages_revalidated(cache_path):
+    """Test per-domain TTLs, conditional GETs answered with 304 and downloads of changed pages."""
+    store = FakeStore()
+    cache = PageCache(cache_path, default_ttl=0, domain_ttls={"links.hr": 3600})
+    fetcher = PageFetcher(transport=httpx.MockTransport(store.handler), cache=cache)
+
+    assert fetcher.get_text("https://www.links.hr/search?q=cpu") == "www.links.hr v1"
+    assert fetcher.get_text("https://www.links.hr/search?q=cpu#top") == "www.links.hr v1"
+    assert len(store.requests) == 1
+
+    assert fetcher.get_text("https://www.protis.hr/search?exp=cpu") == "www.protis.hr v1"
+    assert fetcher.get_text("https://www.protis.hr/search?exp=cpu") == "www.protis.hr v1"
+    assert store.requests[-1].headers["If-None-Match"] == '"v1"'
+    store.version = 2
+    assert fetcher.get_text("https://www.protis.hr/search?exp=cpu") == "www.protis.hr v2"
+
+    stats = cache.stats()
+    assert (stats.hits, stats.revalidations, stats.misses) == (1, 1, 3)
+    assert stats.bytes_saved == len(b"<p>www.links.hr v1</p>") + len(b"<p>www.protis.hr v1</p>")
+    assert stats.hit_ratio == 0.4
+    assert 'page_cache_lookups_total{result="revalidated"} 1' in cache.render_prometheus()
+    fetcher.close()
+
+    reopened = PageCache(cache_path, default_ttl=3600)
+    page, _ = reopened.lookup("https://www.protis.hr/search?exp=cpu")
+    assert page.content == b"<p>www.protis.hr v2</p>" and page.etag == '"v2"'
+    assert reopened.stats().entries == 2
+
+
+def test_stale_pages_are_served_while_revalidated(cache_path):
+    """Test that a page expired within the stale window is served at once and refreshed in the background."""
+    store = FakeStore()
+    cache = PageCache(cache_path, default_ttl=0, stale_while_revalidate=3600)
+    fetcher = PageFetcher(transport=httpx.MockTransport(store.handler), cache=cache)
+    fetcher.get_text("https://www.links.hr/search?q=gpu")
+    store.version = 2
+
+    assert fetcher.get_text("https://www.links.hr/search?q=gpu") == "www.links.hr v1"
+    fetcher.close()
+
+    assert len(store.requests) == 2
+    assert cache.stats().stale_hits == 1
+    reopened = PageCache(cache_path, default_ttl=3600)
+    assert reopened.lookup("https://www.links.hr/search?q=gpu")[0].content == b"<p>www.links.hr v2</p>"
+
+
+def test_size_cap_evicts_least_recently_used_pages():
+    """Test that pages above the size cap are evicted starting with the least recently used one."""
+    cache = PageCache(max_bytes=300)
+    for index in range(3):
+        cache.store(f"https://www.links.hr/{index}", httpx.Response(200, content=bytes(range(index, index + 80))))
+    cache.lookup("https://www.links.hr/0")
+    cache.store("https://www.links.hr/3", httpx.Response(200, content=bytes(range(3, 83))))
+
+    assert cache.lookup("https://www.links.hr/1")[0] is None
+    assert cache.lookup("https://www.links.hr/0")[0] is not None
+    stats = cache.stats()
+    assert stats.evictions >= 1 and stats.stored_bytes <= 300
+    cache.store("https://www.links.hr/4", httpx.Response(200, content=b"x", headers={"Cache-Control": "no-store"}))
+    assert cache.lookup("https://www.links.hr/4")[0] is None
+
+
+def test_async_fetcher_uses_the_cache_off_the_event_loop(monkeypatch):
+    """Test that the async fetcher looks up and stores pages on worker threads, keeping the event loop free."""
+    store = FakeStore()
+    transport = httpx.MockTransport(store.handler)
+    cache = PageCache()
+    fetcher = PageFetcher(async_transport=transport, cache=cache)
+    threads = []
+    for name in ("lookup", "store"):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *args, method=method: threads.append(threading.current_thread())
+                            or method(*args))
+
+    async def fetch_twice() -> threading.Thread:
+        await fetcher.aget_page("https://www.links.hr/hr/search?q=cpu")
+        await fetcher.aget_page("https://www.links.hr/hr/search?q=cpu")
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(fetch_twice())
+
+    assert len(threads) == 3 and loop_thread not in threads
+    assert len(store.requests) == 1
+    fetcher.close()
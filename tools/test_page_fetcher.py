@@ -0,0 +1,82 @@
+"""
+Unit tests for the pooled page fetcher in tools/page_fetcher.py.
+
+The fetcher is created around httpx mock transports, so no network access is needed.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from tools.page_fetcher import PageFetcher, html_to_text
+from tools.page_fetcher_model import FetchSettings
+
+PAGE = "<html><head><title>Store</title></head><body><p>Procesor</p><p>199,99 €</p></body></html>"
+
+
+def test_get_text_reuses_one_client():
+    """Test that pages are returned as text and all requests go through the same pooled client."""
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, content=PAGE.encode("utf-8"), headers={"Content-Type": "text/html; charset=utf-8"})
+
+    fetcher = PageFetcher(FetchSettings(connect_timeout=2, read_timeout=7), transport=httpx.MockTransport(handler))
+    client = fetcher.client
+
+    assert fetcher.get_text("https://www.links.hr/hr/search?q=cpu") == "StoreProcesor199,99 €"
+    assert fetcher.get_text("https://www.links.hr/hr/search?q=gpu") == "StoreProcesor199,99 €"
+    assert fetcher.client is client
+    assert client.timeout == httpx.Timeout(7, connect=2, pool=30)
+    assert "gzip" in requests[0].headers["Accept-Encoding"]
+    fetcher.close()
+
+
+def test_concurrent_fetches_are_limited_per_host():
+    """Test that async fetches to one host never exceed max_connections_per_host, while other hosts proceed."""
+    active: dict[str, int] = {}
+    max_active: dict[str, int] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        max_active[host] = max(max_active.get(host, 0), active[host])
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+        return httpx.Response(200, content=f"<p>{request.url.path}</p>".encode())
+
+    fetcher = PageFetcher(FetchSettings(max_connections_per_host=2), async_transport=httpx.MockTransport(handler))
+
+    async def run():
+        urls = [f"https://www.links.hr/{i}" for i in range(6)] + [f"https://www.protis.hr/{i}" for i in range(3)]
+        texts = await asyncio.gather(*(fetcher.aget_text(url) for url in urls))
+        await fetcher.aclose()
+        return texts
+
+    texts = asyncio.run(run())
+
+    assert texts[:2] == ["/0", "/1"]
+    assert max_active == {"www.links.hr": 2, "www.protis.hr": 2}
+
+
+def test_html_to_text_detects_declared_encoding():
+    """Test that documents without a charset header are decoded using their meta charset."""
+    content = '<meta charset="windows-1250"><p>Grafička kartica</p>'.encode("windows-1250")
+
+    assert html_to_text(content) == "Grafička kartica"
+
+
+def test_error_status_raises():
+    """Test that error responses raise instead of returning the error page, on the sync and async paths."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503, content=b"<html><body>Service Unavailable</body></html>")
+
+    transport = httpx.MockTransport(handler)
+    fetcher = PageFetcher(transport=transport, async_transport=transport)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        fetcher.get_page("https://www.links.hr/hr/search?q=cpu")
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(fetcher.aget_page("https://www.links.hr/hr/search?q=cpu"))
+    fetcher.close()
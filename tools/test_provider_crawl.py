@@ -0,0 +1,187 @@
+"""
+Unit tests for the paginated crawl of the provider tools in tools/provider_tool_interface.py.
+
+A mock Links store serves numbered search result pages in the markup of the store, repeating its last page for page
+numbers past the end like the store does.
+"""
+import asyncio
+import gc
+import threading
+import time
+from contextlib import aclosing
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from tools.item_extractor_agent import ExtractedData
+from tools.links_tool import LinksTool
+from tools.page_fetcher import PageFetcher
+
+
+class FakeStore:
+    """Mock store serving pages of items, numbered by the pagenumber parameter."""
+
+    def __init__(self, pages: int, page_size: int):
+        self.pages = pages
+        self.page_size = page_size
+        self.requested: list[int] = []
+        self.on_request = lambda page_number: None
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        page_number = int(request.url.params["pagenumber"])
+        self.requested.append(page_number)
+        self.on_request(page_number)
+        first = (min(page_number, self.pages) - 1) * self.page_size
+        items = "".join(
+            f'<div class="product-item"><div class="sku">{code}</div><h2 class="product-title"><a>Procesor {code}</a>'
+            f'</h2><span class="price actual-price">{100 + code},99 €</span></div>'
+            for code in range(first, first + self.page_size))
+        return httpx.Response(200, content=f"<html><body>{items}</body></html>".encode(),
+                              headers={"Content-Type": "text/html; charset=utf-8"})
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """Fixture serving three pages of two items through the page fetcher of the provider tools."""
+    store = FakeStore(pages=3, page_size=2)
+    transport = httpx.MockTransport(store.handler)
+    fetcher = PageFetcher(transport=transport, async_transport=transport)
+    monkeypatch.setattr("tools.provider_tool_interface.get_page_fetcher", lambda: fetcher)
+    yield store
+    fetcher.close()
+
+
+def create_tool() -> LinksTool:
+    """Return a Links tool with a mock extractor agent."""
+    agent = MagicMock()
+    agent.aingest = AsyncMock()
+    agent.aprocess_link = AsyncMock(return_value=ExtractedData(date_time="", store_name="Links"))
+    return LinksTool.model_construct(extractor_agent=agent)
+
+
+def item_codes(pages) -> list[list[str]]:
+    """Return the item codes of each crawled page."""
+    return [[item.item_code for item in page.items] for page in pages]
+
+
+def test_crawl_stops_at_repeated_page_and_item_budget(store):
+    """Test that the crawl ends at the last page of the store and trims the last page to the item budget."""
+    tool = create_tool()
+
+    assert item_codes(tool.crawl({"query": "cpu"}, max_pages=5)) == [["0", "1"], ["2", "3"], ["4", "5"]]
+    assert store.requested == [1, 2, 3, 4]
+    assert tool.extractor_agent.ingest.call_count == 3
+
+    store.requested.clear()
+    assert item_codes(tool.crawl({"query": "cpu"}, max_pages=5, max_items=3)) == [["0", "1"], ["2"]]
+    assert 4 not in store.requested
+
+    result = tool._run("cpu", max_pages=2)
+    assert [item.item_code for item in result.items] == ["0", "1", "2", "3"]
+
+
+def test_invalid_budgets_are_rejected_and_empty_crawls_return_no_items(store):
+    """Test that page and item budgets below one are rejected by get_data and an empty crawl merges to no items."""
+    tool = create_tool()
+
+    with pytest.raises(ValidationError):
+        tool.get_data({"query": "cpu", "max_pages": 0})
+    with pytest.raises(ValidationError):
+        asyncio.run(tool.aget_data({"query": "cpu", "max_items": 0}))
+    assert tool.search({"query": "cpu"}, max_pages=0).items == []
+    assert asyncio.run(tool.asearch({"query": "cpu"}, max_pages=0)).items == []
+    assert store.requested == []
+
+
+def test_crawl_prefetches_next_page_and_stops_when_caller_does(store):
+    """Test that page 2 is fetched while page 1 is extracted, and breaking out of the loop ends the crawl."""
+    tool = create_tool()
+    prefetched = threading.Event()
+    store.on_request = lambda page_number: prefetched.set() if page_number == 2 else None
+    fetched_during_extraction = []
+    tool.extractor_agent.ingest.side_effect = lambda data: fetched_during_extraction.append(prefetched.wait(5))
+
+    for page in tool.crawl({"query": "cpu"}, max_pages=10):
+        break
+
+    assert fetched_during_extraction == [True]
+    assert store.requested == [1, 2]
+
+
+def test_closed_crawl_does_not_wait_for_running_prefetch(store):
+    """Test that breaking out of the crawl returns while the prefetch of the next page is still being fetched."""
+    tool = create_tool()
+    fetching, release = threading.Event(), threading.Event()
+
+    def block_page_two(page_number):
+        if page_number == 2:
+            fetching.set()
+            release.wait(5)
+
+    store.on_request = block_page_two
+    pages = tool.crawl({"query": "cpu"}, max_pages=10)
+    next(pages)
+    assert fetching.wait(5)
+    started = time.monotonic()
+    pages.close()
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert elapsed < 2
+
+
+def test_closed_acrawl_retrieves_failed_prefetch(store):
+    """Test that a prefetch failing before the caller stops the async crawl is not reported as never retrieved."""
+    tool = create_tool()
+
+    def fail_page_two(page_number):
+        if page_number == 2:
+            raise httpx.ConnectError("connection refused")
+
+    async def extract_slowly(data):
+        await asyncio.sleep(0.1)
+
+    store.on_request = fail_page_two
+    tool.extractor_agent.aingest.side_effect = extract_slowly
+
+    async def crawl() -> list:
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        async with aclosing(tool.acrawl({"query": "cpu"}, max_pages=10)) as pages:
+            async for _ in pages:
+                break
+        await asyncio.sleep(0)
+        gc.collect()
+        return errors
+
+    assert asyncio.run(crawl()) == []
+    assert store.requested == [1, 2]
+
+
+def test_acrawl_yields_pages_within_budget(store):
+    """Test the async crawl with the same budgets and early stop."""
+    tool = create_tool()
+
+    async def crawl() -> list:
+        return [page async for page in tool.acrawl({"query": "cpu"}, max_pages=2, max_items=10)]
+
+    assert item_codes(asyncio.run(crawl())) == [["0", "1"], ["2", "3"]]
+    assert store.requested == [1, 2]
+
+
+def test_async_tool_ingests_off_the_event_loop_and_falls_back_with_fetched_page(store):
+    """Test that the async tool path ingests parsed pages asynchronously and hands fetched pages to the LLM."""
+    tool = create_tool()
+
+    result = asyncio.run(tool.aget_data({"query": "cpu", "max_pages": 5, "max_items": 5}))
+    assert [item.item_code for item in result.items] == ["0", "1", "2", "3", "4"]
+    assert tool.extractor_agent.aingest.await_count == 3
+    tool.extractor_agent.ingest.assert_not_called()
+
+    store.page_size = 0
+    asyncio.run(tool.aget_data({"query": "cpu"}))
+    url, page = tool.extractor_agent.aprocess_link.await_args.args
+    assert "pagenumber=1" in url and page.content == b"<html><body></body></html>"
+    tool.extractor_agent.process_link.assert_not_called()
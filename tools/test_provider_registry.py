@@ -0,0 +1,50 @@
+"""
+Unit tests for the provider registry in tools/provider_registry.py.
+"""
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from tools.item_extractor_agent import ItemExtractorAgent
+from tools.links_tool import LinksTool
+from tools.protis_tool import ProtisTool
+from tools.provider_registry import ProviderRegistry, provider_classes, register_provider
+
+
+def test_provider_modules_are_imported_on_first_lookup():
+    """Test that importing the tools package leaves the provider modules unimported until the registry is used."""
+    code = ("import sys, tools; from tools.provider_registry import provider_classes; "
+            "loaded = 'tools.links_tool' in sys.modules; print(loaded, sorted(provider_classes()))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == "False ['links', 'protis']"
+
+
+def test_register_provider_rejects_a_second_class_under_a_name():
+    """Test that the decorated classes are registered and a name can not be taken by another class."""
+    assert provider_classes() == {"links": LinksTool, "protis": ProtisTool}
+    with pytest.raises(ValueError):
+        register_provider("links")(ProtisTool)
+
+
+def test_registry_builds_agent_and_tools_once_per_configuration():
+    """Test that the agent and tools are reused for the same configuration key and rebuilt when it changes."""
+    registry = ProviderRegistry()
+    create_agent = MagicMock(side_effect=lambda: MagicMock(spec=ItemExtractorAgent))
+
+    tools = registry.tools(("model", 1), create_agent)
+    again = registry.tools(("model", 1), create_agent)
+    agent = registry.agent(("model", 1), create_agent)
+
+    assert create_agent.call_count == 1
+    assert [type(tool) for tool in tools] == [LinksTool, ProtisTool]
+    assert all(first is second for first, second in zip(tools, again))
+    assert all(tool.extractor_agent is agent for tool in tools)
+
+    rebuilt = registry.tools(("model", 2), create_agent)
+    assert create_agent.call_count == 2 and rebuilt[0] is not tools[0]
+    registry.clear()
+    registry.agent(("model", 2), create_agent)
+    assert create_agent.call_count == 3
@@ -0,0 +1,113 @@
+"""
+Unit tests for the provider result cache in tools/provider_result_cache.py and its use by the provider tools.
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from tools.item_extractor_agent import ExtractedData, ExtractedItem
+from tools.links_tool import LinksTool
+from tools.page_fetcher import PageFetcher
+from tools.provider_result_cache import ProviderResultCache, cache_key, configure_provider_result_cache
+
+
+def result(code: str) -> ExtractedData:
+    """Return a search result with one item."""
+    return ExtractedData(date_time="2025-01-01T00:00:00", store_name="Links",
+                         items=[ExtractedItem(price="219,99 €", description="Procesor", item_code=code)])
+
+
+def test_cache_key_normalizes_parameters():
+    """Test that parameters differing in case, spacing and order share a key, other providers do not."""
+    assert cache_key("LinksTool", {"query": " Intel  Procesor", "min_price": 200}) == \
+        cache_key("LinksTool", {"min_price": 200, "query": "intel procesor"})
+    assert cache_key("LinksTool", {"query": "cpu"}) != cache_key("ProtisTool", {"query": "cpu"})
+    assert cache_key("LinksTool", {"query": "cpu", "max_pages": 1}) != cache_key("LinksTool", {"query": "cpu"})
+
+
+def test_stale_result_is_served_while_one_refresh_runs():
+    """Test fresh hits, a stale hit answered at once with a single background refresh, and the refreshed result."""
+    cache = ProviderResultCache(ttl=0.05, stale_while_revalidate=60)
+    loads = iter(["1", "2", "3"])
+    release = threading.Event()
+
+    def load() -> ExtractedData:
+        code = next(loads)
+        if code == "2":
+            release.wait(5)
+        return result(code)
+
+    assert cache.get("LinksTool", {"query": "cpu"}, load).items[0].item_code == "1"
+    assert cache.get("LinksTool", {"query": "CPU"}, load).items[0].item_code == "1"
+    time.sleep(0.06)
+    assert cache.get("LinksTool", {"query": "cpu"}, load).items[0].item_code == "1"
+    assert cache.get("LinksTool", {"query": "cpu"}, load).items[0].item_code == "1"
+    release.set()
+    cache.close()
+
+    assert cache.get("LinksTool", {"query": "cpu"}, load).items[0].item_code == "2"
+    stats = cache.stats()
+    assert (stats.hits, stats.stale_hits, stats.misses, stats.refreshes) == (2, 2, 1, 1)
+    assert 'provider_result_cache_lookups_total{result="stale"} 2' in cache.render_prometheus()
+
+
+def test_concurrent_misses_share_one_job_and_errors_are_not_cached():
+    """Test that identical async misses wait for one load, which survives a cancelled caller, and failures retry."""
+    cache = ProviderResultCache(ttl=60)
+    calls = []
+
+    async def load() -> ExtractedData:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return result(str(len(calls)))
+
+    async def failing() -> ExtractedData:
+        raise ValueError("layout changed")
+
+    async def run():
+        impatient = asyncio.wait_for(cache.aget("LinksTool", {"query": "cpu"}, load), 0.01)
+        results = await asyncio.gather(impatient, *(cache.aget("LinksTool", {"query": "cpu"}, load)
+                                                    for _ in range(4)), return_exceptions=True)
+        assert isinstance(results[0], asyncio.TimeoutError)
+        assert [data.items[0].item_code for data in results[1:]] == ["1"] * 4
+        with pytest.raises(ValueError):
+            await cache.aget("LinksTool", {"query": "gpu"}, failing)
+        assert (await cache.aget("LinksTool", {"query": "gpu"}, load)).items[0].item_code == "2"
+
+    asyncio.run(run())
+
+    stats = cache.stats()
+    assert len(calls) == 2
+    assert (stats.misses, stats.coalesced, stats.errors, stats.entries) == (3, 4, 1, 2)
+
+
+def test_provider_tool_serves_repeated_searches_from_cache(monkeypatch):
+    """Test that a repeated Links search is answered without fetching or ingesting the page again."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, content=b"<html><body>Nema rezultata</body></html>")
+
+    fetcher = PageFetcher(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr("tools.provider_tool_interface.get_page_fetcher", lambda: fetcher)
+    configure_provider_result_cache(ProviderResultCache(ttl=60))
+    try:
+        agent = MagicMock()
+        agent.process_link.return_value = result("050.600.196")
+        tool = LinksTool.model_construct(extractor_agent=agent)
+
+        first = tool._run("intel procesor", 200, 300)
+        fetched = len(requests)
+        second = tool.get_data({"query": "Intel Procesor", "min_price": 200, "max_price": 300})
+    finally:
+        configure_provider_result_cache(None)
+        fetcher.close()
+
+    assert second == first
+    assert agent.process_link.call_count == 1
+    assert len(requests) == fetched
@@ -0,0 +1,79 @@
+"""
+Unit tests for the deterministic store parsers in tools/store_parser.py and their use by the provider tools.
+
+The Links fixture reproduces the search results of outputs/web_no_html_sample.txt in the markup of the store search
+page, the Protis fixture a search of the Protis store.
+"""
+import os
+from unittest.mock import MagicMock
+
+import httpx
+
+from tools.item_extractor_agent import ExtractedData
+from tools.links_tool import LINKS_PARSER, LinksTool
+from tools.page_fetcher import PageFetcher
+from tools.protis_tool import PROTIS_PARSER
+from tools.store_parser import ParseRules, StoreParser
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name: str) -> bytes:
+    """Return the content of a saved store page."""
+    with open(os.path.join(FIXTURES, name), "rb") as file:
+        return file.read()
+
+
+def test_links_parser_extracts_search_results():
+    """Test that the Links parser returns every search result with its code and current price."""
+    page = LINKS_PARSER.parse(read_fixture("links_search.html"), date_time="2025-07-06T10:00:00")
+
+    assert LINKS_PARSER.is_confident(page)
+    assert page.data.store_name == "Links" and page.data.date_time == "2025-07-06T10:00:00"
+    assert [(item.item_code, item.price) for item in page.data.items] == [
+        ("050.600.196", "219,99 €"), ("010.501.051", "264,99 €"), ("010.501.135", "284,99 €")]
+    assert page.data.items[0].description == \
+        "Procesor INTEL Core i5 12600K BOX, s. 1700, 3.7GHz, 20MB cache, bez hladnjaka"
+
+
+def test_protis_parser_extracts_search_results():
+    """Test that the Protis parser strips the item code label and reads the current price."""
+    page = PROTIS_PARSER.parse(read_fixture("protis_search.html"))
+
+    assert PROTIS_PARSER.is_confident(page)
+    assert [(item.item_code, item.price) for item in page.data.items] == [
+        ("52341", "94,90 €"), ("52298", "154,90 €"), ("53012", "1.049,00 €")]
+    assert page.data.items[2].description == "Procesor Intel Core i7-14700K, 3.4GHz, LGA1700, BOX, bez hladnjaka"
+
+
+def test_incomplete_parse_is_not_confident():
+    """Test that a layout change leaving most items without prices fails the confidence check."""
+    parser = StoreParser(ParseRules(store_name="Links", item_selector="div.product-item",
+                                    description_selector="h2.product-title a", price_selector="span.new-price",
+                                    item_code_selector="div.sku"))
+
+    page = parser.parse(read_fixture("links_search.html"))
+
+    assert page.candidates == 3 and page.data.items == []
+    assert not parser.is_confident(page)
+    assert not LINKS_PARSER.is_confident(LINKS_PARSER.parse(read_fixture("protis_search.html")))
+
+
+def test_tool_uses_parser_and_falls_back_to_llm(monkeypatch):
+    """Test that a confident parse is ingested without the LLM, and a page without results goes to the LLM."""
+    pages = {"links.hr": read_fixture("links_search.html"), "empty": b"<html><body>Nema rezultata</body></html>"}
+    served = pages["links.hr"]
+    fetcher = PageFetcher(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=served)))
+    monkeypatch.setattr("tools.provider_tool_interface.get_page_fetcher", lambda: fetcher)
+    agent = MagicMock()
+    agent.process_link.return_value = ExtractedData(date_time="", store_name="Links")
+    tool = LinksTool.model_construct(extractor_agent=agent)
+
+    result = tool._run("intel procesor", 200, 300)
+    assert len(result.items) == 3
+    agent.ingest.assert_called_once_with(result)
+    agent.process_link.assert_not_called()
+
+    served = pages["empty"]
+    tool._run("intel procesor", 200, 300)
+    agent.process_link.assert_called_once()
@@ -35,11 +35,8 @@ class TimeTool(BaseTool):
     async def _arun(self, run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> str:
         """
         Asynchronously returns the current time in ISO format.
-        If the calculation is cheap, you can just delegate to the sync implementation
-        as shown below.
-        If the sync calculation is expensive, you should delete the entire _arun method.
-        LangChain will automatically provide a better implementation that will
-        kick off the task in a thread to make sure it doesn't block other async code.
+
+        Reading the clock does not block, so the time is returned on the event loop without a worker thread.
 
         Returns:
             str: The current time in ISO format.
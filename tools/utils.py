@@ -2,10 +2,14 @@
 """
 Utility functions for document extraction and web content loading.
 
-This module provides helpers for fetching and extracting text from URLs using LangChain document loaders.
+This module provides helpers for fetching and extracting text from URLs through the shared page fetcher, which reuses
+pooled keep-alive connections to the store hosts. The text is pruned of store boilerplate, so that only the page
+title and product listing reach the extraction model.
 """
-from langchain_core.documents import Document
-from langchain_community.document_loaders import WebBaseLoader
+import asyncio
+
+from tools.content_pruner import CONTENT_PRUNER
+from tools.page_fetcher import get_page_fetcher
 
 def get_url_text(url: str) -> str:
     """
@@ -15,9 +19,32 @@ def get_url_text(url: str) -> str:
         url (str): The URL to fetch the text from.
 
     Returns:
-        str: The text content of the page.
+        str: The pruned text content of the page.
+    """
+    page = get_page_fetcher().get_page(url)
+    return CONTENT_PRUNER.prune(page.content, page.encoding).text
+
+async def aget_url_text(url: str) -> str:
+    """
+    Asynchronously fetches the text content from a given URL.
+
+    Args:
+        url (str): The URL to fetch the text from.
+
+    Returns:
+        str: The pruned text content of the page.
+    """
+    page = await get_page_fetcher().aget_page(url)
+    return CONTENT_PRUNER.prune(page.content, page.encoding).text
+
+async def aget_urls_text(urls: list[str]) -> list[str]:
+    """
+    Concurrently fetches the text content of several URLs, limited per host by the page fetcher.
+
+    Args:
+        urls (list[str]): The URLs to fetch the text from.
+
+    Returns:
+        list[str]: The pruned text content of the pages, in the order of the URLs.
     """
-    loader =  WebBaseLoader(url)
-    docs: list[Document] = loader.load()
-    text = docs[0].page_content if docs else ""
-    return text
+    return list(await asyncio.gather(*(aget_url_text(url) for url in urls)))
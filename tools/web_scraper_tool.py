@@ -10,7 +10,7 @@ from langchain_core.callbacks import (
     CallbackManagerForToolRun,
 )
 
-from tools.utils import get_url_text
+from tools.utils import aget_url_text, get_url_text
 
 logger = logging.getLogger(__name__)
 
@@ -36,14 +36,13 @@ class WebScraperTool(BaseTool):
 
     async def _arun(self, url: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> str:
         """
-        Asynchronously returns the content of a web page as a plain text.
-        If the calculation is cheap, you can just delegate to the sync implementation
-        as shown below.
-        If the sync calculation is expensive, you should delete the entire _arun method.
-        LangChain will automatically provide a better implementation that will
-        kick off the task in a thread to make sure it doesn't block other async code.
+        Asynchronously returns the content of a web page as a plain text, fetched over the pooled connections of
+        the shared async client.
 
         Returns:
             str: The content of the web page as plain text.
         """
-        return self._run(url, run_manager=run_manager.get_sync()) if run_manager else self._run(url)
+        logger.info("WebScraperTool called with URL: %s", url)
+        text = await aget_url_text(url)
+        logger.info("WebScraperTool returning text of length: %d characters", len(text))
+        return text
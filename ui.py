@@ -18,6 +18,10 @@ Functions:
         Sends a user query to the backend API and returns the agent's response messages
     query_db_api(text: str) -> list[RetrievedDatabaseExtractedItem]:
         Retrieves items from the database via API using text similarity search
+    stream_db_api(text: str) -> Iterator[RetrievedDatabaseExtractedItem]:
+        Yields items from the database via API as the streamed response arrives
+    search_database(text: str, max_results: int) -> list[RetrievedDatabaseExtractedItem]:
+        Streams search results into the results table while they arrive
     init_session_state():
         Initializes Streamlit session state variables
     main():
@@ -26,6 +30,7 @@ Functions:
 Constants:
     API_URL: URL of the FastAPI backend
     TIMEOUT: HTTP request timeout configuration
+    STREAM_PAGE_SIZE: Number of results fetched per page when streaming database results
     DEFAULT_SETUP_PROMPT: Default system prompt for agent initialization
 """
 
@@ -34,7 +39,7 @@ from streamlit.web import bootstrap
 bootstrap.load_config_options(flag_options={"browser.gatherUsageStats": False})
 
 import os
-from typing import Optional, Literal, List
+from typing import Iterator, Optional, Literal, List
 from pydantic import BaseModel
 from database.retrieved_item_model import RetrievedDatabaseExtractedItem
 import httpx
@@ -43,6 +48,8 @@ import streamlit as st
 # API Configuration
 API_URL = "http://localhost:8000"
 TIMEOUT = httpx.Timeout(600, connect=5, pool=5)
+# Number of results the API fetches from the database per streamed page
+STREAM_PAGE_SIZE = 10
 
 # CSS styles for message types
 MESSAGE_STYLES = {
@@ -205,7 +212,88 @@ def query_db_api(text: str, max_results: int = 10) -> list[RetrievedDatabaseExtr
                 raise ValueError(f"API returned error status code: {response.status_code}")
     except httpx.RequestError as e:
         raise ValueError(f"Failed to connect to API: {str(e)}")
-        
+
+
+def stream_db_api(text: str, max_results: int = 10) -> Iterator[RetrievedDatabaseExtractedItem]:
+    """
+    Query the backend API's database using the NDJSON streaming mode, yielding items as they arrive.
+
+    Args:
+        text (str): User's query text to be embedded and used for similarity search
+        max_results (int, optional): Maximum number of results to return. Defaults to 10.
+
+    Returns:
+        Iterator[RetrievedDatabaseExtractedItem]: The retrieved items, most similar first
+
+    Raises:
+        ValueError: If API connection fails, the server returns an error or a line can not be parsed
+    """
+    payload = {
+        "text": text,
+        "max_results": max_results,
+        "user_id": "default_user",
+        "page_size": STREAM_PAGE_SIZE,
+        "stream": True
+    }
+    try:
+        with httpx.Client() as client:
+            with client.stream("POST", f"{API_URL}/query_db", json=payload, timeout=TIMEOUT) as response:
+                if response.status_code != 200:
+                    raise ValueError(f"API returned error status code: {response.status_code}")
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    try:
+                        yield RetrievedDatabaseExtractedItem.model_validate_json(line)
+                    except ValueError as e:
+                        raise ValueError(f"Failed to parse API response: {str(e)}")
+    except httpx.RequestError as e:
+        raise ValueError(f"Failed to connect to API: {str(e)}")
+
+
+def search_database(text: str, max_results: int) -> list[RetrievedDatabaseExtractedItem]:
+    """
+    Stream search results from the API, rendering the rows received so far while the rest arrive.
+
+    Args:
+        text (str): User's query text
+        max_results (int): Maximum number of results to return
+
+    Returns:
+        list[RetrievedDatabaseExtractedItem]: All retrieved items
+
+    Raises:
+        ValueError: If API connection fails or the server returns an error
+    """
+    placeholder = st.empty()
+    retrieved_items: list[RetrievedDatabaseExtractedItem] = []
+    try:
+        for item in stream_db_api(text, max_results):
+            retrieved_items.append(item)
+            placeholder.dataframe([table_row(item) for item in retrieved_items], use_container_width=True)
+    finally:
+        placeholder.empty()
+    return retrieved_items
+
+
+def table_row(item: RetrievedDatabaseExtractedItem) -> dict[str, str]:
+    """
+    Convert a retrieved item to a row of the results table.
+
+    Args:
+        item (RetrievedDatabaseExtractedItem): The retrieved item
+
+    Returns:
+        dict[str, str]: The table columns of the item
+    """
+    return {
+        "Similarity": f"{item.similarity_score:.4f}",
+        "Description": item.description,
+        "Price": item.price,
+        "Store": item.store_name,
+        "Item Code": item.item_code,
+        "Date Retrieved": item.date_time
+    }
 
 
 
@@ -348,8 +436,8 @@ def main():
                             if query not in st.session_state.db_query_history:
                                 st.session_state.db_query_history.append(query)
                             
-                            # Get items from database via API
-                            retrieved_items = query_db_api(query, max_results)
+                            # Stream items from database via API, rendering rows as they arrive
+                            retrieved_items = search_database(query, max_results)
                             st.session_state.retrieved_items = retrieved_items
                             
                             if retrieved_items:
@@ -370,8 +458,8 @@ def main():
                             if st.button(f"Rerun: {past_query}", key=f"history_{idx}"):
                                 try:
                                     with st.spinner("Searching database..."):
-                                        # Get items from database via API using current max_results setting
-                                        retrieved_items = query_db_api(past_query, max_results)
+                                        # Stream items from database via API using current max_results setting
+                                        retrieved_items = search_database(past_query, max_results)
                                         st.session_state.retrieved_items = retrieved_items
                                         
                                         if retrieved_items:
@@ -390,17 +478,7 @@ def main():
                     st.markdown("### 📊 Search Results")
                     
                     # Create a table for the items with similarity as the first column
-                    table_data = [
-                        {
-                            "Similarity": f"{item.similarity_score:.4f}",
-                            "Description": item.description,
-                            "Price": item.price,
-                            "Store": item.store_name,
-                            "Item Code": item.item_code,
-                            "Date Retrieved": item.date_time
-                        }
-                        for item in st.session_state.retrieved_items
-                    ]
+                    table_data = [table_row(item) for item in st.session_state.retrieved_items]
                     
                     # Make the table wider by setting the container width and using st.container()
                     with st.container():